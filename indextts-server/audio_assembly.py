@@ -0,0 +1,58 @@
+"""
+Assembly of generated segments into a single PCM buffer.
+
+Segments arrive as raw float arrays straight from inference. They are
+copied once into a preallocated buffer with silence gaps, the peak is
+tracked while copying, and a single in-place pass normalizes and converts
+to int16.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+# Leave a little headroom below full scale
+NORMALIZE_PEAK = 0.95
+
+
+def to_mono_float(samples) -> np.ndarray:
+    """Flatten model output ((N,), (N, 1) or (1, N)) to a 1-D float32 array"""
+    arr = np.asarray(samples)
+    if arr.ndim > 1:
+        # (N, channels) from IndexTTS2, or (channels, N) from torch-style output
+        arr = arr[:, 0] if arr.shape[0] >= arr.shape[1] else arr[0]
+    return arr.astype(np.float32, copy=False)
+
+
+def assemble_segments(segments: Sequence[np.ndarray], sample_rate: int, silence_ms: int = 200) -> np.ndarray:
+    """
+    Concatenate segments with silence between them and normalize to int16.
+
+    Linear in total length: one copy per segment into a buffer sized up
+    front, then one scale-and-convert pass.
+    """
+    if not segments:
+        return np.zeros(0, dtype=np.int16)
+
+    gap = int(sample_rate * silence_ms / 1000)
+    total = sum(len(seg) for seg in segments) + gap * (len(segments) - 1)
+    combined = np.zeros(total, dtype=np.float32)
+
+    peak = 0.0
+    offset = 0
+    for idx, seg in enumerate(segments):
+        if idx:
+            offset += gap  # buffer is already zeroed
+        end = offset + len(seg)
+        combined[offset:end] = seg
+        if len(seg):
+            peak = max(peak, float(np.max(np.abs(combined[offset:end]))))
+        offset = end
+
+    # Normalize to prevent clipping
+    if peak > 0:
+        combined *= 32767 * NORMALIZE_PEAK / peak
+    return combined.astype(np.int16)
+
+
+__all__ = ["assemble_segments", "to_mono_float", "NORMALIZE_PEAK"]
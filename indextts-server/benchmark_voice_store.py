@@ -0,0 +1,137 @@
+"""
+Benchmark: startup time and memory of the voice embedding cache at N voices.
+
+Compares the old layout (one pickle per voice, all unpickled into RAM at
+startup) with the memory-mapped VoiceStore (manifest read at startup,
+tensors mapped on first use). Each measurement runs in a fresh subprocess
+so RSS numbers aren't polluted by the previous run.
+
+Usage:
+    python benchmark_voice_store.py                 # 10, 100, 300 voices
+    python benchmark_voice_store.py --voices 50 500 --touch 8
+"""
+
+import argparse
+import json
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from voice_store import VoiceStore
+
+# Roughly IndexTTS2's shapes for a 15s reference clip (FP32 on CPU)
+SHAPES = {
+    "spk_cond_emb": (1, 750, 1024),
+    "style": (1, 192),
+    "prompt_condition": (1, 1290, 512),
+    "ref_mel": (1, 80, 1290),
+}
+
+
+def make_embedding(idx: int) -> dict:
+    rng = np.random.default_rng(idx)
+    data = {name: rng.standard_normal(shape, dtype=np.float32) for name, shape in SHAPES.items()}
+    data.update({"name": f"voice{idx}", "audio_path": f"voices/voice{idx}.wav", "extracted_at": time.time()})
+    return data
+
+
+def build_fixtures(root: Path, count: int) -> None:
+    pkl_dir = root / "pickle"
+    pkl_dir.mkdir(parents=True, exist_ok=True)
+    store = VoiceStore(root / "store", max_resident_bytes=1)
+    for i in range(count):
+        emb = make_embedding(i)
+        with open(pkl_dir / f"voice{i}.pkl", "wb") as f:
+            pickle.dump(emb, f)
+        store.put(f"voice{i}", emb)
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (Linux /proc, falls back to ru_maxrss)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        import os
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode: str, root: Path, touch: int, budget_mb: float) -> dict:
+    """Runs inside the subprocess: 'start' the cache, then use `touch` voices"""
+    base = rss_mb()
+    start = time.perf_counter()
+    if mode == "pickle":
+        cache = {}
+        for path in (root / "pickle").glob("*.pkl"):
+            with open(path, "rb") as f:
+                cache[path.stem] = pickle.load(f)
+        get = cache.get
+    else:
+        store = VoiceStore(root / "store", max_resident_bytes=int(budget_mb * 1024 * 1024))
+        get = store.get
+    startup_ms = (time.perf_counter() - start) * 1000
+    after_start = rss_mb()
+
+    start = time.perf_counter()
+    checksum = 0.0
+    for i in range(touch):
+        emb = get(f"voice{i}")
+        checksum += float(emb["spk_cond_emb"][0, 0, 0]) + float(np.asarray(emb["ref_mel"]).sum())
+    first_use_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "startup_ms": round(startup_ms, 1),
+        "startup_rss_mb": round(after_start - base, 1),
+        "first_use_ms": round(first_use_ms, 1),
+        "rss_after_use_mb": round(rss_mb() - base, 1),
+        "checksum": checksum,
+    }
+
+
+def run_child(mode: str, root: Path, touch: int, budget_mb: float) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode, "--root", str(root),
+         "--touch", str(touch), "--budget-mb", str(budget_mb)],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voices", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--touch", type=int, default=8, help="voices used after startup")
+    parser.add_argument("--budget-mb", type=float, default=256, help="VoiceStore resident budget")
+    parser.add_argument("--child", choices=["pickle", "store"], help=argparse.SUPPRESS)
+    parser.add_argument("--root", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args.root, args.touch, args.budget_mb)))
+        return
+
+    per_voice_mb = sum(int(np.prod(s)) * 4 for s in SHAPES.values()) / (1024 * 1024)
+    print(f"Embedding size: {per_voice_mb:.1f} MB/voice, touching {args.touch} voices, "
+          f"store budget {args.budget_mb:.0f} MB\n")
+    header = f"{'voices':>6} | {'layout':>6} | {'startup ms':>10} | {'startup MB':>10} | {'first use ms':>12} | {'RSS MB':>7}"
+    print(header)
+    print("-" * len(header))
+    for count in args.voices:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            build_fixtures(root, count)
+            for mode in ("pickle", "store"):
+                r = run_child(mode, root, min(args.touch, count), args.budget_mb)
+                print(f"{count:>6} | {mode:>6} | {r['startup_ms']:>10} | {r['startup_rss_mb']:>10} | "
+                      f"{r['first_use_ms']:>12} | {r['rss_after_use_mb']:>7}")
+
+
+if __name__ == "__main__":
+    main()
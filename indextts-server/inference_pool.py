@@ -0,0 +1,212 @@
+"""
+Per-request voice conditioning and model worker pool for the IndexTTS2 server.
+
+IndexTTS2 reads its speaker conditioning from attributes on the model object
+(cache_spk_cond, cache_s2mel_style, cache_mel, ...). Writing those onto one
+shared model for every request means two concurrent requests for different
+voices overwrite each other. Instead, every request carries its own
+VoiceConditioning, and inference runs on a ModelWorker that owns a model
+replica exclusively for the duration of the call.
+
+Kept free of torch/fastapi imports at module level so it can be exercised
+with a stub model.
+"""
+
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+def _move(value: Any, device: Any) -> Any:
+    """Move a tensor-like value to a device; pass anything else through."""
+    if device is not None and hasattr(value, "to"):
+        return value.to(device)
+    return value
+
+
+@dataclass(frozen=True)
+class VoiceConditioning:
+    """Speaker conditioning for a single inference call."""
+    voice: str
+    audio_path: str
+    spk_cond_emb: Any
+    style: Any
+    prompt_condition: Any
+    ref_mel: Any
+    # Changes when the voice is re-extracted; keys device-resident copies
+    version: Any = None
+
+    @classmethod
+    def from_embedding(cls, voice: str, embedding: Dict[str, Any]) -> "VoiceConditioning":
+        """Build a conditioning context from a cached voice embedding dict"""
+        return cls(
+            voice=voice,
+            audio_path=embedding["audio_path"],
+            spk_cond_emb=embedding["spk_cond_emb"],
+            style=embedding["style"],
+            prompt_condition=embedding["prompt_condition"],
+            ref_mel=embedding["ref_mel"],
+            version=embedding.get("extracted_at"),
+        )
+
+    def to(self, device: Any) -> "VoiceConditioning":
+        """Return a copy with all tensors on the given device"""
+        return VoiceConditioning(
+            voice=self.voice,
+            audio_path=self.audio_path,
+            spk_cond_emb=_move(self.spk_cond_emb, device),
+            style=_move(self.style, device),
+            prompt_condition=_move(self.prompt_condition, device),
+            ref_mel=_move(self.ref_mel, device),
+            version=self.version,
+        )
+
+    def bind(self, model: Any) -> None:
+        """
+        Install this conditioning as the model's reference cache.
+
+        IndexTTS2.infer() skips feature extraction when spk_audio_prompt
+        matches cache_spk_audio_prompt, so this is how a pre-extracted
+        embedding is fed in. Only call this on a model owned by the
+        current worker.
+        """
+        model.cache_spk_cond = self.spk_cond_emb
+        model.cache_s2mel_style = self.style
+        model.cache_s2mel_prompt = self.prompt_condition
+        model.cache_spk_audio_prompt = self.audio_path
+        model.cache_mel = self.ref_mel
+        # Use the same voice as emotion reference for consistent delivery
+        model.cache_emo_cond = self.spk_cond_emb
+        model.cache_emo_audio_prompt = self.audio_path
+
+
+class ModelWorker:
+    """A model replica pinned to one device; used by one request at a time."""
+
+    def __init__(self, model: Any, device: Any = None, index: int = 0, device_cache: Any = None):
+        self.model = model
+        self.device = device
+        self.index = index
+        # Optional LRU (get_or_load/discard) of conditioning already on device
+        self.device_cache = device_cache
+        self._busy = threading.Lock()
+
+    def place(self, conditioning: VoiceConditioning) -> VoiceConditioning:
+        """Move conditioning to this worker's device, reusing cached copies"""
+        if self.device_cache is None:
+            return conditioning.to(self.device)
+        key = (str(self.device), conditioning.voice, conditioning.version)
+        return self.device_cache.get_or_load(key, lambda: conditioning.to(self.device))
+
+    def infer(self, conditioning: VoiceConditioning, **kwargs: Any) -> Any:
+        """Run inference for one request with its own conditioning"""
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError(f"Worker {self.index} is already running a request")
+        try:
+            ctx = self.place(conditioning)
+            ctx.bind(self.model)
+            kwargs["spk_audio_prompt"] = ctx.audio_path
+            return self.model.infer(**kwargs)
+        finally:
+            self._busy.release()
+
+
+class InferencePool:
+    """
+    Hands out ModelWorkers to requests.
+
+    Each worker is checked out by exactly one request at a time, so the
+    conditioning bound to its model can't be replaced mid-inference.
+    """
+
+    def __init__(self, workers: List[ModelWorker]):
+        if not workers:
+            raise ValueError("InferencePool needs at least one worker")
+        self.workers = list(workers)
+        self._idle: "queue.Queue[ModelWorker]" = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+
+    @property
+    def size(self) -> int:
+        return len(self.workers)
+
+    @property
+    def primary_model(self) -> Any:
+        """Model used for embedding extraction and other read-only work"""
+        return self.workers[0].model
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize()
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[ModelWorker]:
+        """Check out an idle worker, waiting up to timeout seconds"""
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No IndexTTS2 worker became available in time")
+        try:
+            yield worker
+        finally:
+            self._idle.put(worker)
+
+    def infer(self, conditioning: VoiceConditioning, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Run one inference on the next idle worker"""
+        with self.acquire(timeout=timeout) as worker:
+            return worker.infer(conditioning, **kwargs)
+
+
+def detect_devices() -> List[str]:
+    """List the devices models can be placed on ("cuda:N", "mps" or "cpu")"""
+    try:
+        import torch
+    except ImportError:
+        return ["cpu"]
+    if torch.cuda.is_available():
+        return [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+    if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+        return ["mps"]
+    return ["cpu"]
+
+
+def plan_worker_devices(devices: Optional[List[str]] = None) -> List[str]:
+    """
+    Decide how many workers to run and where.
+
+    INDEXTTS_WORKERS sets the total explicitly; otherwise each device gets
+    INDEXTTS_WORKERS_PER_DEVICE replicas (default 1, since a replica needs
+    ~4-6GB of VRAM in FP16). Workers are spread round-robin over devices.
+    """
+    devices = devices or detect_devices()
+    total = int(os.environ.get("INDEXTTS_WORKERS", "0") or 0)
+    if total <= 0:
+        per_device = max(1, int(os.environ.get("INDEXTTS_WORKERS_PER_DEVICE", "1") or 1))
+        total = per_device * len(devices)
+    return [devices[i % len(devices)] for i in range(total)]
+
+
+def build_pool(
+    factory: Callable[[str], Any],
+    devices: Optional[List[str]] = None,
+    device_cache: Any = None,
+) -> InferencePool:
+    """Create one model replica per planned worker slot via factory(device)"""
+    workers = []
+    for index, device in enumerate(plan_worker_devices(devices)):
+        workers.append(ModelWorker(factory(device), device=device, index=index, device_cache=device_cache))
+    return InferencePool(workers)
+
+
+__all__ = [
+    "VoiceConditioning",
+    "ModelWorker",
+    "InferencePool",
+    "detect_devices",
+    "plan_worker_devices",
+    "build_pool",
+]
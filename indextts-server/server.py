@@ -14,37 +14,77 @@ import io
 import json
 import time
 import uuid
-import pickle
 import asyncio
 import zipfile
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from contextlib import asynccontextmanager
 
 import torch
 import numpy as np
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form, BackgroundTasks
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+from audio_assembly import assemble_segments, to_mono_float
+from inference_pool import InferencePool, VoiceConditioning, build_pool
+from metrics import CHARACTERS, CONTENT_TYPE, ENGINE_ERRORS, REGISTRY, RTF, STAGE_SECONDS
+import tracing
+import tts_logging
+from tts_logging import LOG_SAMPLE_RATE, get_logger
+from voice_store import TENSOR_FIELDS, ByteBudgetLRU, VoiceStore, budget_from_env, nbytes
+
 # Directories
 VOICES_DIR = Path("voices")
-CACHE_DIR = Path("cache")  # For embeddings cache
+CACHE_DIR = Path("cache")  # Memory-mapped embedding store (manifest.json + .npy)
 OUTPUT_DIR = Path("outputs")
 TEMP_DIR = Path("temp")
 
+# Engine label on this server's metrics (matches the webapp's engine name)
+ENGINE = "indextts"
+tracing.set_service(ENGINE)
+
+# Per-request messages go through the queued structured logger; per-segment
+# ones are sampled at LOG_SAMPLE_RATE
+tts_logging.configure()
+log = get_logger(ENGINE)
+segment_log = get_logger("batch", sample_rate=LOG_SAMPLE_RATE)
+
 # Create directories
 for d in [VOICES_DIR, CACHE_DIR, OUTPUT_DIR, TEMP_DIR]:
     d.mkdir(exist_ok=True)
 
-# Global model instance
+# Global model instance (primary replica, used for embedding extraction)
 tts_model = None
 model_loaded = False
 
-# Voice embedding cache - stores extracted embeddings for all voices
-# Key: voice_name, Value: dict with spk_cond, style, prompt, etc.
-voice_cache: Dict[str, Dict[str, Any]] = {}
+# Worker pool of model replicas; each request checks out one replica
+inference_pool: Optional[InferencePool] = None
+
+# Threads that run batch segments; sized to the pool so each can hold a worker
+segment_executor: Optional[ThreadPoolExecutor] = None
+
+# Serializes extraction so concurrent first requests for a voice extract once
+extraction_lock = threading.Lock()
+
+# Voice embedding store - manifest of all extracted voices on disk; tensors are
+# memory-mapped on first use and evicted LRU beyond INDEXTTS_VOICE_RAM_MB
+voice_store = VoiceStore(
+    CACHE_DIR,
+    max_resident_bytes=budget_from_env("INDEXTTS_VOICE_RAM_MB", 2048),
+    tensor_factory=torch.from_numpy,
+)
+
+# Conditioning already copied to a GPU, keyed (device, voice, version) and
+# bounded by INDEXTTS_VOICE_VRAM_MB so hot voices skip the host->device copy
+device_voice_cache = ByteBudgetLRU(
+    budget_from_env("INDEXTTS_VOICE_VRAM_MB", 512),
+    sizeof=lambda ctx: sum(nbytes(getattr(ctx, f)) for f in TENSOR_FIELDS),
+)
 
 
 class TTSRequest(BaseModel):
@@ -68,8 +108,8 @@ class VoiceUploadResponse(BaseModel):
 
 
 def load_model():
-    """Load IndexTTS2 model"""
-    global tts_model, model_loaded
+    """Load IndexTTS2 model replicas (one worker per device by default)"""
+    global tts_model, model_loaded, inference_pool, segment_executor
     
     print("[IndexTTS2] Loading model in FP16 mode...")
     start = time.time()
@@ -87,18 +127,27 @@ def load_model():
         if indextts_path.exists():
             checkpoint_dir = str(indextts_path / "checkpoints")
         
-        tts_model = IndexTTS2(
-            cfg_path=f"{checkpoint_dir}/config.yaml",
-            model_dir=checkpoint_dir,
-            use_fp16=True,  # FP16 for lower VRAM (~4-6GB)
-            use_cuda_kernel=False,  # Disable for compatibility
-            use_deepspeed=False  # Disable for simplicity
+        def create_replica(device: str):
+            print(f"[IndexTTS2] Loading replica on {device}...")
+            return IndexTTS2(
+                cfg_path=f"{checkpoint_dir}/config.yaml",
+                model_dir=checkpoint_dir,
+                use_fp16=True,  # FP16 for lower VRAM (~4-6GB)
+                device=device,
+                use_cuda_kernel=False,  # Disable for compatibility
+                use_deepspeed=False  # Disable for simplicity
+            )
+        
+        inference_pool = build_pool(create_replica, device_cache=device_voice_cache)
+        tts_model = inference_pool.primary_model
+        segment_executor = ThreadPoolExecutor(
+            max_workers=inference_pool.size, thread_name_prefix="indextts-segment"
         )
         
         model_loaded = True
-        print(f"[IndexTTS2] Model loaded in {time.time() - start:.2f}s")
+        print(f"[IndexTTS2] {inference_pool.size} worker(s) loaded in {time.time() - start:.2f}s")
         
-        # Pre-cache existing voices
+        # Index existing voices (tensors are mapped lazily on first use)
         preload_voice_cache()
         
     except Exception as e:
@@ -181,7 +230,7 @@ def extract_voice_embedding(voice_name: str, audio_path: str) -> Dict[str, Any]:
         f0=None
     )[0]
     
-    # Store the cached data
+    # Persist to the store and hand back the memory-mapped copy
     embedding_data = {
         "name": voice_name,
         "audio_path": audio_path,
@@ -192,125 +241,73 @@ def extract_voice_embedding(voice_name: str, audio_path: str) -> Dict[str, Any]:
         "extracted_at": time.time()
     }
     
-    # Save to disk cache
-    cache_path = CACHE_DIR / f"{voice_name}.pkl"
-    with open(cache_path, "wb") as f:
-        pickle.dump(embedding_data, f)
+    embedding_data = voice_store.put(voice_name, embedding_data)
+    forget_device_copies(voice_name)
     
     print(f"[IndexTTS2] Extracted embedding for '{voice_name}' in {time.time() - start:.2f}s")
     
     return embedding_data
 
 
-def load_voice_from_cache(voice_name: str) -> Optional[Dict[str, Any]]:
-    """Load a voice embedding from disk cache"""
-    cache_path = CACHE_DIR / f"{voice_name}.pkl"
-    if cache_path.exists():
-        try:
-            with open(cache_path, "rb") as f:
-                return pickle.load(f)
-        except Exception as e:
-            print(f"[IndexTTS2] Failed to load cache for {voice_name}: {e}")
-    return None
+def forget_device_copies(voice_name: str):
+    """Drop GPU-resident conditioning for a voice (after re-extract or delete)"""
+    device_voice_cache.discard(lambda key: key[1] == voice_name)
 
 
 def preload_voice_cache():
-    """Load all cached voice embeddings into memory"""
-    global voice_cache
+    """Index cached voice embeddings (reads only the store manifest)"""
+    start = time.time()
+    print("[IndexTTS2] Indexing voice store...")
     
-    print("[IndexTTS2] Preloading voice cache...")
+    # One-time conversion of the old per-voice pickle cache
+    migrated = voice_store.migrate_pickles()
+    if migrated:
+        print(f"  - Migrated {len(migrated)} pickled embeddings to the store")
     
-    # Load from disk cache
-    for cache_file in CACHE_DIR.glob("*.pkl"):
-        voice_name = cache_file.stem
-        try:
-            data = load_voice_from_cache(voice_name)
-            if data:
-                voice_cache[voice_name] = data
-                print(f"  - Loaded cached embedding: {voice_name}")
-        except Exception as e:
-            print(f"  - Failed to load {voice_name}: {e}")
-    
-    print(f"[IndexTTS2] Loaded {len(voice_cache)} cached voices")
+    print(f"[IndexTTS2] {len(voice_store)} cached voices indexed in {(time.time() - start) * 1000:.1f}ms")
     
     # Check for new voice files that need extraction
     for ext in ["*.wav", "*.mp3", "*.flac"]:
         for voice_file in VOICES_DIR.glob(ext):
             voice_name = voice_file.stem
-            if voice_name not in voice_cache:
+            if voice_name not in voice_store:
                 print(f"  - New voice found: {voice_name} (will extract on first use)")
 
 
 def get_or_extract_embedding(voice_name: str) -> Dict[str, Any]:
-    """Get voice embedding from cache, or extract it if not cached"""
-    global voice_cache
-    
-    # Check memory cache first
-    if voice_name in voice_cache:
-        return voice_cache[voice_name]
-    
-    # Check disk cache
-    cached = load_voice_from_cache(voice_name)
-    if cached:
-        voice_cache[voice_name] = cached
-        return cached
-    
-    # Need to extract from audio file
-    audio_path = get_voice_audio_path(voice_name)
-    if not audio_path:
-        raise FileNotFoundError(f"Voice '{voice_name}' not found. Add {voice_name}.wav to voices/ directory.")
-    
-    # Extract and cache
-    embedding = extract_voice_embedding(voice_name, audio_path)
-    voice_cache[voice_name] = embedding
-    
-    return embedding
+    """Get voice embedding from the store, or extract it if not cached"""
+    # Memory-mapped on first use, then served from the resident LRU
+    embedding = voice_store.get(voice_name)
+    if embedding is not None:
+        return embedding
+    
+    with extraction_lock:
+        # Another request may have extracted it while we waited
+        embedding = voice_store.get(voice_name)
+        if embedding is not None:
+            return embedding
+        
+        # Need to extract from audio file
+        audio_path = get_voice_audio_path(voice_name)
+        if not audio_path:
+            raise FileNotFoundError(f"Voice '{voice_name}' not found. Add {voice_name}.wav to voices/ directory.")
+        
+        return extract_voice_embedding(voice_name, audio_path)
 
 
-def generate_speech_with_cache(
+def build_infer_kwargs(
     text: str,
-    voice: str,
     emo_alpha: float = 0.6,
     use_emo_text: bool = False,
     emo_text: Optional[str] = None,
     emo_vector: Optional[List[float]] = None,
-    use_random: bool = False
-) -> bytes:
-    """
-    Generate speech using cached voice embedding for instant generation.
-    """
-    global tts_model
-    
-    if not model_loaded or tts_model is None:
-        raise RuntimeError("Model not loaded")
-    
-    # Get cached embedding
-    embedding = get_or_extract_embedding(voice)
-    
-    print(f"[IndexTTS2] Generating with cached voice '{voice}': text_len={len(text)}")
-    start = time.time()
-    
-    # Set the model's internal cache to our cached values
-    # This tricks the model into using our pre-extracted embedding
-    tts_model.cache_spk_cond = embedding["spk_cond_emb"].to(tts_model.device)
-    tts_model.cache_s2mel_style = embedding["style"].to(tts_model.device)
-    tts_model.cache_s2mel_prompt = embedding["prompt_condition"].to(tts_model.device)
-    tts_model.cache_spk_audio_prompt = embedding["audio_path"]
-    tts_model.cache_mel = embedding["ref_mel"].to(tts_model.device)
-    
-    # Also set emotion cache to same voice (for consistent emotion reference)
-    tts_model.cache_emo_cond = embedding["spk_cond_emb"].to(tts_model.device)
-    tts_model.cache_emo_audio_prompt = embedding["audio_path"]
-    
-    # Generate unique output filename
-    output_filename = f"gen_{uuid.uuid4().hex[:8]}.wav"
-    output_path = OUTPUT_DIR / output_filename
-    
-    # Build inference kwargs
+    use_random: bool = False,
+    output_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """Build IndexTTS2.infer() kwargs (spk_audio_prompt is filled in by the worker)"""
     kwargs = {
-        "spk_audio_prompt": embedding["audio_path"],  # Needed for cache check
         "text": text,
-        "output_path": str(output_path),
+        "output_path": output_path,
         "verbose": False
     }
     
@@ -327,15 +324,81 @@ def generate_speech_with_cache(
     if use_random:
         kwargs["use_random"] = True
     
-    # Generate
-    tts_model.infer(**kwargs)
+    return kwargs
+
+
+def get_conditioning(voice: str) -> VoiceConditioning:
+    """Per-request conditioning context for a voice"""
+    if not model_loaded or inference_pool is None:
+        raise RuntimeError("Model not loaded")
+    return VoiceConditioning.from_embedding(voice, get_or_extract_embedding(voice))
+
+
+def run_inference(conditioning: VoiceConditioning, **kwargs) -> Any:
+    """inference_pool.infer, recording the wait for a worker and the inference time"""
+    waited, waited_at = time.perf_counter(), time.time()
+    with inference_pool.acquire() as worker:
+        wait = time.perf_counter() - waited
+        STAGE_SECONDS.observe(wait, stage="queue_wait", engine=ENGINE)
+        tracing.record("queue_wait", waited_at, wait, engine=ENGINE)
+        with tracing.span("synthesis", engine=ENGINE, voice=conditioning.voice, worker=worker.index), \
+                STAGE_SECONDS.time(stage="synthesis", engine=ENGINE):
+            return worker.infer(conditioning, **kwargs)
+
+
+def record_generation(voice: str, text: str, compute_seconds: float, audio_seconds: float):
+    CHARACTERS.inc(len(text), engine=ENGINE)
+    if audio_seconds > 0:
+        RTF.set(compute_seconds / audio_seconds, engine=ENGINE, voice=voice)
+
+
+def wav_duration(audio_bytes: bytes) -> float:
+    try:
+        with wave.open(io.BytesIO(audio_bytes)) as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except (wave.Error, EOFError):
+        return 0.0
+
+
+def generate_speech_with_cache(
+    text: str,
+    voice: str,
+    emo_alpha: float = 0.6,
+    use_emo_text: bool = False,
+    emo_text: Optional[str] = None,
+    emo_vector: Optional[List[float]] = None,
+    use_random: bool = False
+) -> bytes:
+    """
+    Generate speech using cached voice embedding for instant generation.
+    
+    Thread-safe: the voice conditioning travels with the request and is only
+    bound to a model replica while this request has it checked out.
+    """
+    conditioning = get_conditioning(voice)
+    
+    log.debug("generate.start", voice=voice, chars=len(text))
+    start = time.time()
+    
+    # Generate unique output filename
+    output_filename = f"gen_{uuid.uuid4().hex[:8]}.wav"
+    output_path = OUTPUT_DIR / output_filename
+    
+    kwargs = build_infer_kwargs(
+        text, emo_alpha, use_emo_text, emo_text, emo_vector, use_random,
+        output_path=str(output_path)
+    )
+    
+    # Generate on the next free replica
+    run_inference(conditioning, **kwargs)
     
     gen_time = time.time() - start
-    print(f"[IndexTTS2] Generated in {gen_time:.2f}s (using cached embedding)")
+    log.info("generate.done", voice=voice, seconds=round(gen_time, 2))
     
     # Read and return audio bytes
     with open(output_path, "rb") as f:
         audio_bytes = f.read()
+    record_generation(voice, text, gen_time, wav_duration(audio_bytes))
     
     # Clean up output file
     try:
@@ -346,6 +409,27 @@ def generate_speech_with_cache(
     return audio_bytes
 
 
+def synthesize_segment(
+    text: str,
+    voice: str,
+    emo_vector: Optional[List[float]] = None,
+    emo_alpha: float = 0.6
+) -> Tuple[int, np.ndarray]:
+    """
+    Generate one segment and return (sample_rate, float32 mono samples).
+    
+    Calls infer() without an output_path so the audio stays in memory;
+    nothing is encoded to WAV or written to disk.
+    """
+    conditioning = get_conditioning(voice)
+    kwargs = build_infer_kwargs(text, emo_alpha=emo_alpha, emo_vector=emo_vector)
+    start = time.perf_counter()
+    sample_rate, samples = run_inference(conditioning, **kwargs)
+    samples = to_mono_float(samples)
+    record_generation(voice, text, time.perf_counter() - start, len(samples) / sample_rate)
+    return sample_rate, samples
+
+
 def list_available_voices() -> List[dict]:
     """List all available voices"""
     voices = []
@@ -357,7 +441,7 @@ def list_available_voices() -> List[dict]:
             name = f.stem
             if name not in seen:
                 seen.add(name)
-                is_cached = name in voice_cache or (CACHE_DIR / f"{name}.pkl").exists()
+                is_cached = name in voice_store
                 voices.append({
                     "id": name,
                     "name": name,
@@ -402,8 +486,9 @@ async def root():
         "model": "IndexTTS2",
         "model_loaded": model_loaded,
         "fp16": True,
-        "cached_voices": len(voice_cache),
-        "total_voices": len(list_available_voices())
+        "cached_voices": len(voice_store),
+        "total_voices": len(list_available_voices()),
+        "workers": inference_pool.size if inference_pool else 0
     }
 
 
@@ -413,10 +498,28 @@ async def health():
     return {
         "status": "healthy" if model_loaded else "loading",
         "model_loaded": model_loaded,
-        "cached_voices": len(voice_cache)
+        "cached_voices": len(voice_store),
+        "resident_voices": voice_store.resident_count,
+        "workers": inference_pool.size if inference_pool else 0,
+        "idle_workers": inference_pool.idle if inference_pool else 0
     }
 
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Root span per request, joined to the caller's trace via `traceparent`"""
+    with tracing.start_trace(f"{request.method} {request.url.path}", request.headers.get(tracing.TRACE_HEADER)) as trace:
+        response = await call_next(request)
+        trace.attrs["status"] = response.status_code
+    return response
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format: per-stage latency, characters, errors, RTF per voice"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/voices")
 async def get_voices():
     """List available voices"""
@@ -442,12 +545,11 @@ async def cache_voice(voice_name: str, background_tasks: BackgroundTasks):
     if not audio_path:
         raise HTTPException(status_code=404, detail=f"Voice file not found: {voice_name}")
     
-    if voice_name in voice_cache:
+    if voice_name in voice_store:
         return {"success": True, "message": f"Voice '{voice_name}' already cached"}
     
     try:
-        embedding = extract_voice_embedding(voice_name, audio_path)
-        voice_cache[voice_name] = embedding
+        extract_voice_embedding(voice_name, audio_path)
         return {
             "success": True,
             "message": f"Voice '{voice_name}' cached successfully",
@@ -469,10 +571,9 @@ async def cache_all_voices():
     for ext in ["*.wav", "*.mp3", "*.flac"]:
         for voice_file in VOICES_DIR.glob(ext):
             voice_name = voice_file.stem
-            if voice_name not in voice_cache:
+            if voice_name not in voice_store:
                 try:
-                    embedding = extract_voice_embedding(voice_name, str(voice_file))
-                    voice_cache[voice_name] = embedding
+                    extract_voice_embedding(voice_name, str(voice_file))
                     cached.append(voice_name)
                     
                     # Clear CUDA cache after each extraction to prevent OOM
@@ -489,7 +590,7 @@ async def cache_all_voices():
         "success": True,
         "cached": cached,
         "errors": errors,
-        "total_cached": len(voice_cache)
+        "total_cached": len(voice_store)
     }
 
 
@@ -508,7 +609,9 @@ async def generate(request: TTSRequest):
     try:
         start = time.time()
         
-        audio_bytes = generate_speech_with_cache(
+        # Run in a thread so other requests can use the remaining workers
+        audio_bytes = await asyncio.to_thread(
+            generate_speech_with_cache,
             text=request.text,
             voice=request.voice,
             emo_alpha=request.emo_alpha,
@@ -523,7 +626,8 @@ async def generate(request: TTSRequest):
         # Save to temp file for response
         output_filename = f"output_{uuid.uuid4().hex[:8]}.wav"
         output_path = OUTPUT_DIR / output_filename
-        with open(output_path, "wb") as f:
+        with tracing.span("file_write", engine=ENGINE), STAGE_SECONDS.time(stage="file_write", engine=ENGINE), \
+                open(output_path, "wb") as f:
             f.write(audio_bytes)
         
         return FileResponse(
@@ -534,16 +638,16 @@ async def generate(request: TTSRequest):
                 "X-Generation-Time": str(gen_time),
                 "X-Text-Length": str(len(request.text)),
                 "X-Voice": request.voice,
-                "X-Cached": "true" if request.voice in voice_cache else "false"
+                "X-Cached": "true" if request.voice in voice_store else "false"
             }
         )
         
     except FileNotFoundError as e:
+        ENGINE_ERRORS.inc(engine=ENGINE, error=type(e).__name__)
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        print(f"[IndexTTS2] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        ENGINE_ERRORS.inc(engine=ENGINE, error=type(e).__name__)
+        log.exception("generate.failed", error=f"{type(e).__name__}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -577,8 +681,7 @@ async def upload_voice(
             f.write(content)
         
         # Extract and cache embedding immediately
-        embedding = extract_voice_embedding(voice_name, str(audio_path))
-        voice_cache[voice_name] = embedding
+        extract_voice_embedding(voice_name, str(audio_path))
         
         return VoiceUploadResponse(
             success=True,
@@ -587,7 +690,7 @@ async def upload_voice(
         )
         
     except Exception as e:
-        print(f"[IndexTTS2] Upload error: {e}")
+        log.exception("upload.failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -596,16 +699,10 @@ async def delete_voice(voice_name: str):
     """Delete a voice (audio file and cached embedding)"""
     deleted = []
     
-    # Delete from memory cache
-    if voice_name in voice_cache:
-        del voice_cache[voice_name]
-        deleted.append("memory_cache")
-    
-    # Delete disk cache
-    cache_path = CACHE_DIR / f"{voice_name}.pkl"
-    if cache_path.exists():
-        cache_path.unlink()
-        deleted.append("disk_cache")
+    # Delete from the embedding store (manifest, mapped tensors, GPU copies)
+    if voice_store.delete(voice_name):
+        deleted.append("embedding_cache")
+    forget_device_copies(voice_name)
     
     # Delete audio files
     for ext in [".wav", ".mp3", ".flac"]:
@@ -676,8 +773,7 @@ async def upload_voices_zip(file: UploadFile = File(...), cache_immediately: boo
                     # Cache immediately if requested
                     if cache_immediately:
                         try:
-                            embedding = extract_voice_embedding(voice_name, str(audio_path))
-                            voice_cache[voice_name] = embedding
+                            extract_voice_embedding(voice_name, str(audio_path))
                             cached.append(voice_name)
                         except Exception as e:
                             errors.append({"voice": voice_name, "error": f"Cache failed: {str(e)}"})
@@ -706,7 +802,7 @@ async def get_voice_info(voice_name: str):
     audio_path = get_voice_audio_path(voice_name)
     
     # Check cache status
-    is_cached = voice_name in voice_cache or (CACHE_DIR / f"{voice_name}.pkl").exists()
+    is_cached = voice_name in voice_store
     
     if not audio_path and not is_cached:
         raise HTTPException(status_code=404, detail=f"Voice '{voice_name}' not found")
@@ -717,14 +813,11 @@ async def get_voice_info(voice_name: str):
         "audio_file": audio_path
     }
     
-    # Get cache metadata if available
-    if voice_name in voice_cache:
-        cache_data = voice_cache[voice_name]
-        info["extracted_at"] = cache_data.get("extracted_at")
-    elif (CACHE_DIR / f"{voice_name}.pkl").exists():
-        cache_data = load_voice_from_cache(voice_name)
-        if cache_data:
-            info["extracted_at"] = cache_data.get("extracted_at")
+    # Get cache metadata from the manifest (no tensors are loaded)
+    entry = voice_store.info(voice_name)
+    if entry:
+        info["extracted_at"] = entry.get("extracted_at")
+        info["embedding_bytes"] = entry.get("nbytes")
     
     return info
 
@@ -769,6 +862,9 @@ async def batch_generate(request: BatchTTSRequest):
     """
     Generate multiple segments in one request and concatenate.
     Much faster than making separate API calls for each segment.
+    
+    Segments run concurrently on the worker pool and stay as raw float
+    arrays until the output is assembled once at the end.
     """
     if not model_loaded:
         raise HTTPException(status_code=503, detail="Model not loaded")
@@ -782,51 +878,45 @@ async def batch_generate(request: BatchTTSRequest):
     from scipy.io import wavfile
     
     start_total = time.time()
-    audio_arrays = []
-    sample_rate = 22050
+    total = len(request.segments)
+    loop = asyncio.get_running_loop()
     
-    for idx, seg in enumerate(request.segments):
+    def run_segment(idx: int, seg: BatchSegment) -> Tuple[int, np.ndarray]:
         seg_start = time.time()
-        print(f"[Batch] Segment {idx+1}/{len(request.segments)}: {seg.voice}, {len(seg.text)} chars")
+        segment_log.debug("segment.start", segment=idx + 1, of=total, voice=seg.voice, chars=len(seg.text))
         try:
-            audio_bytes = generate_speech_with_cache(
-                text=seg.text,
-                voice=seg.voice,
-                emo_vector=seg.emo_vector
-            )
-            # Convert bytes to numpy array
-            sr, audio_data = wavfile.read(io.BytesIO(audio_bytes))
-            sample_rate = sr
-            audio_arrays.append(audio_data.astype(np.float32))
-            print(f"[Batch] Segment {idx+1} done in {time.time() - seg_start:.2f}s")
+            result = synthesize_segment(seg.text, seg.voice, emo_vector=seg.emo_vector)
         except Exception as e:
-            print(f"[Batch] Segment {idx+1} failed: {e}")
-            import traceback
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"Segment {idx+1} failed: {str(e)}")
-    
-    # Concatenate with silence between segments
-    silence_samples = int(sample_rate * request.silence_ms / 1000)
-    silence = np.zeros(silence_samples, dtype=np.float32)
-    
-    combined = audio_arrays[0]
-    for arr in audio_arrays[1:]:
-        combined = np.concatenate([combined, silence, arr])
+            ENGINE_ERRORS.inc(engine=ENGINE, error=type(e).__name__)
+            segment_log.exception("segment.failed", segment=idx + 1, error=str(e))
+            raise RuntimeError(f"Segment {idx+1} failed: {str(e)}") from e
+        segment_log.debug("segment.done", segment=idx + 1, seconds=round(time.time() - seg_start, 2))
+        return result
+    
+    # Dispatch every segment to the pool; results come back in request order
+    futures = [
+        loop.run_in_executor(segment_executor, tracing.bind(run_segment), idx, seg)
+        for idx, seg in enumerate(request.segments)
+    ]
+    try:
+        results = await asyncio.gather(*futures)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
     
-    # Normalize to prevent clipping
-    max_val = np.max(np.abs(combined))
-    if max_val > 0:
-        combined = combined / max_val * 32767 * 0.95
-    combined = combined.astype(np.int16)
+    sample_rate = results[0][0]
+    with tracing.span("assembly", engine=ENGINE, segments=len(results)), STAGE_SECONDS.time(stage="assembly", engine=ENGINE):
+        combined = assemble_segments([samples for _, samples in results], sample_rate, request.silence_ms)
     
     # Save to file
     output_filename = f"batch_{uuid.uuid4().hex[:8]}.wav"
     output_path = OUTPUT_DIR / output_filename
-    wavfile.write(str(output_path), sample_rate, combined)
+    with tracing.span("file_write", engine=ENGINE), STAGE_SECONDS.time(stage="file_write", engine=ENGINE):
+        wavfile.write(str(output_path), sample_rate, combined)
     
     total_time = time.time() - start_total
     audio_duration = len(combined) / sample_rate
-    print(f"[Batch] Generated {len(request.segments)} segments in {total_time:.2f}s, audio={audio_duration:.1f}s")
+    log.info("batch.done", segments=len(request.segments), seconds=round(total_time, 2),
+             audio_seconds=round(audio_duration, 1))
     
     return FileResponse(
         output_path,
@@ -0,0 +1,53 @@
+"""
+Tests for batch segment assembly.
+
+Run with: python -m pytest test_audio_assembly.py  (or python test_audio_assembly.py)
+"""
+
+import numpy as np
+
+from audio_assembly import assemble_segments, to_mono_float
+
+
+def naive_assemble(segments, sample_rate, silence_ms):
+    """The previous concatenate-in-a-loop implementation, for reference"""
+    silence = np.zeros(int(sample_rate * silence_ms / 1000), dtype=np.float32)
+    combined = segments[0]
+    for arr in segments[1:]:
+        combined = np.concatenate([combined, silence, arr])
+    max_val = np.max(np.abs(combined))
+    if max_val > 0:
+        combined = combined / max_val * 32767 * 0.95
+    return combined.astype(np.int16)
+
+
+def test_matches_naive_concatenation():
+    rng = np.random.default_rng(0)
+    segments = [(rng.standard_normal(n) * 8000).astype(np.float32) for n in (2205, 10, 4410, 1)]
+    expected = naive_assemble(segments, 22050, 200)
+    actual = assemble_segments(segments, 22050, 200)
+    assert actual.dtype == np.int16
+    assert len(actual) == len(expected) == 2205 + 10 + 4410 + 1 + 3 * 4410
+    assert np.max(np.abs(actual.astype(np.int32) - expected.astype(np.int32))) <= 1
+
+
+def test_silence_and_empty_inputs():
+    assert len(assemble_segments([], 22050)) == 0
+    silent = assemble_segments([np.zeros(100, dtype=np.float32)] * 2, 1000, 50)
+    assert len(silent) == 250 and not silent.any()
+
+
+def test_to_mono_float_accepts_model_layouts():
+    column = np.arange(6, dtype=np.int16).reshape(6, 1)  # IndexTTS2 returns (N, 1)
+    row = np.arange(6, dtype=np.int16).reshape(1, 6)
+    for arr in (column, row, np.arange(6)):
+        mono = to_mono_float(arr)
+        assert mono.dtype == np.float32
+        assert mono.tolist() == [0, 1, 2, 3, 4, 5]
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"PASS: {name}")
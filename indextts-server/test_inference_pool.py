@@ -0,0 +1,158 @@
+"""
+Concurrency stress test for the IndexTTS2 inference pool.
+
+Uses a stub model that behaves like IndexTTS2: infer() reads the speaker
+conditioning from the model's cache_* attributes, sleeps to simulate GPU
+work, and writes out whichever voice it was conditioned on. If two requests
+ever share a model replica, the voice written out no longer matches the
+voice requested.
+
+Run with: python -m pytest test_inference_pool.py  (or python test_inference_pool.py)
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from inference_pool import (
+    InferencePool,
+    ModelWorker,
+    VoiceConditioning,
+    build_pool,
+    plan_worker_devices,
+)
+
+VOICES = ["Adam", "Emily", "Grace", "Hannah", "Michael", "Natalie", "Oliva", "Sophia"]
+
+
+class StubTensor:
+    """Minimal tensor stand-in that remembers which device it was moved to"""
+
+    def __init__(self, voice, device="cpu"):
+        self.voice = voice
+        self.device = device
+
+    def to(self, device):
+        return StubTensor(self.voice, device)
+
+
+class StubIndexTTS2:
+    """Reads conditioning from model attributes, like IndexTTS2.infer()"""
+
+    def __init__(self, device="cpu"):
+        self.device = device
+        self.calls = 0
+
+    def infer(self, spk_audio_prompt, text, output_path=None, **kwargs):
+        self.calls += 1
+        voice_at_start = self.cache_spk_cond.voice
+        assert self.cache_spk_audio_prompt == spk_audio_prompt
+        time.sleep(random.uniform(0.0005, 0.003))
+        # Anything that rebinds the model mid-inference shows up here
+        return {
+            "text": text,
+            "voice_start": voice_at_start,
+            "voice_end": self.cache_spk_cond.voice,
+            "style": self.cache_s2mel_style.voice,
+            "mel": self.cache_mel.voice,
+            "device": self.cache_spk_cond.device,
+        }
+
+
+def make_conditioning(voice):
+    return VoiceConditioning.from_embedding(voice, {
+        "audio_path": f"voices/{voice}.wav",
+        "spk_cond_emb": StubTensor(voice),
+        "style": StubTensor(voice),
+        "prompt_condition": StubTensor(voice),
+        "ref_mel": StubTensor(voice),
+    })
+
+
+def test_voices_never_cross_over_under_concurrency():
+    pool = InferencePool([
+        ModelWorker(StubIndexTTS2(f"cuda:{i}"), device=f"cuda:{i}", index=i)
+        for i in range(4)
+    ])
+    conditionings = {v: make_conditioning(v) for v in VOICES}
+    jobs = [(i, VOICES[i % len(VOICES)]) for i in range(400)]
+    random.shuffle(jobs)
+
+    def run(job):
+        idx, voice = job
+        return voice, pool.infer(conditionings[voice], text=f"line {idx} for {voice}")
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(run, jobs))
+
+    assert len(results) == len(jobs)
+    for voice, out in results:
+        assert out["voice_start"] == voice
+        assert out["voice_end"] == voice
+        assert out["style"] == voice
+        assert out["mel"] == voice
+        assert out["text"].endswith(voice)
+        assert out["device"].startswith("cuda:")
+    assert sum(w.model.calls for w in pool.workers) == len(jobs)
+    assert pool.idle == pool.size
+
+
+def test_worker_checked_out_by_one_request_at_a_time():
+    pool = InferencePool([ModelWorker(StubIndexTTS2(), index=i) for i in range(3)])
+    active = {}
+    peak = [0]
+    lock = threading.Lock()
+
+    def run(_):
+        with pool.acquire(timeout=5) as worker:
+            with lock:
+                assert worker.index not in active
+                active[worker.index] = True
+                peak[0] = max(peak[0], len(active))
+            time.sleep(0.002)
+            with lock:
+                del active[worker.index]
+
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        list(executor.map(run, range(120)))
+
+    assert peak[0] <= pool.size
+
+
+def test_acquire_times_out_when_pool_is_exhausted():
+    pool = InferencePool([ModelWorker(StubIndexTTS2())])
+    with pool.acquire():
+        try:
+            with pool.acquire(timeout=0.01):
+                pass
+        except TimeoutError:
+            pass
+        else:
+            raise AssertionError("expected TimeoutError")
+    assert pool.idle == 1
+
+
+def test_pool_sized_to_devices():
+    saved = {k: os.environ.pop(k, None) for k in ("INDEXTTS_WORKERS", "INDEXTTS_WORKERS_PER_DEVICE")}
+    try:
+        assert plan_worker_devices(["cuda:0", "cuda:1"]) == ["cuda:0", "cuda:1"]
+        os.environ["INDEXTTS_WORKERS_PER_DEVICE"] = "2"
+        assert plan_worker_devices(["cuda:0", "cuda:1"]) == ["cuda:0", "cuda:1", "cuda:0", "cuda:1"]
+        os.environ["INDEXTTS_WORKERS"] = "3"
+        pool = build_pool(StubIndexTTS2, ["cpu"])
+        assert pool.size == 3
+        assert [w.device for w in pool.workers] == ["cpu", "cpu", "cpu"]
+    finally:
+        for k, v in saved.items():
+            os.environ.pop(k, None)
+            if v is not None:
+                os.environ[k] = v
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"PASS: {name}")
@@ -0,0 +1,105 @@
+"""
+Tests for the memory-mapped voice embedding store.
+
+Run with: python -m pytest test_voice_store.py  (or python test_voice_store.py)
+"""
+
+import pickle
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from voice_store import ByteBudgetLRU, VoiceStore
+
+
+def make_embedding(seed, frames=10):
+    rng = np.random.default_rng(seed)
+    return {
+        "name": f"voice{seed}",
+        "audio_path": f"voices/voice{seed}.wav",
+        "spk_cond_emb": rng.standard_normal((1, frames, 16), dtype=np.float32),
+        "style": rng.standard_normal((1, 8), dtype=np.float32),
+        "prompt_condition": rng.standard_normal((1, frames, 4), dtype=np.float32),
+        "ref_mel": rng.standard_normal((1, 8, frames)).astype(np.float16),
+        "extracted_at": 1000.0 + seed,
+    }
+
+
+def test_roundtrip_is_memory_mapped_and_lazy():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VoiceStore(Path(tmp))
+        original = make_embedding(1)
+        store.put("Emily", original)
+
+        reopened = VoiceStore(Path(tmp))
+        assert "Emily" in reopened
+        assert reopened.resident_count == 0  # startup only reads the manifest
+
+        emb = reopened.get("Emily")
+        assert isinstance(emb["spk_cond_emb"], np.memmap)
+        assert emb["ref_mel"].dtype == np.float16
+        for field in ("spk_cond_emb", "style", "prompt_condition", "ref_mel"):
+            np.testing.assert_array_equal(emb[field], original[field])
+        assert emb["audio_path"] == "voices/voice1.wav"
+        assert reopened.info("Emily")["extracted_at"] == 1001.0
+        assert reopened.resident_count == 1
+
+
+def test_lru_evicts_under_budget():
+    with tempfile.TemporaryDirectory() as tmp:
+        one_voice = VoiceStore(Path(tmp)).put("probe", make_embedding(0))
+        size = sum(a.nbytes for k, a in one_voice.items() if isinstance(a, np.ndarray))
+
+        store = VoiceStore(Path(tmp), max_resident_bytes=int(size * 2.5))
+        for i in range(5):
+            store.put(f"v{i}", make_embedding(i))
+        for i in range(5):
+            assert store.get(f"v{i}") is not None
+        assert store.resident_count == 2
+        assert store.resident.current_bytes <= store.resident.max_bytes
+        assert len(store) == 6  # eviction never drops voices from the manifest
+
+
+def test_delete_and_reextract_invalidate():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VoiceStore(Path(tmp))
+        store.put("Adam", make_embedding(1))
+        first = store.get("Adam")
+        store.put("Adam", make_embedding(2))
+        second = store.get("Adam")
+        assert not np.array_equal(first["style"], second["style"])
+
+        assert store.delete("Adam")
+        assert "Adam" not in store
+        assert store.get("Adam") is None
+        assert not (Path(tmp) / "Adam").exists()
+        assert not VoiceStore(Path(tmp)).voices()
+
+
+def test_migrates_legacy_pickles():
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(Path(tmp) / "Grace.pkl", "wb") as f:
+            pickle.dump(make_embedding(3), f)
+        store = VoiceStore(Path(tmp))
+        assert store.migrate_pickles() == ["Grace"]
+        assert not (Path(tmp) / "Grace.pkl").exists()
+        assert store.resident_count == 0
+        np.testing.assert_array_equal(store.get("Grace")["style"], make_embedding(3)["style"])
+
+
+def test_byte_budget_lru_discard():
+    lru = ByteBudgetLRU(max_bytes=100, sizeof=len)
+    lru.put(("cuda:0", "a", 1), "x" * 40)
+    lru.put(("cuda:0", "b", 1), "x" * 40)
+    lru.put(("cuda:1", "a", 1), "x" * 40)
+    assert len(lru) == 2 and lru.evictions == 1
+    assert lru.discard(lambda k: k[1] == "a") == 1
+    assert lru.current_bytes == 40
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"PASS: {name}")
@@ -0,0 +1,326 @@
+"""
+Memory-mapped voice embedding store for the IndexTTS2 server.
+
+Each voice's conditioning tensors are written as .npy files under
+cache/{voice}/ and described in cache/manifest.json. Startup only reads the
+manifest; tensors are memory-mapped on first use and kept in an LRU bounded
+by a byte budget, so hundreds of cloned voices cost neither startup time nor
+resident memory until they are actually requested.
+
+Layout:
+    cache/manifest.json
+    cache/Emily/spk_cond_emb.npy
+    cache/Emily/style.npy
+    cache/Emily/prompt_condition.npy
+    cache/Emily/ref_mel.npy
+"""
+
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Tensor fields of a voice embedding (see extract_voice_embedding)
+TENSOR_FIELDS = ("spk_cond_emb", "style", "prompt_condition", "ref_mel")
+
+
+def nbytes(value: Any) -> int:
+    """Size in bytes of a numpy array or torch tensor (0 for anything else)"""
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if hasattr(value, "element_size") and hasattr(value, "nelement"):
+        return int(value.element_size() * value.nelement())
+    return 0
+
+
+def _to_numpy(value: Any) -> np.ndarray:
+    """Convert a (CPU) torch tensor or array-like to a numpy array"""
+    if hasattr(value, "detach"):
+        value = value.detach().cpu()
+        # numpy has no bfloat16; widen it rather than fail
+        if str(getattr(value, "dtype", "")) == "torch.bfloat16":
+            value = value.float()
+        value = value.numpy()
+    return np.ascontiguousarray(value)
+
+
+def embedding_nbytes(embedding: Dict[str, Any]) -> int:
+    """Summed size of an embedding's tensor fields"""
+    return sum(nbytes(embedding.get(field)) for field in TENSOR_FIELDS)
+
+
+class ByteBudgetLRU:
+    """
+    Thread-safe LRU cache that evicts least-recently-used entries once the
+    summed size of its values exceeds max_bytes. max_bytes <= 0 disables
+    eviction.
+    """
+
+    def __init__(self, max_bytes: int = 0, sizeof: Callable[[Any], int] = nbytes):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = value
+            self._sizes[key] = size
+            self.current_bytes += size
+            self._evict()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches predicate; returns count dropped"""
+        with self._lock:
+            doomed = [k for k in self._entries if predicate(k)]
+            for key in doomed:
+                del self._entries[key]
+                self.current_bytes -= self._sizes.pop(key)
+            return len(doomed)
+
+    def _evict(self) -> None:
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        while self.max_bytes > 0 and self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class VoiceStore:
+    """
+    Manifest-indexed, memory-mapped store of voice embeddings.
+
+    get() returns the same dict shape extract_voice_embedding() produces,
+    with tensor fields backed by copy-on-write memory maps (optionally
+    wrapped by tensor_factory, e.g. torch.from_numpy).
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_resident_bytes: int = 0,
+        tensor_factory: Optional[Callable[[np.ndarray], Any]] = None,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.tensor_factory = tensor_factory or (lambda arr: arr)
+        self.resident = ByteBudgetLRU(max_resident_bytes, sizeof=embedding_nbytes)
+        self._lock = threading.Lock()
+        self._manifest: Dict[str, Dict[str, Any]] = self._read_manifest()
+
+    # ----- manifest -----
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / MANIFEST_NAME
+
+    def _read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("voices", {})
+        except (OSError, ValueError) as e:
+            print(f"[VoiceStore] Failed to read manifest, starting empty: {e}")
+            return {}
+
+    def _write_manifest(self) -> None:
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "voices": self._manifest}, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    # ----- queries -----
+
+    def __contains__(self, voice_name: str) -> bool:
+        return voice_name in self._manifest
+
+    def __len__(self) -> int:
+        return len(self._manifest)
+
+    def voices(self) -> List[str]:
+        return sorted(self._manifest)
+
+    def info(self, voice_name: str) -> Optional[Dict[str, Any]]:
+        """Manifest entry for a voice (no tensor data is touched)"""
+        entry = self._manifest.get(voice_name)
+        return dict(entry) if entry else None
+
+    @property
+    def resident_count(self) -> int:
+        return len(self.resident)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "voices": len(self._manifest),
+            "stored_bytes": sum(e.get("nbytes", 0) for e in self._manifest.values()),
+            "resident": self.resident.stats(),
+        }
+
+    # ----- read / write -----
+
+    def get(self, voice_name: str) -> Optional[Dict[str, Any]]:
+        """Return a voice embedding, memory-mapping it on first use"""
+        entry = self._manifest.get(voice_name)
+        if entry is None:
+            return None
+        key = (voice_name, entry.get("extracted_at"))
+        cached = self.resident.get(key)
+        if cached is not None:
+            return cached
+        try:
+            embedding = self._load(voice_name, entry)
+        except (OSError, ValueError) as e:
+            print(f"[VoiceStore] Failed to map {voice_name}: {e}")
+            return None
+        self.resident.put(key, embedding)
+        return embedding
+
+    def _load(self, voice_name: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        voice_dir = self.root / voice_name
+        embedding: Dict[str, Any] = {
+            "name": voice_name,
+            "audio_path": entry["audio_path"],
+            "extracted_at": entry.get("extracted_at"),
+        }
+        for field in TENSOR_FIELDS:
+            # mmap_mode="c": pages are shared and read lazily, but the array is
+            # writable (copy-on-write), which torch.from_numpy requires
+            arr = np.load(voice_dir / f"{field}.npy", mmap_mode="c")
+            embedding[field] = self.tensor_factory(arr)
+        return embedding
+
+    def put(self, voice_name: str, embedding: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist an embedding and return it in memory-mapped form"""
+        voice_dir = self.root / voice_name
+        tmp_dir = self.root / f".{voice_name}.tmp"
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        fields: Dict[str, Dict[str, Any]] = {}
+        total = 0
+        for field in TENSOR_FIELDS:
+            arr = _to_numpy(embedding[field])
+            np.save(tmp_dir / f"{field}.npy", arr)
+            fields[field] = {"shape": list(arr.shape), "dtype": str(arr.dtype)}
+            total += arr.nbytes
+
+        entry = {
+            "audio_path": str(embedding["audio_path"]),
+            "extracted_at": embedding.get("extracted_at") or time.time(),
+            "fields": fields,
+            "nbytes": total,
+        }
+        with self._lock:
+            if voice_dir.exists():
+                shutil.rmtree(voice_dir)
+            os.replace(tmp_dir, voice_dir)
+            self._manifest[voice_name] = entry
+            self._write_manifest()
+        self.resident.discard(lambda k: k[0] == voice_name)
+        return self.get(voice_name)
+
+    def delete(self, voice_name: str) -> bool:
+        """Remove a voice from the manifest, disk and memory; True if it existed"""
+        with self._lock:
+            existed = self._manifest.pop(voice_name, None) is not None
+            if existed:
+                self._write_manifest()
+            voice_dir = self.root / voice_name
+            if voice_dir.exists():
+                shutil.rmtree(voice_dir)
+                existed = True
+        self.resident.discard(lambda k: k[0] == voice_name)
+        return existed
+
+    def migrate_pickles(self) -> List[str]:
+        """
+        Convert legacy cache/{voice}.pkl files into the store and remove them.
+        Returns the migrated voice names.
+        """
+        migrated = []
+        for pkl_path in sorted(self.root.glob("*.pkl")):
+            voice_name = pkl_path.stem
+            try:
+                with open(pkl_path, "rb") as f:
+                    data = pickle.load(f)
+                if voice_name not in self._manifest:
+                    self.put(voice_name, data)
+                pkl_path.unlink()
+                migrated.append(voice_name)
+            except Exception as e:
+                print(f"[VoiceStore] Failed to migrate {pkl_path.name}: {e}")
+        # Migration maps every voice once; don't keep them all resident
+        self.resident.discard(lambda k: True)
+        return migrated
+
+
+def budget_from_env(name: str, default_mb: int) -> int:
+    """Read a megabyte budget from the environment as bytes (0 = unlimited)"""
+    try:
+        return int(float(os.environ.get(name, default_mb)) * 1024 * 1024)
+    except ValueError:
+        return default_mb * 1024 * 1024
+
+
+__all__ = [
+    "ByteBudgetLRU",
+    "VoiceStore",
+    "TENSOR_FIELDS",
+    "budget_from_env",
+    "embedding_nbytes",
+    "nbytes",
+]
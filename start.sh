@@ -4,6 +4,13 @@
 # Create output directory if it doesn't exist
 mkdir -p webapp/output
 
+# Worker metric snapshots are per deploy; start counting from zero
+if [ -n "$METRICS_DIR" ]; then
+    rm -rf "$METRICS_DIR" && mkdir -p "$METRICS_DIR"
+fi
+
+# Apply schema migrations and prune old audio once, before any worker starts
+flask --app webapp.app migrate && flask --app webapp.app cleanup-audio || exit 1
+
 # Start gunicorn with production settings
-# Note: db.create_all() and cleanup_old_files() run automatically on import
 exec gunicorn -w 4 -b 0.0.0.0:${PORT:-5000} --timeout 120 --access-logfile - --error-logfile - webapp.app:app
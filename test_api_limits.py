@@ -16,7 +16,7 @@ os.environ['STRIPE_PRICE_ID'] = 'price_fake_123'  # Fake price to enable billing
 
 from datetime import datetime, timedelta
 
-from webapp.app import APIKey, User, app, db
+from webapp.app import APIKey, User, app, db, hash_api_key
 
 
 def print_header(text):
@@ -201,42 +201,32 @@ def run_tests():
         # Test 4: API Key validation
         print_header("TEST 6: API Key Creation & Validation")
         
-        # Create API keys
-        api_key_starter = APIKey(
-            user_id=user_starter.id,
-            key=APIKey.generate_key(),
-            name="Test Key Starter"
-        )
-        
-        api_key_pro = APIKey(
-            user_id=user_pro.id,
-            key=APIKey.generate_key(),
-            name="Test Key Pro"
-        )
-        
-        api_key_no_plan = APIKey(
-            user_id=user_no_plan.id,
-            key=APIKey.generate_key(),
-            name="Test Key No Plan"
-        )
+        # Create API keys (only the hash is stored; keep the plaintext for the calls below)
+        api_key_starter, starter_key = APIKey.create(user_starter.id, "Test Key Starter")
+        api_key_pro, pro_key = APIKey.create(user_pro.id, "Test Key Pro")
+        api_key_no_plan, no_plan_key = APIKey.create(user_no_plan.id, "Test Key No Plan")
         
         db.session.add_all([api_key_starter, api_key_pro, api_key_no_plan])
         db.session.commit()
         
         print_test("API key generated for starter user", 
-                   len(api_key_starter.key) > 20,
-                   f"Key: {api_key_starter.key[:20]}...")
+                   len(starter_key) > 20 and starter_key.startswith(api_key_starter.key_prefix),
+                   f"Prefix: {api_key_starter.key_prefix}")
         
         print_test("API key generated for pro user", 
-                   len(api_key_pro.key) > 20)
+                   len(pro_key) > 20 and pro_key.startswith(api_key_pro.key_prefix))
+        
+        print_test("Only the key hash is stored", 
+                   api_key_starter.key_hash == hash_api_key(starter_key)
+                   and starter_key not in (api_key_starter.key_hash, api_key_starter.key_prefix))
         
         print_test("API key is unique", 
-                   api_key_starter.key != api_key_pro.key)
+                   starter_key != pro_key and api_key_starter.key_hash != api_key_pro.key_hash)
         
         # Test 5: verify_api_key function
         print_header("TEST 7: verify_api_key() Function")
         
-        from webapp.app import verify_api_key
+        from webapp.app import api_key_cache, usage_ledger, verify_api_key
 
         # Reset starter usage for clean test
         user_starter.api_chars_used = 0
@@ -244,7 +234,7 @@ def run_tests():
         db.session.commit()
         
         # Test valid key with no char count
-        result = verify_api_key(api_key_starter.key)
+        result = verify_api_key(starter_key)
         print_test("Valid API key returns valid=True", 
                    result.get('valid') == True)
         
@@ -260,16 +250,21 @@ def run_tests():
                    result.get('valid') == False)
         
         # Test key with usage check - should pass
-        result = verify_api_key(api_key_starter.key, char_count=5000)
+        result = verify_api_key(starter_key, char_count=5000)
         print_test("Starter key with 5k chars passes", 
                    result.get('valid') == True)
         
+        reservation = result.get('reservation')
+        print_test("5k chars are reserved", 
+                   reservation is not None and reservation.amount == 5000)
+        usage_ledger.refund(reservation)
+        
         # Set starter user to near limit
         user_starter.api_chars_used = 99000
         db.session.commit()
         
         # Test key with usage that would exceed
-        result = verify_api_key(api_key_starter.key, char_count=5000)
+        result = verify_api_key(starter_key, char_count=5000)
         print_test("Starter key with 5k chars when 99k used FAILS", 
                    result.get('valid') == False,
                    f"Error: {result.get('error', '')[:60]}...")
@@ -284,14 +279,16 @@ def run_tests():
         
         api_key_starter.is_active = False
         db.session.commit()
+        api_key_cache.invalidate(key_id=api_key_starter.id)
         
-        result = verify_api_key(api_key_starter.key)
+        result = verify_api_key(starter_key)
         print_test("Deactivated API key returns invalid", 
                    result.get('valid') == False)
         
         # Reactivate for remaining tests
         api_key_starter.is_active = True
         db.session.commit()
+        api_key_cache.invalidate(key_id=api_key_starter.id)
         
         # Test 7: User without API plan trying to use API
         print_header("TEST 9: User Without API Plan")
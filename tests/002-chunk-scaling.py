@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark chunk_processor.process_text on tests/001-long-text.txt scaled up.
+
+Run from the repository root: python tests/002-chunk-scaling.py
+Exits nonzero if the time per character grows super-linearly with input size.
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "webapp"))
+
+from chunk_processor import process_text
+
+SCALES = (1, 2, 4, 8)
+MAX_GROWTH = 1.75  # allowed slowdown per character between the smallest and largest input
+
+
+def with_markers(text, every=7):
+    sentences = text.split(". ")
+    for i in range(0, len(sentences), every):
+        sentences[i] = (
+            f"[[voice=en-US-JennyNeural;emotion=cheerful;intensity={i % 3 + 1};"
+            f"pitch={i % 5};speed=9{i % 10}]]" + sentences[i]
+        )
+    return ". ".join(sentences)
+
+
+def best_of(fn, runs=3):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    with open(os.path.join(ROOT, "tests", "001-long-text.txt"), encoding="utf-8") as fh:
+        base = with_markers(fh.read())
+
+    per_char = []
+    for scale in SCALES:
+        text = "\n".join([base] * scale)
+        seconds = best_of(lambda: process_text(text, max_chars=240))
+        chunks = len(process_text(text, max_chars=240))
+        per_char.append(seconds / len(text))
+        print(f"x{scale}: {len(text):>9} chars  {chunks:>6} chunks  {seconds * 1000:8.1f} ms  "
+              f"{per_char[-1] * 1e9:7.1f} ns/char")
+
+    growth = per_char[-1] / per_char[0]
+    print(f"per-char growth x{SCALES[0]} -> x{SCALES[-1]}: {growth:.2f}")
+    return 0 if growth <= MAX_GROWTH else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
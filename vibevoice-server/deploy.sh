@@ -60,6 +60,15 @@ echo "[4/7] Downloading server..."
 if [ ! -f "server_1.5b.py" ]; then
     curl -sSL https://raw.githubusercontent.com/Hamza750802/TTS/master/vibevoice-server/server_1.5b.py -o server_1.5b.py
 fi
+if [ ! -f "metrics.py" ]; then
+    curl -sSL https://raw.githubusercontent.com/Hamza750802/TTS/master/vibevoice-server/metrics.py -o metrics.py
+fi
+if [ ! -f "tracing.py" ]; then
+    curl -sSL https://raw.githubusercontent.com/Hamza750802/TTS/master/vibevoice-server/tracing.py -o tracing.py
+fi
+if [ ! -f "tts_logging.py" ]; then
+    curl -sSL https://raw.githubusercontent.com/Hamza750802/TTS/master/vibevoice-server/tts_logging.py -o tts_logging.py
+fi
 
 # 5. Download custom voices from HuggingFace
 echo "[5/7] Downloading custom voices..."
@@ -28,10 +28,15 @@ from contextlib import asynccontextmanager
 import numpy as np
 import torch
 from fastapi import FastAPI, HTTPException, WebSocket, Request
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+from metrics import CHARACTERS, CONTENT_TYPE, ENGINE_ERRORS, REGISTRY, RTF, STAGE_SECONDS
+import tracing
+import tts_logging
+from tts_logging import LOG_SAMPLE_RATE, get_logger
+
 # Directories
 VOICES_DIR = Path("voices")
 OUTPUT_DIR = Path("outputs")
@@ -50,6 +55,16 @@ voice_cache: Dict[str, Any] = {}
 # Sample rate for VibeVoice output
 SAMPLE_RATE = 24000
 
+# Engine label on this server's metrics (matches the webapp's engine name)
+ENGINE = "vibevoice"
+tracing.set_service(ENGINE)
+
+# Per-request messages go through the queued structured logger; per-segment
+# ones are sampled at LOG_SAMPLE_RATE
+tts_logging.configure()
+log = get_logger(ENGINE)
+segment_log = get_logger("batch", sample_rate=LOG_SAMPLE_RATE)
+
 
 class TTSRequest(BaseModel):
     """Request for TTS generation"""
@@ -197,7 +212,7 @@ def get_voice_preset(voice_name: str) -> Optional[Any]:
     # Return first voice if not found
     if voice_cache:
         first_voice = next(iter(voice_cache.values()))
-        print(f"[VibeVoice] Voice '{voice_name}' not found, using default")
+        log.warning("voice.fallback", voice=voice_name)
         return first_voice
     
     return None
@@ -244,19 +259,21 @@ def generate_audio(text: str, voice: str, cfg_scale: float = 1.5, inference_step
         if torch.is_tensor(v):
             inputs[k] = v.to(torch_device)
     
-    print(f"[VibeVoice] Generating: voice={voice}, text_len={len(text)}, cfg={cfg_scale}, steps={inference_steps}")
+    log.debug("generate.start", voice=voice, chars=len(text), cfg=cfg_scale, steps=inference_steps)
     start_time = time.time()
     
     # Generate - use another fresh copy for all_prefilled_outputs
-    outputs = model.generate(
-        **inputs,
-        max_new_tokens=None,
-        cfg_scale=cfg_scale,
-        tokenizer=processor.tokenizer,
-        generation_config={'do_sample': False},
-        verbose=False,
-        all_prefilled_outputs=copy.deepcopy(original_preset),
-    )
+    with tracing.span("synthesis", engine=ENGINE, voice=voice, chars=len(text)), \
+            STAGE_SECONDS.time(stage="synthesis", engine=ENGINE):
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=None,
+            cfg_scale=cfg_scale,
+            tokenizer=processor.tokenizer,
+            generation_config={'do_sample': False},
+            verbose=False,
+            all_prefilled_outputs=copy.deepcopy(original_preset),
+        )
     
     gen_time = time.time() - start_time
     
@@ -264,9 +281,8 @@ def generate_audio(text: str, voice: str, cfg_scale: float = 1.5, inference_step
     if outputs.speech_outputs and outputs.speech_outputs[0] is not None:
         audio = outputs.speech_outputs[0]
         
-        # Debug: print the shape/type of audio
         if torch.is_tensor(audio):
-            print(f"[VibeVoice] Audio tensor shape: {audio.shape}, dtype: {audio.dtype}")
+            log.debug("generate.tensor", shape=tuple(audio.shape), dtype=audio.dtype)
             # Get sample count from last dimension (may be multi-dimensional)
             audio_samples = audio.shape[-1] if len(audio.shape) > 0 else 0
             audio = audio.detach().cpu().to(torch.float32).numpy()
@@ -278,18 +294,21 @@ def generate_audio(text: str, voice: str, cfg_scale: float = 1.5, inference_step
         
         # Check if audio is valid (not empty)
         if audio.size == 0 or audio_samples < 100:
-            print(f"[VibeVoice] WARNING: Generated empty/tiny audio ({audio_samples} samples)")
+            log.warning("generate.empty_audio", voice=voice, samples=audio_samples)
             raise RuntimeError(f"Model generated empty audio for text: {text[:50]}...")
         
         audio_duration = len(audio) / SAMPLE_RATE
         rtf = gen_time / audio_duration if audio_duration > 0 else 0
-        print(f"[VibeVoice] Generated {audio_duration:.2f}s audio ({len(audio)} samples) in {gen_time:.2f}s (RTF: {rtf:.2f}x)")
+        log.info("generate.done", voice=voice, audio_seconds=round(audio_duration, 2),
+                 seconds=round(gen_time, 2), rtf=round(rtf, 2))
+        CHARACTERS.inc(len(text), engine=ENGINE)
+        RTF.set(rtf, engine=ENGINE, voice=voice)
         
         # Convert to WAV
         wav_bytes = numpy_to_wav(audio, SAMPLE_RATE)
         return wav_bytes
     else:
-        print(f"[VibeVoice] ERROR: No speech_outputs returned for text: {text[:50]}...")
+        log.error("generate.no_output", voice=voice, text=text[:50])
         raise RuntimeError("No audio generated")
 
 
@@ -427,6 +446,21 @@ async def health():
     }
 
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Root span per request, joined to the caller's trace via `traceparent`"""
+    with tracing.start_trace(f"{request.method} {request.url.path}", request.headers.get(tracing.TRACE_HEADER)) as trace:
+        response = await call_next(request)
+        trace.attrs["status"] = response.status_code
+    return response
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format: synthesis time, characters, errors, RTF per voice"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/voices")
 async def list_voices():
     """List available voices"""
@@ -472,8 +506,8 @@ async def generate(request: TTSRequest):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"[VibeVoice] Error: {e}")
-        traceback.print_exc()
+        ENGINE_ERRORS.inc(engine=ENGINE, error=type(e).__name__)
+        log.exception("generate.failed", error=f"{type(e).__name__}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -494,7 +528,7 @@ async def batch_generate(request: BatchRequest):
             if not segment.text.strip():
                 continue
             
-            print(f"[VibeVoice] Batch segment {i+1}/{len(request.segments)}: voice={segment.voice}")
+            segment_log.debug("segment.start", segment=i + 1, of=len(request.segments), voice=segment.voice)
             
             audio_bytes = generate_audio(
                 text=segment.text,
@@ -508,7 +542,9 @@ async def batch_generate(request: BatchRequest):
             raise HTTPException(status_code=400, detail="No valid segments")
         
         # Concatenate with silence
-        final_audio = concatenate_wav_with_silence(audio_chunks, request.silence_ms)
+        with tracing.span("assembly", engine=ENGINE, segments=len(audio_chunks)), \
+                STAGE_SECONDS.time(stage="assembly", engine=ENGINE):
+            final_audio = concatenate_wav_with_silence(audio_chunks, request.silence_ms)
         
         gen_time = time.time() - start_time
         audio_duration = len(final_audio) / (SAMPLE_RATE * 2)
@@ -524,8 +560,8 @@ async def batch_generate(request: BatchRequest):
         )
         
     except Exception as e:
-        print(f"[VibeVoice] Batch error: {e}")
-        traceback.print_exc()
+        ENGINE_ERRORS.inc(engine=ENGINE, error=type(e).__name__)
+        log.exception("batch.failed", error=f"{type(e).__name__}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -552,7 +588,8 @@ async def preview_voice(voice: str):
         )
         
     except Exception as e:
-        print(f"[VibeVoice] Preview error: {e}")
+        ENGINE_ERRORS.inc(engine=ENGINE, error=type(e).__name__)
+        log.exception("preview.failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -17,6 +17,7 @@ import io
 import json
 import time
 import copy
+import contextvars
 import struct
 import asyncio
 import threading
@@ -33,17 +34,32 @@ import heapq
 import numpy as np
 import torch
 from fastapi import FastAPI, HTTPException, WebSocket, Request, UploadFile, File, Form
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import scipy.io.wavfile as wavfile
 
+from metrics import CHARACTERS, CONTENT_TYPE, ENGINE_ERRORS, REGISTRY, RTF, STAGE_SECONDS
+import tracing
+import tts_logging
+from tts_logging import LOG_SAMPLE_RATE, get_logger
+
 # Directories
 VOICES_DIR = Path("voices")
 CUSTOM_VOICES_DIR = Path("voices/custom")
 OUTPUT_DIR = Path("outputs")
 TEMP_DIR = Path("temp")
 
+# Engine label on this server's metrics (matches the webapp's engine name)
+ENGINE = "vibevoice"
+tracing.set_service(ENGINE)
+
+# Per-request and queue messages go through the queued structured logger;
+# per-segment ones are sampled at LOG_SAMPLE_RATE
+tts_logging.configure()
+log = get_logger(ENGINE)
+segment_log = get_logger("batch", sample_rate=LOG_SAMPLE_RATE)
+
 # Create directories
 for d in [VOICES_DIR, CUSTOM_VOICES_DIR, OUTPUT_DIR, TEMP_DIR]:
     d.mkdir(exist_ok=True, parents=True)
@@ -101,6 +117,8 @@ class QueueItem:
     future: asyncio.Future = field(compare=False)
     char_count: int = field(compare=False)
     user_priority: int = field(compare=False, default=1)  # 1-10 from webapp
+    # Context of the enqueuing request, so queue wait and inference join its trace
+    trace_context: contextvars.Context = field(compare=False, default_factory=contextvars.copy_context)
 
 
 class HybridQueue:
@@ -199,7 +217,8 @@ class HybridQueue:
             eta = self._estimate_wait(position, char_count)
             
             if user_priority > 1:
-                print(f"[Queue] Enqueued {request_id}: {char_count} chars, user_priority={user_priority}, combined={combined_priority}")
+                log.debug("queue.enqueued", request_id=request_id, chars=char_count,
+                          user_priority=user_priority, combined=combined_priority, position=position)
             
             return request_id, position, eta
     
@@ -260,11 +279,15 @@ class HybridQueue:
             
             async with semaphore:
                 start_time = time.time()
+                STAGE_SECONDS.observe(start_time - item.timestamp, stage="queue_wait", engine=ENGINE)
+                item.trace_context.run(tracing.record, "queue_wait", item.timestamp, start_time - item.timestamp,
+                                       engine=ENGINE, lane="priority" if is_priority else "standard")
                 
-                # Run generation in thread pool
+                # Run generation in thread pool, inside the enqueuing request's trace
                 loop = asyncio.get_event_loop()
                 result = await loop.run_in_executor(
                     None,
+                    item.trace_context.run,
                     generate_audio_sync,
                     item.text,
                     item.voice,
@@ -285,6 +308,7 @@ class HybridQueue:
                 item.future.set_result((result, elapsed))
                 
         except Exception as e:
+            ENGINE_ERRORS.inc(engine=ENGINE, error=type(e).__name__)
             item.future.set_exception(e)
         finally:
             async with self._lock:
@@ -321,7 +345,7 @@ async def queue_processor():
             else:
                 await asyncio.sleep(0.1)
         except Exception as e:
-            print(f"[Queue] Error processing: {e}")
+            log.exception("queue.failed", error=f"{type(e).__name__}: {e}")
             await asyncio.sleep(0.5)
 
 
@@ -500,7 +524,7 @@ def generate_audio(text: str, voice: str, cfg_scale: float = 1.5, inference_step
         if voice_registry:
             fallback_voice = list(voice_registry.keys())[0]
             voice_audio_path = voice_registry[fallback_voice]
-            print(f"[Studio Model] Voice '{voice}' not found, using '{fallback_voice}'")
+            log.warning("voice.fallback", voice=voice, fallback=fallback_voice)
         else:
             raise RuntimeError(f"No voice samples available")
     
@@ -524,7 +548,9 @@ def generate_audio(text: str, voice: str, cfg_scale: float = 1.5, inference_step
             inputs[k] = v.to(target_device)
     
     # Generate
-    with torch.no_grad():
+    start = time.perf_counter()
+    with tracing.span("synthesis", engine=ENGINE, voice=voice, chars=len(text)), \
+            STAGE_SECONDS.time(stage="synthesis", engine=ENGINE), torch.no_grad():
         outputs = model.generate(
             **inputs,
             cfg_scale=cfg_scale,
@@ -551,6 +577,10 @@ def generate_audio(text: str, voice: str, cfg_scale: float = 1.5, inference_step
     audio = np.clip(audio, -1.0, 1.0)
     audio_int16 = (audio * 32767).astype(np.int16)
     
+    CHARACTERS.inc(len(text), engine=ENGINE)
+    if len(audio_int16):
+        RTF.set((time.perf_counter() - start) / (len(audio_int16) / SAMPLE_RATE), engine=ENGINE, voice=voice)
+    
     # Create WAV bytes
     buffer = io.BytesIO()
     wavfile.write(buffer, SAMPLE_RATE, audio_int16)
@@ -652,6 +682,21 @@ async def health():
     }
 
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Root span per request, joined to the caller's trace via `traceparent`"""
+    with tracing.start_trace(f"{request.method} {request.url.path}", request.headers.get(tracing.TRACE_HEADER)) as trace:
+        response = await call_next(request)
+        trace.attrs["status"] = response.status_code
+    return response
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format: queue wait, synthesis time, characters, errors, RTF per voice"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/queue/status")
 async def queue_status():
     """Get overall queue status"""
@@ -751,7 +796,8 @@ async def generate(request: TTSRequest):
         
         # Save to temp file
         output_file = TEMP_DIR / f"gen_{request_id}.wav"
-        with open(output_file, "wb") as f:
+        with tracing.span("file_write", engine=ENGINE), STAGE_SECONDS.time(stage="file_write", engine=ENGINE), \
+                open(output_file, "wb") as f:
             f.write(audio_bytes)
         
         return FileResponse(
@@ -768,7 +814,7 @@ async def generate(request: TTSRequest):
     except HTTPException:
         raise
     except Exception as e:
-        traceback.print_exc()
+        log.exception("generate.failed", error=f"{type(e).__name__}: {e}")
         raise HTTPException(500, f"Generation failed: {e}")
 
 
@@ -790,7 +836,7 @@ async def batch_generate(request: BatchRequest):
         silence = np.zeros(silence_samples, dtype=np.float32)
         
         for i, seg in enumerate(request.segments):
-            print(f"[Studio Model] Generating segment {i+1}/{len(request.segments)}: {seg.voice}")
+            segment_log.debug("segment.start", segment=i + 1, of=len(request.segments), voice=seg.voice)
             
             # Generate each segment through queue with user priority
             request_id, position, eta = await request_queue.enqueue(
@@ -827,20 +873,23 @@ async def batch_generate(request: BatchRequest):
             raise HTTPException(500, "All segments failed")
         
         # Concatenate
-        combined = np.concatenate(all_audio)
-        combined = np.clip(combined, -1.0, 1.0)
-        combined_int16 = (combined * 32767).astype(np.int16)
-        
-        # Create WAV
-        buffer = io.BytesIO()
-        wavfile.write(buffer, SAMPLE_RATE, combined_int16)
-        audio_bytes = buffer.getvalue()
+        with tracing.span("assembly", engine=ENGINE, segments=len(request.segments)), \
+                STAGE_SECONDS.time(stage="assembly", engine=ENGINE):
+            combined = np.concatenate(all_audio)
+            combined = np.clip(combined, -1.0, 1.0)
+            combined_int16 = (combined * 32767).astype(np.int16)
+            
+            # Create WAV
+            buffer = io.BytesIO()
+            wavfile.write(buffer, SAMPLE_RATE, combined_int16)
+            audio_bytes = buffer.getvalue()
         
         elapsed = time.time() - start
         
         # Save to temp file
         output_file = TEMP_DIR / f"batch_{int(time.time()*1000)}.wav"
-        with open(output_file, "wb") as f:
+        with tracing.span("file_write", engine=ENGINE), STAGE_SECONDS.time(stage="file_write", engine=ENGINE), \
+                open(output_file, "wb") as f:
             f.write(audio_bytes)
         
         return FileResponse(
@@ -856,7 +905,7 @@ async def batch_generate(request: BatchRequest):
     except HTTPException:
         raise
     except Exception as e:
-        traceback.print_exc()
+        log.exception("batch.failed", error=f"{type(e).__name__}: {e}")
         raise HTTPException(500, f"Batch generation failed: {e}")
 
 
@@ -884,6 +933,7 @@ async def preview_voice(voice: str, text: str = "Hello! This is a preview of my
             }
         )
     except Exception as e:
+        ENGINE_ERRORS.inc(engine=ENGINE, error=type(e).__name__)
         raise HTTPException(500, f"Preview failed: {e}")
 
 
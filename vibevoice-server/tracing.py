@@ -0,0 +1,317 @@
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Request tracing across the webapp and the model servers.
+#
+# A request gets a trace when it arrives (start_trace, continuing the
+# caller's W3C `traceparent` header if there is one); span() opens child
+# spans around the work inside it -- segmenting, queue wait, inference,
+# concatenation, saving. The current span lives in a ContextVar, so it
+# follows asyncio tasks; threads and executors need bind(). Outgoing
+# backend calls carry the current span in `traceparent` (inject()), so a
+# model server's spans join the webapp's trace.
+#
+# Finished spans go onto an in-memory queue and a background thread appends
+# them to TRACE_FILE as JSON lines (one object per span). Without
+# TRACE_FILE ids are still generated and propagated, but nothing is
+# recorded. TRACE_SAMPLE_RATE applies to traces that start here; a trace
+# continued from a header keeps the caller's decision.
+#
+# Identical copies of this file ship with indextts-server/ and
+# vibevoice-server/, which are deployed on their own.
+
+TRACE_FILE = os.environ.get("TRACE_FILE", "")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "1"))
+TRACE_HEADER = "traceparent"
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str  # 32 hex chars
+    span_id: str  # 16 hex chars
+    sampled: bool = True
+
+    def header(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """SpanContext from a `traceparent` header value, or None if malformed."""
+    parts = (value or "").strip().lower().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return SpanContext(parts[1], parts[2], bool(flags & 1))
+
+
+def _new_id(hex_chars: int) -> str:
+    return f"{random.getrandbits(hex_chars * 4):0{hex_chars}x}"
+
+
+_current: "contextvars.ContextVar[Optional[SpanContext]]" = contextvars.ContextVar("trace_span", default=None)
+_service = os.environ.get("TRACE_SERVICE", "")
+
+
+def set_service(name: str) -> None:
+    """Name recorded on this process's spans (unless TRACE_SERVICE is set)."""
+    global _service
+    _service = os.environ.get("TRACE_SERVICE") or name
+
+
+def current() -> Optional[SpanContext]:
+    return _current.get()
+
+
+def trace_id() -> Optional[str]:
+    ctx = _current.get()
+    return ctx.trace_id if ctx else None
+
+
+def inject(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """headers plus `traceparent` for the current span (a new dict)."""
+    headers = dict(headers or {})
+    ctx = _current.get()
+    if ctx is not None:
+        headers[TRACE_HEADER] = ctx.header()
+    return headers
+
+
+def bind(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """fn running in a copy of the current context (for executors and threads)."""
+    ctx = contextvars.copy_context()
+
+    def bound(*args: Any, **kwargs: Any) -> Any:
+        return ctx.run(fn, *args, **kwargs)
+
+    return bound
+
+
+class Span:
+    """One timed operation. Use as a context manager, or start()/finish()."""
+
+    def __init__(self, name: str, context: Optional[SpanContext], parent_id: Optional[str],
+                 attrs: Dict[str, Any]):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self._token = None
+        self._started = 0.0
+        self._began = 0.0
+
+    @property
+    def recording(self) -> bool:
+        return self.context is not None and self.context.sampled
+
+    def start(self) -> "Span":
+        if self.context is not None:
+            self._token = _current.set(self.context)
+        self._started = time.time()
+        self._began = time.perf_counter()
+        return self
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        if self.recording:
+            _emit(self.context, self.parent_id, self.name, self._started,
+                  time.perf_counter() - self._began, self.attrs, error)
+
+    def __enter__(self) -> "Span":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.finish(exc)
+
+
+def start_trace(name: str, traceparent: Optional[str] = None, **attrs: Any) -> Span:
+    """Root span for an incoming request, continuing traceparent if valid."""
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        return Span(name, SpanContext(parent.trace_id, _new_id(16), parent.sampled), parent.span_id, attrs)
+    sampled = TRACE_SAMPLE_RATE >= 1 or random.random() < TRACE_SAMPLE_RATE
+    return Span(name, SpanContext(_new_id(32), _new_id(16), sampled), None, attrs)
+
+
+def span(name: str, **attrs: Any) -> Span:
+    """Child of the current span; records nothing outside a sampled trace."""
+    parent = _current.get()
+    if parent is None:
+        return Span(name, None, None, attrs)
+    return Span(name, SpanContext(parent.trace_id, _new_id(16), parent.sampled), parent.span_id, attrs)
+
+
+def record(name: str, started: float, duration: float, **attrs: Any) -> None:
+    """Record an interval measured elsewhere (e.g. queue wait) under the current span."""
+    parent = _current.get()
+    if parent is not None and parent.sampled:
+        _emit(SpanContext(parent.trace_id, _new_id(16)), parent.span_id, name, started, duration, attrs, None)
+
+
+# Sink -----------------------------------------------------------------
+
+_pending: "queue.SimpleQueue[Dict[str, Any]]" = queue.SimpleQueue()
+_wake = threading.Event()
+_write_lock = threading.Lock()
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+
+def _log():
+    # tts_logging imports this module, so the logger is looked up on use
+    from tts_logging import get_logger
+    return get_logger("tracing")
+
+
+def _emit(ctx: SpanContext, parent_id: Optional[str], name: str, started: float, duration: float,
+          attrs: Dict[str, Any], error: Optional[BaseException]) -> None:
+    if not TRACE_FILE:
+        return
+    entry = {
+        "trace_id": ctx.trace_id,
+        "span_id": ctx.span_id,
+        "parent_id": parent_id,
+        "name": name,
+        "service": _service,
+        "start": round(started, 6),
+        "duration_ms": round(duration * 1000, 3),
+    }
+    if attrs:
+        entry["attrs"] = attrs
+    if error is not None:
+        entry["error"] = f"{type(error).__name__}: {error}"
+    _pending.put(entry)
+    _wake.set()
+    ensure_started()
+
+
+def _write_pending() -> None:
+    with _write_lock:
+        entries = []
+        while True:
+            try:
+                entries.append(_pending.get_nowait())
+            except queue.Empty:
+                break
+        if not entries:
+            return
+        # One O_APPEND write per batch, so workers sharing the file don't interleave lines
+        data = "".join(json.dumps(entry, default=str) + "\n" for entry in entries).encode()
+        fd = os.open(TRACE_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+def _run_writer() -> None:
+    while True:
+        _wake.wait()
+        time.sleep(0.05)  # let the rest of the request's spans arrive
+        _wake.clear()
+        try:
+            _write_pending()
+        except OSError as e:
+            _log().warning('tracing.write_failed', file=TRACE_FILE, error=str(e))
+
+
+def ensure_started() -> None:
+    """Start the span writer for this process (no-op without TRACE_FILE)."""
+    global _writer
+    if not TRACE_FILE or (_writer is not None and _writer.is_alive()):
+        return
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_run_writer, daemon=True, name="trace-writer")
+            _writer.start()
+
+
+def flush() -> None:
+    """Write queued spans now (tests, shutdown)."""
+    if TRACE_FILE:
+        _write_pending()
+
+
+# Reading --------------------------------------------------------------
+
+def load_trace(trace: str, paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """Every span of one trace from JSON-lines files, in start order."""
+    spans = []
+    for path in paths:
+        try:
+            with open(path) as fh:
+                for line in fh:
+                    if trace in line:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        if entry.get("trace_id") == trace:
+                            spans.append(entry)
+        except OSError:
+            continue
+    return sorted(spans, key=lambda entry: entry["start"])
+
+
+def waterfall(spans: List[Dict[str, Any]], width: int = 40) -> str:
+    """Text waterfall: one line per span, indented under its parent."""
+    if not spans:
+        return ""
+    origin = min(entry["start"] for entry in spans)
+    end = max(entry["start"] + entry["duration_ms"] / 1000 for entry in spans)
+    scale = width / max(end - origin, 1e-6)
+    ids = {entry["span_id"] for entry in spans}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for entry in spans:
+        parent = entry.get("parent_id") if entry.get("parent_id") in ids else None
+        children.setdefault(parent, []).append(entry)
+
+    lines = []
+
+    def walk(parent: Optional[str], depth: int) -> None:
+        for entry in children.get(parent, []):
+            offset = int((entry["start"] - origin) * scale)
+            bar = max(1, int(entry["duration_ms"] / 1000 * scale))
+            label = f"{'  ' * depth}{entry.get('service') or '?'}:{entry['name']}"
+            flag = "  !" if entry.get("error") else ""
+            lines.append(f"{label:<44} {' ' * offset}{'#' * bar:<{width - offset}} "
+                         f"{entry['duration_ms']:>10.1f} ms{flag}")
+            walk(entry["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+__all__ = [
+    "Span",
+    "SpanContext",
+    "TRACE_FILE",
+    "TRACE_HEADER",
+    "bind",
+    "current",
+    "ensure_started",
+    "flush",
+    "inject",
+    "load_trace",
+    "parse_traceparent",
+    "record",
+    "set_service",
+    "span",
+    "start_trace",
+    "trace_id",
+    "waterfall",
+]
@@ -0,0 +1,208 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, TextIO
+
+import tracing
+from metrics import counter
+
+# Structured logging for request hot paths.
+#
+# get_logger(name) returns an EventLogger under the "tts" logger:
+#
+#   log.info("tts.generated", voice=voice, size=size)
+#
+# An event name plus keyword fields, rendered as one line of text
+# (LOG_FORMAT=text, `key=value`) or JSON (LOG_FORMAT=json). Disabled levels
+# return before building anything. Field values are cut to
+# LOG_MAX_FIELD_CHARS, so request payloads can be logged without flooding
+# the output. Inside a trace the trace id is added as `trace_id`.
+#
+# Loggers for per-chunk/per-segment messages take a sample_rate: only that
+# fraction of their DEBUG/INFO records is kept (warnings and errors always
+# are).
+#
+# Records go through a bounded in-memory queue; a QueueListener thread
+# formats and writes them to stdout. A request thread never blocks on the
+# stream; if the queue is full the record is dropped and counted in
+# log_records_dropped_total.
+#
+# Identical copies of this file ship with indextts-server/ and
+# vibevoice-server/, which are deployed on their own.
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.1"))
+LOG_MAX_FIELD_CHARS = int(os.environ.get("LOG_MAX_FIELD_CHARS", "200"))
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+ROOT_LOGGER = "tts"
+
+DROPPED = counter("log_records_dropped_total", "Log records dropped because the log queue was full.")
+
+
+def truncate(value: Any, limit: int = LOG_MAX_FIELD_CHARS) -> Any:
+    """value, or its text cut to limit chars with the original length noted."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} chars)"
+
+
+class EventLogger:
+    """Event-plus-fields wrapper around a logging.Logger, with optional sampling."""
+
+    def __init__(self, logger: logging.Logger, sample_rate: float = 1.0):
+        self.logger = logger
+        self.sample_rate = sample_rate
+
+    def enabled(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def _log(self, level: int, event: str, fields: Dict[str, Any], exc_info: bool = False) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        trace = tracing.trace_id()
+        if trace:
+            fields["trace_id"] = trace
+        self.logger.log(level, event, exc_info=exc_info, extra={"fields": fields}, stacklevel=3)
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event: str, **fields: Any) -> None:
+        """ERROR with the current exception's traceback."""
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+def get_logger(name: str, sample_rate: float = 1.0) -> EventLogger:
+    return EventLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"), sample_rate)
+
+
+class StructuredFormatter(logging.Formatter):
+    def __init__(self, fmt: str = LOG_FORMAT, max_chars: int = LOG_MAX_FIELD_CHARS):
+        super().__init__()
+        self.json = fmt == "json"
+        self.max_chars = max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {key: truncate(value, self.max_chars)
+                  for key, value in (getattr(record, "fields", None) or {}).items()}
+        event = truncate(record.getMessage(), self.max_chars)
+        exc = record.exc_text or (self.formatException(record.exc_info) if record.exc_info else None)
+        if self.json:
+            entry = {"ts": round(record.created, 3), "level": record.levelname, "logger": record.name,
+                     "event": event, **fields}
+            if exc:
+                entry["exc"] = exc
+            return json.dumps(entry, default=str)
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created))
+        parts = [stamp, f"{record.levelname:<7}", record.name, event]
+        parts += [f"{key}={json.dumps(value) if isinstance(value, str) and (' ' in value or not value) else value}"
+                  for key, value in fields.items()]
+        line = " ".join(parts)
+        return f"{line}\n{exc}" if exc else line
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Tracebacks reference live frames; render them now, leave everything
+        # else (and all formatting) to the listener thread
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc()
+
+
+_listener: Optional[QueueListener] = None
+_listener_pid: Optional[int] = None
+_settings: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def configure(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream: Optional[TextIO] = None) -> None:
+    """(Re)install the queue handler and start its writer thread for this process."""
+    global _listener, _listener_pid
+    with _lock:
+        if _listener is not None:
+            try:
+                _listener.stop()
+            except Exception:
+                pass  # listener thread did not survive a fork
+        records: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(StructuredFormatter(fmt))
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_DroppingQueueHandler(records))
+        root.setLevel(level)
+        root.propagate = False
+        _listener = QueueListener(records, output)
+        _listener.start()
+        _listener_pid = os.getpid()
+        _settings.update(level=level, fmt=fmt, stream=stream)
+
+
+def ensure_started() -> None:
+    """Restart the writer thread in a forked worker (threads don't survive fork)."""
+    if _listener_pid == os.getpid():
+        return
+    if _settings:
+        configure(**_settings)
+    else:
+        configure()
+
+
+def shutdown() -> None:
+    """Write every queued record and stop the writer thread."""
+    global _listener, _listener_pid
+    with _lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            _listener.stop()
+        _listener = None
+        _listener_pid = None
+
+
+atexit.register(shutdown)
+
+
+__all__ = [
+    "EventLogger",
+    "LOG_SAMPLE_RATE",
+    "StructuredFormatter",
+    "configure",
+    "ensure_started",
+    "get_logger",
+    "shutdown",
+    "truncate",
+]
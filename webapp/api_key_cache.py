@@ -0,0 +1,92 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+# API keys are stored as SHA-256 digests (they are long random tokens, so a
+# fast unsalted hash is enough) in a unique, indexed column; the plaintext is
+# shown once at creation. Verified keys are cached in-process for a short
+# TTL so a burst of API calls costs no key/user lookups. Toggling or deleting
+# a key drops it from this worker's cache at once; other workers notice
+# within API_KEY_CACHE_TTL seconds.
+
+API_KEY_CACHE_TTL = float(os.environ.get("API_KEY_CACHE_TTL", "30"))
+API_KEY_CACHE_SIZE = int(os.environ.get("API_KEY_CACHE_SIZE", "4096"))
+KEY_PREFIX_LENGTH = 12  # "ctts_" plus a few characters, for display
+
+
+def hash_api_key(raw_key: str) -> str:
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+def display_prefix(raw_key: str) -> str:
+    return raw_key[:KEY_PREFIX_LENGTH]
+
+
+@dataclass(frozen=True)
+class VerifiedKey:
+    key_id: int
+    user_id: int
+    api_tier: str
+    has_api_access: bool
+    char_limit: int
+
+
+class APIKeyCache:
+    """Bounded TTL cache of key hash -> VerifiedKey."""
+
+    def __init__(self, ttl: float = API_KEY_CACHE_TTL, max_size: int = API_KEY_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # hash -> (expires_at, VerifiedKey)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key_hash: str) -> Optional[VerifiedKey]:
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key_hash]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key_hash)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key_hash: str, verified: VerifiedKey) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key_hash] = (time.monotonic() + self.ttl, verified)
+            self._entries.move_to_end(key_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key_hash: Optional[str] = None, key_id: Optional[int] = None,
+                   user_id: Optional[int] = None) -> None:
+        """Drop one key (by hash or id), every key of a user, or everything."""
+        with self._lock:
+            if key_hash is None and key_id is None and user_id is None:
+                self._entries.clear()
+                return
+            for cached_hash, (_, verified) in list(self._entries.items()):
+                if (cached_hash == key_hash or verified.key_id == key_id
+                        or verified.user_id == user_id):
+                    del self._entries[cached_hash]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+__all__ = [
+    "APIKeyCache",
+    "VerifiedKey",
+    "display_prefix",
+    "hash_api_key",
+    "API_KEY_CACHE_TTL",
+]
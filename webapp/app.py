@@ -4,17 +4,20 @@ Web app for Cheap TTS with auth + Stripe subscriptions
 import asyncio
 import base64
 import hashlib
+import hmac
 import os
 import secrets
 
 # Import local modified edge_tts first (for emotion support)
 import sys
+import threading
 import time
 from datetime import datetime, timedelta
 from email.message import EmailMessage
 from functools import wraps
 from pathlib import Path
 
+import click
 import requests
 import stripe
 
@@ -24,6 +27,8 @@ from flask import (
     Flask,
     flash,
     jsonify,
+    Response,
+    g,
     redirect,
     render_template,
     request,
@@ -48,8 +53,30 @@ from werkzeug.security import check_password_hash, generate_password_hash
 webapp_dir = Path(__file__).parent
 sys.path.insert(0, str(webapp_dir))  # Ensure local edge_tts is imported first
 # Import chunking and SSML modules from same directory
+from backend_client import BackendError, error_detail, get_backend, save_response
+from backend_health import HealthMonitor
+from backend_pool import HEALTH_INTERVAL, BackendPool, SegmentFailed, parse_urls
+from tts_engines import Capabilities, Engine, Segment, SynthesisPipeline, register_engine, registered_engines
+from reference_registry import ReferenceRegistry, generation_from_health
+from preview_warmer import PREWARM_ENABLED, PreviewWarmer, WarmJob
+from limiter_storage import limiter_storage_uri
+from shared_counters import UsageFlusher, open_store
+from usage_ledger import Meter, Reservation, UsageLedger
+from api_key_cache import APIKeyCache, VerifiedKey, display_prefix, hash_api_key
+from mobile_sessions import CachedSession, SessionCache, hash_token, session_expiry
+from migrations import MIGRATE_ON_STARTUP, MIGRATIONS, MigrationRunner
+from audio_serving import audio_mimetype, cache_control, serve_audio
+from audio_storage import open_storage
+from mp3_assembler import assemble_mp3
+from hls_writer import HLSWriter, playlist_complete
 from chunk_processor import process_text
-from ssml_builder import build_ssml
+from single_flight import SingleFlight, partial_path
+from ssml_builder import build_ssml, build_ssml_batch
+from text_normalizer import default_normalizer
+from metrics import CACHE_LOOKUPS, CHARACTERS, CONTENT_TYPE, ENGINE_ERRORS, REGISTRY, STAGE_SECONDS, histogram
+import tracing
+import tts_logging
+from tts_logging import LOG_SAMPLE_RATE, get_logger, truncate
 
 import edge_tts
 
@@ -79,6 +106,19 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # Debug mode from environment
 DEBUG_MODE = os.environ.get('FLASK_DEBUG', 'False').lower() in ('true', '1', 'yes')
 
+# Request-path diagnostics go through the queued structured logger
+# (tts_logging.py); per-batch and per-segment messages are sampled at
+# LOG_SAMPLE_RATE. User emails are logged truncated.
+tts_logging.configure()
+edge_log = get_logger('edge')
+segment_log = get_logger('batch', sample_rate=LOG_SAMPLE_RATE)
+widget_log = get_logger('widget')
+api_log = get_logger('api')
+premium_log = get_logger('premium')
+indextts_log = get_logger('indextts')
+vibevoice_log = get_logger('vibevoice')
+mobile_log = get_logger('mobile')
+
 # Configure WTForms CSRF
 app.config['WTF_CSRF_ENABLED'] = True
 app.config['WTF_CSRF_TIME_LIMIT'] = None  # No timeout for CSRF tokens
@@ -97,14 +137,6 @@ CORS(app, resources={
     }
 })
 
-# Rate limiter for API abuse protection
-limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
-)
-
 # Stripe config (set env vars in production)
 stripe.api_key = os.environ.get('STRIPE_SECRET_KEY', '')
 STRIPE_PRICE_ID = os.environ.get('STRIPE_PRICE_ID', '')  # monthly price id (legacy)
@@ -159,6 +191,40 @@ INDEXTTS_URL = os.environ.get('INDEXTTS_URL', '')
 # Runs on Vast.ai GPU instance (RTX 3060 12GB or better)
 VIBEVOICE_URL = os.environ.get('VIBEVOICE_URL', '')
 
+# Connection-pooled clients for the model servers (keep-alive across segments;
+# pool size / retries / connect timeout via BACKEND_* env vars)
+chatterbox_backend = get_backend('chatterbox', CHATTERBOX_URL)
+# Health-check endpoint (devnen server: GET /). If its JSON carries a start
+# time/boot id it is also used to detect restarts; otherwise manifests are compared
+CHATTERBOX_HEALTH_PATH = os.environ.get('CHATTERBOX_HEALTH_PATH', '/')
+
+# Premium segments fan out across every Chatterbox replica in CHATTERBOX_URLS
+# (comma-separated; defaults to CHATTERBOX_URL), least-busy replica first
+CHATTERBOX_URLS = parse_urls(os.environ.get('CHATTERBOX_URLS'), CHATTERBOX_URL)
+chatterbox_pool = BackendPool(
+    'chatterbox', CHATTERBOX_URLS,
+    per_replica=int(os.environ.get('CHATTERBOX_REPLICA_CONCURRENCY', '1')),
+    health_path=CHATTERBOX_HEALTH_PATH,
+)
+# Same for IndexTTS2 / VibeVoice replicas (INDEXTTS_URLS / VIBEVOICE_URLS)
+indextts_pool = BackendPool(
+    'indextts', parse_urls(os.environ.get('INDEXTTS_URLS'), INDEXTTS_URL),
+    per_replica=int(os.environ.get('INDEXTTS_REPLICA_CONCURRENCY', '1')),
+    health_path='/health',
+)
+vibevoice_pool = BackendPool(
+    'vibevoice', parse_urls(os.environ.get('VIBEVOICE_URLS'), VIBEVOICE_URL),
+    per_replica=int(os.environ.get('VIBEVOICE_REPLICA_CONCURRENCY', '1')),
+    health_path='/health',
+)
+
+# Background health probes + circuit breakers for every replica; started on
+# the first request in each worker so requests never wait on health calls
+backend_monitor = HealthMonitor([chatterbox_pool, indextts_pool, vibevoice_pool], HEALTH_INTERVAL)
+REGISTRY.add_collector(backend_monitor.metrics)
+indextts_backend = get_backend('indextts', INDEXTTS_URL)
+vibevoice_backend = get_backend('vibevoice', VIBEVOICE_URL)
+
 # All available Chatterbox predefined voices (with .wav extension required by server)
 # These are the actual voice names from the Chatterbox server
 CHATTERBOX_VOICES = [
@@ -219,6 +285,54 @@ def billing_enabled() -> bool:
 OUTPUT_DIR = Path(__file__).parent / "output"
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# Coalesces identical concurrent renders (same cache key) across threads and
+# gunicorn workers so a burst of identical requests makes one upstream call
+synthesis_flight = SingleFlight(OUTPUT_DIR / ".locks")
+
+# Finished audio is published to audio_storage: the output directory itself
+# by default, or S3-compatible storage (AUDIO_STORAGE_URI=s3://...) so any
+# web node can hand out a file another node rendered
+audio_storage = open_storage(os.environ.get('AUDIO_STORAGE_URI'), OUTPUT_DIR)
+
+# HLS output: how long a request waits for the first segment
+HLS_START_TIMEOUT = float(os.environ.get('HLS_START_TIMEOUT', '60'))
+_hls_renders = {}  # playlist name -> failed event of the thread rendering it in this process
+_hls_renders_lock = threading.Lock()
+_published_audio = set()  # names this process has already uploaded
+
+# Sliding-window counters shared by all workers (Studio rate limit and
+# throttle windows). Redis when configured, otherwise a SQLite file that
+# every worker on this host opens.
+COUNTER_STORE_URI = (
+    os.environ.get('COUNTER_STORE_URI')
+    or os.environ.get('REDIS_URL')
+    or f"sqlite:///{OUTPUT_DIR / '.locks' / 'counters.db'}"
+)
+counter_store = open_store(COUNTER_STORE_URI)
+
+# Rate limiter for API abuse protection. It counts in the same store, so the
+# limits are shared by every worker (and every host with Redis);
+# limiter_storage.py adds the sqlite:/// backend to Flask-Limiter.
+limiter = Limiter(
+    app=app,
+    key_func=get_remote_address,
+    default_limits=["200 per day", "50 per hour"],
+    storage_uri=os.environ.get('RATELIMIT_STORAGE_URI') or limiter_storage_uri(COUNTER_STORE_URI),
+    strategy="moving-window"
+)
+
+
+def flush_user_usage(batch):
+    """Write buffered per-user column values in one transaction."""
+    with app.app_context():
+        for user_id, values in batch.items():
+            User.query.filter_by(id=user_id).update(values, synchronize_session=False)
+        db.session.commit()
+
+
+# Mirrors counter values into the user row off the request path
+usage_flusher = UsageFlusher(flush_user_usage)
+
 
 def cleanup_old_files(days=7):
     """Remove generated audio files older than specified days"""
@@ -233,6 +347,21 @@ def cleanup_old_files(days=7):
             except Exception:
                 pass
 
+
+def publish_audio(output_file, absolute=False):
+    """Client URL for a finished file, publishing it to audio_storage first."""
+    name = Path(output_file).name
+    if audio_storage.remote:
+        if name not in _published_audio:
+            if not audio_storage.exists(name):
+                audio_storage.put(name, output_file)
+            if len(_published_audio) > 50000:
+                _published_audio.clear()
+            _published_audio.add(name)
+        return audio_storage.presign(name)
+    path = f'/api/audio/{name}'
+    return request.url_root.rstrip('/') + path if absolute else path
+
 # Cache for voices
 _voices_cache = None
 
@@ -274,6 +403,15 @@ HERO_PRESETS = [
 ]
 
 
+# Character usage is reserved with single atomic UPDATEs (see usage_ledger.py)
+usage_ledger = UsageLedger(lambda: db.engine)
+CHARS_METER = Meter('chars', 'chars_used', 'chars_reset_at')
+API_METER = Meter('api', 'api_chars_used', 'api_usage_reset_at')
+PREMIUM_METER = Meter('premium', 'premium_chars_used', 'premium_chars_reset_at', overage_column='premium_overage_cents')
+INDEXTTS_METER = Meter('indextts', 'indextts_chars_used', 'indextts_chars_reset_at')
+VIBEVOICE_METER = Meter('vibevoice', 'vibevoice_chars_used', 'vibevoice_chars_reset_at')
+
+
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
@@ -293,8 +431,8 @@ class User(db.Model, UserMixin):
     api_usage_reset_at = db.Column(db.DateTime)  # When usage resets (monthly)
     
     # Mobile App Session
-    mobile_session_token = db.Column(db.String(255))  # Token for mobile app auth
-    mobile_session_expires = db.Column(db.DateTime)  # When mobile session expires
+    mobile_session_token = db.Column(db.String(255))  # Legacy; sessions now live in MobileSession
+    mobile_session_expires = db.Column(db.DateTime)  # Legacy; see MobileSession.expires_at
     
     # Character Usage Tracking (Web + Mobile - unified)
     # Free tier: 10,000 chars/month, Paid: unlimited
@@ -320,20 +458,22 @@ class User(db.Model, UserMixin):
         """Check if user has lifetime access"""
         return self.subscription_status == 'lifetime'
     
+    # API tier character limits (per month)
+    API_LIMITS = {
+        'starter': 100000,      # 100k chars/month
+        'pro': 500000,          # 500k chars/month
+        'enterprise': 999999999  # Effectively unlimited
+    }
+    
     @property
     def has_api_access(self) -> bool:
         """API access (separate from web subscription)"""
-        return self.api_tier in ('starter', 'pro', 'enterprise')
+        return self.api_tier in self.API_LIMITS
     
     @property
     def api_char_limit(self) -> int:
         """Get character limit based on API tier"""
-        limits = {
-            'starter': 100000,      # 100k chars/month
-            'pro': 500000,          # 500k chars/month
-            'enterprise': 999999999  # Effectively unlimited
-        }
-        return limits.get(self.api_tier, 0)
+        return self.API_LIMITS.get(self.api_tier, 0)
     
     @property
     def api_chars_remaining(self) -> int:
@@ -362,16 +502,8 @@ class User(db.Model, UserMixin):
         if not self.has_api_access:
             return False
         
-        # Check and reset if needed
-        self.check_and_reset_api_usage()
-        
-        # Check if this request would exceed limit
-        if (self.api_chars_used or 0) + char_count > self.api_char_limit:
-            return False
-        
-        # Track usage
-        self.api_chars_used = (self.api_chars_used or 0) + char_count
-        return True
+        # Reset (if due), check and track in one statement
+        return usage_ledger.reserve(API_METER, self, char_count, self.api_char_limit) is not None
     
     # --- Web/Mobile Character Usage (10K free, unlimited paid) ---
     
@@ -415,18 +547,12 @@ class User(db.Model, UserMixin):
         if self.is_subscribed:
             return (True, None)
         
-        # Free users - check and reset monthly usage
-        self.check_and_reset_usage()
-        
-        # Check if this request would exceed limit
-        current_used = self.chars_used or 0
-        if current_used + char_count > self.FREE_CHAR_LIMIT:
-            remaining = max(0, self.FREE_CHAR_LIMIT - current_used)
-            return (False, f"Character limit reached. You have {remaining:,} of {self.FREE_CHAR_LIMIT:,} characters remaining this month. Upgrade for unlimited access.")
+        # Free users - monthly reset, limit check and tracking in one statement
+        if usage_ledger.reserve(CHARS_METER, self, char_count, self.FREE_CHAR_LIMIT):
+            return (True, None)
         
-        # Track usage
-        self.chars_used = current_used + char_count
-        return (True, None)
+        remaining = self.chars_remaining
+        return (False, f"Character limit reached. You have {remaining:,} of {self.FREE_CHAR_LIMIT:,} characters remaining this month. Upgrade for unlimited access.")
     
     # --- Premium Chatterbox TTS (Premium tier) ---
     # Premium tiers: 'none' | 'premium' (100K) | 'premium_plus' (200K) | 'premium_pro' (300K)
@@ -482,22 +608,17 @@ class User(db.Model, UserMixin):
     
     def use_indextts_chars(self, char_count: int) -> tuple:
         """
-        Track IndexTTS2 character usage.
-        Returns (success: bool, error_message: str or None)
+        Reserve IndexTTS2 character usage.
+        Returns (reservation or None, error_message: str or None); refund the
+        reservation through usage_ledger if generation fails.
         """
         if not self.has_indextts:
-            return (False, "IndexTTS2 subscription required.")
-        
-        self.check_and_reset_indextts_usage()
-        
-        current_used = self.indextts_chars_used or 0
-        remaining = self.indextts_char_limit - current_used
+            return (None, "IndexTTS2 subscription required.")
         
-        if char_count > remaining:
-            return (False, f"IndexTTS2 character limit reached. {remaining:,} characters remaining.")
-        
-        self.indextts_chars_used = current_used + char_count
-        return (True, None)
+        reservation = usage_ledger.reserve(INDEXTTS_METER, self, char_count, self.indextts_char_limit)
+        if reservation is None:
+            return (None, f"IndexTTS2 character limit reached. {self.indextts_chars_remaining:,} characters remaining.")
+        return (reservation, None)
     
     # --- Studio Voices (Premium HD voices) ---
     # Tiers: 'none' | 'vibevoice' (5 hrs) | 'vibevoice_unlimited' (unlimited with throttle)
@@ -507,13 +628,14 @@ class User(db.Model, UserMixin):
     vibevoice_chars_reset_at = db.Column(db.DateTime)
     vibevoice_stripe_subscription_id = db.Column(db.String(255))
     
-    # Unlimited tier throttle tracking (in seconds of audio generated)
-    vibevoice_hourly_seconds = db.Column(db.Integer, default=0)      # Seconds generated this hour
-    vibevoice_daily_seconds = db.Column(db.Integer, default=0)       # Seconds generated today
-    vibevoice_hourly_reset_at = db.Column(db.DateTime)               # When to reset hourly counter
-    vibevoice_daily_reset_at = db.Column(db.DateTime)                # When to reset daily counter
-    vibevoice_request_count = db.Column(db.Integer, default=0)       # Requests in current minute
-    vibevoice_request_minute = db.Column(db.DateTime)                # Current minute for rate limiting
+    # Unlimited tier throttle tracking (in seconds of audio generated).
+    # Live values are in counter_store; these are a periodically flushed copy.
+    vibevoice_hourly_seconds = db.Column(db.Integer, default=0)      # Seconds generated in the last hour
+    vibevoice_daily_seconds = db.Column(db.Integer, default=0)       # Seconds generated in the last day
+    vibevoice_hourly_reset_at = db.Column(db.DateTime)               # Unused (sliding windows)
+    vibevoice_daily_reset_at = db.Column(db.DateTime)                # Unused (sliding windows)
+    vibevoice_request_count = db.Column(db.Integer, default=0)       # Unused (rate limit is in counter_store)
+    vibevoice_request_minute = db.Column(db.DateTime)                # Unused (rate limit is in counter_store)
     
     # Studio Voices tier limits (in characters, 60K chars ≈ 1 hour)
     VIBEVOICE_LIMITS = {
@@ -586,42 +708,30 @@ class User(db.Model, UserMixin):
     
     def use_vibevoice_chars(self, char_count: int) -> tuple:
         """
-        Track Studio Voices character usage.
-        Returns (success: bool, error_message: str or None, hours_remaining: float)
+        Reserve Studio Voices character usage.
+        Returns (reservation or None, error_message: str or None, hours_remaining: float);
+        refund the reservation through usage_ledger if generation fails.
         """
         if not self.has_vibevoice:
-            return (False, "Studio Voices subscription required.", 0.0)
+            return (None, "Studio Voices subscription required.", 0.0)
         
         # Unlimited tier doesn't track char usage (uses throttle instead)
         if self.is_vibevoice_unlimited:
-            return (True, None, float('inf'))
-        
-        self.check_and_reset_vibevoice_usage()
-        
-        current_used = self.vibevoice_chars_used or 0
-        remaining = self.vibevoice_char_limit - current_used
+            return (Reservation(VIBEVOICE_METER, self.id, 0, self.vibevoice_chars_used or 0), None, float('inf'))
         
-        if char_count > remaining:
-            hours_left = remaining / self.CHARS_PER_HOUR
-            return (False, f"Studio Voices limit reached. {hours_left:.1f} hours remaining.", hours_left)
+        reservation = usage_ledger.reserve(VIBEVOICE_METER, self, char_count, self.vibevoice_char_limit)
+        if reservation is None:
+            hours_left = self.vibevoice_chars_remaining / self.CHARS_PER_HOUR
+            return (None, f"Studio Voices limit reached. {hours_left:.1f} hours remaining.", hours_left)
         
-        self.vibevoice_chars_used = current_used + char_count
-        hours_remaining = (self.vibevoice_char_limit - self.vibevoice_chars_used) / self.CHARS_PER_HOUR
-        return (True, None, round(hours_remaining, 1))
+        hours_remaining = (self.vibevoice_char_limit - reservation.used) / self.CHARS_PER_HOUR
+        return (reservation, None, round(hours_remaining, 1))
     
-    def check_and_reset_throttle_counters(self):
-        """Reset hourly/daily throttle counters if time has passed"""
-        now = datetime.utcnow()
-        
-        # Reset hourly counter
-        if not self.vibevoice_hourly_reset_at or now >= self.vibevoice_hourly_reset_at:
-            self.vibevoice_hourly_seconds = 0
-            self.vibevoice_hourly_reset_at = now + timedelta(hours=1)
-        
-        # Reset daily counter
-        if not self.vibevoice_daily_reset_at or now >= self.vibevoice_daily_reset_at:
-            self.vibevoice_daily_seconds = 0
-            self.vibevoice_daily_reset_at = now + timedelta(days=1)
+    def throttle_seconds(self) -> tuple:
+        """Studio audio seconds generated in the last hour and last day (shared across workers)."""
+        hourly = counter_store.total(f"vibevoice:seconds:1h:{self.id}", 3600)
+        daily = counter_store.total(f"vibevoice:seconds:1d:{self.id}", 86400)
+        return (hourly, daily)
     
     def get_vibevoice_priority(self) -> int:
         """
@@ -638,10 +748,7 @@ class User(db.Model, UserMixin):
         if self.vibevoice_tier != 'vibevoice_unlimited':
             return 1
         
-        self.check_and_reset_throttle_counters()
-        
-        hourly = self.vibevoice_hourly_seconds or 0
-        daily = self.vibevoice_daily_seconds or 0
+        hourly, daily = self.throttle_seconds()
         
         # Priority based on usage thresholds
         if daily >= self.THROTTLE_DAILY_HARD:      # >5h/day → slowest
@@ -655,41 +762,37 @@ class User(db.Model, UserMixin):
     
     def check_rate_limit(self) -> tuple:
         """
-        Check if user is rate limited (50 requests/minute).
+        Check if user is rate limited (50 requests/minute, sliding window).
         Returns (allowed: bool, requests_remaining: int)
         """
-        now = datetime.utcnow()
-        current_minute = now.replace(second=0, microsecond=0)
-        
-        if self.vibevoice_request_minute != current_minute:
-            self.vibevoice_request_minute = current_minute
-            self.vibevoice_request_count = 1
-            return (True, self.RATE_LIMIT_PER_MINUTE - 1)
-        
-        self.vibevoice_request_count = (self.vibevoice_request_count or 0) + 1
-        remaining = self.RATE_LIMIT_PER_MINUTE - self.vibevoice_request_count
-        return (remaining >= 0, max(0, remaining))
+        result = counter_store.hit(f"vibevoice:rpm:{self.id}", self.RATE_LIMIT_PER_MINUTE, 60)
+        return (result.allowed, int(result.remaining))
     
     def track_vibevoice_generation(self, audio_seconds: int):
         """
         Track audio generation time for throttle calculations.
         Called after successful generation for unlimited tier users.
+        The shared counters are authoritative; the user row is updated in
+        the background for reporting.
         """
         if self.vibevoice_tier == 'vibevoice_unlimited':
-            self.check_and_reset_throttle_counters()
-            self.vibevoice_hourly_seconds = (self.vibevoice_hourly_seconds or 0) + audio_seconds
-            self.vibevoice_daily_seconds = (self.vibevoice_daily_seconds or 0) + audio_seconds
+            hourly = counter_store.add(f"vibevoice:seconds:1h:{self.id}", audio_seconds, 3600)
+            daily = counter_store.add(f"vibevoice:seconds:1d:{self.id}", audio_seconds, 86400)
+            usage_flusher.record(self.id, {
+                'vibevoice_hourly_seconds': int(hourly),
+                'vibevoice_daily_seconds': int(daily),
+            })
     
     def get_throttle_status(self) -> dict:
         """Get current throttle status for UI display"""
         if self.vibevoice_tier != 'vibevoice_unlimited':
             return {'throttled': False, 'priority': 1, 'message': None}
         
-        self.check_and_reset_throttle_counters()
         priority = self.get_vibevoice_priority()
+        hourly, daily = self.throttle_seconds()
         
-        hourly_mins = (self.vibevoice_hourly_seconds or 0) / 60
-        daily_hours = (self.vibevoice_daily_seconds or 0) / 3600
+        hourly_mins = hourly / 60
+        daily_hours = daily / 3600
         
         if priority >= 10:
             msg = f"High usage detected ({daily_hours:.1f}h today). Requests queued for fairness."
@@ -748,46 +851,46 @@ class User(db.Model, UserMixin):
     
     def use_premium_chars(self, char_count: int, allow_overage: bool = True) -> tuple:
         """
-        Track premium Chatterbox character usage.
-        Returns (success: bool, is_overage: bool, overage_cost_cents: int, error_message: str or None)
+        Reserve premium Chatterbox character usage.
+        Returns (reservation or None, is_overage: bool, overage_cost_cents: int, error_message: str or None);
+        refund the reservation through usage_ledger if generation fails.
         
         Overage rate: $0.40 per 1K chars = 0.04 cents per char
         """
         if not self.has_premium:
-            return (False, False, 0, "Premium subscription required for Ultra Voices.")
-        
-        self.check_and_reset_premium_usage()
+            return (None, False, 0, "Premium subscription required for Ultra Voices.")
         
-        current_used = self.premium_chars_used or 0
-        remaining = self.premium_char_limit - current_used
-        
-        if char_count <= remaining:
+        limit = self.premium_char_limit
+        reservation = usage_ledger.reserve(PREMIUM_METER, self, char_count, limit)
+        if reservation is not None:
             # Within limit
-            self.premium_chars_used = current_used + char_count
-            return (True, False, 0, None)
+            return (reservation, False, 0, None)
         
         if not allow_overage:
-            return (False, False, 0, f"Premium character limit reached. {remaining:,} characters remaining. Enable overage or upgrade your plan.")
+            return (None, False, 0, f"Premium character limit reached. {self.premium_chars_remaining:,} characters remaining. Enable overage or upgrade your plan.")
         
-        # Calculate overage
+        # Over the limit: track unconditionally, then price what went over
+        reservation = usage_ledger.reserve(PREMIUM_METER, self, char_count, None)
+        remaining = limit - (reservation.used - char_count)
         chars_over_limit = char_count - remaining if remaining > 0 else char_count
         # $0.40 per 1K chars = 40 cents per 1K = 0.04 cents per char
         overage_cents = int((chars_over_limit / 1000) * 40)
+        usage_ledger.add_overage(reservation, overage_cents, self)
         
-        self.premium_chars_used = current_used + char_count
-        self.premium_overage_cents = (self.premium_overage_cents or 0) + overage_cents
-        
-        return (True, True, overage_cents, None)
+        return (reservation, True, overage_cents, None)
 
 
 class APIKey(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    key = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    # SHA-256 of the key (stored in the original `key` column); the key itself
+    # is only shown once, when it is created
+    key_hash = db.Column('key', db.String(64), unique=True, nullable=False, index=True)
+    key_prefix = db.Column(db.String(16))  # First characters, for display
     name = db.Column(db.String(255), nullable=False)  # User-friendly name
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    last_used_at = db.Column(db.DateTime)
+    last_used_at = db.Column(db.DateTime)  # Written back in batches (api_key_usage)
     
     user = db.relationship('User', backref=db.backref('api_keys', lazy=True))
 
@@ -798,9 +901,29 @@ class APIKey(db.Model):
         # Keep generating until unique to avoid rare collisions
         while True:
             candidate = f"ctts_{secrets.token_urlsafe(32)}"
-            if not APIKey.query.filter_by(key=candidate).first():
+            if not APIKey.query.filter_by(key_hash=hash_api_key(candidate)).first():
                 return candidate
 
+    @classmethod
+    def create(cls, user_id, name):
+        """New key for a user. Returns (APIKey, plaintext key)."""
+        raw_key = cls.generate_key()
+        return cls(
+            user_id=user_id,
+            key_hash=hash_api_key(raw_key),
+            key_prefix=display_prefix(raw_key),
+            name=name
+        ), raw_key
+
+
+class MobileSession(db.Model):
+    """A signed-in mobile device. Only a SHA-256 of the bearer token is stored."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
 
 class PasswordResetToken(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -967,110 +1090,34 @@ def send_subscription_email(to_email: str, plan_type: str) -> None:
     print(f"[SUBSCRIPTION EMAIL] Would send {plan_type} confirmation to {to_email}")
 
 
-# Initialize database tables (creates tables on app startup, works with Gunicorn)
-with app.app_context():
-    db.create_all()
-    
-    # Migrate: Add new API columns if they don't exist (for existing databases)
-    from sqlalchemy import inspect, text
-    inspector = inspect(db.engine)
-    existing_columns = [col['name'] for col in inspector.get_columns('user')]
-    
-    with db.engine.connect() as conn:
-        if 'api_tier' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN api_tier VARCHAR(32) DEFAULT 'none'"))
-            print("[MIGRATION] Added api_tier column to user table")
-        if 'api_credits' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN api_credits INTEGER DEFAULT 0"))
-            print("[MIGRATION] Added api_credits column to user table")
-        if 'api_stripe_subscription_id' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN api_stripe_subscription_id VARCHAR(255)"))
-            print("[MIGRATION] Added api_stripe_subscription_id column to user table")
-        if 'api_chars_used' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN api_chars_used INTEGER DEFAULT 0"))
-            print("[MIGRATION] Added api_chars_used column to user table")
-        if 'api_usage_reset_at' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN api_usage_reset_at TIMESTAMP"))
-            print("[MIGRATION] Added api_usage_reset_at column to user table")
-        # Mobile app session columns
-        if 'mobile_session_token' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN mobile_session_token VARCHAR(255)"))
-            print("[MIGRATION] Added mobile_session_token column to user table")
-        if 'mobile_session_expires' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN mobile_session_expires TIMESTAMP"))
-            print("[MIGRATION] Added mobile_session_expires column to user table")
-        # Character usage tracking columns (10K free, unlimited paid)
-        if 'chars_used' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN chars_used INTEGER DEFAULT 0"))
-            print("[MIGRATION] Added chars_used column to user table")
-        if 'chars_reset_at' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN chars_reset_at TIMESTAMP"))
-            print("[MIGRATION] Added chars_reset_at column to user table")
-        # Premium Chatterbox TTS tier columns
-        if 'premium_tier' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN premium_tier VARCHAR(32) DEFAULT 'none'"))
-            print("[MIGRATION] Added premium_tier column to user table")
-        if 'premium_chars_used' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN premium_chars_used INTEGER DEFAULT 0"))
-            print("[MIGRATION] Added premium_chars_used column to user table")
-        if 'premium_chars_reset_at' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN premium_chars_reset_at TIMESTAMP"))
-            print("[MIGRATION] Added premium_chars_reset_at column to user table")
-        if 'premium_stripe_subscription_id' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN premium_stripe_subscription_id VARCHAR(255)"))
-            print("[MIGRATION] Added premium_stripe_subscription_id column to user table")
-        if 'premium_overage_cents' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN premium_overage_cents INTEGER DEFAULT 0"))
-            print("[MIGRATION] Added premium_overage_cents column to user table")
-        # IndexTTS2 tier columns
-        if 'indextts_tier' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN indextts_tier VARCHAR(32) DEFAULT 'none'"))
-            print("[MIGRATION] Added indextts_tier column to user table")
-        if 'indextts_chars_used' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN indextts_chars_used INTEGER DEFAULT 0"))
-            print("[MIGRATION] Added indextts_chars_used column to user table")
-        if 'indextts_chars_reset_at' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN indextts_chars_reset_at TIMESTAMP"))
-            print("[MIGRATION] Added indextts_chars_reset_at column to user table")
-        if 'indextts_stripe_subscription_id' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN indextts_stripe_subscription_id VARCHAR(255)"))
-            print("[MIGRATION] Added indextts_stripe_subscription_id column to user table")
-        # VibeVoice/Podcast TTS tier columns
-        if 'vibevoice_tier' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN vibevoice_tier VARCHAR(32) DEFAULT 'none'"))
-            print("[MIGRATION] Added vibevoice_tier column to user table")
-        if 'vibevoice_chars_used' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN vibevoice_chars_used INTEGER DEFAULT 0"))
-            print("[MIGRATION] Added vibevoice_chars_used column to user table")
-        if 'vibevoice_chars_reset_at' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN vibevoice_chars_reset_at TIMESTAMP"))
-            print("[MIGRATION] Added vibevoice_chars_reset_at column to user table")
-        if 'vibevoice_stripe_subscription_id' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN vibevoice_stripe_subscription_id VARCHAR(255)"))
-            print("[MIGRATION] Added vibevoice_stripe_subscription_id column to user table")
-        # VibeVoice throttling columns (for unlimited tier)
-        if 'vibevoice_hourly_seconds' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN vibevoice_hourly_seconds INTEGER DEFAULT 0"))
-            print("[MIGRATION] Added vibevoice_hourly_seconds column to user table")
-        if 'vibevoice_daily_seconds' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN vibevoice_daily_seconds INTEGER DEFAULT 0"))
-            print("[MIGRATION] Added vibevoice_daily_seconds column to user table")
-        if 'vibevoice_hourly_reset_at' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN vibevoice_hourly_reset_at TIMESTAMP"))
-            print("[MIGRATION] Added vibevoice_hourly_reset_at column to user table")
-        if 'vibevoice_daily_reset_at' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN vibevoice_daily_reset_at TIMESTAMP"))
-            print("[MIGRATION] Added vibevoice_daily_reset_at column to user table")
-        if 'vibevoice_request_count' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN vibevoice_request_count INTEGER DEFAULT 0"))
-            print("[MIGRATION] Added vibevoice_request_count column to user table")
-        if 'vibevoice_request_minute' not in existing_columns:
-            conn.execute(text("ALTER TABLE \"user\" ADD COLUMN vibevoice_request_minute TIMESTAMP"))
-            print("[MIGRATION] Added vibevoice_request_minute column to user table")
-        conn.commit()
-
-# Cleanup old files on startup (works with Gunicorn)
-cleanup_old_files()
+# Schema migrations (see migrations.py). Normally applied by the release
+# step; with MIGRATE_ON_STARTUP a worker on a stale schema applies them under
+# a lock, and a worker on a current schema only checks the version.
+schema_migrations = MigrationRunner(
+    lambda: db.engine,
+    MIGRATIONS,
+    metadata=db.metadata,
+    lock_path=OUTPUT_DIR / '.locks' / 'migrate.lock',
+)
+
+if MIGRATE_ON_STARTUP:
+    with app.app_context():
+        schema_migrations.ensure_current()
+
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations (run once per release)."""
+    applied = schema_migrations.upgrade()
+    print(f"Schema at version {schema_migrations.current_version()} ({len(applied)} applied)")
+
+
+@app.cli.command('cleanup-audio')
+def cleanup_audio_command():
+    """Remove generated audio older than 7 days (run from the release step or cron)."""
+    cleanup_old_files()
+    if audio_storage.remote:
+        print(f"Deleted {audio_storage.delete_older_than(7 * 24 * 3600)} objects from audio storage")
 
 
 @login_manager.user_loader
@@ -1096,13 +1143,6 @@ async def generate_speech(text, voice, rate=None, volume=None, pitch=None, is_ss
         style: Emotion/style (e.g., "cheerful") for single-voice with emotion
         style_degree: Style intensity (0.01-2.0) for single-voice with emotion
     """
-    import re
-
-    import edge_tts as tts_module  # Rename to avoid shadowing
-    import edge_tts.communicate as tts_comm
-    from edge_tts.data_classes import TTSConfig
-    from edge_tts.exceptions import NoAudioReceived, UnexpectedResponse
-
     # Create filename (cache-aware)
     if cache_key:
         fname = f"speech_{cache_key}.mp3"
@@ -1112,8 +1152,47 @@ async def generate_speech(text, voice, rate=None, volume=None, pitch=None, is_ss
     output_file = OUTPUT_DIR / fname
 
     if cache_key and output_file.exists():
+        CACHE_LOOKUPS.inc(engine='edge', result='hit')
+        return output_file
+
+    if not cache_key:
+        await _render_speech(output_file, text, voice, rate, volume, pitch, is_ssml, is_full_ssml, style, style_degree)
         return output_file
 
+    # Single-flight: concurrent identical requests wait for one render.
+    # generate_speech always runs on its own loop via run_async, so blocking
+    # on the lock here only holds up this request.
+    with synthesis_flight.hold(fname):
+        if output_file.exists():
+            CACHE_LOOKUPS.inc(engine='edge', result='hit')
+            return output_file
+        CACHE_LOOKUPS.inc(engine='edge', result='miss')
+        partial = partial_path(output_file)
+        try:
+            await _render_speech(partial, text, voice, rate, volume, pitch, is_ssml, is_full_ssml, style, style_degree)
+            os.replace(partial, output_file)
+        finally:
+            if partial.exists():
+                partial.unlink()
+    return output_file
+
+
+async def _render_speech(output_file, text, voice, rate, volume, pitch, is_ssml, is_full_ssml, style, style_degree):
+    """Run the Edge TTS request for generate_speech and write the mp3 to output_file."""
+    CHARACTERS.inc(len(text), engine='edge')
+    try:
+        with tracing.span('synthesis', engine='edge', voice=voice), STAGE_SECONDS.time(stage='synthesis', engine='edge'):
+            await _edge_communicate(output_file, text, voice, rate, volume, pitch, is_ssml, is_full_ssml, style, style_degree)
+    except Exception as e:
+        ENGINE_ERRORS.inc(engine='edge', error=type(e).__name__)
+        raise
+
+
+async def _edge_communicate(output_file, text, voice, rate, volume, pitch, is_ssml, is_full_ssml, style, style_degree):
+    import edge_tts as tts_module  # Rename to avoid shadowing
+    import edge_tts.communicate as tts_comm
+    from edge_tts.exceptions import NoAudioReceived, UnexpectedResponse
+
     if is_full_ssml:
         # Full SSML with <speak> wrapper (multi-voice) - need full passthrough
         def mkssml_passthrough(tc, escaped_text, style=None, role=None, style_degree=None):
@@ -1136,14 +1215,12 @@ async def generate_speech(text, voice, rate=None, volume=None, pitch=None, is_ss
                 pitch="+0Hz",
                 receive_timeout=600  # 10 minutes for long-form content
             )
-            print(f"[TTS] Generating speech (full SSML): text_length={len(text)}, voice={voice}")
+            edge_log.debug('tts.start', mode='full_ssml', chars=len(text), voice=voice)
             try:
                 await communicate.save(str(output_file))
-                print(f"[TTS] Success: {output_file.name}, size={output_file.stat().st_size} bytes")
+                edge_log.info('tts.generated', file=output_file.name, size=output_file.stat().st_size)
             except Exception as e:
-                print(f"[TTS ERROR] Failed: {type(e).__name__}: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                edge_log.exception('tts.failed', voice=voice, error=f"{type(e).__name__}: {e}")
                 raise
         finally:
             # Restore originals
@@ -1181,14 +1258,12 @@ async def generate_speech(text, voice, rate=None, volume=None, pitch=None, is_ss
                     pitch=pitch or "+0Hz",
                     receive_timeout=600  # 10 minutes for long-form content
                 )
-            print(f"[TTS] Generating speech (SSML): text_length={len(text)}, voice={voice}, style={style}")
+            edge_log.debug('tts.start', mode='ssml', chars=len(text), voice=voice, style=style)
             try:
                 await communicate.save(str(output_file))
-                print(f"[TTS] Success: {output_file.name}, size={output_file.stat().st_size} bytes")
+                edge_log.info('tts.generated', file=output_file.name, size=output_file.stat().st_size)
             except Exception as e:
-                print(f"[TTS ERROR] Failed: {type(e).__name__}: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                edge_log.exception('tts.failed', voice=voice, error=f"{type(e).__name__}: {e}")
                 raise
         finally:
             tts_comm.escape = original_escape
@@ -1219,14 +1294,14 @@ async def generate_speech(text, voice, rate=None, volume=None, pitch=None, is_ss
                 pitch=pitch or "+0Hz",
                 receive_timeout=600  # 10 minutes for long-form content
             )
-        print(f"[TTS] Generating speech (regular): text_length={len(text)}, voice={voice}, style={style}")
+        edge_log.debug('tts.start', mode='text', chars=len(text), voice=voice, style=style)
         try:
             await communicate.save(str(output_file))
-            print(f"[TTS] Success: {output_file.name}, size={output_file.stat().st_size} bytes")
+            edge_log.info('tts.generated', file=output_file.name, size=output_file.stat().st_size)
         except (NoAudioReceived, UnexpectedResponse) as e:
             # If style triggers a rejection, retry once without style to avoid 500s
             if style is not None or style_degree is not None:
-                print(f"[STYLE FALLBACK] Retrying without style due to: {e}")
+                edge_log.warning('tts.style_fallback', voice=voice, style=style, error=str(e))
                 communicate = tts_module.Communicate(
                     text=text,
                     voice=voice,
@@ -1236,15 +1311,12 @@ async def generate_speech(text, voice, rate=None, volume=None, pitch=None, is_ss
                     receive_timeout=600  # 10 minutes for long-form content
                 )
                 await communicate.save(str(output_file))
-                print(f"[TTS] Fallback success: {output_file.name}, size={output_file.stat().st_size} bytes")
+                edge_log.info('tts.generated', file=output_file.name, size=output_file.stat().st_size,
+                              fallback=True)
             else:
-                print(f"[TTS ERROR] Failed: {type(e).__name__}: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                edge_log.exception('tts.failed', voice=voice, error=f"{type(e).__name__}: {e}")
                 raise
 
-    return output_file
-
 
 async def generate_speech_with_srt(text, voice, rate=None, volume=None, pitch=None, style=None, style_degree=None, cache_key=None):
     """Generate speech from text and also generate SRT subtitles.
@@ -1319,7 +1391,8 @@ async def generate_speech_with_srt(text, voice, rate=None, volume=None, pitch=No
     with open(srt_file, "w", encoding="utf-8") as f:
         f.write(srt_content)
     
-    print(f"[TTS+SRT] Generated: {audio_fname} ({len(audio_data)} bytes), {srt_fname} ({len(srt_content)} chars)")
+    edge_log.info('tts.generated', file=audio_fname, size=len(audio_data), srt=srt_fname,
+                  srt_chars=len(srt_content))
     
     return audio_file, srt_file
 
@@ -1367,111 +1440,136 @@ def sanitize_chunks_with_styles(chunks, default_voice, voice_map):
     return sanitized, style_warnings
 
 
-def merge_audio_files(file_paths, job_label="speech"):
-    """Concatenate mp3 parts in order without re-encoding."""
-    if not file_paths:
-        raise ValueError("No audio parts to merge")
-    paths = [Path(p) for p in file_paths]
-    if len(paths) == 1:
-        return paths[0]
-
-    unique_id = hashlib.md5("|".join(str(p) for p in paths).encode()).hexdigest()[:10]
-    output_file = OUTPUT_DIR / f"{job_label}_{unique_id}.mp3"
-    with open(output_file, "wb") as dest:
-        for path in paths:
-            with open(path, "rb") as src:
-                dest.write(src.read())
-    return output_file
+def plan_chunk_parts(chunks, voice, auto_pauses, auto_emphasis, auto_breaths, global_controls):
+    """SSML and cache key for each chunk, built in one pass (no synthesis).
+
+    Returns (parts, joined SSML); each part is a dict with ssml, voice,
+    cache_key, is_full_ssml, warnings and chunk_map. Empty chunks are dropped.
+    """
+    batch = build_ssml_batch(
+        voice=voice,
+        chunks=chunks,
+        auto_pauses=auto_pauses,
+        auto_emphasis=auto_emphasis,
+        auto_breaths=auto_breaths,
+        global_rate=global_controls.get('rate'),
+        global_pitch=global_controls.get('pitch'),
+        global_volume=global_controls.get('volume'),
+    )
+    for part in batch['parts']:
+        part['cache_key'] = hashlib.md5(f"{part['voice']}:{part['ssml']}".encode()).hexdigest()[:16]
+    return batch['parts'], batch['ssml']
+
+
+def render_chunk_part(part):
+    """Synthesize a planned chunk (cached by its key). Returns the mp3 path."""
+    return run_async(
+        generate_speech(
+            part['ssml'],
+            part['voice'],
+            rate=None,
+            volume=None,
+            pitch=None,
+            is_ssml=True,
+            cache_key=part['cache_key'],
+            is_full_ssml=part['is_full_ssml']
+        )
+    )
 
 
 def synthesize_and_merge_chunks(chunks, voice, auto_pauses, auto_emphasis, auto_breaths, global_controls, job_label="speech"):
-    """Render chunks in batches then merge to avoid per-request limits.
-    
-    Batching strategy:
-    - Group chunks into batches where total chars per batch < MAX_BATCH_CHARS
-    - Generate audio for each batch separately
-    - Merge all batch audio files together
+    """Render chunks through the Edge pipeline and join them into one MP3.
+
+    Each chunk is its own Edge request, cached by its SSML; up to
+    EDGE_CONCURRENCY render at once and the parts are concatenated without
+    re-encoding (see mp3_assembler.py). The same chunks always produce the
+    same file, so identical concurrent jobs merge once.
     """
-    MAX_BATCH_CHARS = 2500  # Conservative limit per batch to stay under API constraints
-    MAX_CHUNKS_PER_BATCH = 5  # Also limit number of chunks per batch
-    
-    # Group chunks into batches
-    batches = []
-    current_batch = []
-    current_batch_chars = 0
-    
-    for chunk in chunks:
-        chunk_content = str(chunk.get('content', '') or '')
-        chunk_len = len(chunk_content)
-        
-        # Check if adding this chunk would exceed limits
-        would_exceed_chars = (current_batch_chars + chunk_len) > MAX_BATCH_CHARS
-        would_exceed_count = len(current_batch) >= MAX_CHUNKS_PER_BATCH
-        
-        if current_batch and (would_exceed_chars or would_exceed_count):
-            # Start new batch
-            batches.append(current_batch)
-            current_batch = [chunk]
-            current_batch_chars = chunk_len
-        else:
-            # Add to current batch
-            current_batch.append(chunk)
-            current_batch_chars += chunk_len
-    
-    # Don't forget the last batch
-    if current_batch:
-        batches.append(current_batch)
-    
-    print(f"[BATCH] Processing {len(chunks)} chunks in {len(batches)} batches")
-    
-    # Process each batch
-    all_part_files = []
-    all_warnings = []
-    all_chunk_map = []
-    all_ssml_preview = []
-    
-    for batch_idx, batch_chunks in enumerate(batches):
-        batch_char_count = sum(len(str(c.get('content', '') or '')) for c in batch_chunks)
-        print(f"[BATCH {batch_idx + 1}/{len(batches)}] Processing {len(batch_chunks)} chunks ({batch_char_count} chars)")
-        
-        # Process each chunk in this batch
-        for chunk in batch_chunks:
-            ssml_result = build_ssml(
-                voice=chunk.get('voice') or voice,
-                chunks=[chunk],
-                auto_pauses=auto_pauses,
-                auto_emphasis=auto_emphasis,
-                auto_breaths=auto_breaths,
-                global_rate=global_controls.get('rate'),
-                global_pitch=global_controls.get('pitch'),
-                global_volume=global_controls.get('volume'),
-            )
-            ssml_text = ssml_result['ssml']
-            all_ssml_preview.append(ssml_text)
-            chunk_voice = ssml_result.get('chunk_map', [{}])[0].get('voice', chunk.get('voice') or voice)
-            cache_key = hashlib.md5(f"{chunk_voice}:{ssml_text}".encode()).hexdigest()[:16]
+    parts, ssml_preview = plan_chunk_parts(chunks, voice, auto_pauses, auto_emphasis, auto_breaths, global_controls)
+    if not parts:
+        raise ValueError("No chunk content provided")
+
+    jobs = [
+        Segment(
+            text=part['ssml'],
+            voice=part['voice'],
+            label=f'chunk {idx+1}',
+            options={'is_ssml': True, 'cache_key': part['cache_key'], 'is_full_ssml': part['is_full_ssml']},
+            stats={'chars': len(part['chunk_map'][0]['content'])},
+        )
+        for idx, part in enumerate(parts)
+    ]
+    merge_key = hashlib.md5("|".join(part['cache_key'] for part in parts).encode()).hexdigest()[:10]
+    output_file = OUTPUT_DIR / f"{job_label}_{merge_key}.mp3"
+    merged_file = edge_pipeline.run(jobs, output_file, cache_key=output_file.name).output_file
+
+    warnings = [w for p in parts for w in p['warnings']]
+    chunk_map = [c for p in parts for c in p['chunk_map']]
+    return merged_file, warnings, chunk_map, ssml_preview
+
+
+def _render_hls(parts, writer, failed):
+    try:
+        # One writer per playlist across workers; if another worker holds it,
+        # its segments land in the same output directory
+        with synthesis_flight.try_hold(writer.name) as owner:
+            if not owner:
+                edge_log.debug('hls.owned_elsewhere', playlist=writer.name)
+                return
+            if playlist_complete(writer.playlist_path):
+                return
+            # Continue a playlist an interrupted render left behind
+            resumed = writer.resume()
+            if resumed:
+                edge_log.info('hls.resumed', playlist=writer.name, segments=resumed)
+            for part in parts:
+                writer.add_part(render_chunk_part(part))
+            writer.finish()
+            edge_log.info('hls.finished', playlist=writer.name, segments=len(writer.segments),
+                          duration=round(writer.duration, 1))
+    except Exception as e:
+        failed.set()
+        edge_log.exception('hls.failed', playlist=writer.name, error=str(e))
+    finally:
+        with _hls_renders_lock:
+            _hls_renders.pop(writer.name, None)
 
-            output_file = run_async(
-                generate_speech(
-                    ssml_text,
-                    chunk_voice,
-                    rate=None,
-                    volume=None,
-                    pitch=None,
-                    is_ssml=True,
-                    cache_key=cache_key,
-                    is_full_ssml=ssml_result.get('is_full_ssml', False)
-                )
-            )
-            all_part_files.append(output_file)
-            all_warnings.extend(ssml_result.get('warnings', []))
-            all_chunk_map.extend(ssml_result.get('chunk_map', []))
-    
-    print(f"[BATCH] Generated {len(all_part_files)} audio parts, merging...")
-    merged_file = merge_audio_files(all_part_files, job_label=job_label)
-    print(f"[BATCH] Merge complete: {merged_file.name}")
-    
-    return merged_file, all_warnings, all_chunk_map, "".join(all_ssml_preview)
+
+def _start_hls_render(parts, writer):
+    """Start rendering this playlist unless a thread already is; returns its failed event."""
+    with _hls_renders_lock:
+        failed = _hls_renders.get(writer.name)
+        if failed is None:
+            failed = _hls_renders[writer.name] = threading.Event()
+            threading.Thread(target=_render_hls, args=(parts, writer, failed), daemon=True,
+                             name=f"hls-{writer.name}").start()
+    return failed
+
+
+def synthesize_chunks_hls(chunks, voice, auto_pauses, auto_emphasis, auto_breaths, global_controls, job_label="speech"):
+    """
+    Like synthesize_and_merge_chunks, but writes HLS segments plus an .m3u8
+    playlist in the background (see hls_writer.py). Returns as soon as the
+    first segment is playable, or at once if the playlist is already complete.
+    """
+    parts, ssml_preview = plan_chunk_parts(chunks, voice, auto_pauses, auto_emphasis, auto_breaths, global_controls)
+    job_id = hashlib.md5("|".join(p['cache_key'] for p in parts).encode()).hexdigest()[:10]
+    on_write = (lambda path: audio_storage.put(path.name, path)) if audio_storage.remote else None
+    writer = HLSWriter(OUTPUT_DIR, f"{job_label}_hls_{job_id}", on_write=on_write)
+
+    if not playlist_complete(writer.playlist_path):
+        failed = _start_hls_render(parts, writer)
+        deadline = time.monotonic() + HLS_START_TIMEOUT
+        while not writer.playlist_path.exists():
+            if failed.is_set() and not writer.playlist_path.exists():
+                raise RuntimeError("HLS rendering failed before the first segment")
+            if time.monotonic() > deadline:
+                raise TimeoutError("Timed out waiting for the first HLS segment")
+            time.sleep(0.1)
+
+    warnings = [w for p in parts for w in p['warnings']]
+    chunk_map = [c for p in parts for c in p['chunk_map']]
+    return writer.playlist_path, warnings, chunk_map, ssml_preview
 
 
 @app.route('/')
@@ -2128,6 +2226,23 @@ def api_preview():
         is_ssml = bool(data.get('is_ssml'))
         chunk = data.get('chunk')  # optional chunk preview payload
         
+        # Hero preset sample: fixed text, so it is normally pre-warmed
+        if data.get('preset') and not text and not chunk:
+            preset = find_hero_preset(data['preset'])
+            if not preset:
+                return jsonify({'success': False, 'error': 'Unknown preset'}), 400
+            try:
+                output_file = render_edge_ssml_preview(preset_preview_ssml(preset), preset['voice'])
+            except Exception as gen_error:
+                return jsonify(
+                    {"success": False, "error": f"Speech generation failed: {str(gen_error)}"}
+                ), 500
+            return jsonify({
+                'success': True,
+                'audioUrl': publish_audio(output_file),
+                'warnings': []
+            })
+        
         # Ensure proper formatting for rate, volume, and pitch
         if not rate.startswith(('+', '-')):
             rate = '+' + rate
@@ -2192,30 +2307,21 @@ def api_preview():
         # Generate speech
         try:
             if ssml_text and is_ssml:
-                cache_key = hashlib.md5(
-                    f"preview:{voice}:{ssml_text}".encode()
-                ).hexdigest()[:16]
-                # Check if full SSML with <speak> wrapper (emotion on landing)
-                is_full = ssml_text.strip().lower().startswith("<speak")
-                output_file = run_async(
-                    generate_speech(
-                        ssml_text, voice, None, None, None,
-                        is_ssml=True, cache_key=cache_key, is_full_ssml=is_full
-                    )
-                )
+                output_file = render_edge_ssml_preview(ssml_text, voice)
             elif is_ssml:
                 # Check if this is full SSML with <speak> wrapper
                 is_full = text.strip().lower().startswith("<speak")
+                cache_key = hashlib.md5(
+                    f"preview:{voice}:{rate}:{volume}:{pitch}:ssml:{text}".encode()
+                ).hexdigest()[:16]
                 output_file = run_async(
                     generate_speech(
                         text, voice, rate, volume, pitch,
-                        is_ssml=True, is_full_ssml=is_full
+                        is_ssml=True, cache_key=cache_key, is_full_ssml=is_full
                     )
                 )
             else:
-                output_file = run_async(
-                    generate_speech(text, voice, rate, volume, pitch)
-                )
+                output_file = render_edge_text_preview(text, voice, rate, volume, pitch)
         except Exception as gen_error:
             return jsonify(
                 {"success": False, "error": f"Speech generation failed: {str(gen_error)}"}
@@ -2223,7 +2329,7 @@ def api_preview():
         
         return jsonify({
             'success': True,
-            'audioUrl': f'/api/audio/{output_file.name}',
+            'audioUrl': publish_audio(output_file),
             'warnings': warnings_out
         })
     except Exception as e:
@@ -2251,6 +2357,8 @@ def api_generate():
         auto_breaths = data.get('auto_breaths', False)
         generate_srt = data.get('generate_srt', False)  # NEW: SRT generation flag
         global_controls = data.get('global_controls', {}) or {}
+        # 'hls': segmented .m3u8 output that can play while long jobs render
+        output_format = 'hls' if data.get('output_format') == 'hls' else 'mp3'
 
         # Legacy params for plain text mode
         rate = data.get('rate', '+0%')
@@ -2290,9 +2398,6 @@ def api_generate():
                 'chars_remaining': current_user.chars_remaining,
                 'upgrade_url': '/subscribe'
             }), 402  # Payment Required
-        
-        # Save the usage
-        db.session.commit()
 
         # --- Chunked SSML path ---
         if chunks is not None:
@@ -2309,7 +2414,7 @@ def api_generate():
                     v.get('ShortName'): set(v.get('StyleList') or []) for v in voices
                 }
             except Exception as e:
-                print(f"[STYLE VALIDATION ERROR] failed to load voices: {e}")
+                edge_log.warning('voices.load_failed', error=str(e))
                 voice_map = {}
 
             sanitized_chunks, style_warnings = sanitize_chunks_with_styles(normalized_chunks, voice, voice_map)
@@ -2368,7 +2473,7 @@ def api_generate():
                             output_file = audio_file
                             srt_url = f'/api/srt/{srt_file.name}'
                         except Exception as srt_err:
-                            print(f"[SRT ERROR] Failed to generate SRT, falling back to audio-only: {srt_err}")
+                            edge_log.warning('srt.failed', voice=voice, error=str(srt_err))
                             output_file = run_async(
                                 generate_speech(
                                     plain_text,
@@ -2399,7 +2504,7 @@ def api_generate():
 
                     response_data = {
                         'success': True,
-                        'audioUrl': f'/api/audio/{output_file.name}',
+                        'audioUrl': publish_audio(output_file),
                         'warnings': style_warnings,
                         'chunk_map': [{
                             'content': plain_text,
@@ -2420,7 +2525,8 @@ def api_generate():
                     return jsonify(response_data)
 
             # Multi-chunk or multi-voice path: render and merge parts
-            merged_file, chunk_warnings, chunk_map_out, ssml_preview = synthesize_and_merge_chunks(
+            synthesize = synthesize_chunks_hls if output_format == 'hls' else synthesize_and_merge_chunks
+            merged_file, chunk_warnings, chunk_map_out, ssml_preview = synthesize(
                 sanitized_chunks,
                 voice,
                 auto_pauses,
@@ -2431,7 +2537,8 @@ def api_generate():
             )
             return jsonify({
                 'success': True,
-                'audioUrl': f'/api/audio/{merged_file.name}',
+                'audioUrl': f'/api/audio/{merged_file.name}' if output_format == 'hls' else publish_audio(merged_file),
+                'format': output_format,
                 'ssml_used': ssml_preview,
                 'chunk_map': chunk_map_out,
                 'warnings': (style_warnings + chunk_warnings),
@@ -2465,7 +2572,8 @@ def api_generate():
             if not sanitized_chunks:
                 return jsonify({'success': False, 'error': 'No text provided after chunking'}), 400
 
-            merged_file, chunk_warnings, chunk_map_out, ssml_preview = synthesize_and_merge_chunks(
+            synthesize = synthesize_chunks_hls if output_format == 'hls' else synthesize_and_merge_chunks
+            merged_file, chunk_warnings, chunk_map_out, ssml_preview = synthesize(
                 sanitized_chunks,
                 voice,
                 auto_pauses,
@@ -2476,7 +2584,8 @@ def api_generate():
             )
             return jsonify({
                 'success': True,
-                'audioUrl': f'/api/audio/{merged_file.name}',
+                'audioUrl': f'/api/audio/{merged_file.name}' if output_format == 'hls' else publish_audio(merged_file),
+                'format': output_format,
                 'ssml_used': ssml_preview,
                 'chunk_map': chunk_map_out,
                 'warnings': (style_warnings + chunk_warnings),
@@ -2502,7 +2611,7 @@ def api_generate():
         
         return jsonify({
             'success': True,
-            'audioUrl': f'/api/audio/{output_file.name}',
+            'audioUrl': publish_audio(output_file),
             'chars_used': current_user.chars_used or 0,
             'chars_limit': current_user.char_limit,
             'chars_remaining': current_user.chars_remaining,
@@ -2529,67 +2638,19 @@ def api_generate_pro():
 # -------- Premium Ultra TTS Endpoints --------
 
 # ===== TEXT PREPROCESSING FOR BETTER TTS QUALITY =====
+tts_normalizer = default_normalizer()
+
+
 def preprocess_text_for_tts(text):
     """
     Preprocess text to match HuggingFace Chatterbox quality.
     - Expands contractions
-    - Normalizes numbers
+    - Normalizes numbers (plus any other NORMALIZER_PACKS, e.g. dates, currency)
     - Adds natural pauses via punctuation
-    - Cleans up whitespace
+    - Cleans up whitespace and removes emojis
+    One compiled pass per text; repeated segments come from the cache.
     """
-    import re
-    
-    # Expand common contractions for clearer speech
-    contractions = {
-        "don't": "do not", "doesn't": "does not", "didn't": "did not",
-        "won't": "will not", "wouldn't": "would not", "couldn't": "could not",
-        "shouldn't": "should not", "can't": "cannot", "isn't": "is not",
-        "aren't": "are not", "wasn't": "was not", "weren't": "were not",
-        "haven't": "have not", "hasn't": "has not", "hadn't": "had not",
-        "I'm": "I am", "you're": "you are", "we're": "we are", "they're": "they are",
-        "he's": "he is", "she's": "she is", "it's": "it is", "that's": "that is",
-        "what's": "what is", "who's": "who is", "there's": "there is",
-        "I've": "I have", "you've": "you have", "we've": "we have", "they've": "they have",
-        "I'll": "I will", "you'll": "you will", "we'll": "we will", "they'll": "they will",
-        "he'll": "he will", "she'll": "she will", "it'll": "it will",
-        "I'd": "I would", "you'd": "you would", "we'd": "we would", "they'd": "they would",
-        "he'd": "he would", "she'd": "she would", "it'd": "it would",
-        "let's": "let us", "that'll": "that will", "who'll": "who will",
-    }
-    
-    for contraction, expansion in contractions.items():
-        # Case-insensitive replacement
-        text = re.sub(re.escape(contraction), expansion, text, flags=re.IGNORECASE)
-    
-    # Convert common number patterns to words (basic)
-    number_words = {
-        '0': 'zero', '1': 'one', '2': 'two', '3': 'three', '4': 'four',
-        '5': 'five', '6': 'six', '7': 'seven', '8': 'eight', '9': 'nine',
-        '10': 'ten', '11': 'eleven', '12': 'twelve', '100': 'one hundred',
-        '1000': 'one thousand', '2024': 'twenty twenty four', '2025': 'twenty twenty five',
-    }
-    for num, word in number_words.items():
-        text = re.sub(r'\b' + num + r'\b', word, text)
-    
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
-    
-    # Ensure sentences end with proper punctuation for natural pauses
-    # Add period if text doesn't end with punctuation
-    if text and text[-1] not in '.!?':
-        text += '.'
-    
-    # Add slight pause markers (extra space) after major punctuation
-    # This helps the model understand pause points
-    text = re.sub(r'\.(\s)', '.  \\1', text)  # Period: longer pause
-    text = re.sub(r'\!(\s)', '!  \\1', text)  # Exclamation: longer pause
-    text = re.sub(r'\?(\s)', '?  \\1', text)  # Question: longer pause
-    
-    # Remove emojis (they can confuse TTS)
-    text = re.sub(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', '', text)
-    
-    return text.strip()
+    return tts_normalizer.normalize(text)
 
 
 def split_into_sentences(text, max_chars=180):
@@ -2685,13 +2746,14 @@ def parse_speaker_segments(text):
     return segments
 
 
-def upload_reference_audio_to_chatterbox(file_path, filename=None):
+def upload_reference_audio_to_chatterbox(file_path, filename=None, backend=None):
     """
     Upload a reference audio file to the Chatterbox server for voice cloning.
     
     Parameters:
     - file_path: Local path to the audio file
     - filename: Optional filename to use on server (defaults to original filename)
+    - backend: Chatterbox replica to upload to (defaults to CHATTERBOX_URL)
     
     Returns:
     - The actual filename on the server (may have spaces replaced with underscores)
@@ -2699,34 +2761,48 @@ def upload_reference_audio_to_chatterbox(file_path, filename=None):
     if filename is None:
         filename = os.path.basename(file_path)
     
-    print(f"[ULTRA TTS] Uploading reference audio from {file_path} as {filename}...")
+    premium_log.info('reference.upload', file=filename, size=os.path.getsize(file_path))
     
     with open(file_path, 'rb') as f:
         # Note: Chatterbox server expects 'files' key, not 'file'
         files = {'files': (filename, f, 'audio/wav')}
-        response = requests.post(
-            f'{CHATTERBOX_URL}/upload_reference',
+        response = (backend or chatterbox_backend).post(
+            '/upload_reference',
             files=files,
             timeout=120  # Increased timeout for large files
         )
     
     if response.status_code != 200:
-        error_detail = response.text[:500] if response.text else f'HTTP {response.status_code}'
-        print(f"[ULTRA TTS] Upload failed: {error_detail}")
-        raise Exception(f'Failed to upload reference audio: {error_detail}')
+        detail = response.text[:500] if response.text else f'HTTP {response.status_code}'
+        premium_log.warning('reference.upload_failed', file=filename, status=response.status_code,
+                            detail=truncate(detail))
+        raise Exception(f'Failed to upload reference audio: {detail}')
     
     # Server may rename file (e.g., replace spaces with underscores)
     result = response.json()
     uploaded_files = result.get('uploaded_files', [])
     if uploaded_files:
         actual_filename = uploaded_files[0]
-        print(f"[ULTRA TTS] Successfully uploaded reference audio as: {actual_filename}")
+        premium_log.info('reference.uploaded', file=filename, server_file=actual_filename)
         return actual_filename
     
-    print(f"[ULTRA TTS] Successfully uploaded reference audio: {filename}")
+    premium_log.info('reference.uploaded', file=filename, server_file=filename)
     return filename
 
 
+def fetch_chatterbox_reference_files(backend=None):
+    """
+    Get list of reference audio files available on the Chatterbox server.
+    Raises on failure so an outage is never mistaken for an empty server.
+    """
+    response = (backend or chatterbox_backend).get('/get_reference_files', timeout=30)
+    if response.status_code != 200:
+        raise BackendError('chatterbox', response.status_code, error_detail(response))
+    files = response.json().get('files', [])
+    premium_log.info('reference.manifest', files=len(files))
+    return files
+
+
 def get_chatterbox_reference_files():
     """
     Get list of reference audio files available on the Chatterbox server.
@@ -2735,67 +2811,83 @@ def get_chatterbox_reference_files():
     - List of filenames available for voice cloning
     """
     try:
-        response = requests.get(
-            f'{CHATTERBOX_URL}/get_reference_files',
-            timeout=30
-        )
-        if response.status_code == 200:
-            data = response.json()
-            files = data.get('files', [])
-            print(f"[ULTRA TTS] Reference files on server: {files}")
-            return files
-        else:
-            print(f"[ULTRA TTS] Error getting reference files: HTTP {response.status_code}")
+        return fetch_chatterbox_reference_files()
     except Exception as e:
-        print(f"[ULTRA TTS] Error getting reference files: {e}")
+        premium_log.warning('reference.manifest_failed', error=truncate(str(e)))
     return []
 
 
-def ensure_reference_audio_uploaded(local_path, filename):
+def probe_chatterbox_generation(backend=None):
+    """Fingerprint of the running Chatterbox process (changes on restart), or None."""
+    if not CHATTERBOX_HEALTH_PATH:
+        return None
+    response = (backend or chatterbox_backend).get(CHATTERBOX_HEALTH_PATH, timeout=10)
+    if response.status_code != 200:
+        return None
+    try:
+        return generation_from_health(response.json())
+    except ValueError:
+        return None  # HTML/plain-text health page
+
+
+# Which reference files are on each Chatterbox replica; cached per server
+# generation so cloned-voice chunks don't re-check or re-upload every time
+_chatterbox_references = {}
+_chatterbox_references_lock = threading.Lock()
+
+
+def chatterbox_references(backend=None):
+    """Reference registry for one Chatterbox replica (created on first use)."""
+    backend = backend or chatterbox_backend
+    with _chatterbox_references_lock:
+        registry = _chatterbox_references.get(backend.base_url)
+        if registry is None:
+            registry = ReferenceRegistry(
+                list_files=lambda: fetch_chatterbox_reference_files(backend),
+                upload=lambda path, name: upload_reference_audio_to_chatterbox(path, name, backend),
+                probe_generation=lambda: probe_chatterbox_generation(backend),
+            )
+            _chatterbox_references[backend.base_url] = registry
+        return registry
+
+
+def ensure_reference_audio_uploaded(local_path, filename, backend=None):
     """
     Ensure a reference audio file is uploaded to the Chatterbox server.
-    Checks if it already exists, uploads if not.
+    Uses the cached reference registry; the server is only asked when the
+    file is new, its content changed, or the server restarted.
     
     Parameters:
     - local_path: Local path to the audio file
     - filename: Filename to use on the server
+    - backend: Chatterbox replica that needs the file (defaults to CHATTERBOX_URL)
     
     Returns:
     - True if file is available on server, False otherwise
     """
-    print(f"[ULTRA TTS] Ensuring reference audio is uploaded: {filename}")
-    
     # Check if local file exists
     if not os.path.exists(local_path):
-        print(f"[ULTRA TTS] ERROR: Local file not found: {local_path}")
+        premium_log.warning('reference.missing_local', file=filename, path=local_path)
         return False
     
-    # Check if file already exists on server
-    existing_files = get_chatterbox_reference_files()
-    if filename in existing_files:
-        print(f"[ULTRA TTS] Reference audio already on server: {filename}")
-        return True
-    
-    # Upload if not exists
+    # Uploads only if this content isn't already on the current server
     try:
-        upload_reference_audio_to_chatterbox(local_path, filename)
-        return True
-    except Exception as e:
-        print(f"[ULTRA TTS] Failed to upload reference audio: {e}")
-        return False
+        chatterbox_references(backend).ensure(local_path, filename)
         return True
     except Exception as e:
-        print(f"[ULTRA TTS] Failed to upload reference audio: {e}")
+        premium_log.warning('reference.unavailable', file=filename, error=truncate(str(e)))
         return False
 
 
 def generate_chatterbox_audio(text, voice_mode='predefined', predefined_voice_id='Emily', 
                                reference_audio_filename=None, 
                                exaggeration=0.6, cfg_weight=0.3, temperature=0.4, 
-                               speed_factor=1.0, split_text=True, chunk_size=180):
+                               speed_factor=1.0, split_text=True, chunk_size=180,
+                               output_path=None, backend=None):
     """
     Call the devnen/Chatterbox-TTS-Server /tts endpoint.
     Returns audio bytes (WAV) or raises exception.
+    If output_path is given, the WAV is streamed to that file and its path returned.
     
     Parameters:
     - text: The text to synthesize
@@ -2808,6 +2900,8 @@ def generate_chatterbox_audio(text, voice_mode='predefined', predefined_voice_id
     - speed_factor: Speech speed (0.5-2.0, default 1.0)
     - split_text: Whether to split long text into chunks
     - chunk_size: Characters per chunk when splitting (default 180 for semantic chunks)
+    - output_path: Optional file to stream the result into instead of returning bytes
+    - backend: Chatterbox replica to call (defaults to CHATTERBOX_URL)
     
     NOTE: Defaults tuned to match HuggingFace demo quality.
     Lower temperature (0.35-0.45) = more stable, natural speech
@@ -2831,29 +2925,19 @@ def generate_chatterbox_audio(text, voice_mode='predefined', predefined_voice_id
     # Add voice-specific parameters
     if voice_mode == 'clone' and reference_audio_filename:
         payload['reference_audio_filename'] = reference_audio_filename
-        print(f"[ULTRA TTS] Using cloned voice: {reference_audio_filename}")
     else:
         payload['predefined_voice_id'] = predefined_voice_id
     
-    print(f"[ULTRA TTS] Generating: mode={voice_mode}, temp={temperature}, exag={exaggeration}, cfg={cfg_weight}, text_len={len(processed_text)}")
-    
-    response = requests.post(
-        f'{CHATTERBOX_URL}/tts',
-        json=payload,
-        timeout=600,  # 10 min for long texts
-        stream=True
-    )
-    
-    if response.status_code != 200:
-        error_msg = 'Unknown error'
-        try:
-            error_msg = response.json().get('detail', response.text[:200])
-        except:
-            error_msg = response.text[:200] if response.text else f'HTTP {response.status_code}'
-        raise Exception(f'Ultra TTS error: {error_msg}')
+    segment_log.debug('premium.generate', voice=payload.get('reference_audio_filename', predefined_voice_id),
+                      mode=voice_mode, chars=len(processed_text))
     
-    # Response is streaming audio
-    return response.content
+    backend = backend or chatterbox_backend
+    try:
+        if output_path:
+            return backend.download('POST', '/tts', output_path, json=payload, timeout=600)
+        return backend.fetch('POST', '/tts', json=payload, timeout=600)  # 10 min for long texts
+    except BackendError as e:
+        raise Exception(f'Ultra TTS error: {e.detail}') from e
 
 
 def concatenate_wav_files_with_crossfade(audio_chunks, crossfade_ms=30, silence_ms=200):
@@ -2907,7 +2991,7 @@ def concatenate_wav_files_with_crossfade(audio_chunks, crossfade_ms=30, silence_
                 
                 all_samples.append(samples)
         except Exception as e:
-            print(f"[CROSSFADE] Error reading chunk {i}: {e}")
+            segment_log.warning('crossfade.chunk_unreadable', chunk=i, error=str(e))
             continue
     
     if not all_samples:
@@ -3010,7 +3094,7 @@ def concatenate_wav_files(audio_chunks, silence_ms=300):
                 if i < len(audio_chunks) - 1:
                     all_frames.append(silence_bytes)
         except Exception as e:
-            print(f"[CONCAT] Error reading chunk {i}: {e}")
+            segment_log.warning('concat.chunk_unreadable', chunk=i, error=str(e))
             continue
     
     # Write combined WAV
@@ -3063,6 +3147,13 @@ def api_generate_premium():
                 'error': 'Premium TTS service is not configured. Please contact support.'
             }), 503
         
+        # Fail fast (before charging) while every replica is down or tripped
+        if not chatterbox_engine.available():
+            return jsonify({
+                'success': False,
+                'error': 'Premium TTS service is temporarily unavailable. Please try again in a minute.'
+            }), 503
+        
         data = request.get_json(silent=True) or {}
         
         # Check if using chunks mode (per-segment settings) or text mode
@@ -3113,8 +3204,8 @@ def api_generate_premium():
             }), 402
         
         # Check and track usage
-        success, is_overage, overage_cents, error_msg = current_user.use_premium_chars(char_count, allow_overage)
-        if not success:
+        reservation, is_overage, overage_cents, error_msg = current_user.use_premium_chars(char_count, allow_overage)
+        if not reservation:
             return jsonify({
                 'success': False,
                 'error': error_msg,
@@ -3125,14 +3216,13 @@ def api_generate_premium():
                 'upgrade_url': '/subscribe'
             }), 402
         
-        db.session.commit()
-        
-        audio_chunks = []
-        segment_stats = []
+        # One Segment per chunk/speaker turn; the pipeline renders them across
+        # the Chatterbox replicas concurrently and reassembles them in order
+        jobs = []
         
         if use_chunks_mode:
             # ===== CHUNKS MODE: Per-segment Chatterbox settings =====
-            print(f"[PREMIUM TTS] CHUNKS MODE: {len(chunks)} chunks with per-segment settings")
+            premium_log.info('premium.request', mode='chunks', chunks=len(chunks))
             
             for idx, chunk in enumerate(chunks):
                 chunk_text = chunk.get('text', '').strip()
@@ -3146,82 +3236,49 @@ def api_generate_premium():
                     continue
                 
                 # Detect if using cloned voice (format: "clone:VoiceName")
-                is_cloned_voice = str(chunk_voice).startswith('clone:')
-                reference_filename = None
+                reference = None
                 
-                if is_cloned_voice:
+                if str(chunk_voice).startswith('clone:'):
                     # Extract the voice name and get the reference audio filename
                     clone_name = chunk_voice.replace('clone:', '')
                     reference_filename = CHATTERBOX_CLONED_VOICES.get(clone_name)  # Server filename (with underscores)
                     local_filename = CLONED_VOICE_LOCAL_FILES.get(clone_name, reference_filename)  # Local filename (may have spaces)
                     if reference_filename:
-                        # Ensure reference audio is uploaded to server
-                        local_path = os.path.join(app.static_folder, local_filename)
-                        upload_success = ensure_reference_audio_uploaded(local_path, reference_filename)
-                        if not upload_success:
-                            print(f"[PREMIUM TTS] Warning: Failed to upload cloned voice '{clone_name}', falling back to Emily")
-                            is_cloned_voice = False
-                            chunk_voice = 'Emily.wav'
-                        else:
-                            print(f"[PREMIUM TTS] Chunk {idx+1}/{len(chunks)}: CLONED Voice={clone_name} (ref={reference_filename}), Exag={chunk_exag}, {len(chunk_text)} chars")
+                        # Uploaded to whichever replica renders the chunk
+                        reference = (os.path.join(app.static_folder, local_filename), reference_filename)
+                        segment_log.debug('premium.segment', segment=idx+1, of=len(chunks), voice=clone_name, cloned=True,
+                                          reference=reference_filename, exaggeration=chunk_exag, chars=len(chunk_text))
                     else:
-                        print(f"[PREMIUM TTS] Warning: Unknown cloned voice '{clone_name}', falling back to Emily")
-                        is_cloned_voice = False
+                        premium_log.warning('premium.unknown_clone', voice=clone_name, fallback='Emily')
                         chunk_voice = 'Emily.wav'
                 else:
-                    print(f"[PREMIUM TTS] Chunk {idx+1}/{len(chunks)}: Voice={chunk_voice}, Exag={chunk_exag}, {len(chunk_text)} chars")
+                    segment_log.debug('premium.segment', segment=idx+1, of=len(chunks), voice=chunk_voice,
+                                      exaggeration=chunk_exag, chars=len(chunk_text))
                 
-                try:
-                    if is_cloned_voice and reference_filename:
-                        # Use voice cloning mode
-                        audio_data = generate_chatterbox_audio(
-                            text=chunk_text,
-                            voice_mode='clone',
-                            reference_audio_filename=reference_filename,
-                            exaggeration=chunk_exag,
-                            cfg_weight=chunk_cfg,
-                            temperature=chunk_temp,
-                            speed_factor=chunk_speed,
-                            split_text=True,
-                            chunk_size=200
-                        )
-                    else:
-                        # Use predefined voice mode
-                        audio_data = generate_chatterbox_audio(
-                            text=chunk_text,
-                            voice_mode='predefined',
-                            predefined_voice_id=chunk_voice,
-                            exaggeration=chunk_exag,
-                            cfg_weight=chunk_cfg,
-                            temperature=chunk_temp,
-                            speed_factor=chunk_speed,
-                            split_text=True,
-                            chunk_size=200
-                        )
-                    audio_chunks.append(audio_data)
-                    segment_stats.append({
-                        'voice': chunk_voice,
-                        'chars': len(chunk_text),
-                        'audio_size': len(audio_data)
-                    })
-                except Exception as e:
-                    print(f"[PREMIUM TTS] Chunk {idx+1} failed: {e}")
-                    current_user.premium_chars_used = max(0, (current_user.premium_chars_used or 0) - char_count)
-                    if is_overage:
-                        current_user.premium_overage_cents = max(0, (current_user.premium_overage_cents or 0) - overage_cents)
-                    db.session.commit()
-                    return jsonify({
-                        'success': False,
-                        'error': f'Failed to generate chunk {idx+1}: {str(e)}'
-                    }), 500
+                jobs.append(Segment(
+                    text=chunk_text,
+                    voice=chunk_voice,
+                    label=f'chunk {idx+1}',
+                    options={
+                        'reference': reference,
+                        'fallback_voice': 'Emily.wav',
+                        'exaggeration': chunk_exag,
+                        'cfg_weight': chunk_cfg,
+                        'temperature': chunk_temp,
+                        'speed_factor': chunk_speed,
+                    },
+                    stats={'chars': len(chunk_text)},
+                ))
             
             has_multiple_speakers = len(set(chunk.get('voice', '') for chunk in chunks)) > 1
         else:
             # ===== STANDARD MODE: Parse multi-speaker segments =====
-            segments = parse_speaker_segments(text)
+            with tracing.span('segment', chars=len(text)):
+                segments = parse_speaker_segments(text)
             has_multiple_speakers = len(set(s[0] for s in segments)) > 1
             
-            print(f"[PREMIUM TTS] STANDARD MODE: {len(segments)} segments, multi-speaker={has_multiple_speakers}, voice={voice}")
+            premium_log.info('premium.request', mode='standard', segments=len(segments),
+                             multi_speaker=has_multiple_speakers, voice=voice)
             
             for idx, (speaker_id, segment_text) in enumerate(segments):
                 if has_multiple_speakers:
@@ -3236,110 +3293,77 @@ def api_generate_premium():
                     use_clone_for_segment = is_cloned_voice_main
                 
                 # Handle cloned voice for single-speaker mode
-                reference_filename = None
+                reference = None
                 if use_clone_for_segment:
                     clone_name = voice.replace('clone:', '')
                     reference_filename = CHATTERBOX_CLONED_VOICES.get(clone_name)  # Server filename
                     local_filename = CLONED_VOICE_LOCAL_FILES.get(clone_name, reference_filename)  # Local filename
                     if reference_filename:
-                        local_path = os.path.join(app.static_folder, local_filename)
-                        upload_success = ensure_reference_audio_uploaded(local_path, reference_filename)
-                        if not upload_success:
-                            print(f"[PREMIUM TTS] Warning: Failed to upload cloned voice '{clone_name}', falling back to Emily")
-                            use_clone_for_segment = False
-                            voice_name = 'Emily'
-                        else:
-                            print(f"[PREMIUM TTS] Segment {idx+1}/{len(segments)}: CLONED Voice={clone_name}, {len(segment_text)} chars")
+                        reference = (os.path.join(app.static_folder, local_filename), reference_filename)
+                        segment_log.debug('premium.segment', segment=idx+1, of=len(segments), voice=clone_name, cloned=True,
+                                          chars=len(segment_text))
                     else:
-                        print(f"[PREMIUM TTS] Warning: Unknown cloned voice '{clone_name}', falling back to Emily")
-                        use_clone_for_segment = False
+                        premium_log.warning('premium.unknown_clone', voice=clone_name, fallback='Emily')
                         voice_name = 'Emily'
                 else:
-                    print(f"[PREMIUM TTS] Segment {idx+1}/{len(segments)}: Speaker {speaker_id} ({voice_name}), {len(segment_text)} chars")
+                    segment_log.debug('premium.segment', segment=idx+1, of=len(segments), speaker=speaker_id, voice=voice_name,
+                                      chars=len(segment_text))
                 
-                try:
-                    if use_clone_for_segment and reference_filename:
-                        # Use voice cloning mode
-                        audio_data = generate_chatterbox_audio(
-                            text=segment_text,
-                            voice_mode='clone',
-                            reference_audio_filename=reference_filename,
-                            exaggeration=exaggeration,
-                            cfg_weight=cfg_weight,
-                            temperature=temperature,
-                            speed_factor=speed_factor,
-                            split_text=True,
-                            chunk_size=200
-                        )
-                    else:
-                        # Use predefined voice mode
-                        audio_data = generate_chatterbox_audio(
-                            text=segment_text,
-                            voice_mode='predefined',
-                            predefined_voice_id=voice_name,
-                            exaggeration=exaggeration,
-                            cfg_weight=cfg_weight,
-                            temperature=temperature,
-                            speed_factor=speed_factor,
-                            split_text=True,
-                            chunk_size=200
-                        )
-                    audio_chunks.append(audio_data)
-                    segment_stats.append({
-                        'speaker': speaker_id,
-                        'voice': voice_name if not use_clone_for_segment else f"clone:{clone_name}",
-                        'chars': len(segment_text),
-                        'audio_size': len(audio_data)
-                    })
-                except Exception as e:
-                    print(f"[PREMIUM TTS] Segment {idx+1} failed: {e}")
-                    current_user.premium_chars_used = max(0, (current_user.premium_chars_used or 0) - char_count)
-                    if is_overage:
-                        current_user.premium_overage_cents = max(0, (current_user.premium_overage_cents or 0) - overage_cents)
-                    db.session.commit()
-                    return jsonify({
-                        'success': False,
-                        'error': f'Failed to generate segment {idx+1}: {str(e)}'
-                    }), 500
-        
-        # Concatenate all audio chunks with crossfade for smooth transitions
-        if len(audio_chunks) > 1:
-            print(f"[PREMIUM TTS] Concatenating {len(audio_chunks)} audio chunks with crossfade...")
-            # Use crossfade for same-speaker, silence for speaker changes
-            if has_multiple_speakers:
-                final_audio = concatenate_wav_files_with_crossfade(audio_chunks, crossfade_ms=30, silence_ms=300)
-            else:
-                final_audio = concatenate_wav_files_with_crossfade(audio_chunks, crossfade_ms=40, silence_ms=100)
-        else:
-            final_audio = audio_chunks[0] if audio_chunks else b''
-        
-        if not final_audio:
+                jobs.append(Segment(
+                    text=segment_text,
+                    voice=voice_name,
+                    label=f'segment {idx+1}',
+                    options={
+                        'reference': reference,
+                        'fallback_voice': 'Emily',
+                        'exaggeration': exaggeration,
+                        'cfg_weight': cfg_weight,
+                        'temperature': temperature,
+                        'speed_factor': speed_factor,
+                    },
+                    stats={'speaker': speaker_id, 'chars': len(segment_text)},
+                ))
+        
+        if not jobs:
             return jsonify({
                 'success': False,
                 'error': 'No audio data generated'
             }), 500
         
-        # Save the audio file
         if use_chunks_mode:
             file_hash = hashlib.md5(f"chunks:{len(chunks)}:{time.time()}".encode()).hexdigest()[:12]
         else:
             file_hash = hashlib.md5(f"{text[:50]}:{exaggeration}:{time.time()}".encode()).hexdigest()[:12]
-        output_file = OUTPUT_DIR / f"premium_{file_hash}.wav"
         
-        with open(output_file, 'wb') as f:
-            f.write(final_audio)
+        # Crossfade for same-speaker, silence for speaker changes
+        try:
+            result = premium_pipeline.run(
+                jobs, OUTPUT_DIR / f"premium_{file_hash}.wav",
+                crossfade_ms=30 if has_multiple_speakers else 40,
+                silence_ms=300 if has_multiple_speakers else 100,
+                reservation=reservation, user=current_user
+            )
+        except SegmentFailed as e:
+            # The pipeline has refunded the reservation
+            label = jobs[e.index].label
+            premium_log.warning('premium.segment_failed', segment=label, error=str(e.error))
+            return jsonify({
+                'success': False,
+                'error': f'Failed to generate {label}: {str(e.error)}'
+            }), 500
         
-        print(f"[PREMIUM TTS] Saved {output_file.name}, {len(final_audio)} bytes")
+        output_file = result.output_file
+        segment_stats = result.segment_stats
         
         return jsonify({
             'success': True,
-            'audioUrl': f'/api/audio/{output_file.name}',
+            'audioUrl': publish_audio(output_file),
             'stats': {
                 'total_chars': char_count,
                 'segments': len(chunks) if use_chunks_mode else len(segments),
                 'multi_speaker': has_multiple_speakers,
                 'segment_details': segment_stats,
-                'audio_size': len(final_audio)
+                'audio_size': result.audio_size
             },
             'is_overage': is_overage,
             'overage_cents': overage_cents if is_overage else 0,
@@ -3354,9 +3378,7 @@ def api_generate_premium():
             'error': 'Premium TTS generation timed out. Please try with shorter text.'
         }), 504
     except Exception as e:
-        print(f"[PREMIUM TTS ERROR] {e}")
-        import traceback
-        traceback.print_exc()
+        premium_log.exception('premium.failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -3392,10 +3414,14 @@ def api_preview_chunk():
         if len(text) > 100:
             text = text[:100]
         
-        print(f"[PREVIEW CHUNK] Voice={voice}, Exag={exaggeration}, Text: {text[:30]}...")
+        premium_log.info('preview.request', voice=voice, exaggeration=exaggeration, chars=len(text))
         
         try:
-            audio_data = generate_chatterbox_audio(
+            # Stream the preview straight into its file
+            file_hash = hashlib.md5(f"preview:{text[:20]}:{time.time()}".encode()).hexdigest()[:12]
+            output_file = OUTPUT_DIR / f"preview_{file_hash}.wav"
+            
+            generate_chatterbox_audio(
                 text=text,
                 voice_mode='predefined',
                 predefined_voice_id=voice,
@@ -3404,30 +3430,24 @@ def api_preview_chunk():
                 temperature=temperature,
                 speed_factor=speed_factor,
                 split_text=False,
-                chunk_size=200
+                chunk_size=200,
+                output_path=output_file
             )
             
-            # Save preview file
-            file_hash = hashlib.md5(f"preview:{text[:20]}:{time.time()}".encode()).hexdigest()[:12]
-            output_file = OUTPUT_DIR / f"preview_{file_hash}.wav"
-            
-            with open(output_file, 'wb') as f:
-                f.write(audio_data)
-            
             return jsonify({
                 'success': True,
-                'audioUrl': f'/api/audio/{output_file.name}'
+                'audioUrl': publish_audio(output_file)
             })
             
         except Exception as e:
-            print(f"[PREVIEW CHUNK ERROR] {e}")
+            premium_log.exception('preview.failed', error=f"{type(e).__name__}: {e}")
             return jsonify({
                 'success': False,
                 'error': f'Preview failed: {str(e)}'
             }), 500
             
     except Exception as e:
-        print(f"[PREVIEW CHUNK ERROR] {e}")
+        premium_log.exception('preview.failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -3488,16 +3508,20 @@ def api_premium_voices():
 
 # ==================== IndexTTS2 API Endpoints ====================
 
-def generate_indextts_audio(text, voice, emo_vector=None, use_random=False):
+def generate_indextts_audio(text, voice, emo_vector=None, use_random=False, emo_alpha=None, output_path=None, backend=None):
     """
     Call the IndexTTS2 server /generate endpoint.
     Returns audio bytes (WAV) or raises exception.
+    If output_path is given, the WAV is streamed to that file and its path returned.
     
     Parameters:
     - text: The text to synthesize
     - voice: Voice name (e.g., 'Emily', 'Michael')
     - emo_vector: [happy, angry, sad, afraid, disgusted, melancholic, surprised, calm]
     - use_random: Enable stochastic sampling
+    - emo_alpha: Emotion intensity (server default when omitted)
+    - output_path: Optional file to stream the result into instead of returning bytes
+    - backend: IndexTTS2 replica to call (defaults to INDEXTTS_URL)
     """
     payload = {
         'text': text,
@@ -3507,28 +3531,21 @@ def generate_indextts_audio(text, voice, emo_vector=None, use_random=False):
     
     if emo_vector:
         payload['emo_vector'] = emo_vector
+    if emo_alpha is not None:
+        payload['emo_alpha'] = emo_alpha
     
-    print(f"[IndexTTS2] Generating: voice={voice}, text_len={len(text)}, emo_vector={emo_vector is not None}")
-    
-    response = requests.post(
-        f'{INDEXTTS_URL}/generate',
-        json=payload,
-        timeout=300,  # 5 min timeout
-        stream=True
-    )
-    
-    if response.status_code != 200:
-        error_msg = 'Unknown error'
-        try:
-            error_msg = response.json().get('detail', response.text[:200])
-        except:
-            error_msg = response.text[:200] if response.text else f'HTTP {response.status_code}'
-        raise Exception(f'IndexTTS2 error: {error_msg}')
+    segment_log.debug('indextts.generate', voice=voice, chars=len(text), emo_vector=emo_vector is not None)
     
-    return response.content
+    backend = backend or indextts_backend
+    try:
+        if output_path:
+            return backend.download('POST', '/generate', output_path, json=payload, timeout=300)
+        return backend.fetch('POST', '/generate', json=payload, timeout=300)  # 5 min timeout
+    except BackendError as e:
+        raise Exception(f'IndexTTS2 error: {e.detail}') from e
 
 
-def generate_indextts_batch(segments, silence_ms=200):
+def generate_indextts_batch(segments, silence_ms=200, output_path=None, backend=None):
     """
     Call the IndexTTS2 server /batch-generate endpoint.
     Much faster for multi-segment generation.
@@ -3536,8 +3553,10 @@ def generate_indextts_batch(segments, silence_ms=200):
     Parameters:
     - segments: List of {text, voice, emo_vector}
     - silence_ms: Silence between segments
+    - output_path: Optional file to stream the result into instead of returning bytes
+    - backend: IndexTTS2 replica to call (defaults to INDEXTTS_URL)
     
-    Returns audio bytes (WAV) or raises exception.
+    Returns audio bytes (WAV), or output_path if given, or raises exception.
     """
     payload = {
         'segments': segments,
@@ -3545,29 +3564,21 @@ def generate_indextts_batch(segments, silence_ms=200):
         'crossfade_ms': 30
     }
     
-    print(f"[IndexTTS2] Batch generating {len(segments)} segments...")
-    
-    response = requests.post(
-        f'{INDEXTTS_URL}/batch-generate',
-        json=payload,
-        timeout=600,  # 10 min timeout for batch
-        stream=True
-    )
-    
-    if response.status_code != 200:
-        error_msg = 'Unknown error'
-        try:
-            error_msg = response.json().get('detail', response.text[:200])
-        except:
-            error_msg = response.text[:200] if response.text else f'HTTP {response.status_code}'
-        raise Exception(f'IndexTTS2 batch error: {error_msg}')
+    segment_log.debug('indextts.batch', segments=len(segments))
     
-    gen_time = response.headers.get('X-Generation-Time', 'unknown')
-    audio_duration = response.headers.get('X-Audio-Duration', 'unknown')
-    print(f"[IndexTTS2] Batch done: gen_time={gen_time}s, audio_duration={audio_duration}s")
-    
-    return response.content
-
+    try:
+        # 10 min timeout for batch
+        with (backend or indextts_backend).stream('POST', '/batch-generate', json=payload, timeout=600) as response:
+            gen_time = response.headers.get('X-Generation-Time', 'unknown')
+            audio_duration = response.headers.get('X-Audio-Duration', 'unknown')
+            segment_log.info('indextts.batch_done', gen_time=gen_time, audio_duration=audio_duration)
+            
+            if output_path:
+                return save_response(response, output_path)
+            return response.content
+    except BackendError as e:
+        raise Exception(f'IndexTTS2 batch error: {e.detail}') from e
+
 
 @app.route('/api/indextts/voices', methods=['GET'])
 def api_indextts_voices():
@@ -3581,7 +3592,7 @@ def api_indextts_voices():
                 'error': 'IndexTTS2 service is not configured.'
             }), 503
         
-        response = requests.get(f'{INDEXTTS_URL}/voices', timeout=30)
+        response = indextts_backend.get('/voices', timeout=30)
         if response.status_code == 200:
             data = response.json()
             return jsonify({
@@ -3601,7 +3612,7 @@ def api_indextts_voices():
             'error': 'IndexTTS2 service is not responding.'
         }), 504
     except Exception as e:
-        print(f"[IndexTTS2] Error fetching voices: {e}")
+        indextts_log.warning('voices.load_failed', error=str(e))
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -3628,6 +3639,13 @@ def api_indextts_generate():
                 'error': 'IndexTTS2 service is not configured. Please contact support.'
             }), 503
         
+        # Fail fast (before charging) while every replica is down or tripped
+        if not indextts_engine.available():
+            return jsonify({
+                'success': False,
+                'error': 'IndexTTS2 service is temporarily unavailable. Please try again in a minute.'
+            }), 503
+        
         data = request.get_json(silent=True) or {}
         
         text = (data.get('text', '') or '').strip()
@@ -3662,8 +3680,8 @@ def api_indextts_generate():
             }), 402
         
         # Check and track usage
-        success, error_msg = current_user.use_indextts_chars(char_count)
-        if not success:
+        reservation, error_msg = current_user.use_indextts_chars(char_count)
+        if not reservation:
             return jsonify({
                 'success': False,
                 'error': error_msg,
@@ -3674,8 +3692,6 @@ def api_indextts_generate():
                 'upgrade_url': '/subscribe'
             }), 402
         
-        db.session.commit()
-        
         # Build segments list
         segments = []
         
@@ -3722,105 +3738,50 @@ def api_indextts_generate():
         
         has_multiple_speakers = len(set(s['voice'] for s in segments)) > 1
         
-        print(f"[IndexTTS2] Processing {len(segments)} segments, multi-speaker={has_multiple_speakers}")
+        indextts_log.info('indextts.request', segments=len(segments), multi_speaker=has_multiple_speakers)
         
-        # Use batch endpoint for multiple segments (much faster)
-        if len(segments) > 1:
-            try:
-                print(f"[IndexTTS2] Using batch generation for {len(segments)} segments")
-                
-                # Prepare batch request
-                batch_segments = []
-                for seg in segments:
-                    batch_segments.append({
-                        'text': seg['text'],
-                        'voice': seg['voice'],
-                        'emo_vector': seg.get('emo_vector')
-                    })
-                
-                silence_ms = 300 if has_multiple_speakers else 150
-                final_audio = generate_indextts_batch(batch_segments, silence_ms=silence_ms)
-                
-                segment_stats = [{'voice': s['voice'], 'chars': len(s['text'])} for s in segments]
-                
-            except Exception as e:
-                print(f"[IndexTTS2] Batch generation failed: {e}, falling back to sequential")
-                # Fallback to sequential generation
-                final_audio = None
-        else:
-            final_audio = None
-        
-        # Sequential generation (single segment or batch fallback)
-        if final_audio is None:
-            audio_chunks = []
-            segment_stats = []
-            
-            for idx, seg in enumerate(segments):
-                seg_voice = seg['voice']
-                seg_text = seg['text']
-                seg_emo_vector = seg.get('emo_vector')
-                
-                print(f"[IndexTTS2] Segment {idx+1}/{len(segments)}: Voice={seg_voice}, {len(seg_text)} chars")
-                
-                try:
-                    audio_data = generate_indextts_audio(
-                        text=seg_text,
-                        voice=seg_voice,
-                        emo_vector=seg_emo_vector,
-                        use_random=use_random
-                    )
-                    audio_chunks.append(audio_data)
-                    segment_stats.append({
-                        'voice': seg_voice,
-                        'chars': len(seg_text),
-                        'audio_size': len(audio_data)
-                    })
-                except Exception as e:
-                    print(f"[IndexTTS2] Segment {idx+1} failed: {e}")
-                    # Rollback usage
-                    current_user.indextts_chars_used = max(0, (current_user.indextts_chars_used or 0) - char_count)
-                    db.session.commit()
-                    return jsonify({
-                        'success': False,
-                        'error': f'Failed to generate segment {idx+1}: {str(e)}'
-                    }), 500
-            
-            # Concatenate audio chunks
-            if len(audio_chunks) > 1:
-                print(f"[IndexTTS2] Concatenating {len(audio_chunks)} audio chunks...")
-                if has_multiple_speakers:
-                    final_audio = concatenate_wav_files_with_crossfade(audio_chunks, crossfade_ms=30, silence_ms=300)
-                else:
-                    final_audio = concatenate_wav_files_with_crossfade(audio_chunks, crossfade_ms=40, silence_ms=100)
-            else:
-                final_audio = audio_chunks[0] if audio_chunks else b''
-        else:
-            final_audio = audio_chunks[0] if audio_chunks else b''
-        
-        if not final_audio:
+        # Batch endpoint for multiple segments (much faster), falling back to
+        # per-segment generation; crossfade for same-speaker, silence for changes
+        file_hash = hashlib.md5(f"indextts:{voice}:{text[:50]}:{time.time()}".encode()).hexdigest()[:12]
+        jobs = [
+            Segment(
+                text=seg['text'],
+                voice=seg['voice'],
+                label=f'segment {idx+1}',
+                options={'emo_vector': seg.get('emo_vector'), 'use_random': use_random},
+                stats={'chars': len(seg['text'])},
+            )
+            for idx, seg in enumerate(segments)
+        ]
+        try:
+            result = indextts_pipeline.run(
+                jobs, OUTPUT_DIR / f"indextts_{file_hash}.wav",
+                crossfade_ms=30 if has_multiple_speakers else 40,
+                silence_ms=300 if has_multiple_speakers else 100,
+                batch_silence_ms=300 if has_multiple_speakers else 150,
+                reservation=reservation, user=current_user
+            )
+        except SegmentFailed as e:
+            # The pipeline has refunded the reservation
+            indextts_log.warning('indextts.segment_failed', segment=e.index+1, error=str(e.error))
             return jsonify({
                 'success': False,
-                'error': 'No audio data generated'
+                'error': f'Failed to generate segment {e.index+1}: {str(e.error)}'
             }), 500
         
-        # Save the audio file
-        file_hash = hashlib.md5(f"indextts:{voice}:{text[:50]}:{time.time()}".encode()).hexdigest()[:12]
-        output_file = OUTPUT_DIR / f"indextts_{file_hash}.wav"
-        
-        with open(output_file, 'wb') as f:
-            f.write(final_audio)
-        
-        print(f"[IndexTTS2] Saved {output_file.name}, {len(final_audio)} bytes")
+        output_file = result.output_file
+        audio_size = result.audio_size
+        segment_stats = result.segment_stats
         
         return jsonify({
             'success': True,
-            'audioUrl': f'/api/audio/{output_file.name}',
+            'audioUrl': publish_audio(output_file),
             'stats': {
                 'total_chars': char_count,
                 'segments': len(segments),
                 'multi_speaker': has_multiple_speakers,
                 'segment_details': segment_stats,
-                'audio_size': len(final_audio)
+                'audio_size': audio_size
             },
             'indextts_chars_used': current_user.indextts_chars_used or 0,
             'indextts_chars_limit': current_user.indextts_char_limit,
@@ -3833,9 +3794,7 @@ def api_indextts_generate():
             'error': 'IndexTTS2 generation timed out. Please try with shorter text.'
         }), 504
     except Exception as e:
-        print(f"[IndexTTS2 ERROR] {e}")
-        import traceback
-        traceback.print_exc()
+        indextts_log.exception('indextts.failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -3855,47 +3814,35 @@ def api_indextts_preview():
         
         data = request.get_json(silent=True) or {}
         
-        text = (data.get('text', '') or '').strip()
+        # Without text the voice reads the fixed sample, which is pre-warmed
+        text = (data.get('text', '') or '').strip() or INDEXTTS_PREVIEW_TEXT
         voice = data.get('voice', 'Emily')
-        emo_alpha = float(data.get('emo_alpha', 0.6))
-        
-        if not text:
-            return jsonify({'success': False, 'error': 'No text provided'}), 400
+        emo_alpha = float(data.get('emo_alpha', INDEXTTS_PREVIEW_EMO_ALPHA))
         
         # Limit preview to 100 characters
         if len(text) > 100:
             text = text[:100]
         
-        print(f"[IndexTTS2 Preview] Voice={voice}, Text: {text[:30]}...")
+        indextts_log.info('preview.request', voice=voice, chars=len(text))
         
         try:
-            audio_data = generate_indextts_audio(
-                text=text,
-                voice=voice,
-                emo_alpha=emo_alpha
-            )
-            
-            # Save preview file
-            file_hash = hashlib.md5(f"indextts_preview:{text[:20]}:{time.time()}".encode()).hexdigest()[:12]
-            output_file = OUTPUT_DIR / f"indextts_preview_{file_hash}.wav"
-            
-            with open(output_file, 'wb') as f:
-                f.write(audio_data)
-            
+            output_file = render_indextts_preview(voice, text, emo_alpha)
+            audio_url = publish_audio(output_file)
             return jsonify({
                 'success': True,
-                'audioUrl': f'/api/audio/{output_file.name}'
+                'audioUrl': audio_url,
+                'audio_url': audio_url
             })
             
         except Exception as e:
-            print(f"[IndexTTS2 Preview ERROR] {e}")
+            indextts_log.exception('preview.failed', error=f"{type(e).__name__}: {e}")
             return jsonify({
                 'success': False,
                 'error': f'Preview failed: {str(e)}'
             }), 500
             
     except Exception as e:
-        print(f"[IndexTTS2 Preview ERROR] {e}")
+        indextts_log.exception('preview.failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -3909,9 +3856,8 @@ def api_indextts_health():
                 'status': 'not_configured'
             })
         
-        response = requests.get(f'{INDEXTTS_URL}/health', timeout=10)
-        if response.status_code == 200:
-            data = response.json()
+        ok, status, data = monitored_health(indextts_pool)
+        if ok:
             return jsonify({
                 'success': True,
                 'status': data.get('status', 'unknown'),
@@ -3921,7 +3867,7 @@ def api_indextts_health():
         else:
             return jsonify({
                 'success': False,
-                'status': 'unhealthy'
+                'status': status
             }), 503
     except Exception as e:
         return jsonify({
@@ -3933,10 +3879,11 @@ def api_indextts_health():
 
 # ==================== VibeVoice API Endpoints ====================
 
-def generate_vibevoice_audio(text, voice, cfg_scale=1.5, inference_steps=5, user_priority=1):
+def generate_vibevoice_audio(text, voice, cfg_scale=1.5, inference_steps=5, user_priority=1, output_path=None, backend=None):
     """
     Call the Podcast TTS server /generate endpoint.
     Returns audio bytes (WAV) or raises exception.
+    If output_path is given, the WAV is streamed to that file and its path returned.
     
     Parameters:
     - text: The text to synthesize
@@ -3944,6 +3891,8 @@ def generate_vibevoice_audio(text, voice, cfg_scale=1.5, inference_steps=5, user
     - cfg_scale: Classifier-free guidance scale (default 1.5)
     - inference_steps: Diffusion steps (default 5 for realtime)
     - user_priority: Priority 1-10 (1=highest, 10=lowest) for queue ordering
+    - output_path: Optional file to stream the result into instead of returning bytes
+    - backend: VibeVoice replica to call (defaults to VIBEVOICE_URL)
     """
     payload = {
         'text': text,
@@ -3953,27 +3902,18 @@ def generate_vibevoice_audio(text, voice, cfg_scale=1.5, inference_steps=5, user
         'user_priority': user_priority  # Pass to server for queue ordering
     }
     
-    print(f"[Studio Model] Generating: voice={voice}, text_len={len(text)}, cfg={cfg_scale}, priority={user_priority}")
-    
-    response = requests.post(
-        f'{VIBEVOICE_URL}/generate',
-        json=payload,
-        timeout=600,  # 10 min timeout for long-form
-        stream=True
-    )
+    segment_log.debug('vibevoice.generate', voice=voice, chars=len(text), cfg=cfg_scale, priority=user_priority)
     
-    if response.status_code != 200:
-        error_msg = 'Unknown error'
-        try:
-            error_msg = response.json().get('detail', response.text[:200])
-        except:
-            error_msg = response.text[:200] if response.text else f'HTTP {response.status_code}'
-        raise Exception(f'VibeVoice error: {error_msg}')
-    
-    return response.content
+    backend = backend or vibevoice_backend
+    try:
+        if output_path:
+            return backend.download('POST', '/generate', output_path, json=payload, timeout=600)
+        return backend.fetch('POST', '/generate', json=payload, timeout=600)  # 10 min timeout for long-form
+    except BackendError as e:
+        raise Exception(f'VibeVoice error: {e.detail}') from e
 
 
-def generate_vibevoice_batch(segments, silence_ms=300, user_priority=1):
+def generate_vibevoice_batch(segments, silence_ms=300, user_priority=1, output_path=None, backend=None):
     """
     Call the Podcast TTS server /batch-generate endpoint.
     Much faster for multi-segment generation.
@@ -3982,8 +3922,10 @@ def generate_vibevoice_batch(segments, silence_ms=300, user_priority=1):
     - segments: List of {text, voice}
     - silence_ms: Silence between segments
     - user_priority: Priority 1-10 (1=highest, 10=lowest) for queue ordering
+    - output_path: Optional file to stream the result into instead of returning bytes
+    - backend: VibeVoice replica to call (defaults to VIBEVOICE_URL)
     
-    Returns audio bytes (WAV) or raises exception.
+    Returns audio bytes (WAV), or output_path if given, or raises exception.
     """
     payload = {
         'segments': segments,
@@ -3992,28 +3934,450 @@ def generate_vibevoice_batch(segments, silence_ms=300, user_priority=1):
         'user_priority': user_priority  # Pass to server for queue ordering
     }
     
-    print(f"[Studio Model] Batch generating {len(segments)} segments, priority={user_priority}...")
+    segment_log.debug('vibevoice.batch', segments=len(segments), priority=user_priority)
     
-    response = requests.post(
-        f'{VIBEVOICE_URL}/batch-generate',
-        json=payload,
-        timeout=900,  # 15 min timeout for batch
-        stream=True
+    try:
+        # 15 min timeout for batch
+        with (backend or vibevoice_backend).stream('POST', '/batch-generate', json=payload, timeout=900) as response:
+            gen_time = response.headers.get('X-Generation-Time', 'unknown')
+            audio_duration = response.headers.get('X-Audio-Duration', 'unknown')
+            segment_log.info('vibevoice.batch_done', gen_time=gen_time, audio_duration=audio_duration)
+            
+            if output_path:
+                return save_response(response, output_path)
+            return response.content
+    except BackendError as e:
+        raise Exception(f'VibeVoice batch error: {e.detail}') from e
+
+
+# ==================== TTS Engines ====================
+# Adapters that put every engine behind the common Engine interface
+# (tts_engines.py). Long-form endpoints build Segments and run them through a
+# SynthesisPipeline, which handles replica fan-out, batch-vs-per-segment,
+# streaming, crossfade assembly and atomic saving the same way for all engines.
+
+
+class EdgeEngine(Engine):
+    """Microsoft Edge neural voices, rendered locally via edge_tts."""
+
+    name = 'edge'
+    capabilities = Capabilities(emotion=True, ssml=True, output_format='mp3')
+
+    def synthesize_file(self, segment, backend=None):
+        segment_log.debug('chunk.render', voice=segment.voice, label=segment.label, chars=segment.stats.get('chars'))
+        return run_async(generate_speech(segment.text, segment.voice, **segment.options))
+
+    def synthesize(self, segment, backend=None):
+        return self.synthesize_file(segment, backend).read_bytes()
+
+    def stream(self, segment, output_path, backend=None):
+        opts = segment.options
+        run_async(_render_speech(
+            output_path, segment.text, segment.voice,
+            opts.get('rate'), opts.get('volume'), opts.get('pitch'),
+            opts.get('is_ssml', False), opts.get('is_full_ssml', False),
+            opts.get('style'), opts.get('style_degree')
+        ))
+        return Path(output_path)
+
+
+class ChatterboxEngine(Engine):
+    """Chatterbox (Ultra Voices): predefined voices and reference-audio cloning."""
+
+    name = 'chatterbox'
+    capabilities = Capabilities(cloning=True, emotion=True)
+
+    def _render(self, segment, backend, output_path=None):
+        opts = dict(segment.options)
+        reference = opts.pop('reference', None)
+        fallback_voice = opts.pop('fallback_voice', 'Emily')
+        if reference:
+            # Cloned voices are uploaded to whichever replica renders the segment
+            local_path, reference_filename = reference
+            if ensure_reference_audio_uploaded(local_path, reference_filename, backend=backend):
+                return generate_chatterbox_audio(
+                    text=segment.text, voice_mode='clone', reference_audio_filename=reference_filename,
+                    split_text=True, chunk_size=200, output_path=output_path, backend=backend, **opts
+                )
+            premium_log.warning('premium.clone_upload_failed', voice=segment.voice, fallback=fallback_voice)
+            segment.stats['voice'] = fallback_voice
+            voice_id = fallback_voice
+        else:
+            voice_id = segment.voice
+        return generate_chatterbox_audio(
+            text=segment.text, voice_mode='predefined', predefined_voice_id=voice_id,
+            split_text=True, chunk_size=200, output_path=output_path, backend=backend, **opts
+        )
+
+    def synthesize(self, segment, backend=None):
+        return self._render(segment, backend)
+
+    def stream(self, segment, output_path, backend=None):
+        return self._render(segment, backend, output_path)
+
+
+class IndexTTSEngine(Engine):
+    """IndexTTS2: zero-shot cloning with emotion vectors and a batch endpoint."""
+
+    name = 'indextts'
+    capabilities = Capabilities(batch=True, cloning=True, emotion=True)
+
+    def synthesize(self, segment, backend=None):
+        return generate_indextts_audio(segment.text, segment.voice, backend=backend, **segment.options)
+
+    def stream(self, segment, output_path, backend=None):
+        return generate_indextts_audio(segment.text, segment.voice, output_path=output_path, backend=backend, **segment.options)
+
+    def synthesize_batch(self, segments, silence_ms, output_path, backend=None):
+        batch_segments = [
+            {'text': s.text, 'voice': s.voice, 'emo_vector': s.options.get('emo_vector')}
+            for s in segments
+        ]
+        return generate_indextts_batch(batch_segments, silence_ms=silence_ms, output_path=output_path, backend=backend)
+
+
+class VibeVoiceEngine(Engine):
+    """VibeVoice (Studio Model): long-form multi-speaker voices."""
+
+    name = 'vibevoice'
+    # Batch can time out on long dialogues; larger requests go per-segment
+    capabilities = Capabilities(batch=True, max_batch_segments=5)
+
+    def synthesize(self, segment, backend=None):
+        return generate_vibevoice_audio(segment.text, segment.voice, backend=backend, **segment.options)
+
+    def stream(self, segment, output_path, backend=None):
+        return generate_vibevoice_audio(segment.text, segment.voice, output_path=output_path, backend=backend, **segment.options)
+
+    def synthesize_batch(self, segments, silence_ms, output_path, backend=None):
+        batch_segments = [{'text': s.text, 'voice': s.voice} for s in segments]
+        user_priority = segments[0].options.get('user_priority', 1)
+        return generate_vibevoice_batch(
+            batch_segments, silence_ms=silence_ms, user_priority=user_priority,
+            output_path=output_path, backend=backend
+        )
+
+
+# Edge chunks render on local threads (each its own event loop and request)
+EDGE_CONCURRENCY = int(os.environ.get('EDGE_CONCURRENCY', '4'))
+
+edge_engine = register_engine(EdgeEngine(concurrency=EDGE_CONCURRENCY))
+chatterbox_engine = register_engine(ChatterboxEngine(chatterbox_pool, health_path=CHATTERBOX_HEALTH_PATH))
+indextts_engine = register_engine(IndexTTSEngine(indextts_pool))
+vibevoice_engine = register_engine(VibeVoiceEngine(vibevoice_pool))
+
+edge_pipeline = SynthesisPipeline(edge_engine, flight=synthesis_flight, assemble_files=assemble_mp3)
+premium_pipeline = SynthesisPipeline(chatterbox_engine, concatenate_wav_files_with_crossfade, synthesis_flight,
+                                     ledger=usage_ledger)
+indextts_pipeline = SynthesisPipeline(indextts_engine, concatenate_wav_files_with_crossfade, synthesis_flight,
+                                      ledger=usage_ledger)
+vibevoice_pipeline = SynthesisPipeline(vibevoice_engine, concatenate_wav_files_with_crossfade, synthesis_flight,
+                                       ledger=usage_ledger)
+
+
+def monitored_health(pool):
+    """
+    Latest health of a backend from the background monitor.
+    Returns (ok, status, server health JSON). Only probes directly for
+    replicas the monitor hasn't reached yet.
+    """
+    backend_monitor.ensure_started()
+    for replica in pool.replicas:
+        if not replica.checked_at:
+            pool.probe(replica)
+    usable = pool.usable_replicas()
+    if usable:
+        return True, 'healthy', usable[0].last_health or {}
+    primary = pool.replicas[0]
+    status = 'unreachable' if not primary.healthy else 'circuit_open'
+    return False, status, primary.last_health or {}
+
+
+# Every request is a trace (continuing an incoming `traceparent`); the id is
+# returned in X-Trace-Id for slow-request reports (`flask trace <id>`)
+tracing.set_service('webapp')
+
+HTTP_SECONDS = histogram(
+    'http_request_duration_seconds', 'Time to produce a response, by endpoint.', ('endpoint', 'method', 'status')
+)
+
+
+@app.before_request
+def start_request_trace():
+    g.request_started = time.perf_counter()
+    g.trace = tracing.start_trace(
+        f'{request.method} {request.endpoint or request.path}', request.headers.get(tracing.TRACE_HEADER)
+    ).start()
+
+
+@app.before_request
+def ensure_background_services():
+    """Start this worker's background threads on its first request (each is started once)."""
+    backend_monitor.ensure_started()
+    REGISTRY.ensure_started()
+    tts_logging.ensure_started()
+    if PREWARM_ENABLED:
+        preview_warmer.ensure_started()
+
+
+@app.after_request
+def record_request_duration(response):
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        HTTP_SECONDS.observe(
+            time.perf_counter() - started,
+            endpoint=request.endpoint or 'unmatched', method=request.method, status=response.status_code,
+        )
+    trace = getattr(g, 'trace', None)
+    if trace is not None:
+        trace.attrs['status'] = response.status_code
+        response.headers['X-Trace-Id'] = trace.context.trace_id
+    return response
+
+
+@app.teardown_request
+def finish_trace(error=None):
+    trace = g.pop('trace', None)
+    if trace is not None:
+        trace.finish(error)
+
+
+@app.cli.command('trace')
+@click.argument('trace_id')
+def trace_command(trace_id):
+    """Print the span waterfall of one request from TRACE_FILE (and any extra files in TRACE_FILES)."""
+    paths = [tracing.TRACE_FILE] + [p for p in os.environ.get('TRACE_FILES', '').split(',') if p]
+    spans = tracing.load_trace(trace_id, [p for p in paths if p])
+    print(tracing.waterfall(spans) or f"No spans for trace {trace_id}")
+
+
+def operator_authorized():
+    """
+    True for `Authorization: Bearer <token>` with METRICS_TOKEN or the admin
+    key. Operator endpoints stay closed when neither is configured.
+    """
+    supplied = request.headers.get('Authorization', '')
+    for secret in (os.environ.get('METRICS_TOKEN'), ADMIN_API_KEY):
+        if secret and hmac.compare_digest(supplied.encode(), f'Bearer {secret}'.encode()):
+            return True
+    return False
+
+
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics_endpoint():
+    """Prometheus metrics (stage latencies, cache, errors, bytes, backend health)."""
+    if not operator_authorized():
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+@app.route('/api/backends/health', methods=['GET'])
+def api_backends_health():
+    """
+    Replica health, circuit state and latency from memory (no backend calls).
+    Without operator credentials only healthy/total replica counts per
+    backend are returned (no replica URLs).
+    """
+    if not operator_authorized():
+        return jsonify({
+            'success': True,
+            'backends': {
+                name: {'healthy': sum(1 for row in rows if row['healthy']), 'replicas': len(rows)}
+                for name, rows in backend_monitor.snapshot().items()
+            }
+        })
+    return jsonify({
+        'success': True,
+        'backends': backend_monitor.snapshot(),
+        'metrics': [
+            {'name': name, 'labels': labels, 'value': value}
+            for name, labels, value in backend_monitor.metrics()
+        ]
+    })
+
+
+@app.route('/api/engines', methods=['GET'])
+def api_engines():
+    """List TTS engines and what each supports (no backend calls)."""
+    return jsonify({
+        'success': True,
+        'engines': [
+            {
+                'name': name,
+                'configured': engine.configured,
+                'replicas': len(engine.pool) if engine.pool is not None else 0,
+                'capabilities': engine.capabilities.as_dict()
+            }
+            for name, engine in registered_engines().items()
+        ]
+    })
+
+
+# ============================================
+# Fixed-text previews and pre-warming
+# ============================================
+# Preset and voice-catalog previews use a fixed sample text, so their cache
+# keys are known ahead of time. The endpoints and preview_warmer share the
+# helpers below, which makes a warmed file exactly the file a click serves.
+
+PRESET_PREVIEW_TEXT = os.environ.get(
+    'PRESET_PREVIEW_TEXT', "Hi there! This is a quick sample of how this voice sounds."
+)
+INDEXTTS_PREVIEW_TEXT = os.environ.get(
+    'INDEXTTS_PREVIEW_TEXT', "Hello! This is a short sample of my voice."
+)
+INDEXTTS_PREVIEW_EMO_ALPHA = 0.6
+# Extra Edge voices to warm with the plain sample text at neutral settings
+PREVIEW_PREWARM_EDGE_VOICES = [
+    v.strip() for v in os.environ.get('PREVIEW_PREWARM_EDGE_VOICES', '').split(',') if v.strip()
+]
+
+
+def edge_preview_key(voice, rate, volume, pitch, text):
+    return hashlib.md5(f"preview:{voice}:{rate}:{volume}:{pitch}:{text}".encode()).hexdigest()[:16]
+
+
+def edge_ssml_preview_key(voice, ssml_text):
+    return hashlib.md5(f"preview:{voice}:{ssml_text}".encode()).hexdigest()[:16]
+
+
+def render_edge_text_preview(text, voice, rate='+0%', volume='+0%', pitch='+0Hz'):
+    """Cached plain-text Edge preview (same key as /api/preview)."""
+    cache_key = edge_preview_key(voice, rate, volume, pitch, text)
+    return run_async(generate_speech(text, voice, rate, volume, pitch, cache_key=cache_key))
+
+
+def render_edge_ssml_preview(ssml_text, voice):
+    """Cached SSML Edge preview (same key as /api/preview chunk previews)."""
+    is_full = ssml_text.strip().lower().startswith("<speak")
+    return run_async(
+        generate_speech(
+            ssml_text, voice, None, None, None,
+            is_ssml=True, cache_key=edge_ssml_preview_key(voice, ssml_text), is_full_ssml=is_full
+        )
     )
-    
-    if response.status_code != 200:
-        error_msg = 'Unknown error'
+
+
+def find_hero_preset(preset_id):
+    return next((p for p in HERO_PRESETS if p['id'] == preset_id), None)
+
+
+def preset_preview_ssml(preset):
+    """SSML for a hero preset reading PRESET_PREVIEW_TEXT with its tuned settings."""
+    chunk = {
+        'content': PRESET_PREVIEW_TEXT,
+        'emotion': preset.get('emotion'),
+        'intensity': preset.get('intensity', 2),
+        'rate': preset.get('rate', 0),
+        'pitch': preset.get('pitch', 0),
+        'volume': preset.get('volume', 0),
+    }
+    return build_ssml(voice=preset['voice'], chunks=[chunk])['ssml']
+
+
+def indextts_preview_path(voice, text, emo_alpha):
+    file_hash = hashlib.md5(f"indextts_preview:{INDEXTTS_URL}:{voice}:{emo_alpha}:{text}".encode()).hexdigest()[:12]
+    return OUTPUT_DIR / f"indextts_preview_{file_hash}.wav"
+
+
+def render_indextts_preview(voice, text=INDEXTTS_PREVIEW_TEXT, emo_alpha=INDEXTTS_PREVIEW_EMO_ALPHA):
+    output_file = indextts_preview_path(voice, text, emo_alpha)
+
+    def produce(partial):
+        indextts_engine.call(lambda backend: generate_indextts_audio(
+            text=text, voice=voice, emo_alpha=emo_alpha, output_path=partial, backend=backend
+        ))
+
+    return synthesis_flight.render(output_file.name, output_file, produce, timeout=120)
+
+
+def vibevoice_preview_path(voice):
+    file_hash = hashlib.md5(f"vibevoice_preview:{VIBEVOICE_URL}:{voice}".encode()).hexdigest()[:12]
+    return OUTPUT_DIR / f"vibevoice_preview_{file_hash}.wav"
+
+
+def render_vibevoice_preview(voice):
+    """The server's fixed per-voice preview, cached by voice."""
+    output_file = vibevoice_preview_path(voice)
+
+    def fetch_preview(partial):
         try:
-            error_msg = response.json().get('detail', response.text[:200])
-        except:
-            error_msg = response.text[:200] if response.text else f'HTTP {response.status_code}'
-        raise Exception(f'VibeVoice batch error: {error_msg}')
-    
-    gen_time = response.headers.get('X-Generation-Time', 'unknown')
-    audio_duration = response.headers.get('X-Audio-Duration', 'unknown')
-    print(f"[Studio Model] Batch done: gen_time={gen_time}s, audio_duration={audio_duration}s")
-    
-    return response.content
+            vibevoice_engine.call(lambda backend: backend.download('GET', f'/preview/{voice}', partial, timeout=60))
+        except BackendError as e:
+            raise RuntimeError(f'HTTP {e.status_code}')
+
+    return synthesis_flight.render(output_file.name, output_file, fetch_preview, timeout=90)
+
+
+def _catalog_voice_ids(backend):
+    response = backend.get('/voices', timeout=30)
+    if response.status_code != 200:
+        raise RuntimeError(f'HTTP {response.status_code} from /voices')
+    voices = response.json().get('voices', [])
+    return [v.get('id') or v.get('name') if isinstance(v, dict) else v for v in voices]
+
+
+def edge_preview_jobs():
+    jobs = []
+    for preset in HERO_PRESETS:
+        ssml_text = preset_preview_ssml(preset)
+        jobs.append(WarmJob(
+            name=f"preset {preset['id']}",
+            output_path=OUTPUT_DIR / f"speech_{edge_ssml_preview_key(preset['voice'], ssml_text)}.mp3",
+            render=lambda ssml_text=ssml_text, voice=preset['voice']: render_edge_ssml_preview(ssml_text, voice),
+        ))
+    for voice in PREVIEW_PREWARM_EDGE_VOICES:
+        key = edge_preview_key(voice, '+0%', '+0%', '+0Hz', PRESET_PREVIEW_TEXT)
+        jobs.append(WarmJob(
+            name=f"edge {voice}",
+            output_path=OUTPUT_DIR / f"speech_{key}.mp3",
+            render=lambda voice=voice: render_edge_text_preview(PRESET_PREVIEW_TEXT, voice),
+        ))
+    return jobs
+
+
+def indextts_preview_jobs():
+    if not INDEXTTS_URL or not indextts_engine.available():
+        return []
+    return [
+        WarmJob(
+            name=f"indextts {voice}",
+            output_path=indextts_preview_path(voice, INDEXTTS_PREVIEW_TEXT, INDEXTTS_PREVIEW_EMO_ALPHA),
+            render=lambda voice=voice: render_indextts_preview(voice),
+        )
+        for voice in _catalog_voice_ids(indextts_backend) if voice
+    ]
+
+
+def vibevoice_preview_jobs():
+    if not VIBEVOICE_URL or not vibevoice_engine.available():
+        return []
+    return [
+        WarmJob(
+            name=f"vibevoice {voice}",
+            output_path=vibevoice_preview_path(voice),
+            render=lambda voice=voice: render_vibevoice_preview(voice),
+        )
+        for voice in _catalog_voice_ids(vibevoice_backend) if voice
+    ]
+
+
+preview_warmer = PreviewWarmer(
+    {
+        'edge': edge_preview_jobs,
+        'indextts': indextts_preview_jobs,
+        'vibevoice': vibevoice_preview_jobs,
+    },
+    lock_path=OUTPUT_DIR / '.locks' / 'prewarm.lock',
+)
+
+
+@app.cli.command('prewarm-previews')
+def prewarm_previews_command():
+    """Render every fixed-text preview that isn't cached yet (run at deploy)."""
+    stats = preview_warmer.run_once()
+    print(f"[Prewarm] {stats}")
 
 
 @app.route('/api/vibevoice/voices', methods=['GET'])
@@ -4028,7 +4392,7 @@ def api_vibevoice_voices():
                 'error': 'Podcast TTS service is not configured.'
             }), 503
         
-        response = requests.get(f'{VIBEVOICE_URL}/voices', timeout=30)
+        response = vibevoice_backend.get('/voices', timeout=30)
         if response.status_code == 200:
             data = response.json()
             return jsonify({
@@ -4048,7 +4412,7 @@ def api_vibevoice_voices():
             'error': 'VibeVoice service is not responding.'
         }), 504
     except Exception as e:
-        print(f"[Studio Model] Error fetching voices: {e}")
+        vibevoice_log.warning('voices.load_failed', error=str(e))
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -4125,6 +4489,13 @@ def api_vibevoice_generate():
                 'error': 'Studio Model service is not configured. Please contact support.'
             }), 503
         
+        # Fail fast (before charging) while every replica is down or tripped
+        if not vibevoice_engine.available():
+            return jsonify({
+                'success': False,
+                'error': 'Studio Model service is temporarily unavailable. Please try again in a minute.'
+            }), 503
+        
         data = request.get_json(silent=True) or {}
         
         text = (data.get('text', '') or '').strip()
@@ -4161,11 +4532,11 @@ def api_vibevoice_generate():
         # Check rate limit for unlimited users (50 req/min)
         is_unlimited = current_user.vibevoice_tier == 'vibevoice_unlimited'
         if is_unlimited:
-            rate_ok, rate_msg = current_user.check_rate_limit()
+            rate_ok, _ = current_user.check_rate_limit()
             if not rate_ok:
                 return jsonify({
                     'success': False,
-                    'error': rate_msg,
+                    'error': f'Too many requests. Limit is {User.RATE_LIMIT_PER_MINUTE} per minute, please slow down.',
                     'rate_limited': True
                 }), 429
         
@@ -4173,8 +4544,8 @@ def api_vibevoice_generate():
         user_priority = current_user.get_vibevoice_priority() if is_unlimited else 1
         
         # Check and track usage (now returns hours_remaining)
-        success, error_msg, hours_remaining = current_user.use_vibevoice_chars(char_count)
-        if not success:
+        reservation, error_msg, hours_remaining = current_user.use_vibevoice_chars(char_count)
+        if not reservation:
             return jsonify({
                 'success': False,
                 'error': error_msg,
@@ -4183,8 +4554,6 @@ def api_vibevoice_generate():
                 'upgrade_url': '/subscribe'
             }), 402
         
-        db.session.commit()
-        
         # Build segments list
         segments = []
         
@@ -4201,7 +4570,8 @@ def api_vibevoice_generate():
         else:
             # Parse multi-voice segments [Carter]: [Emma]: format
             speaker_pattern = r'\[(\w+)\]:\s*'
-            parts = re.split(speaker_pattern, text)
+            with tracing.span('segment', chars=len(text)):
+                parts = re.split(speaker_pattern, text)
             
             # First part before any tag
             if parts[0].strip():
@@ -4228,116 +4598,60 @@ def api_vibevoice_generate():
         
         has_multiple_speakers = len(set(s['voice'] for s in segments)) > 1
         
-        print(f"[Studio Model] Processing {len(segments)} segments, multi-speaker={has_multiple_speakers}")
+        vibevoice_log.info('vibevoice.request', segments=len(segments), multi_speaker=has_multiple_speakers)
         
-        # Use sequential generation for reliability (batch can timeout on long dialogues)
-        # Only use batch for small requests (5 segments or less)
-        MAX_BATCH_SEGMENTS = 5
-        
-        if len(segments) > 1 and len(segments) <= MAX_BATCH_SEGMENTS:
-            try:
-                print(f"[Studio Model] Using batch generation for {len(segments)} segments")
-                
-                batch_segments = []
-                for seg in segments:
-                    batch_segments.append({
-                        'text': seg['text'],
-                        'voice': seg['voice']
-                    })
-                
-                silence_ms = 400 if has_multiple_speakers else 200
-                final_audio = generate_vibevoice_batch(batch_segments, silence_ms=silence_ms, user_priority=user_priority)
-                
-                segment_stats = [{'voice': s['voice'], 'chars': len(s['text'])} for s in segments]
-                
-            except Exception as e:
-                print(f"[Studio Model] Batch generation failed: {e}, falling back to sequential")
-                final_audio = None
-        else:
-            if len(segments) > MAX_BATCH_SEGMENTS:
-                print(f"[Studio Model] Too many segments ({len(segments)}) for batch, using sequential")
-            final_audio = None
-        
-        # Sequential generation (single segment or batch fallback)
-        if final_audio is None:
-            audio_chunks = []
-            segment_stats = []
-            
-            for idx, seg in enumerate(segments):
-                seg_voice = seg['voice']
-                seg_text = seg['text']
-                
-                print(f"[Studio Model] Segment {idx+1}/{len(segments)}: Voice={seg_voice}, {len(seg_text)} chars")
-                
-                try:
-                    audio_data = generate_vibevoice_audio(
-                        text=seg_text,
-                        voice=seg_voice,
-                        cfg_scale=cfg_scale,
-                        inference_steps=inference_steps,
-                        user_priority=user_priority
-                    )
-                    audio_chunks.append(audio_data)
-                    segment_stats.append({
-                        'voice': seg_voice,
-                        'chars': len(seg_text),
-                        'audio_size': len(audio_data)
-                    })
-                except Exception as e:
-                    print(f"[Studio Model] Segment {idx+1} failed: {e}")
-                    # Rollback usage
-                    current_user.vibevoice_chars_used = max(0, (current_user.vibevoice_chars_used or 0) - char_count)
-                    db.session.commit()
-                    return jsonify({
-                        'success': False,
-                        'error': f'Failed to generate segment {idx+1}: {str(e)}'
-                    }), 500
-            
-            # Concatenate audio chunks
-            if len(audio_chunks) > 1:
-                print(f"[Studio Model] Concatenating {len(audio_chunks)} audio chunks...")
-                if has_multiple_speakers:
-                    final_audio = concatenate_wav_files_with_crossfade(audio_chunks, crossfade_ms=30, silence_ms=400)
-                else:
-                    final_audio = concatenate_wav_files_with_crossfade(audio_chunks, crossfade_ms=40, silence_ms=150)
-            else:
-                final_audio = audio_chunks[0] if audio_chunks else b''
-        
-        if not final_audio:
+        # Batch for small requests (batch can timeout on long dialogues, see
+        # VibeVoiceEngine), otherwise per-segment with crossfade assembly
+        file_hash = hashlib.md5(f"vibevoice:{voice}:{text[:50]}:{time.time()}".encode()).hexdigest()[:12]
+        jobs = [
+            Segment(
+                text=seg['text'],
+                voice=seg['voice'],
+                label=f'segment {idx+1}',
+                options={'cfg_scale': cfg_scale, 'inference_steps': inference_steps, 'user_priority': user_priority},
+                stats={'chars': len(seg['text'])},
+            )
+            for idx, seg in enumerate(segments)
+        ]
+        try:
+            result = vibevoice_pipeline.run(
+                jobs, OUTPUT_DIR / f"vibevoice_{file_hash}.wav",
+                crossfade_ms=30 if has_multiple_speakers else 40,
+                silence_ms=400 if has_multiple_speakers else 150,
+                batch_silence_ms=400 if has_multiple_speakers else 200,
+                reservation=reservation, user=current_user
+            )
+        except SegmentFailed as e:
+            # The pipeline has refunded the reservation
+            vibevoice_log.warning('vibevoice.segment_failed', segment=e.index+1, error=str(e.error))
             return jsonify({
                 'success': False,
-                'error': 'No audio data generated'
+                'error': f'Failed to generate segment {e.index+1}: {str(e.error)}'
             }), 500
         
-        # Save the audio file
-        file_hash = hashlib.md5(f"vibevoice:{voice}:{text[:50]}:{time.time()}".encode()).hexdigest()[:12]
-        output_file = OUTPUT_DIR / f"vibevoice_{file_hash}.wav"
-        
-        with open(output_file, 'wb') as f:
-            f.write(final_audio)
-        
-        print(f"[Studio Model] Saved {output_file.name}, {len(final_audio)} bytes")
+        output_file = result.output_file
+        audio_size = result.audio_size
+        segment_stats = result.segment_stats
         
         # Track audio generation for unlimited tier throttling
-        if is_unlimited and final_audio:
+        if is_unlimited and audio_size:
             # Estimate audio duration from WAV file size
             # WAV: 16-bit mono 24kHz = 48000 bytes per second
             # Actual VV output is 24kHz stereo = 96000 bytes per second
-            audio_bytes = len(final_audio) - 44  # Subtract WAV header
+            audio_bytes = audio_size - 44  # Subtract WAV header
             audio_seconds = max(1, audio_bytes / 96000)  # At least 1 second
             current_user.track_vibevoice_generation(audio_seconds)
-            db.session.commit()
-            print(f"[Studio Model] Tracked {audio_seconds:.1f}s for unlimited user")
+            vibevoice_log.info('vibevoice.unlimited_tracked', audio_seconds=round(audio_seconds, 1))
         
         return jsonify({
             'success': True,
-            'audioUrl': f'/api/audio/{output_file.name}',
+            'audioUrl': publish_audio(output_file),
             'stats': {
                 'total_chars': char_count,
                 'segments': len(segments),
                 'multi_speaker': has_multiple_speakers,
                 'segment_details': segment_stats,
-                'audio_size': len(final_audio)
+                'audio_size': audio_size
             },
             'hours_remaining': current_user.vibevoice_hours_remaining
         })
@@ -4348,9 +4662,7 @@ def api_vibevoice_generate():
             'error': 'VibeVoice generation timed out. Please try with shorter text.'
         }), 504
     except Exception as e:
-        print(f"[VibeVoice ERROR] {e}")
-        import traceback
-        traceback.print_exc()
+        vibevoice_log.exception('vibevoice.failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -4369,40 +4681,23 @@ def api_vibevoice_preview():
         data = request.get_json(silent=True) or {}
         voice = data.get('voice', 'Wayne')
         
-        # Use the server's preview endpoint
+        # Preview text is fixed per voice, so it is cached by voice (and
+        # normally pre-warmed); concurrent requests share one upstream call
         try:
-            response = requests.get(
-                f'{VIBEVOICE_URL}/preview/{voice}',
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                # Save preview file
-                file_hash = hashlib.md5(f"vibevoice_preview:{voice}:{time.time()}".encode()).hexdigest()[:12]
-                output_file = OUTPUT_DIR / f"vibevoice_preview_{file_hash}.wav"
-                
-                with open(output_file, 'wb') as f:
-                    f.write(response.content)
-                
-                return jsonify({
-                    'success': True,
-                    'audioUrl': f'/api/audio/{output_file.name}'
-                })
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': f'Preview failed: HTTP {response.status_code}'
-                }), 500
-                
+            output_file = render_vibevoice_preview(voice)
+            return jsonify({
+                'success': True,
+                'audioUrl': publish_audio(output_file)
+            })
         except Exception as e:
-            print(f"[VibeVoice Preview ERROR] {e}")
+            vibevoice_log.exception('preview.failed', error=f"{type(e).__name__}: {e}")
             return jsonify({
                 'success': False,
                 'error': f'Preview failed: {str(e)}'
             }), 500
             
     except Exception as e:
-        print(f"[VibeVoice Preview ERROR] {e}")
+        vibevoice_log.exception('preview.failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -4416,9 +4711,8 @@ def api_vibevoice_health():
                 'status': 'not_configured'
             })
         
-        response = requests.get(f'{VIBEVOICE_URL}/health', timeout=10)
-        if response.status_code == 200:
-            data = response.json()
+        ok, status, data = monitored_health(vibevoice_pool)
+        if ok:
             return jsonify({
                 'success': True,
                 'status': data.get('status', 'unknown'),
@@ -4428,7 +4722,7 @@ def api_vibevoice_health():
         else:
             return jsonify({
                 'success': False,
-                'status': 'unhealthy'
+                'status': status
             }), 503
     except Exception as e:
         return jsonify({
@@ -4440,28 +4734,21 @@ def api_vibevoice_health():
 
 @app.route('/api/audio/<filename>')
 def api_audio(filename):
-    """Serve audio file (public for previews)"""
+    """Serve audio file (public for previews); see audio_serving.py"""
     try:
-        file_path = OUTPUT_DIR / filename
-        if file_path.exists():
-            # Determine correct mimetype based on extension
-            if filename.endswith('.wav'):
-
-                mimetype = 'audio/wav'
-            elif filename.endswith('.mp3'):
-                mimetype = 'audio/mpeg'
-            elif filename.endswith('.ogg'):
-                mimetype = 'audio/ogg'
-            else:
-                mimetype = 'audio/mpeg'
-            
-            # Add cache headers for faster playback
-            response = send_file(file_path, mimetype=mimetype)
-            response.headers['Accept-Ranges'] = 'bytes'
-            response.headers['Cache-Control'] = 'public, max-age=3600'
-            return response
-        else:
+        response = serve_audio(OUTPUT_DIR / filename, request.environ)
+        if response is None and audio_storage.remote and filename.endswith('.m3u8') and audio_storage.exists(filename):
+            # Playlists list segments by relative name, which would resolve
+            # (unsigned) against a presigned URL; served from here they come
+            # back through this route and redirect one by one
+            return Response(audio_storage.get(filename), mimetype=audio_mimetype(filename),
+                            headers={'Cache-Control': cache_control(filename)})
+        if response is None and audio_storage.remote and audio_storage.exists(filename):
+            # Rendered on another node
+            return redirect(audio_storage.presign(filename))
+        if response is None:
             return jsonify({'success': False, 'error': 'File not found'}), 404
+        return response
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -4511,16 +4798,13 @@ def public_widget():
 @csrf.exempt
 def widget_generate():
     """Public endpoint for widget - no authentication required"""
-    import traceback
-    
     try:
-        print(f"[WIDGET] Received request from {request.remote_addr}")
-        print(f"[WIDGET] Content-Type: {request.content_type}")
-        
         data = request.get_json(silent=True) or {}
-        print(f"[WIDGET] Parsed JSON data: {data}")
+        widget_log.debug('widget.payload', payload=data)  # truncated to LOG_MAX_FIELD_CHARS
         voice = data.get('voice', 'en-US-AriaNeural')
         chunks = data.get('chunks')
+        widget_log.info('widget.request', remote=request.remote_addr, content_type=request.content_type,
+                        voice=voice, chunks=len(chunks) if isinstance(chunks, list) else None)
         auto_pauses = data.get('auto_pauses', True)
         auto_emphasis = data.get('auto_emphasis', False)
         auto_breaths = data.get('auto_breaths', False)
@@ -4539,7 +4823,7 @@ def widget_generate():
                 v.get('ShortName'): set(v.get('StyleList') or []) for v in voices
             }
         except Exception as e:
-            print(f"[STYLE VALIDATION ERROR] failed to load voices: {e}")
+            widget_log.warning('voices.load_failed', error=str(e))
             voice_map = {}
 
         sanitized_chunks, style_warnings = sanitize_chunks_with_styles(normalized_chunks, voice, voice_map)
@@ -4594,7 +4878,7 @@ def widget_generate():
 
                 return jsonify({
                     'success': True,
-                    'audioUrl': f'/api/audio/{output_file.name}',
+                    'audioUrl': publish_audio(output_file),
                     'warnings': style_warnings
                 })
 
@@ -4610,15 +4894,12 @@ def widget_generate():
 
         return jsonify({
             'success': True,
-            'audioUrl': f'/api/audio/{merged_file.name}',
+            'audioUrl': publish_audio(merged_file),
             'warnings': (style_warnings + chunk_warnings)
         })
         
     except Exception as e:
-        print(f"[WIDGET ERROR] Exception type: {type(e).__name__}")
-        print(f"[WIDGET ERROR] Exception message: {str(e)}")
-        print(f"[WIDGET ERROR] Full traceback:")
-        traceback.print_exc()
+        widget_log.exception('widget.failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -4641,18 +4922,14 @@ def create_api_key():
     if not name:
         return jsonify({'success': False, 'error': 'Key name required'}), 400
     
-    # Generate new key
-    new_key = APIKey(
-        user_id=current_user.id,
-        key=APIKey.generate_key(),
-        name=name
-    )
+    # Generate new key (only its hash is stored; this is the one time it is shown)
+    new_key, raw_key = APIKey.create(current_user.id, name)
     db.session.add(new_key)
     db.session.commit()
     
     return jsonify({
         'success': True,
-        'key': new_key.key,
+        'key': raw_key,
         'name': new_key.name,
         'created_at': new_key.created_at.isoformat()
     })
@@ -4670,6 +4947,7 @@ def delete_api_key(key_id):
     
     db.session.delete(api_key)
     db.session.commit()
+    api_key_cache.invalidate(key_id=key_id)
     
     return jsonify({'success': True})
 
@@ -4686,14 +4964,57 @@ def toggle_api_key(key_id):
     
     api_key.is_active = not api_key.is_active
     db.session.commit()
+    api_key_cache.invalidate(key_id=key_id)
     
     return jsonify({'success': True, 'is_active': api_key.is_active})
 
 
 # -------- API Endpoint (for external use) --------
 
+# Verified keys are cached per worker; last_used_at is written in batches
+api_key_cache = APIKeyCache()
+
+
+def flush_api_key_last_used(batch):
+    with app.app_context():
+        for key_id, values in batch.items():
+            APIKey.query.filter_by(id=key_id).update(values, synchronize_session=False)
+        db.session.commit()
+
+
+api_key_usage = UsageFlusher(flush_api_key_last_used)
+
+
+def lookup_api_key(key_hash):
+    """VerifiedKey for an active key: from the cache, else one indexed join."""
+    verified = api_key_cache.get(key_hash)
+    if verified is not None:
+        return verified
+    row = (
+        db.session.query(APIKey.id, APIKey.user_id, User.api_tier)
+        .join(User, User.id == APIKey.user_id)
+        .filter(APIKey.key_hash == key_hash, APIKey.is_active.is_(True))
+        .first()
+    )
+    if row is None:
+        return None
+    verified = VerifiedKey(
+        key_id=row.id,
+        user_id=row.user_id,
+        api_tier=row.api_tier or 'none',
+        has_api_access=row.api_tier in User.API_LIMITS,
+        char_limit=User.API_LIMITS.get(row.api_tier, 0),
+    )
+    api_key_cache.put(key_hash, verified)
+    return verified
+
+
 def verify_api_key(api_key_string, char_count=0):
-    """Verify API key and return user if valid. Optionally check usage limits."""
+    """
+    Verify API key. If char_count is given (and billing is on), the
+    characters are reserved atomically; the caller commits the returned
+    reservation on success or refunds it.
+    """
     api_key_string = (api_key_string or '').strip()
     if not api_key_string:
         return {'valid': False, 'error': 'API key required'}
@@ -4703,25 +5024,23 @@ def verify_api_key(api_key_string, char_count=0):
         return {'is_admin': True, 'valid': True}
     
     # Check regular user API keys
-    api_key = APIKey.query.filter_by(key=api_key_string, is_active=True).first()
-    if not api_key:
+    verified = lookup_api_key(hash_api_key(api_key_string))
+    if verified is None:
         return {'valid': False, 'error': 'Invalid API key'}
     
-    # Update last used timestamp
-    api_key.last_used_at = datetime.utcnow()
+    # Update last used timestamp (batched)
+    api_key_usage.record(verified.key_id, {'last_used_at': datetime.utcnow()})
     
     # Check if user has API access (separate from web subscription)
-    if billing_enabled() and not api_key.user.has_api_access:
-        db.session.commit()
+    if billing_enabled() and not verified.has_api_access:
         return {'valid': False, 'error': 'API access required. Please subscribe to an API plan at cheaptts.com/api-pricing'}
     
-    # Check usage limits if char_count provided
+    # Reserve usage if char_count provided
+    reservation = None
     if char_count > 0 and billing_enabled():
-        user = api_key.user
-        user.check_and_reset_api_usage()  # Reset if new billing period
-        
-        if user.api_chars_remaining < char_count:
-            db.session.commit()
+        reservation = usage_ledger.reserve(API_METER, verified.user_id, char_count, verified.char_limit)
+        if reservation is None:
+            user = db.session.get(User, verified.user_id)
             return {
                 'valid': False, 
                 'error': f'API usage limit exceeded. You have {user.api_chars_remaining:,} characters remaining this month. Upgrade your plan at cheaptts.com/api-pricing',
@@ -4733,14 +5052,81 @@ def verify_api_key(api_key_string, char_count=0):
                 }
             }
     
-    db.session.commit()
-    return {'valid': True, 'is_admin': False, 'user': api_key.user, 'api_key': api_key}
+    return {
+        'valid': True,
+        'is_admin': False,
+        'user_id': verified.user_id,
+        'api_key_id': verified.key_id,
+        'reservation': reservation
+    }
 
 
 # ============================================
 # MOBILE APP API ENDPOINTS
 # ============================================
 
+# Validated sessions are cached per worker; see mobile_sessions.py
+mobile_session_cache = SessionCache()
+
+
+def create_mobile_session(user):
+    """Start a session for a mobile device. Returns the bearer token."""
+    raw_token = secrets.token_urlsafe(32)
+    db.session.add(MobileSession(
+        user_id=user.id,
+        token_hash=hash_token(raw_token),
+        expires_at=session_expiry(),
+    ))
+    if mobile_session_cache.cleanup_due():
+        cleanup_expired_mobile_sessions(commit=False)
+    return raw_token
+
+
+def mobile_session_user(token):
+    """User for a live session token: cached, else one indexed lookup."""
+    if not token:
+        return None
+    token_hash = hash_token(token)
+    cached = mobile_session_cache.get(token_hash)
+    if cached is None:
+        row = (
+            db.session.query(MobileSession.user_id, MobileSession.expires_at)
+            .filter(MobileSession.token_hash == token_hash,
+                    MobileSession.expires_at > datetime.utcnow())
+            .first()
+        )
+        if row is None:
+            return None
+        cached = CachedSession(user_id=row.user_id, expires_at=row.expires_at)
+        mobile_session_cache.put(token_hash, cached)
+    return db.session.get(User, cached.user_id)
+
+
+def end_mobile_session(token):
+    token_hash = hash_token(token)
+    MobileSession.query.filter_by(token_hash=token_hash).delete(synchronize_session=False)
+    db.session.commit()
+    mobile_session_cache.invalidate(token_hash)
+
+
+def cleanup_expired_mobile_sessions(commit=True):
+    """Delete every expired session in one statement. Returns the row count."""
+    deleted = (
+        MobileSession.query
+        .filter(MobileSession.expires_at <= datetime.utcnow())
+        .delete(synchronize_session=False)
+    )
+    if commit:
+        db.session.commit()
+    return deleted
+
+
+@app.cli.command('cleanup-sessions')
+def cleanup_sessions_command():
+    """Delete expired mobile sessions."""
+    print(f"Deleted {cleanup_expired_mobile_sessions()} expired mobile sessions")
+
+
 @app.route('/api/v1/auth/login', methods=['POST'])
 @csrf.exempt  # API endpoint - no CSRF needed
 @limiter.limit("10 per minute")
@@ -4781,20 +5167,10 @@ def api_auth_login():
         if not user or not check_password_hash(user.password_hash, password):
             return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
         
-        # Generate a simple session token
-        session_token = secrets.token_urlsafe(32)
-        
-        # Try to save session token (may fail if columns don't exist yet)
-        try:
-            user.mobile_session_token = session_token
-            user.mobile_session_expires = datetime.utcnow() + timedelta(days=30)
-            # Also reset usage if needed
-            user.check_and_reset_usage()
-            db.session.commit()
-        except Exception as db_err:
-            print(f"[API Auth] Could not save session token (migration pending): {db_err}")
-            db.session.rollback()
-            # Continue anyway - token won't persist but login will work
+        session_token = create_mobile_session(user)
+        # Also reset usage if needed
+        user.check_and_reset_usage()
+        db.session.commit()
         
         return jsonify({
             'success': True,
@@ -4814,9 +5190,7 @@ def api_auth_login():
         })
         
     except Exception as e:
-        import traceback
-        print(f"[API Auth] Login error: {e}")
-        print(f"[API Auth] Traceback: {traceback.format_exc()}")
+        mobile_log.exception('auth.login_failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': f'Server error: {str(e)}'}), 500
 
 
@@ -4853,9 +5227,7 @@ def api_auth_signup():
         db.session.commit()
         
         # Auto-login
-        session_token = secrets.token_urlsafe(32)
-        user.mobile_session_token = session_token
-        user.mobile_session_expires = datetime.utcnow() + timedelta(days=30)
+        session_token = create_mobile_session(user)
         # Initialize character usage
         user.chars_used = 0
         user.chars_reset_at = datetime.utcnow() + timedelta(days=30)
@@ -4879,7 +5251,7 @@ def api_auth_signup():
         })
         
     except Exception as e:
-        print(f"[API Auth] Signup error: {e}")
+        mobile_log.exception('auth.signup_failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': 'Server error'}), 500
 
 
@@ -4912,7 +5284,7 @@ def api_auth_forgot_password():
                 reset_url = f"https://cheaptts.com/reset-password?token={token}"
                 send_password_reset_email(user.email, reset_url)
             except Exception as e:
-                print(f"[API Auth] Failed to send reset email: {e}")
+                mobile_log.warning('auth.reset_email_failed', error=str(e))
         
         return jsonify({
             'success': True,
@@ -4920,7 +5292,7 @@ def api_auth_forgot_password():
         })
         
     except Exception as e:
-        print(f"[API Auth] Forgot password error: {e}")
+        mobile_log.exception('auth.forgot_password_failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': 'Server error'}), 500
 
 
@@ -4935,9 +5307,9 @@ def api_auth_me():
     if not token:
         return jsonify({'success': False, 'error': 'No token provided'}), 401
     
-    user = User.query.filter_by(mobile_session_token=token).first()
+    user = mobile_session_user(token)
     
-    if not user or (user.mobile_session_expires and user.mobile_session_expires < datetime.utcnow()):
+    if not user:
         return jsonify({'success': False, 'error': 'Invalid or expired token'}), 401
     
     # Reset usage if needed
@@ -4968,11 +5340,7 @@ def api_auth_logout():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     
     if token:
-        user = User.query.filter_by(mobile_session_token=token).first()
-        if user:
-            user.mobile_session_token = None
-            user.mobile_session_expires = None
-            db.session.commit()
+        end_mobile_session(token)
     
     return jsonify({'success': True})
 
@@ -5021,7 +5389,6 @@ def api_mobile_synthesize():
         }
     """
     import re
-    import traceback
 
     # Authenticate with session token
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -5030,13 +5397,12 @@ def api_mobile_synthesize():
         return jsonify({'success': False, 'error': 'No token provided'}), 401
     
     try:
-        user = User.query.filter_by(mobile_session_token=token).first()
+        user = mobile_session_user(token)
     except Exception as e:
-        # Fallback if mobile_session_token column doesn't exist yet
-        print(f"[Mobile API] Token lookup failed (migration pending?): {e}")
+        mobile_log.warning('auth.lookup_failed', error=str(e))
         return jsonify({'success': False, 'error': 'Authentication system not ready. Please try again later.'}), 503
     
-    if not user or (user.mobile_session_expires and user.mobile_session_expires < datetime.utcnow()):
+    if not user:
         return jsonify({'success': False, 'error': 'Invalid or expired token. Please login again.'}), 401
     
     try:
@@ -5072,10 +5438,8 @@ def api_mobile_synthesize():
                     'upgrade_url': 'https://cheaptts.com/subscribe'
                 }), 402  # Payment Required
             
-            # Save character usage
-            db.session.commit()
-            
-            print(f"[Mobile API] Multi-speaker request from {user.email}: {len(chunks)} chunks, {total_chars} chars")
+            mobile_log.info('mobile.request', mode='chunks', user=user.id, email=truncate(user.email, 3),
+                            chunks=len(chunks), chars=total_chars)
             
             # Get global controls
             global_controls = data.get('global_controls', {})
@@ -5111,7 +5475,7 @@ def api_mobile_synthesize():
                                     'error': f"Style '{emotion}' is not supported by voice {chunk_voice}. Supported styles: {sorted(supported_styles) if supported_styles else 'none'}"
                                 }), 400
                         except Exception as e:
-                            print(f"[Mobile API] Style validation error: {e}")
+                            mobile_log.warning('style.validation_failed', error=str(e))
                         
                         # Use native style parameter
                         plain_text = chunk.get('content', '')
@@ -5141,7 +5505,7 @@ def api_mobile_synthesize():
                             )
                         )
                         
-                        audio_url = request.url_root.rstrip('/') + f'/api/audio/{output_file.name}'
+                        audio_url = publish_audio(output_file, absolute=True)
                         return jsonify({
                             'success': True,
                             'audio_url': audio_url,
@@ -5159,7 +5523,7 @@ def api_mobile_synthesize():
                     v.get('ShortName'): set(v.get('StyleList') or []) for v in voices_list
                 }
             except Exception as e:
-                print(f"[Mobile API] Voice validation error: {e}")
+                mobile_log.warning('voices.load_failed', error=str(e))
                 voice_map = {}
             
             for chunk in chunks:
@@ -5202,7 +5566,7 @@ def api_mobile_synthesize():
                 )
             )
             
-            audio_url = request.url_root.rstrip('/') + f'/api/audio/{output_file.name}'
+            audio_url = publish_audio(output_file, absolute=True)
             
             return jsonify({
                 'success': True,
@@ -5237,9 +5601,6 @@ def api_mobile_synthesize():
                 'upgrade_url': 'https://cheaptts.com/subscribe'
             }), 402  # Payment Required
         
-        # Save character usage
-        db.session.commit()
-        
         # Handle numeric rate/pitch from mobile (e.g., -50 to +50)
         rate_val = data.get('rate', 0)
         pitch_val = data.get('pitch', 0)
@@ -5271,7 +5632,8 @@ def api_mobile_synthesize():
         # Chunk mode for long text
         chunk_mode = data.get('chunk_mode', False)
         
-        print(f"[Mobile API] Synthesize request from {user.email}: voice={voice}, style={style}, chars={len(text)}")
+        mobile_log.info('mobile.request', mode='text', user=user.id, email=truncate(user.email, 3),
+                        voice=voice, style=style, chars=len(text))
         
         # Validate style against voice's supported styles
         if style:
@@ -5286,7 +5648,7 @@ def api_mobile_synthesize():
                         'error': f"Style '{style}' not supported by {voice}. Available styles: {', '.join(sorted(supported_styles)) if supported_styles else 'none'}"
                     }), 400
             except Exception as e:
-                print(f"[Mobile API] Style validation error: {e}")
+                mobile_log.warning('style.validation_failed', error=str(e))
                 # Continue anyway
         
         # Generate speech
@@ -5304,7 +5666,7 @@ def api_mobile_synthesize():
         )
         
         # Return the audio URL
-        audio_url = request.url_root.rstrip('/') + f'/api/audio/{output_file.name}'
+        audio_url = publish_audio(output_file, absolute=True)
         
         return jsonify({
             'success': True,
@@ -5316,8 +5678,7 @@ def api_mobile_synthesize():
         })
         
     except Exception as e:
-        print(f"[Mobile API] Synthesize error: {e}")
-        traceback.print_exc()
+        mobile_log.exception('mobile.failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -5350,7 +5711,6 @@ def api_mobile_preview():
         }
     """
     import re
-    import traceback
 
     # Authenticate with session token
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -5359,18 +5719,15 @@ def api_mobile_preview():
         return jsonify({'success': False, 'error': 'No token provided'}), 401
     
     try:
-        user = User.query.filter_by(mobile_session_token=token).first()
+        user = mobile_session_user(token)
     except Exception as e:
-        print(f"[Mobile Preview] Token lookup failed: {e}")
+        mobile_log.warning('auth.lookup_failed', error=str(e))
         return jsonify({
             'success': False,
             'error': 'Authentication system not ready'
         }), 503
     
-    if not user or (
-        user.mobile_session_expires
-        and user.mobile_session_expires < datetime.utcnow()
-    ):
+    if not user:
         return jsonify({
             'success': False,
             'error': 'Invalid or expired token'
@@ -5414,7 +5771,7 @@ def api_mobile_preview():
         chunk_pitch = chunk.get('pitch', data.get('global_pitch', 0))
         chunk_volume = chunk.get('volume', data.get('global_volume', 0))
         
-        print(f"[Mobile Preview] {user.email}: voice={chunk_voice}, emotion={emotion}")
+        mobile_log.info('preview.request', user=user.id, email=truncate(user.email, 3), voice=chunk_voice, emotion=emotion)
         
         # If emotion is specified, use native style parameter
         if emotion:
@@ -5440,7 +5797,7 @@ def api_mobile_preview():
                             'error': f"Style '{emotion}' not supported by {chunk_voice}"
                         }), 400
                 except Exception as e:
-                    print(f"[Mobile Preview] Style validation error: {e}")
+                    mobile_log.warning('style.validation_failed', voice=chunk_voice, error=str(e))
                 
                 style_degree = {1: 0.7, 2: 1.0, 3: 1.3}.get(intensity, 1.0)
                 rate_str = f"+{int(chunk_speed)}%" if chunk_speed >= 0 else f"{int(chunk_speed)}%"
@@ -5510,7 +5867,7 @@ def api_mobile_preview():
                 )
             )
         
-        audio_url = request.url_root.rstrip('/') + f'/api/audio/{output_file.name}'
+        audio_url = publish_audio(output_file, absolute=True)
         
         return jsonify({
             'success': True,
@@ -5519,8 +5876,7 @@ def api_mobile_preview():
         })
         
     except Exception as e:
-        print(f"[Mobile Preview] Error: {e}")
-        traceback.print_exc()
+        mobile_log.exception('preview.failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -5551,13 +5907,13 @@ def api_synthesize():
         }
     """
     import re
-    import traceback
 
     # Get API key from header
     api_key_str = (request.headers.get('X-API-Key') or '').strip()
     if not api_key_str:
         return jsonify({'success': False, 'error': 'API key required. Provide X-API-Key header.'}), 401
     
+    reservation = None  # characters reserved by verify_api_key
     try:
         data = request.get_json(silent=True) or {}
         raw_text = data.get('text', '')
@@ -5585,13 +5941,12 @@ def api_synthesize():
                 error_response['usage'] = auth_result['usage']
             return jsonify(error_response), 401 if 'API access required' in auth_result.get('error', '') else 429
         
-        # Track usage for non-admin users
+        # Usage for non-admin users is reserved; committed below on success
         is_admin = auth_result.get('is_admin', False)
-        user = auth_result.get('user')
+        reservation = auth_result.get('reservation')
         
-        print(f"[API V1] Received request from {request.remote_addr}")
-        print(f"[API V1] Content-Type: {request.content_type}")
-        print(f"[API V1] Characters: {total_chars}, Admin: {is_admin}")
+        api_log.info('api.request', remote=request.remote_addr, content_type=request.content_type,
+                     chars=total_chars, admin=is_admin)
         
         voice = data.get('voice', 'en-US-AriaNeural')
         rate = data.get('rate', '+0%')
@@ -5645,8 +6000,7 @@ def api_synthesize():
                             }), 400
                     except Exception as e:
                         # If validation fails, log but proceed
-                        print(f"[VALIDATION ERROR] {e}")
-                        pass
+                        api_log.warning('style.validation_failed', voice=voice, error=str(e))
                     
                     # Use native style parameter - bypass SSML building
                     plain_text = chunk.get('content', '')
@@ -5674,7 +6028,8 @@ def api_synthesize():
                         )
                     )
                     
-                    audio_url = request.url_root.rstrip('/') + f'/api/audio/{output_file.name}'
+                    audio_url = publish_audio(output_file, absolute=True)
+                    usage_ledger.commit(reservation)
                     return jsonify({
                         'success': True,
                         'audio_url': audio_url,
@@ -5689,7 +6044,7 @@ def api_synthesize():
                     v.get('ShortName'): set(v.get('StyleList') or []) for v in voices
                 }
             except Exception as e:
-                print(f"[STYLE VALIDATION ERROR] failed to load voices: {e}")
+                api_log.warning('voices.load_failed', error=str(e))
                 voice_map = {}
 
             for idx, chunk in enumerate(chunks):
@@ -5730,12 +6085,10 @@ def api_synthesize():
                 )
             )
             
-            audio_url = request.url_root.rstrip('/') + f'/api/audio/{output_file.name}'
+            audio_url = publish_audio(output_file, absolute=True)
             
-            # Track API usage for non-admin users
-            if user and not is_admin and billing_enabled():
-                user.use_api_chars(total_chars)
-                db.session.commit()
+            # Keep the reserved API usage
+            usage_ledger.commit(reservation)
             
             return jsonify({
                 'success': True,
@@ -5760,13 +6113,11 @@ def api_synthesize():
             )
         )
         
-        # Track API usage for non-admin users
-        if user and not is_admin and billing_enabled():
-            user.use_api_chars(total_chars)
-            db.session.commit()
+        # Keep the reserved API usage
+        usage_ledger.commit(reservation)
         
         # Return the audio URL
-        audio_url = request.url_root.rstrip('/') + f'/api/audio/{output_file.name}'
+        audio_url = publish_audio(output_file, absolute=True)
         
         return jsonify({
             'success': True,
@@ -5775,11 +6126,11 @@ def api_synthesize():
         })
     
     except Exception as e:
-        print(f"[API V1 ERROR] Exception type: {type(e).__name__}")
-        print(f"[API V1 ERROR] Exception message: {str(e)}")
-        print(f"[API V1 ERROR] Full traceback:")
-        traceback.print_exc()
+        api_log.exception('api.failed', error=f"{type(e).__name__}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        # Anything not committed (validation errors, failures) is refunded
+        usage_ledger.refund(reservation)
 
 
 @app.route('/api/v1/voices', methods=['GET'])
@@ -5949,7 +6300,7 @@ def admin_revoke_legacy_api_keys():
                 revoked_keys.append({
                     'key_id': api_key.id,
                     'key_name': api_key.name,
-                    'key_prefix': api_key.key[:15] + '...',
+                    'key_prefix': (api_key.key_prefix or 'ctts_') + '...',
                     'user_email': user.email,
                     'was_active': api_key.is_active,
                     'last_used': api_key.last_used_at.isoformat() if api_key.last_used_at else None,
@@ -5961,6 +6312,7 @@ def admin_revoke_legacy_api_keys():
         
         if not dry_run:
             db.session.commit()
+            api_key_cache.invalidate()
         
         # Get unique affected users
         unique_users = {u['email']: u for u in affected_users}.values()
@@ -6020,7 +6372,7 @@ def admin_delete_legacy_api_keys():
                 deleted_keys.append({
                     'key_id': api_key.id,
                     'key_name': api_key.name,
-                    'key_prefix': api_key.key[:15] + '...',
+                    'key_prefix': (api_key.key_prefix or 'ctts_') + '...',
                     'user_email': user.email,
                     'last_used': api_key.last_used_at.isoformat() if api_key.last_used_at else None,
                 })
@@ -6030,6 +6382,7 @@ def admin_delete_legacy_api_keys():
             for key in keys_to_delete:
                 db.session.delete(key)
             db.session.commit()
+            api_key_cache.invalidate()
         
         # Get unique affected users
         unique_users = {u['email']: u for u in affected_users}.values()
@@ -6103,7 +6456,7 @@ def admin_grant_vibevoice():
 if __name__ == '__main__':
     # Initialize DB if needed
     with app.app_context():
-        db.create_all()
+        schema_migrations.upgrade()
     
     # Cleanup old files on startup
     cleanup_old_files()
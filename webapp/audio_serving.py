@@ -0,0 +1,157 @@
+import os
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional
+
+from werkzeug.datastructures import Range
+from werkzeug.http import parse_etags, parse_range_header
+from werkzeug.wrappers import Response
+
+from metrics import counter
+
+# Serving generated audio.
+#
+# Files in the output directory are written once under their final name
+# (synthesis writes to a partial path and renames) and never change, so
+# responses carry a strong ETag derived from the file name -- the cache key
+# -- plus size and mtime, and `Cache-Control: immutable` (HLS playlists,
+# which grow while a job renders, get `no-cache`). Conditional and
+# single byte-range requests are answered here without reading the file in
+# Python: the body is handed to the server's wsgi.file_wrapper positioned at
+# the range start, which gunicorn turns into sendfile(2) bounded by
+# Content-Length. With AUDIO_OFFLOAD the front proxy streams the file
+# instead:
+#   AUDIO_OFFLOAD=nginx     X-Accel-Redirect: AUDIO_ACCEL_PREFIX/<name>
+#                           (an `internal` location aliased to the output dir)
+#   AUDIO_OFFLOAD=sendfile  X-Sendfile: <absolute path> (Apache/lighttpd)
+
+AUDIO_OFFLOAD = os.environ.get("AUDIO_OFFLOAD", "").strip().lower()
+AUDIO_ACCEL_PREFIX = os.environ.get("AUDIO_ACCEL_PREFIX", "/protected-audio").rstrip("/")
+AUDIO_MAX_AGE = int(os.environ.get("AUDIO_MAX_AGE", str(365 * 24 * 3600)))
+FILE_BLOCK_SIZE = 64 * 1024
+
+BYTES_SERVED = counter("audio_bytes_served_total", "Audio body bytes sent (mode: direct, or offload to the proxy).", ("mode",))
+
+AUDIO_MIMETYPES = {
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".ogg": "audio/ogg",
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".aac": "audio/aac",
+}
+
+
+def audio_mimetype(name: str) -> str:
+    return AUDIO_MIMETYPES.get(Path(name).suffix.lower(), "audio/mpeg")
+
+
+def cache_control(name: str) -> str:
+    # HLS playlists grow while a long job renders; everything else is final
+    if name.endswith(".m3u8"):
+        return "no-cache"
+    return f"public, max-age={AUDIO_MAX_AGE}, immutable"
+
+
+def strong_etag(path: Path, st: os.stat_result) -> str:
+    return f"{path.stem}-{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+class _FileRange:
+    """Iterates exactly `length` bytes from an open file (servers without sendfile)."""
+
+    def __init__(self, fh, length: int):
+        self.fh = fh
+        self.remaining = length
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        if self.remaining <= 0:
+            raise StopIteration
+        data = self.fh.read(min(FILE_BLOCK_SIZE, self.remaining))
+        if not data:
+            raise StopIteration
+        self.remaining -= len(data)
+        return data
+
+    def close(self) -> None:
+        self.fh.close()
+
+
+def _body(environ, fh, length: int, ranged: bool):
+    wrapper = environ.get("wsgi.file_wrapper")
+    # gunicorn's wrapper sends Content-Length bytes from the current offset;
+    # other servers' wrappers may read to EOF, so ranges use _FileRange there
+    if wrapper is not None and (not ranged or environ.get("SERVER_SOFTWARE", "").startswith("gunicorn")):
+        return wrapper(fh, FILE_BLOCK_SIZE)
+    return _FileRange(fh, length)
+
+
+def serve_audio(path: Path, environ, mimetype: Optional[str] = None) -> Optional[Response]:
+    """Response for a generated file, or None if it doesn't exist."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    if not path.is_file():
+        return None
+
+    etag = strong_etag(path, st)
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": cache_control(path.name),
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+    }
+    mimetype = mimetype or audio_mimetype(path.name)
+
+    if_none_match = parse_etags(environ.get("HTTP_IF_NONE_MATCH"))
+    if if_none_match.contains_weak(etag):
+        return Response(status=304, headers=headers)
+
+    if AUDIO_OFFLOAD == "nginx":
+        headers["X-Accel-Redirect"] = f"{AUDIO_ACCEL_PREFIX}/{path.name}"
+        BYTES_SERVED.inc(st.st_size, mode="offload")
+        return Response(mimetype=mimetype, headers=headers)
+    if AUDIO_OFFLOAD == "sendfile":
+        headers["X-Sendfile"] = str(path.resolve())
+        BYTES_SERVED.inc(st.st_size, mode="offload")
+        return Response(mimetype=mimetype, headers=headers)
+
+    size = st.st_size
+    start, stop, status = 0, size, 200
+    byte_range: Optional[Range] = parse_range_header(environ.get("HTTP_RANGE"))
+    if_range = environ.get("HTTP_IF_RANGE")
+    # Only a single byte range is honoured; multi-range and other units
+    # are ignored and get the whole file, as RFC 9110 allows
+    single = byte_range is not None and byte_range.units == "bytes" and len(byte_range.ranges) == 1
+    if single and (if_range is None or if_range.strip() == f'"{etag}"'):
+        bounds = byte_range.range_for_length(size)
+        if bounds is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status=416, headers=headers)
+        start, stop = bounds
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+    headers["Content-Length"] = str(stop - start)
+
+    if environ.get("REQUEST_METHOD") == "HEAD":
+        return Response(status=status, mimetype=mimetype, headers=headers)
+
+    BYTES_SERVED.inc(stop - start, mode="direct")
+    fh = open(path, "rb")
+    if start:
+        fh.seek(start)
+    body = _body(environ, fh, stop - start, ranged=status == 206)
+    return Response(body, status=status, mimetype=mimetype, headers=headers, direct_passthrough=True)
+
+
+__all__ = [
+    "AUDIO_OFFLOAD",
+    "audio_mimetype",
+    "cache_control",
+    "serve_audio",
+    "strong_etag",
+]
@@ -0,0 +1,236 @@
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+from audio_serving import audio_mimetype, cache_control
+
+# Where generated audio lives once it has been rendered.
+#
+# Files are always rendered into the local output directory first (the
+# synthesis cache and single-flight locks work on local paths). Publishing
+# copies a file to the configured Storage and returns the URL clients
+# should fetch:
+#
+#   (unset) / file:///path   LocalStorage -- the output directory itself;
+#                            URLs point at /api/audio/<name> on this host
+#   s3://bucket/prefix?endpoint=http://minio:9000&region=...&public_url=...
+#                            S3Storage -- any S3-compatible store (AWS, R2,
+#                            MinIO, ...). Needs the `boto3` package. URLs are
+#                            presigned GETs (or public_url/<key>), so any web
+#                            node can hand out a file rendered on another.
+#
+# LocalStorage implements the same contract. S3Storage takes an optional
+# pre-built client, which is how the tests run it against an in-memory
+# stand-in. Keys are the generated file names, which are unique and never
+# rewritten.
+
+AUDIO_URL_TTL = int(os.environ.get("AUDIO_URL_TTL", str(24 * 3600)))
+MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+
+Source = Union[Path, str, BinaryIO]
+
+
+class Storage:
+    """put/get/stream/presign/delete for generated audio, keyed by file name."""
+
+    remote = False
+
+    def put(self, key: str, source: Source) -> None:
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        return b"".join(self.stream(key))
+
+    def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Bytes [start, end) of an object, in chunks."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def presign(self, key: str, expires: int = AUDIO_URL_TTL) -> Optional[str]:
+        """Direct URL for the object, or None if the app serves it itself."""
+        return None
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def delete_older_than(self, seconds: float) -> int:
+        raise NotImplementedError
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: Union[Path, str]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = self.root / key
+        if path.parent != self.root or key in ("", ".", ".."):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+    def put(self, key: str, source: Source) -> None:
+        target = self._path(key)
+        if isinstance(source, (str, Path)):
+            if Path(source).resolve() == target.resolve():
+                return  # rendered in place
+            with open(source, "rb") as fh:
+                self.put(key, fh)
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".put-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                shutil.copyfileobj(source, out, STREAM_CHUNK_SIZE)
+            os.replace(tmp, target)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as fh:
+            fh.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                data = fh.read(STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining))
+                if not data:
+                    return
+                if remaining is not None:
+                    remaining -= len(data)
+                yield data
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def delete_older_than(self, seconds: float) -> int:
+        cutoff = time.time() - seconds
+        deleted = 0
+        for path in self.root.iterdir():
+            try:
+                if path.is_file() and not path.name.startswith(".") and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    deleted += 1
+            except OSError:
+                pass
+        return deleted
+
+
+class S3Storage(Storage):
+    remote = True
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, public_url: Optional[str] = None, client=None):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self._transfer = None
+        if client is None:
+            try:
+                import boto3
+                from boto3.s3.transfer import TransferConfig
+            except ImportError as e:  # pragma: no cover - depends on deployment
+                raise RuntimeError("AUDIO_STORAGE_URI is an s3:// URL but the boto3 package is not installed") from e
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+            # upload_file streams from disk and switches to multipart above the threshold
+            self._transfer = TransferConfig(multipart_threshold=MULTIPART_CHUNK_SIZE,
+                                            multipart_chunksize=MULTIPART_CHUNK_SIZE)
+        self._client = client
+        self._client_error = client.exceptions.ClientError
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def put(self, key: str, source: Source) -> None:
+        extra = {
+            "ContentType": audio_mimetype(key),
+            "CacheControl": cache_control(key),
+        }
+        if isinstance(source, (str, Path)):
+            self._client.upload_file(str(source), self.bucket, self._key(key),
+                                     ExtraArgs=extra, Config=self._transfer)
+        else:
+            self._client.upload_fileobj(source, self.bucket, self._key(key),
+                                        ExtraArgs=extra, Config=self._transfer)
+
+    def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        body = self._client.get_object(**params)["Body"]
+        try:
+            yield from body.iter_chunks(STREAM_CHUNK_SIZE)
+        finally:
+            body.close()
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def presign(self, key: str, expires: int = AUDIO_URL_TTL) -> Optional[str]:
+        if self.public_url:
+            return f"{self.public_url}/{self._key(key)}"
+        return self._client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self._key(key)}, ExpiresIn=expires
+        )
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def delete_older_than(self, seconds: float) -> int:
+        """Prefer a bucket lifecycle rule; this is for stores without one."""
+        cutoff = time.time() - seconds
+        deleted = 0
+        batch = []
+        for page in self._client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                if obj["LastModified"].timestamp() < cutoff:
+                    batch.append({"Key": obj["Key"]})
+                if len(batch) == 1000:
+                    self._client.delete_objects(Bucket=self.bucket, Delete={"Objects": batch})
+                    deleted += len(batch)
+                    batch = []
+        if batch:
+            self._client.delete_objects(Bucket=self.bucket, Delete={"Objects": batch})
+            deleted += len(batch)
+        return deleted
+
+
+def open_storage(uri: Optional[str], local_root: Union[Path, str]) -> Storage:
+    """Storage for an s3:// or file:// URI; LocalStorage(local_root) if unset."""
+    if not uri:
+        return LocalStorage(local_root)
+    parsed = urlparse(uri)
+    if parsed.scheme == "file":
+        return LocalStorage(parsed.path or local_root)
+    if parsed.scheme == "s3":
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        return S3Storage(
+            parsed.netloc,
+            prefix=parsed.path,
+            endpoint_url=query.get("endpoint"),
+            region=query.get("region"),
+            public_url=query.get("public_url"),
+        )
+    raise ValueError(f"Unsupported audio storage URI: {uri}")
+
+
+__all__ = [
+    "LocalStorage",
+    "S3Storage",
+    "Storage",
+    "open_storage",
+    "AUDIO_URL_TTL",
+]
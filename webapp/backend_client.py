@@ -0,0 +1,208 @@
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+import tracing
+from metrics import STAGE_SECONDS
+
+# Shared, connection-pooled HTTP clients for the model servers
+# (Chatterbox, IndexTTS2, VibeVoice).
+#
+# One requests.Session per backend keeps TCP/TLS connections alive between
+# segments instead of reconnecting for every requests.post(). Large audio
+# responses are streamed to disk in fixed-size pieces rather than buffered
+# via response.content.
+#
+# New connections report their TCP/TLS setup time and synthesis POSTs their
+# time to response headers to tts_stage_seconds (stages "connect", "ttfb");
+# streaming a body to disk is the "download" stage.
+#
+# Every request runs in a "backend_call" span and carries it to the server
+# in the `traceparent` header, so the server's spans join the caller's trace.
+
+DEFAULT_POOL_SIZE = int(os.environ.get("BACKEND_POOL_SIZE", "16"))
+DEFAULT_RETRIES = int(os.environ.get("BACKEND_RETRIES", "2"))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("BACKEND_CONNECT_TIMEOUT", "5"))
+DOWNLOAD_CHUNK_BYTES = 256 * 1024
+
+PathLike = Union[str, Path]
+Timeout = Union[float, Tuple[float, float]]
+
+
+class BackendError(Exception):
+    """Non-200 response from a model server."""
+
+    def __init__(self, backend: str, status_code: int, detail: str):
+        super().__init__(detail)
+        self.backend = backend
+        self.status_code = status_code
+        self.detail = detail
+
+
+def error_detail(response: requests.Response) -> str:
+    """Best-effort error message from a failed backend response."""
+    try:
+        return response.json().get('detail', response.text[:200])
+    except Exception:
+        return response.text[:200] if response.text else f'HTTP {response.status_code}'
+
+
+def save_response(response: requests.Response, dest: PathLike) -> Path:
+    """
+    Stream a (stream=True) response body to dest without holding it in memory.
+    Writes to a temporary sibling first so dest is never left half-written.
+    """
+    dest = Path(dest)
+    partial = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.download")
+    try:
+        response.raw.decode_content = True
+        with open(partial, 'wb') as f:
+            shutil.copyfileobj(response.raw, f, DOWNLOAD_CHUNK_BYTES)
+        os.replace(partial, dest)
+    finally:
+        if partial.exists():
+            partial.unlink()
+    return dest
+
+
+@lru_cache(maxsize=None)
+def _timed_pool(pool_cls: type, backend: str) -> type:
+    """pool_cls whose connections record their connect time for backend."""
+
+    class TimedConnection(pool_cls.ConnectionCls):
+        def connect(self) -> None:
+            began = time.perf_counter()
+            super().connect()
+            STAGE_SECONDS.observe(time.perf_counter() - began, stage="connect", engine=backend)
+
+    return type(pool_cls.__name__, (pool_cls,), {"ConnectionCls": TimedConnection})
+
+
+class _TimedAdapter(HTTPAdapter):
+    def __init__(self, backend: str, **kwargs: Any):
+        self.backend = backend
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _timed_pool(HTTPConnectionPool, self.backend),
+            "https": _timed_pool(HTTPSConnectionPool, self.backend),
+        }
+
+
+class BackendClient:
+    """Pooled HTTP client for one model server."""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        retries: int = DEFAULT_RETRIES,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    ):
+        self.name = name
+        self.base_url = (base_url or '').rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.session = requests.Session()
+        # Connection failures are always safe to retry (nothing was sent).
+        # Read errors and 5xx are only retried for idempotent GETs, so an
+        # expensive synthesis POST is never silently run twice.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            backoff_factor=0.5,
+            raise_on_status=False,
+        )
+        adapter = _TimedAdapter(name, pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url)
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _timeout(self, timeout: Optional[Timeout]) -> Optional[Timeout]:
+        # A bare number is the read timeout; connecting should fail fast
+        if timeout is None or isinstance(timeout, tuple):
+            return timeout
+        return (min(self.connect_timeout, timeout), timeout)
+
+    def request(self, method: str, path: str, timeout: Optional[Timeout] = None, **kwargs: Any) -> requests.Response:
+        with tracing.span("backend_call", backend=self.name, method=method, path=path) as call:
+            kwargs['headers'] = tracing.inject(kwargs.get('headers'))
+            response = self.session.request(method, self.url(path), timeout=self._timeout(timeout), **kwargs)
+            call.attrs['status'] = response.status_code
+        if method == 'POST':  # synthesis calls; health probes are GETs
+            STAGE_SECONDS.observe(response.elapsed.total_seconds(), stage="ttfb", engine=self.name)
+        return response
+
+    def get(self, path: str, timeout: Optional[Timeout] = 30, **kwargs: Any) -> requests.Response:
+        return self.request('GET', path, timeout=timeout, **kwargs)
+
+    def post(self, path: str, timeout: Optional[Timeout] = 60, **kwargs: Any) -> requests.Response:
+        return self.request('POST', path, timeout=timeout, **kwargs)
+
+    def _checked(self, response: requests.Response) -> requests.Response:
+        if response.status_code != 200:
+            detail = error_detail(response)
+            response.close()
+            raise BackendError(self.name, response.status_code, detail)
+        return response
+
+    @contextmanager
+    def stream(self, method: str, path: str, timeout: Optional[Timeout] = None, **kwargs: Any) -> Iterator[requests.Response]:
+        """Open a streaming request; raises BackendError on non-200. Body is not read yet."""
+        kwargs['stream'] = True
+        with self._checked(self.request(method, path, timeout=timeout, **kwargs)) as response:
+            yield response
+
+    def download(self, method: str, path: str, dest: PathLike, timeout: Optional[Timeout] = None, **kwargs: Any) -> Path:
+        """Stream a response body straight to dest; returns dest."""
+        with self.stream(method, path, timeout=timeout, **kwargs) as response:
+            with tracing.span("download", backend=self.name), STAGE_SECONDS.time(stage="download", engine=self.name):
+                return save_response(response, dest)
+
+    def fetch(self, method: str, path: str, timeout: Optional[Timeout] = None, **kwargs: Any) -> bytes:
+        """Return a response body as bytes (for callers that post-process in memory)."""
+        with self._checked(self.request(method, path, timeout=timeout, **kwargs)) as response:
+            return response.content
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_clients: Dict[Tuple[str, str], BackendClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_backend(name: str, base_url: str, **kwargs: Any) -> BackendClient:
+    """Process-wide client for a backend; created on first use."""
+    key = (name, (base_url or '').rstrip('/'))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = BackendClient(name, base_url, **kwargs)
+            _clients[key] = client
+        return client
+
+
+__all__ = ["BackendClient", "BackendError", "error_detail", "get_backend", "save_response"]
@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from backend_client import BackendError
+from tts_logging import get_logger
+
+# Circuit breakers and background health checks for model-server replicas.
+#
+# Each replica has a CircuitBreaker fed by real requests and by a background
+# HealthMonitor that probes every replica on a fixed interval. A replica
+# whose recent error rate or probe latency is too high is "open" and receives
+# no traffic until a cool-down passes and a single trial request succeeds.
+# Request handlers read the resulting state from memory; they never make
+# extra health calls themselves.
+
+BREAKER_WINDOW = float(os.environ.get("BACKEND_BREAKER_WINDOW", "60"))
+BREAKER_MIN_CALLS = int(os.environ.get("BACKEND_BREAKER_MIN_CALLS", "4"))
+BREAKER_ERROR_RATE = float(os.environ.get("BACKEND_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_PROBE_P95 = float(os.environ.get("BACKEND_BREAKER_PROBE_P95", "2.5"))
+BREAKER_OPEN_SECONDS = float(os.environ.get("BACKEND_BREAKER_OPEN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+log = get_logger("health")
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """
+    True if an exception means the backend is unwell: network errors,
+    timeouts and 5xx answers. 4xx (bad voice, text too long) are the
+    caller's fault and don't count. Follows `raise ... from` chains.
+    """
+    seen = 0
+    while error is not None and seen < 5:
+        if isinstance(error, requests.RequestException):
+            return True
+        if isinstance(error, BackendError):
+            return error.status_code >= 500
+        error = error.__cause__
+        seen += 1
+    return False
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+class CircuitBreaker:
+    """
+    Sliding-window breaker.
+
+    Opens when, within the last `window` seconds, at least `min_calls`
+    outcomes were seen and the error rate reached `error_rate`, or the p95
+    of health-probe latency reached `probe_p95` seconds. After
+    `open_seconds` one trial request is let through (half-open); success
+    closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name: str, window: float = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 error_rate: float = BREAKER_ERROR_RATE, probe_p95: Optional[float] = BREAKER_PROBE_P95,
+                 open_seconds: float = BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate_limit = error_rate
+        self.probe_p95_limit = probe_p95
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial_in_flight = False
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._latencies: Deque[Tuple[float, float]] = deque()  # request latencies (reporting only)
+        self._probes: Deque[Tuple[float, float]] = deque()  # probe latencies (drive tripping)
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        horizon = now - self.window
+        for series in (self._outcomes, self._latencies, self._probes):
+            while series and series[0][0] < horizon:
+                series.popleft()
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def _should_trip(self) -> Optional[str]:
+        if len(self._outcomes) >= self.min_calls and self._error_rate() >= self.error_rate_limit:
+            return f"error rate {self._error_rate():.0%}"
+        if self.probe_p95_limit and len(self._probes) >= self.min_calls:
+            p95 = percentile([lat for _, lat in self._probes], 95)
+            if p95 is not None and p95 >= self.probe_p95_limit:
+                return f"probe p95 {p95:.2f}s"
+        return None
+
+    def _open(self, now: float, reason: str) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self.trips += 1
+        self._trial_in_flight = False
+        log.warning('circuit.open', breaker=self.name, reason=reason, open_seconds=self.open_seconds)
+
+    def available(self) -> bool:
+        """Could a request be sent now? (Does not claim the half-open trial.)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.open_seconds
+            return not self._trial_in_flight
+
+    def begin(self) -> bool:
+        """Claim permission for one request; False if the breaker refuses it."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record(self, ok: bool, latency: Optional[float] = None) -> None:
+        """Outcome of a real request."""
+        now = time.monotonic()
+        with self._lock:
+            self._outcomes.append((now, ok))
+            if ok and latency is not None:
+                self._latencies.append((now, latency))
+            self._prune(now)
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = False
+                if ok:
+                    self._close()
+                else:
+                    self._open(now, "trial request failed")
+            elif self.state == CLOSED:
+                reason = self._should_trip()
+                if reason:
+                    self._open(now, reason)
+
+    def release(self) -> None:
+        """A claimed request ended without a verdict (e.g. caller error)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_probe(self, ok: bool, latency: float) -> None:
+        """Outcome of a background health probe."""
+        now = time.monotonic()
+        with self._lock:
+            self._outcomes.append((now, ok))
+            if ok:
+                self._probes.append((now, latency))
+            self._prune(now)
+            if self.state == CLOSED:
+                reason = self._should_trip()
+                if reason:
+                    self._open(now, reason)
+            elif self.state == OPEN and ok and now - self.opened_at >= self.open_seconds:
+                # Let the next real request be the trial
+                self.state = HALF_OPEN
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._outcomes.clear()
+        self._probes.clear()
+        log.info('circuit.closed', breaker=self.name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune(time.monotonic())
+            latencies = [lat for _, lat in self._latencies]
+            probes = [lat for _, lat in self._probes]
+            return {
+                "state": self.state,
+                "trips": self.trips,
+                "calls": len(self._outcomes),
+                "error_rate": round(self._error_rate(), 4),
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95),
+                "probe_p50": percentile(probes, 50),
+                "probe_p95": percentile(probes, 95),
+            }
+
+
+class HealthMonitor:
+    """
+    Daemon thread that probes every replica of the given pools on an interval.
+
+    Started lazily per process (ensure_started) so gunicorn workers forked
+    after import each run their own.
+    """
+
+    def __init__(self, pools: Sequence[Any], interval: float):
+        self.pools = [p for p in pools if p.configured]
+        self.interval = interval
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.rounds = 0
+
+    def ensure_started(self) -> None:
+        if self._pid == os.getpid() or not self.pools:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            for pool in self.pools:
+                pool.monitored = True
+            threading.Thread(target=self._run, name="backend-health", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_once(self) -> None:
+        for pool in self.pools:
+            for replica in pool.replicas:
+                pool.probe(replica)
+        self.rounds += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:  # never let the monitor die
+                log.exception('monitor.round_failed', error=str(e))
+            self._stop.wait(self.interval)
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {pool.name: pool.status() for pool in self.pools}
+
+    def metrics(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """Flat (name, labels, value) samples for every replica (labelled by position, not URL)."""
+        samples: List[Tuple[str, Dict[str, str], float]] = []
+        for pool in self.pools:
+            for index, status in enumerate(pool.status()):
+                labels = {"backend": pool.name, "replica": str(index)}
+                breaker = status["breaker"]
+                samples.append(("backend_up", labels, 1.0 if status["healthy"] else 0.0))
+                samples.append(("backend_circuit_state", labels, float(STATE_VALUES[breaker["state"]])))
+                samples.append(("backend_circuit_trips_total", labels, float(breaker["trips"])))
+                samples.append(("backend_outstanding_requests", labels, float(status["outstanding"])))
+                samples.append(("backend_error_rate", labels, float(breaker["error_rate"])))
+                for key in ("latency_p50", "latency_p95", "probe_p50", "probe_p95"):
+                    if breaker[key] is not None:
+                        samples.append((f"backend_{key}_seconds", labels, float(breaker[key])))
+        return samples
+
+
+__all__ = [
+    "CircuitBreaker",
+    "HealthMonitor",
+    "is_backend_failure",
+    "percentile",
+    "CLOSED",
+    "OPEN",
+    "HALF_OPEN",
+]
@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Sequence
+
+import requests
+
+from backend_client import BackendClient, get_backend
+from backend_health import CircuitBreaker, is_backend_failure
+import tracing
+from metrics import STAGE_SECONDS
+from tts_logging import get_logger
+
+# A set of interchangeable model-server replicas (e.g. several Chatterbox GPU
+# boxes) behind one dispatcher.
+#
+# Requests go to the healthy replica with the fewest requests in flight from
+# this process. A replica that refuses connections, or whose circuit breaker
+# has tripped (see backend_health.py), is taken out of rotation until the
+# health monitor (or, without one, a lazy re-probe after
+# BACKEND_HEALTH_INTERVAL seconds) sees it recover. map_ordered() fans a list
+# of segments out across the pool and returns results in input order.
+
+HEALTH_INTERVAL = float(os.environ.get("BACKEND_HEALTH_INTERVAL", "30"))
+HEALTH_TIMEOUT = 3.0
+
+log = get_logger("pool")
+
+
+class NoHealthyBackend(Exception):
+    """Every replica in the pool is marked down or has its circuit open."""
+
+
+class SegmentFailed(Exception):
+    """A segment in map_ordered() failed; index is its position in the input."""
+
+    def __init__(self, index: int, error: BaseException):
+        super().__init__(str(error))
+        self.index = index
+        self.error = error
+
+
+def parse_urls(value: Optional[str], fallback: Optional[str] = None) -> List[str]:
+    """Comma/whitespace-separated URL list from an env var, falling back to one URL."""
+    urls = [u.strip().rstrip("/") for u in (value or "").replace(",", " ").split()]
+    urls = [u for u in urls if u]
+    if not urls and fallback:
+        urls = [fallback.rstrip("/")]
+    return list(dict.fromkeys(urls))  # de-duplicate, keep order
+
+
+class Replica:
+    def __init__(self, client: BackendClient, breaker: CircuitBreaker):
+        self.client = client
+        self.breaker = breaker
+        self.outstanding = 0
+        self.healthy = True
+        self.checked_at = 0.0
+        self.dispatched = 0
+        self.last_health: Optional[dict] = None  # JSON body of the last successful probe
+
+    @property
+    def url(self) -> str:
+        return self.client.base_url
+
+
+class BackendPool:
+    """Least-outstanding-requests dispatcher over replicas of one backend."""
+
+    def __init__(
+        self,
+        name: str,
+        urls: Sequence[str],
+        per_replica: int = 1,
+        health_path: Optional[str] = None,
+        health_interval: float = HEALTH_INTERVAL,
+    ):
+        self.name = name
+        self.replicas = [
+            Replica(get_backend(name, url), CircuitBreaker(f"{name} {url}")) for url in urls if url
+        ]
+        self.per_replica = max(1, per_replica)
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._turn = 0  # rotates ties so idle replicas share the load
+        self.monitored = False  # set once a HealthMonitor probes this pool
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.replicas)
+
+    def _usable(self, replica: Replica) -> bool:
+        return replica.healthy and replica.breaker.available()
+
+    def available(self) -> bool:
+        """True if at least one replica can take a request right now."""
+        return any(self._usable(r) for r in self.replicas)
+
+    def usable_replicas(self) -> List[Replica]:
+        return [r for r in self.replicas if self._usable(r)]
+
+    @property
+    def capacity(self) -> int:
+        """How many segments one request should have in flight at once."""
+        usable = sum(1 for r in self.replicas if self._usable(r)) or 1
+        return usable * self.per_replica
+
+    def probe(self, replica: Replica) -> bool:
+        """Reachability check: any non-5xx answer counts as up."""
+        began = time.monotonic()
+        payload = None
+        try:
+            response = replica.client.get(self.health_path or "/", timeout=HEALTH_TIMEOUT)
+            up = response.status_code < 500
+            if response.status_code == 200:
+                try:
+                    payload = response.json()
+                except ValueError:
+                    payload = None
+            response.close()
+        except requests.RequestException:
+            up = False
+        latency = time.monotonic() - began
+        replica.breaker.record_probe(up, latency)
+        with self._lock:
+            was_up = replica.healthy
+            replica.healthy = up
+            replica.checked_at = time.monotonic()
+            if payload is not None:
+                replica.last_health = payload if isinstance(payload, dict) else {"status": payload}
+        if up and not was_up:
+            log.info("replica.up", backend=self.name, url=replica.url)
+        return up
+
+    def mark_down(self, replica: Replica) -> None:
+        with self._lock:
+            replica.healthy = False
+            replica.checked_at = time.monotonic()
+        log.warning("replica.down", backend=self.name, url=replica.url)
+
+    def _recheck_down_replicas(self) -> None:
+        # Only needed when no background monitor is probing this pool
+        if self.monitored:
+            return
+        now = time.monotonic()
+        due = [r for r in self.replicas if not r.healthy and now - r.checked_at >= self.health_interval]
+        for replica in due:
+            self.probe(replica)
+
+    def _pick(self, exclude: Sequence[Replica]) -> Replica:
+        self._recheck_down_replicas()
+        with self._lock:
+            candidates = [r for r in self.replicas if r not in exclude and self._usable(r)]
+            self._turn += 1
+            n = len(self.replicas)
+            for replica in sorted(candidates, key=lambda r: (r.outstanding, (self.replicas.index(r) - self._turn) % n)):
+                if replica.breaker.begin():
+                    replica.outstanding += 1
+                    replica.dispatched += 1
+                    return replica
+        raise NoHealthyBackend(f"No healthy {self.name} backend available")
+
+    @contextmanager
+    def acquire(self, exclude: Sequence[Replica] = ()) -> Iterator[Replica]:
+        """
+        Check out the least-busy healthy replica for one request. The outcome
+        and latency feed the replica's circuit breaker.
+        """
+        replica = self._pick(exclude)
+        began = time.monotonic()
+        try:
+            yield replica
+        except BaseException as e:
+            if _connection_failure(e):
+                self.mark_down(replica)
+            if is_backend_failure(e):
+                replica.breaker.record(False)
+            else:
+                replica.breaker.release()
+            raise
+        else:
+            replica.breaker.record(True, time.monotonic() - began)
+        finally:
+            with self._lock:
+                replica.outstanding -= 1
+
+    def call(self, fn: Callable[[BackendClient], Any]) -> Any:
+        """
+        Run fn(client) on one replica. If the replica can't be reached, try the
+        next one; other errors (including read timeouts, where the server may
+        still be working) are raised as-is so work is never duplicated.
+        """
+        tried: List[Replica] = []
+        while True:
+            try:
+                with self.acquire(exclude=tried) as replica:
+                    tried.append(replica)
+                    return fn(replica.client)
+            except NoHealthyBackend:
+                if tried:
+                    raise requests.ConnectionError(f"All {self.name} replicas are unreachable")
+                raise
+            except Exception as e:
+                if not _connection_failure(e) or len(tried) >= len(self.replicas):
+                    raise
+                log.warning("replica.retry", backend=self.name, url=tried[-1].url, error=e.__class__.__name__)
+
+    def map_ordered(self, fn: Callable[[BackendClient, Any], Any], items: Sequence[Any]) -> List[Any]:
+        """
+        fn(client, item) for every item, spread across replicas; results come
+        back in input order. The first failure cancels segments that haven't
+        started and is raised as SegmentFailed.
+        """
+        items = list(items)
+        workers = min(len(items), self.capacity)
+        if workers <= 1:
+            results = []
+            for idx, item in enumerate(items):
+                try:
+                    results.append(self.call(lambda client: fn(client, item)))
+                except Exception as e:
+                    raise SegmentFailed(idx, e) from e
+            return results
+
+        def run(item: Any, submitted: float, submitted_at: float) -> Any:
+            # Segments beyond the fan-out width wait here for a free slot
+            waited = time.monotonic() - submitted
+            STAGE_SECONDS.observe(waited, stage="queue_wait", engine=self.name)
+            tracing.record("queue_wait", submitted_at, waited, backend=self.name)
+            return self.call(lambda client: fn(client, item))
+
+        # bind() carries the request's trace into the fan-out threads
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{self.name}-fanout") as executor:
+            futures = [executor.submit(tracing.bind(run), item, time.monotonic(), time.time()) for item in items]
+            results = []
+            for idx, future in enumerate(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    for pending in futures[idx + 1:]:
+                        pending.cancel()
+                    raise SegmentFailed(idx, e) from e
+            return results
+
+    def status(self) -> List[dict]:
+        with self._lock:
+            rows = [
+                {
+                    "url": r.url,
+                    "healthy": r.healthy,
+                    "outstanding": r.outstanding,
+                    "dispatched": r.dispatched,
+                    "checked_at": r.checked_at,
+                    "health": r.last_health,
+                }
+                for r in self.replicas
+            ]
+        for row, replica in zip(rows, self.replicas):
+            row["breaker"] = replica.breaker.snapshot()
+        return rows
+
+
+def _connection_failure(error: BaseException) -> bool:
+    """Nothing reached the server, so the request is safe to resend elsewhere."""
+    while error is not None:
+        if isinstance(error, requests.ConnectionError):
+            return True
+        error = error.__cause__
+    return False
+
+
+__all__ = ["BackendPool", "NoHealthyBackend", "Replica", "SegmentFailed", "parse_urls", "HEALTH_INTERVAL"]
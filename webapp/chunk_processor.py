@@ -3,10 +3,16 @@ from typing import Any, Dict, List, Optional, Tuple
 
 # Simple, dependency-free chunker used by the SSML builder.
 # It keeps cost low by avoiding heavy NLP while still giving predictable splits.
+# Every stage is a single linear pass (running offsets and lengths, one
+# tokenizer scan), so book-length input scales with its size.
 
 DEFAULT_MAX_CHARS = 240
 MIN_FRAGMENT_CHARS = 15
 
+_MARKER_RE = re.compile(r"\[\[(.*?)\]\]")
+# Sentence enders, commas/semicolons, ellipses, em dashes
+_DELIMITER_RE = re.compile(r"\.{3,}|…|[.!?]|[,;]|—")
+
 Marker = Dict[str, Any]
 Chunk = Dict[str, Any]
 
@@ -61,13 +67,13 @@ def _extract_markers(text: str) -> Tuple[str, List[Tuple[int, Marker]]]:
     markers: List[Tuple[int, Marker]] = []
     cleaned_parts: List[str] = []
     cursor = 0
+    offset = 0  # length of the cleaned text so far
 
-    for match in re.finditer(r"\[\[(.*?)\]\]", text):
+    for match in _MARKER_RE.finditer(text):
         start, end = match.span()
         cleaned_parts.append(text[cursor:start])
-        marker_text = match.group(1)
-        marker = _parse_inline_marker(marker_text)
-        markers.append((len("".join(cleaned_parts)), marker))
+        offset += start - cursor
+        markers.append((offset, _parse_inline_marker(match.group(1))))
         cursor = end
     cleaned_parts.append(text[cursor:])
     return "".join(cleaned_parts).strip(), markers
@@ -81,36 +87,26 @@ def _split_basic(text: str) -> List[str]:
         return []
 
     parts: List[str] = []
-    # Capture sentence enders, commas/semicolons, ellipses, em dashes.
-    tokens = re.split(r"(\.{3,}|…|[.!?]|[,;]|—)", text)
-    # Re-attach delimiters to preceding text.
-    buf = ""
-    for tok in tokens:
-        if tok is None or tok == "":
-            continue
-        if re.fullmatch(r"(\.{3,}|…|[.!?]|[,;]|—)", tok):
-            buf += tok
-            parts.append(buf.strip())
-            buf = ""
-        else:
-            if buf:
-                # Previous chunk without terminal punctuation; push and start new
-                parts.append(buf.strip())
-                buf = ""
-            buf += tok
-    if buf.strip():
-        parts.append(buf.strip())
-    return [p for p in parts if p]
+    cursor = 0
+    # Each delimiter closes the text before it (delimiters are never blank)
+    for match in _DELIMITER_RE.finditer(text):
+        parts.append(text[cursor:match.end()].strip())
+        cursor = match.end()
+    tail = text[cursor:].strip()
+    if tail:
+        parts.append(tail)
+    return parts
 
 
 def _merge_short_fragments(chunks: List[str], min_len: int = MIN_FRAGMENT_CHARS) -> List[str]:
-    merged: List[str] = []
+    # Collect pieces and join once, so long runs of short fragments stay linear
+    merged: List[List[str]] = []
     for chunk in chunks:
         if merged and len(chunk) < min_len:
-            merged[-1] = (merged[-1] + " " + chunk).strip()
+            merged[-1].append(chunk)
         else:
-            merged.append(chunk)
-    return merged
+            merged.append([chunk])
+    return [pieces[0] if len(pieces) == 1 else " ".join(pieces).strip() for pieces in merged]
 
 
 def _split_long_chunks(chunks: List[str], max_len: int = DEFAULT_MAX_CHARS) -> List[str]:
@@ -124,12 +120,15 @@ def _split_long_chunks(chunks: List[str], max_len: int = DEFAULT_MAX_CHARS) -> L
             continue
         words = chunk.split()
         buf: List[str] = []
+        buf_chars = 0  # sum of len(w) for w in buf
         for word in words:
-            if sum(len(w) for w in buf) + len(buf) + len(word) > max_len and buf:
+            if buf and buf_chars + len(buf) + len(word) > max_len:
                 result.append(" ".join(buf))
                 buf = [word]
+                buf_chars = len(word)
             else:
                 buf.append(word)
+                buf_chars += len(word)
         if buf:
             result.append(" ".join(buf))
     return result
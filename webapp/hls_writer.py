@@ -0,0 +1,166 @@
+import math
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Callable, List, Optional, Tuple, Union
+
+from mp3_assembler import FrameHeader, is_info_frame, iter_frames
+
+# HLS output for long-form audio.
+#
+# MP3 parts are cut into ~HLS_SEGMENT_SECONDS segments on frame boundaries
+# (no re-encoding; a segment may span the end of one part and the start of
+# the next) and listed in an EVENT playlist that is rewritten after every
+# segment, so a player can start on the first segment while the rest is
+# still being synthesized. finish() appends #EXT-X-ENDLIST.
+#
+# Segments are HLS "packed audio": each starts with an ID3 PRIV
+# transportStreamTimestamp giving its start time on the 90 kHz clock.
+# Files are written as <name>_00000.mp3 ... and <name>.m3u8 side by side;
+# on_write(path) is called after each one (e.g. to upload it).
+#
+# resume() picks up an unfinished playlist left by an interrupted render:
+# the listed segments are kept and the same input frames are skipped until
+# they are covered, so the playlist only ever grows. Cuts depend only on
+# the frames, so the resumed segments match an uninterrupted run.
+
+HLS_SEGMENT_SECONDS = float(os.environ.get("HLS_SEGMENT_SECONDS", "6"))
+
+_TIMESTAMP_OWNER = b"com.apple.streaming.transportStreamTimestamp\x00"
+
+
+def _syncsafe(value: int) -> bytes:
+    return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+
+def timestamp_tag(seconds: float) -> bytes:
+    """ID3v2.4 tag with the PRIV timestamp HLS requires on packed audio."""
+    pts = round(seconds * 90000) & ((1 << 33) - 1)
+    payload = _TIMESTAMP_OWNER + struct.pack(">Q", pts)
+    frame = b"PRIV" + _syncsafe(len(payload)) + b"\x00\x00" + payload
+    return b"ID3\x04\x00\x00" + _syncsafe(len(frame)) + frame
+
+
+class HLSWriter:
+    def __init__(self, directory: Union[str, Path], name: str, segment_seconds: float = HLS_SEGMENT_SECONDS,
+                 on_write: Optional[Callable[[Path], None]] = None):
+        self.directory = Path(directory)
+        self.name = name
+        self.segment_seconds = segment_seconds
+        self.on_write = on_write
+        # Frames are ~24-26 ms, so a segment overshoots by less than one; the
+        # rounded EXTINF never exceeds this (RFC 8216 4.3.3.1)
+        self.target_duration = max(1, math.ceil(segment_seconds))
+        self.segments: List[Tuple[str, float]] = []
+        self.finished = False
+        self._frames: List[bytes] = []
+        self._pending = 0.0  # duration of the buffered frames
+        self._elapsed = 0.0  # start time of the buffered frames
+        self._skip = 0.0  # input already covered by resumed segments
+
+    @property
+    def playlist_path(self) -> Path:
+        return self.directory / f"{self.name}.m3u8"
+
+    @property
+    def duration(self) -> float:
+        return self._elapsed + self._pending
+
+    def resume(self) -> int:
+        """Keep the segments of an existing unfinished playlist; returns how many."""
+        try:
+            lines = self.playlist_path.read_text().splitlines()
+        except OSError:
+            return 0
+        segments: List[Tuple[str, float]] = []
+        duration = None
+        for line in lines:
+            if line.startswith("#EXTINF:"):
+                duration = float(line[len("#EXTINF:"):].split(",")[0])
+            elif line and not line.startswith("#") and duration is not None:
+                if not (self.directory / line).is_file():
+                    break
+                segments.append((line, duration))
+                duration = None
+        self.segments = segments
+        self._skip = sum(d for _, d in segments)
+        return len(segments)
+
+    def add_part(self, source: Union[str, Path, BinaryIO]) -> None:
+        """Append an MP3 part, writing every segment that fills up."""
+        fh = open(source, "rb") if isinstance(source, (str, Path)) else source
+        try:
+            for header, frame in iter_frames(fh):
+                if not is_info_frame(header, frame):
+                    self._add_frame(header, frame)
+        finally:
+            if fh is not source:
+                fh.close()
+
+    def _add_frame(self, header: FrameHeader, frame: bytes) -> None:
+        # EXTINF is rounded to the millisecond; half a frame absorbs that
+        if self._elapsed + header.duration / 2 < self._skip:
+            self._elapsed += header.duration
+            return
+        self._frames.append(frame)
+        self._pending += header.duration
+        if self._pending >= self.segment_seconds:
+            self._write_segment()
+
+    def _write_segment(self) -> None:
+        index = len(self.segments)
+        segment_name = f"{self.name}_{index:05d}.mp3"
+        tmp = self.directory / f".{segment_name}.part"
+        with open(tmp, "wb") as out:
+            out.write(timestamp_tag(self._elapsed))
+            out.writelines(self._frames)
+        os.replace(tmp, self.directory / segment_name)
+        if self.on_write:
+            self.on_write(self.directory / segment_name)
+        self.segments.append((segment_name, self._pending))
+        self._elapsed += self._pending
+        self._frames = []
+        self._pending = 0.0
+        self._write_playlist()
+
+    def finish(self) -> Path:
+        """Write the last (short) segment and close the playlist."""
+        if self._frames:
+            self._write_segment()
+        self.finished = True
+        self._write_playlist()
+        return self.playlist_path
+
+    def _write_playlist(self) -> None:
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{self.target_duration}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+        ]
+        for segment_name, duration in self.segments:
+            lines.append(f"#EXTINF:{duration:.3f},")
+            lines.append(segment_name)
+        if self.finished:
+            lines.append("#EXT-X-ENDLIST")
+        tmp = self.directory / f".{self.name}.m3u8.part"
+        tmp.write_text("\n".join(lines) + "\n")
+        os.replace(tmp, self.playlist_path)
+        if self.on_write:
+            self.on_write(self.playlist_path)
+
+
+def playlist_complete(path: Union[str, Path]) -> bool:
+    try:
+        return Path(path).read_text().rstrip().endswith("#EXT-X-ENDLIST")
+    except OSError:
+        return False
+
+
+__all__ = [
+    "HLSWriter",
+    "HLS_SEGMENT_SECONDS",
+    "playlist_complete",
+    "timestamp_tag",
+]
@@ -0,0 +1,142 @@
+import sqlite3
+import time
+from typing import Tuple
+
+from limits.storage import MovingWindowSupport, Storage
+
+from shared_counters import SQLiteStore, sqlite_path
+
+# Flask-Limiter storage on the shared counter file.
+#
+# Without Redis the limiter fell back to memory://, so each gunicorn worker
+# kept its own counts and every default limit was effectively multiplied by
+# the worker count. Importing this module registers a `limits` storage for
+# sqlite:/// URIs, backed by SQLiteStore -- the same .locks/counters.db the
+# Studio counters share -- so every worker on a host enforces one set of
+# limits.
+#
+# Moving-window entries are rows of limiter_entries; fixed-window counters
+# reuse the window_counters table. Every check-and-acquire runs in one
+# IMMEDIATE transaction, so concurrent workers never overshoot a limit.
+# Expired rows are swept every _SWEEP_EVERY acquisitions.
+
+_SWEEP_EVERY = 500
+_KEY_PREFIX = "LIMITER/"  # every key limits generates starts with this
+
+
+def limiter_storage_uri(uri: str) -> str:
+    """The `limits` spelling of a COUNTER_STORE_URI (unix:// is redis+unix:// there)."""
+    if uri.startswith("unix://"):
+        return "redis+" + uri
+    return uri
+
+
+class SQLiteLimiterStorage(Storage, MovingWindowSupport):
+    """Fixed- and moving-window rate limit storage in a SQLite file shared by workers."""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        self.store = SQLiteStore(sqlite_path(uri))
+        self._writes = 0
+        with self.store.transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS limiter_entries ("
+                "key TEXT NOT NULL, at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS limiter_entries_key ON limiter_entries (key, at)")
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _sweep(self, conn: sqlite3.Connection, now: float) -> None:
+        self._writes += 1
+        if self._writes % _SWEEP_EVERY == 0:
+            conn.execute("DELETE FROM limiter_entries WHERE expires_at <= ?", (now,))
+
+    # Fixed window
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        with self.store.transaction() as conn:
+            conn.execute(
+                "INSERT INTO window_counters (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "value = CASE WHEN expires_at > ? THEN value + excluded.value ELSE excluded.value END, "
+                "expires_at = CASE WHEN expires_at > ? THEN expires_at ELSE excluded.expires_at END",
+                (key, amount, now + expiry, now, now),
+            )
+            (value,) = conn.execute("SELECT value FROM window_counters WHERE key = ?", (key,)).fetchone()
+        return int(value)
+
+    def get(self, key: str) -> int:
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM window_counters WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return int(row[0]) if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "SELECT expires_at FROM window_counters WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        return row[0] if row else now
+
+    def clear(self, key: str) -> None:
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM window_counters WHERE key = ?", (key,))
+            conn.execute("DELETE FROM limiter_entries WHERE key = ?", (key,))
+
+    def reset(self) -> int:
+        """Clear every rate limit (the Studio counters in the same file are kept)."""
+        with self.store.transaction() as conn:
+            counters = conn.execute(
+                "DELETE FROM window_counters WHERE key LIKE ?", (_KEY_PREFIX + "%",)
+            ).rowcount
+            entries = conn.execute("DELETE FROM limiter_entries").rowcount
+        return counters + entries
+
+    def check(self) -> bool:
+        try:
+            with self.store.transaction() as conn:
+                conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    # Moving window
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        with self.store.transaction() as conn:
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM limiter_entries WHERE key = ? AND at > ?", (key, now - expiry)
+            ).fetchone()
+            if count + amount > limit:
+                return False
+            conn.executemany(
+                "INSERT INTO limiter_entries (key, at, expires_at) VALUES (?, ?, ?)",
+                [(key, now, now + expiry)] * amount,
+            )
+            self._sweep(conn, now)
+        return True
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> Tuple[float, int]:
+        now = time.time()
+        with self.store.transaction() as conn:
+            oldest, count = conn.execute(
+                "SELECT MIN(at), COUNT(*) FROM limiter_entries WHERE key = ? AND at > ?", (key, now - expiry)
+            ).fetchone()
+        return (oldest, count) if count else (now, 0)
+
+
+__all__ = [
+    "SQLiteLimiterStorage",
+    "limiter_storage_uri",
+]
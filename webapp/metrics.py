@@ -0,0 +1,357 @@
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus-style metrics without a client library.
+#
+# Counters, gauges and histograms live in a Registry and are rendered in the
+# text exposition format (version 0.0.4) by render(), which the webapp and
+# the model servers serve at /metrics. Labels are passed as keyword
+# arguments on every call (STAGE_SECONDS.observe(0.4, stage="ttfb",
+# engine="chatterbox")); each label set is one dict entry guarded by a lock,
+# so recording costs a tuple build and a dict lookup.
+#
+# Collectors are callables returning (name, labels, value) gauge samples,
+# read at scrape time (e.g. HealthMonitor.metrics()).
+#
+# Under gunicorn each worker has its own registry. With METRICS_DIR set,
+# every process writes a snapshot there every METRICS_FLUSH_INTERVAL seconds
+# and render() merges them: counters and histograms are summed (including
+# exited workers, so totals never go backwards), gauges come from the most
+# recent snapshot of a live process. Clear METRICS_DIR on deploy.
+#
+# Identical copies of this file ship with indextts-server/ and
+# vibevoice-server/, which are deployed on their own.
+
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "15"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; TTS stages run from milliseconds (cache, connect) to minutes (long-form synthesis)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _log():
+    # tts_logging imports this module, so the logger is looked up on use
+    from tts_logging import get_logger
+    return get_logger("metrics")
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> Dict[LabelValues, object]:
+        with self._lock:
+            return {key: (list(value) if isinstance(value, list) else value) for key, value in self._values.items()}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    """Cumulative buckets; each label set holds [count per bucket..., +Inf count, sum]."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """Observe the duration of the with-block (also when it raises)."""
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - began, **labels)
+
+    def count(self, **labels: object) -> float:
+        row = self._values.get(self._key(labels))
+        return sum(row[:-1]) if row else 0.0
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        self._collectors.append(collector)
+
+    # Snapshots ---------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, dict]:
+        """JSON-safe state of every metric (collectors excluded)."""
+        families = {}
+        for metric in list(self._metrics.values()):
+            families[metric.name] = {
+                "kind": metric.kind,
+                "help": metric.documentation,
+                "labels": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "values": [[list(key), value] for key, value in metric.snapshot().items()],
+            }
+        return families
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(METRICS_DIR, f"metrics-{pid}.json")
+
+    def write_snapshot(self) -> None:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = self._snapshot_path(os.getpid())
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"pid": os.getpid(), "time": time.time(), "families": self.snapshot()}, fh)
+        os.replace(tmp, path)
+
+    def _run_flusher(self) -> None:
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                _log().warning('metrics.snapshot_failed', error=str(e))
+
+    def ensure_started(self) -> None:
+        """Start the snapshot writer for this process (no-op without METRICS_DIR)."""
+        if not METRICS_DIR:
+            return
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._run_flusher, daemon=True, name="metrics-flush")
+                self._flusher.start()
+
+    def _merged(self) -> Dict[str, dict]:
+        own = self.snapshot()
+        if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+            return own
+        snapshots = []
+        for entry in os.listdir(METRICS_DIR):
+            if not (entry.startswith("metrics-") and entry.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(METRICS_DIR, entry)) as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            if data.get("pid") != os.getpid():
+                snapshots.append(data)
+        snapshots.sort(key=lambda data: data.get("time", 0))
+        snapshots.append({"pid": os.getpid(), "families": own})
+
+        merged: Dict[str, dict] = {}
+        for data in snapshots:
+            live = _pid_alive(data.get("pid"))
+            for name, family in data.get("families", {}).items():
+                target = merged.setdefault(name, {**family, "values": {}})
+                values = target["values"]
+                for key, value in family["values"]:
+                    key = tuple(key)
+                    if family["kind"] == "gauge":
+                        if live:
+                            values[key] = value  # latest snapshot wins
+                    elif family["kind"] == "histogram":
+                        row = values.get(key)
+                        values[key] = list(value) if row is None else [a + b for a, b in zip(row, value)]
+                    else:
+                        values[key] = values.get(key, 0.0) + value
+        for family in merged.values():
+            family["values"] = list(family["values"].items())
+        return merged
+
+    # Exposition --------------------------------------------------------
+
+    def render(self) -> str:
+        """All metrics (merged across workers with METRICS_DIR) plus collector samples."""
+        lines: List[str] = []
+        for name, family in sorted(self._merged().items()):
+            labelnames = family["labels"]
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for key, value in sorted(family["values"], key=lambda item: tuple(item[0])):
+                if family["kind"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(list(family["buckets"]) + [math.inf], value[:-1]):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {_format_value(cumulative)}")
+                lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(labelnames, key)} {_format_value(cumulative)}")
+
+        collected: Dict[str, List[Tuple[Dict[str, str], float]]] = {}
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    collected.setdefault(name, []).append((labels, value))
+            except Exception as e:  # a broken collector must not break the scrape
+                _log().exception('metrics.collector_failed', error=str(e))
+        for name, samples in sorted(collected.items()):
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.counter(name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.gauge(name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.histogram(name, documentation, labelnames, buckets)
+
+
+# Shared by the webapp and the model servers so dashboards can line stages up
+STAGE_SECONDS = histogram(
+    "tts_stage_seconds",
+    "Time spent per pipeline stage (queue_wait, connect, ttfb, download, synthesis, assembly, file_write).",
+    ("stage", "engine"),
+)
+CHARACTERS = counter("tts_characters_total", "Characters sent to an engine for synthesis.", ("engine",))
+ENGINE_ERRORS = counter("tts_engine_errors_total", "Failed synthesis calls.", ("engine", "error"))
+CACHE_LOOKUPS = counter("tts_cache_lookups_total", "Rendered-audio cache lookups by result (hit, miss).", ("engine", "result"))
+RTF = gauge("tts_realtime_factor", "Compute time / audio duration of the last generation per voice.", ("engine", "voice"))
+
+
+__all__ = [
+    "CACHE_LOOKUPS",
+    "CHARACTERS",
+    "CONTENT_TYPE",
+    "Counter",
+    "ENGINE_ERRORS",
+    "Gauge",
+    "Histogram",
+    "REGISTRY",
+    "RTF",
+    "Registry",
+    "STAGE_SECONDS",
+    "counter",
+    "gauge",
+    "histogram",
+]
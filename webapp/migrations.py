@@ -0,0 +1,225 @@
+import contextlib
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+try:
+    import fcntl  # POSIX only; elsewhere the schema_version row is the only guard
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from api_key_cache import display_prefix, hash_api_key
+from mobile_sessions import hash_token, session_expiry
+
+# Versioned schema migrations.
+#
+# Each migration has an integer version and runs once per database; applied
+# versions are recorded in the schema_version table. Migrations run from the
+# release step (`flask --app webapp.app migrate`) or, with
+# MIGRATE_ON_STARTUP (default on), from the first worker to boot on a stale
+# schema. Either way they run under a lock -- pg_advisory_lock on
+# PostgreSQL, an flock on a lock file otherwise -- so concurrent workers
+# never race on ALTER TABLE. A worker on a current schema pays one
+# `SELECT MAX(version)` at import.
+#
+# Migrations must be idempotent with respect to databases created before
+# this table existed: those start at version 0 and replay everything.
+
+MIGRATE_ON_STARTUP = os.environ.get("MIGRATE_ON_STARTUP", "1").lower() not in ("0", "false", "no")
+SCHEMA_TABLE = "schema_version"
+ADVISORY_LOCK_KEY = 0x43545453  # "CTTS"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+class MigrationRunner:
+    def __init__(self, engine: Callable[[], Engine], migrations: Sequence[Migration],
+                 metadata=None, lock_path: Optional[Path] = None):
+        # engine is a callable so Flask-SQLAlchemy's engine can be resolved lazily
+        self._engine = engine
+        self.migrations = sorted(migrations, key=lambda m: m.version)
+        versions = [m.version for m in self.migrations]
+        if len(set(versions)) != len(versions):
+            raise ValueError("duplicate migration versions")
+        self.metadata = metadata
+        self.lock_path = Path(lock_path) if lock_path else None
+
+    @property
+    def head(self) -> int:
+        return self.migrations[-1].version if self.migrations else 0
+
+    def current_version(self) -> int:
+        """Highest applied version (0 for a database that predates migrations)."""
+        with self._engine().connect() as conn:
+            return self._current(conn)
+
+    def _current(self, conn: Connection) -> int:
+        try:
+            version = conn.execute(text(f"SELECT MAX(version) FROM {SCHEMA_TABLE}")).scalar()
+        except DBAPIError:
+            conn.rollback()
+            return 0
+        return version or 0
+
+    def pending(self) -> List[Migration]:
+        current = self.current_version()
+        return [m for m in self.migrations if m.version > current]
+
+    def upgrade(self) -> List[Migration]:
+        """Create missing tables and apply pending migrations. Returns what ran."""
+        applied = []
+        with self._engine().connect() as conn, self._locked(conn):
+            if self.metadata is not None:
+                self.metadata.create_all(conn)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} ("
+                "version INTEGER PRIMARY KEY, name VARCHAR(128) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+            ))
+            conn.commit()
+            current = self._current(conn)  # re-read: another process may have won the lock first
+            for migration in self.migrations:
+                if migration.version <= current:
+                    continue
+                try:
+                    migration.apply(conn)
+                    conn.execute(
+                        text(f"INSERT INTO {SCHEMA_TABLE} (version, name, applied_at) VALUES (:v, :n, :t)"),
+                        {"v": migration.version, "n": migration.name, "t": datetime.utcnow()},
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                applied.append(migration)
+                print(f"[MIGRATION] Applied {migration.version:04d} {migration.name}")
+        return applied
+
+    def ensure_current(self) -> List[Migration]:
+        """upgrade() only if the schema is behind; a single query otherwise."""
+        if self.current_version() >= self.head:
+            return []
+        return self.upgrade()
+
+    @contextlib.contextmanager
+    def _locked(self, conn: Connection) -> Iterator[None]:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": ADVISORY_LOCK_KEY})
+            conn.commit()
+            try:
+                yield
+            finally:
+                conn.rollback()
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": ADVISORY_LOCK_KEY})
+                conn.commit()
+        elif fcntl is not None and self.lock_path is not None:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a+b") as fh:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+        else:
+            yield
+
+
+# -------- Migrations --------
+
+# Columns added to "user" over time, from before versioned migrations
+_LEGACY_USER_COLUMNS = [
+    ("api_tier", "VARCHAR(32) DEFAULT 'none'"),
+    ("api_credits", "INTEGER DEFAULT 0"),
+    ("api_stripe_subscription_id", "VARCHAR(255)"),
+    ("api_chars_used", "INTEGER DEFAULT 0"),
+    ("api_usage_reset_at", "TIMESTAMP"),
+    ("mobile_session_token", "VARCHAR(255)"),
+    ("mobile_session_expires", "TIMESTAMP"),
+    ("chars_used", "INTEGER DEFAULT 0"),
+    ("chars_reset_at", "TIMESTAMP"),
+    ("premium_tier", "VARCHAR(32) DEFAULT 'none'"),
+    ("premium_chars_used", "INTEGER DEFAULT 0"),
+    ("premium_chars_reset_at", "TIMESTAMP"),
+    ("premium_stripe_subscription_id", "VARCHAR(255)"),
+    ("premium_overage_cents", "INTEGER DEFAULT 0"),
+    ("indextts_tier", "VARCHAR(32) DEFAULT 'none'"),
+    ("indextts_chars_used", "INTEGER DEFAULT 0"),
+    ("indextts_chars_reset_at", "TIMESTAMP"),
+    ("indextts_stripe_subscription_id", "VARCHAR(255)"),
+    ("vibevoice_tier", "VARCHAR(32) DEFAULT 'none'"),
+    ("vibevoice_chars_used", "INTEGER DEFAULT 0"),
+    ("vibevoice_chars_reset_at", "TIMESTAMP"),
+    ("vibevoice_stripe_subscription_id", "VARCHAR(255)"),
+    ("vibevoice_hourly_seconds", "INTEGER DEFAULT 0"),
+    ("vibevoice_daily_seconds", "INTEGER DEFAULT 0"),
+    ("vibevoice_hourly_reset_at", "TIMESTAMP"),
+    ("vibevoice_daily_reset_at", "TIMESTAMP"),
+    ("vibevoice_request_count", "INTEGER DEFAULT 0"),
+    ("vibevoice_request_minute", "TIMESTAMP"),
+]
+
+
+def _columns(conn: Connection, table: str) -> set:
+    return {col["name"] for col in inspect(conn).get_columns(table)}
+
+
+def add_legacy_user_columns(conn: Connection) -> None:
+    existing = _columns(conn, "user")
+    for name, ddl in _LEGACY_USER_COLUMNS:
+        if name not in existing:
+            conn.execute(text(f'ALTER TABLE "user" ADD COLUMN {name} {ddl}'))
+
+
+def hash_plaintext_api_keys(conn: Connection) -> None:
+    if "key_prefix" not in _columns(conn, "api_key"):
+        conn.execute(text("ALTER TABLE api_key ADD COLUMN key_prefix VARCHAR(16)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_api_key_user_id ON api_key (user_id)"))
+    plaintext = conn.execute(text("SELECT id, key FROM api_key WHERE key LIKE 'ctts!_%' ESCAPE '!'")).fetchall()
+    for key_id, raw_key in plaintext:
+        conn.execute(
+            text("UPDATE api_key SET key = :hash, key_prefix = :prefix WHERE id = :id"),
+            {"hash": hash_api_key(raw_key), "prefix": display_prefix(raw_key), "id": key_id},
+        )
+
+
+def move_mobile_sessions(conn: Connection) -> None:
+    legacy = conn.execute(text(
+        'SELECT id, mobile_session_token, mobile_session_expires FROM "user" '
+        "WHERE mobile_session_token IS NOT NULL"
+    )).fetchall()
+    for user_id, raw_token, expires_at in legacy:
+        conn.execute(
+            text("INSERT INTO mobile_session (user_id, token_hash, created_at, expires_at) "
+                 "VALUES (:user_id, :hash, :now, :expires)"),
+            {"user_id": user_id, "hash": hash_token(raw_token), "now": datetime.utcnow(),
+             "expires": expires_at or session_expiry()},
+        )
+    conn.execute(text(
+        'UPDATE "user" SET mobile_session_token = NULL, mobile_session_expires = NULL '
+        "WHERE mobile_session_token IS NOT NULL"
+    ))
+
+
+MIGRATIONS = [
+    Migration(1, "add_legacy_user_columns", add_legacy_user_columns),
+    Migration(2, "hash_plaintext_api_keys", hash_plaintext_api_keys),
+    Migration(3, "move_mobile_sessions", move_mobile_sessions),
+]
+
+
+__all__ = [
+    "MIGRATIONS",
+    "MIGRATE_ON_STARTUP",
+    "Migration",
+    "MigrationRunner",
+]
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Mobile app sessions live in their own table keyed by a SHA-256 of the
+# bearer token (unique index), with an expiry. Validated sessions are kept
+# in a small per-worker LRU so repeat requests from the same device skip the
+# session lookup. Entries never outlive the session itself and are dropped
+# after MOBILE_SESSION_CACHE_TTL seconds, which bounds how long a logout in
+# another worker can go unnoticed.
+
+MOBILE_SESSION_DAYS = int(os.environ.get("MOBILE_SESSION_DAYS", "30"))
+MOBILE_SESSION_CACHE_TTL = float(os.environ.get("MOBILE_SESSION_CACHE_TTL", "60"))
+MOBILE_SESSION_CACHE_SIZE = int(os.environ.get("MOBILE_SESSION_CACHE_SIZE", "2048"))
+SESSION_CLEANUP_INTERVAL = float(os.environ.get("MOBILE_SESSION_CLEANUP_INTERVAL", "3600"))
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def session_expiry(now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.utcnow()) + timedelta(days=MOBILE_SESSION_DAYS)
+
+
+@dataclass(frozen=True)
+class CachedSession:
+    user_id: int
+    expires_at: Optional[datetime]
+
+
+class SessionCache:
+    """LRU of token hash -> CachedSession with a per-entry TTL."""
+
+    def __init__(self, ttl: float = MOBILE_SESSION_CACHE_TTL, max_size: int = MOBILE_SESSION_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # hash -> (cached_until, CachedSession)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._last_cleanup = time.monotonic()
+
+    def get(self, token_hash: str) -> Optional[CachedSession]:
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is not None:
+                cached_until, session = entry
+                live = session.expires_at is None or session.expires_at > datetime.utcnow()
+                if cached_until > time.monotonic() and live:
+                    self._entries.move_to_end(token_hash)
+                    self.hits += 1
+                    return session
+                del self._entries[token_hash]
+            self.misses += 1
+            return None
+
+    def put(self, token_hash: str, session: CachedSession) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[token_hash] = (time.monotonic() + self.ttl, session)
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token_hash: Optional[str] = None, user_id: Optional[int] = None) -> None:
+        """Drop one session, every session of a user, or everything."""
+        with self._lock:
+            if token_hash is None and user_id is None:
+                self._entries.clear()
+                return
+            self._entries.pop(token_hash, None)
+            if user_id is not None:
+                for cached_hash, (_, session) in list(self._entries.items()):
+                    if session.user_id == user_id:
+                        del self._entries[cached_hash]
+
+    def cleanup_due(self, interval: float = SESSION_CLEANUP_INTERVAL) -> bool:
+        """True at most once per interval per process (for bulk expiry)."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_cleanup < interval:
+                return False
+            self._last_cleanup = now
+            return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+__all__ = [
+    "CachedSession",
+    "SessionCache",
+    "hash_token",
+    "session_expiry",
+    "MOBILE_SESSION_DAYS",
+]
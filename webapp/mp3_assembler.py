@@ -0,0 +1,280 @@
+import struct
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple, Union
+
+# Frame-accurate MP3 concatenation.
+#
+# Parts are read in bounded blocks and split into MPEG audio frames; ID3v2
+# tags, trailing ID3v1/APE tags, stray bytes between parts and each part's
+# own Xing/Info/VBRI frame are dropped, so the output is one clean frame
+# stream. A placeholder frame is written first and, once every part has
+# been copied, rewritten as a Xing/Info header carrying the frame count,
+# byte count and a 100-entry seek table (TOC). Players then know the
+# duration up front and can seek in hour-long files without scanning.
+#
+# Only Layer III is handled (what Edge TTS and the model servers emit).
+
+READ_BLOCK_SIZE = 64 * 1024
+
+_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),  # MPEG-1
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),  # MPEG-2 / 2.5
+}
+_SAMPLE_RATES = {
+    0b11: (44100, 48000, 32000),  # MPEG-1
+    0b10: (22050, 24000, 16000),  # MPEG-2
+    0b00: (11025, 12000, 8000),  # MPEG-2.5
+}
+_XING_FLAGS = 0x1 | 0x2 | 0x4  # frames, bytes, TOC
+_TOC_ENTRIES = 100
+
+
+@dataclass(frozen=True)
+class FrameHeader:
+    version: int  # version bits: 0b11 MPEG-1, 0b10 MPEG-2, 0b00 MPEG-2.5
+    bitrate: int  # kbit/s
+    sample_rate: int
+    padding: bool
+    mono: bool
+    crc: bool
+    length: int  # whole frame in bytes, header included
+    raw: bytes  # the 4 header bytes
+
+    @property
+    def mpeg1(self) -> bool:
+        return self.version == 0b11
+
+    @property
+    def samples(self) -> int:
+        return 1152 if self.mpeg1 else 576
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.sample_rate
+
+    @property
+    def side_info_end(self) -> int:
+        """Offset of the first byte after the side information."""
+        if self.mpeg1:
+            side = 17 if self.mono else 32
+        else:
+            side = 9 if self.mono else 17
+        return 4 + (2 if self.crc else 0) + side
+
+    def compatible(self, other: "FrameHeader") -> bool:
+        return (self.version, self.sample_rate, self.mono) == (other.version, other.sample_rate, other.mono)
+
+
+def _frame_length(version: int, bitrate: int, sample_rate: int, padding: bool) -> int:
+    coefficient = 144 if version == 0b11 else 72
+    return coefficient * bitrate * 1000 // sample_rate + int(padding)
+
+
+def parse_header(data: bytes, offset: int = 0) -> Optional[FrameHeader]:
+    """FrameHeader for a Layer III frame starting at data[offset], else None."""
+    if len(data) - offset < 4:
+        return None
+    b0, b1, b2, b3 = data[offset:offset + 4]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 0b11
+    layer = (b1 >> 1) & 0b11
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0b11
+    if version == 0b01 or layer != 0b01 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = _BITRATES[1 if version == 0b11 else 2][bitrate_index]
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = bool(b2 & 0b10)
+    return FrameHeader(
+        version=version,
+        bitrate=bitrate,
+        sample_rate=sample_rate,
+        padding=padding,
+        mono=(b3 >> 6) == 0b11,
+        crc=not (b1 & 1),
+        length=_frame_length(version, bitrate, sample_rate, padding),
+        raw=bytes(data[offset:offset + 4]),
+    )
+
+
+def is_info_frame(header: FrameHeader, frame: bytes) -> bool:
+    """True for a Xing/Info/VBRI metadata frame (silent; carries no audio)."""
+    tag_at = header.side_info_end
+    return frame[tag_at:tag_at + 4] in (b"Xing", b"Info") or frame[36:40] == b"VBRI"
+
+
+def _id3v2_size(data: bytes) -> int:
+    """Length of an ID3v2 tag at the start of data (header/footer included)."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def iter_frames(fh: BinaryIO, block_size: int = READ_BLOCK_SIZE) -> Iterator[Tuple[FrameHeader, bytes]]:
+    """Yield (header, frame bytes) for each audio frame, reading in blocks."""
+    buf = bytearray()
+    pos = 0
+    eof = False
+    skip = None  # bytes of ID3v2 tag still to discard (None: not checked yet)
+
+    def fill(need: int) -> bool:
+        nonlocal buf, pos, eof
+        while len(buf) - pos < need and not eof:
+            if pos:
+                del buf[:pos]
+                pos = 0
+            chunk = fh.read(block_size)
+            if not chunk:
+                eof = True
+            buf.extend(chunk)
+        return len(buf) - pos >= need
+
+    while True:
+        if skip is None:
+            fill(10)
+            skip = _id3v2_size(bytes(buf[pos:pos + 10]))
+        while skip:
+            if not fill(1):
+                return
+            step = min(skip, len(buf) - pos)
+            pos += step
+            skip -= step
+        if not fill(4):
+            return
+        header = parse_header(buf, pos)
+        if header is None:
+            pos += 1
+            continue
+        # Require the next header to follow, so sync-like bytes inside tags
+        # or junk don't pass as frames (the last frame only has to fit)
+        if not fill(header.length + 4):
+            if len(buf) - pos < header.length:
+                return
+        else:
+            following = parse_header(buf, pos + header.length)
+            if following is None or not following.compatible(header):
+                if buf[pos + header.length:pos + header.length + 3] not in (b"TAG", b"APE", b"ID3"):
+                    pos += 1
+                    continue
+        frame = bytes(buf[pos:pos + header.length])
+        pos += header.length
+        yield header, frame
+
+
+@dataclass
+class Mp3Info:
+    frames: int = 0
+    bytes: int = 0  # whole output, header frame included
+    duration: float = 0.0
+    vbr: bool = False
+
+
+def _info_frame_header(first: FrameHeader) -> FrameHeader:
+    """Smallest frame with first's format that fits the Xing payload."""
+    needed = first.side_info_end - (2 if first.crc else 0) + 8 + 8 + _TOC_ENTRIES
+    table = _BITRATES[1 if first.mpeg1 else 2]
+    for index, bitrate in enumerate(table):
+        if index == 0:
+            continue
+        length = _frame_length(first.version, bitrate, first.sample_rate, False)
+        if length >= needed:
+            b0, b1, _, b3 = first.raw
+            raw = bytes([b0, b1 | 1, (index << 4) | (first.raw[2] & 0b1100), b3])  # no CRC, no padding
+            return parse_header(raw)
+    raise ValueError("no bitrate large enough for a Xing frame")
+
+
+def _info_frame(header: FrameHeader, info: Mp3Info, toc: bytes) -> bytes:
+    frame = bytearray(header.length)
+    frame[:4] = header.raw
+    at = header.side_info_end
+    frame[at:at + 4] = b"Xing" if info.vbr else b"Info"
+    frame[at + 4:at + 16] = struct.pack(">III", _XING_FLAGS, info.frames, info.bytes)
+    frame[at + 16:at + 16 + _TOC_ENTRIES] = toc
+    return bytes(frame)
+
+
+def _seek_table(offsets: array, ends: array, total_bytes: int, duration: float) -> bytes:
+    """TOC[i]: byte position (x256 / file size) where i% of the duration starts."""
+    toc = bytearray(_TOC_ENTRIES)
+    frame = 0
+    for i in range(_TOC_ENTRIES):
+        target = duration * i / _TOC_ENTRIES
+        while frame < len(ends) - 1 and ends[frame] <= target:
+            frame += 1
+        toc[i] = min(255, offsets[frame] * 256 // total_bytes) if offsets else 0
+    return bytes(toc)
+
+
+Source = Union[str, Path, BinaryIO]
+
+
+def assemble_mp3(sources: Iterable[Source], dest: Union[str, Path]) -> Mp3Info:
+    """Concatenate MP3 parts into dest with a Xing/Info header. Returns totals."""
+    info = Mp3Info()
+    offsets = array("Q")  # byte offset of each audio frame in dest
+    ends = array("d")  # playback time at the end of each audio frame
+    first: Optional[FrameHeader] = None
+    info_header: Optional[FrameHeader] = None
+    bitrates = set()
+
+    with open(dest, "w+b") as out:
+        for source in sources:
+            fh = open(source, "rb") if isinstance(source, (str, Path)) else source
+            try:
+                for header, frame in iter_frames(fh):
+                    if is_info_frame(header, frame):
+                        continue
+                    if first is None:
+                        first = header
+                        info_header = _info_frame_header(first)
+                        out.write(bytes(info_header.length))  # placeholder
+                        info.bytes = info_header.length
+                    offsets.append(info.bytes)
+                    out.write(frame)
+                    info.bytes += header.length
+                    info.frames += 1
+                    info.duration += header.duration
+                    ends.append(info.duration)
+                    bitrates.add(header.bitrate)
+            finally:
+                if fh is not source:
+                    fh.close()
+        if first is None:
+            raise ValueError("no MP3 audio frames in the input")
+        info.vbr = len(bitrates) > 1
+        out.seek(0)
+        out.write(_info_frame(info_header, info, _seek_table(offsets, ends, info.bytes, info.duration)))
+    return info
+
+
+def read_info(path: Union[str, Path]) -> Optional[Tuple[int, int, bytes]]:
+    """(frames, bytes, toc) from a file's Xing/Info header, if it has one."""
+    with open(path, "rb") as fh:
+        for header, frame in iter_frames(fh):
+            if not is_info_frame(header, frame) or frame[36:40] == b"VBRI":
+                return None
+            at = header.side_info_end + 4
+            flags, frames, size = struct.unpack(">III", frame[at:at + 12])
+            if flags != _XING_FLAGS:
+                return None
+            return frames, size, frame[at + 12:at + 12 + _TOC_ENTRIES]
+    return None
+
+
+__all__ = [
+    "FrameHeader",
+    "Mp3Info",
+    "assemble_mp3",
+    "is_info_frame",
+    "iter_frames",
+    "parse_header",
+    "read_info",
+]
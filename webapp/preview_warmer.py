@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+try:
+    import fcntl  # POSIX only; elsewhere every worker warms (renders still coalesce)
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from tts_logging import get_logger
+
+# Speculative rendering of fixed-text voice previews.
+#
+# Preset and catalog-voice previews always use the same sample text, so the
+# whole preset x voice matrix can be rendered ahead of time into the normal
+# synthesis cache. A background thread walks the matrix after deploy and
+# again every PREVIEW_PREWARM_INTERVAL seconds (which picks up voices added
+# to a model server's catalog). Rendering is bounded by a small worker pool
+# and a token-bucket rate limit so warming never crowds out real traffic.
+# Only one gunicorn worker warms at a time (non-blocking flock on a lock
+# file); if it dies another takes over on its next round.
+
+PREWARM_ENABLED = os.environ.get("PREVIEW_PREWARM", "1").lower() not in ("0", "false", "no", "off")
+PREWARM_CONCURRENCY = int(os.environ.get("PREVIEW_PREWARM_CONCURRENCY", "2"))
+PREWARM_RATE = float(os.environ.get("PREVIEW_PREWARM_RATE", "0.5"))  # renders started per second
+PREWARM_INTERVAL = float(os.environ.get("PREVIEW_PREWARM_INTERVAL", "900"))
+PREWARM_DELAY = float(os.environ.get("PREVIEW_PREWARM_DELAY", "5"))  # let the app finish booting
+
+log = get_logger("prewarm")
+
+PathLike = Union[str, Path]
+
+
+@dataclass(frozen=True)
+class WarmJob:
+    """
+    One preview to pre-render. render() must be the same cache-aware call
+    the preview endpoint makes, so both land on output_path.
+    """
+
+    name: str
+    output_path: Path
+    render: Callable[[], Any]
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class PreviewWarmer:
+    """
+    Renders every job from `sources` that isn't cached yet.
+
+    sources maps a label to a callable returning WarmJobs; a source that
+    fails (model server down, catalog unreachable) is skipped for the round.
+    """
+
+    def __init__(self, sources: Dict[str, Callable[[], Iterable[WarmJob]]], lock_path: PathLike,
+                 concurrency: int = PREWARM_CONCURRENCY, rate: float = PREWARM_RATE,
+                 interval: float = PREWARM_INTERVAL, delay: float = PREWARM_DELAY):
+        self.sources = sources
+        self.lock_path = Path(lock_path)
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate)
+        self.interval = interval
+        self.delay = delay
+        self.last_run: Dict[str, Any] = {}
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def jobs(self) -> List[WarmJob]:
+        jobs: Dict[Path, WarmJob] = {}
+        for label, source in self.sources.items():
+            try:
+                for job in source():
+                    jobs.setdefault(job.output_path, job)
+            except Exception as e:
+                log.warning('prewarm.source_failed', source=label, error=str(e))
+        return list(jobs.values())
+
+    def _render(self, job: WarmJob) -> bool:
+        if job.output_path.exists():
+            return True
+        self.limiter.acquire()
+        try:
+            job.render()
+            return True
+        except Exception as e:
+            log.warning('prewarm.failed', preview=job.name, error=str(e))
+            return False
+
+    def run_once(self) -> Dict[str, Any]:
+        """Render missing previews; returns counts for the round."""
+        began = time.monotonic()
+        jobs = self.jobs()
+        missing = [job for job in jobs if not job.output_path.exists()]
+        rendered = failed = 0
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(missing)),
+                                    thread_name_prefix="prewarm") as executor:
+                for ok in executor.map(self._render, missing):
+                    if ok:
+                        rendered += 1
+                    else:
+                        failed += 1
+        stats = {
+            "jobs": len(jobs),
+            "cached": len(jobs) - len(missing),
+            "rendered": rendered,
+            "failed": failed,
+            "seconds": round(time.monotonic() - began, 3),
+        }
+        self.last_run = stats
+        if missing:
+            log.info('prewarm.round', missing=len(missing), **stats)
+        return stats
+
+    def run_if_leader(self) -> Optional[Dict[str, Any]]:
+        """run_once() unless another worker is already warming."""
+        if fcntl is None:
+            return self.run_once()
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+b") as fh:
+            try:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            try:
+                return self.run_once()
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def ensure_started(self) -> None:
+        """Start the background thread once per process (gunicorn forks after import)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            threading.Thread(target=self._run, name="preview-prewarm", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        if self._stop.wait(self.delay):
+            return
+        while not self._stop.is_set():
+            try:
+                self.run_if_leader()
+            except Exception as e:  # never let the warmer die
+                log.exception('prewarm.round_failed', error=str(e))
+            self._stop.wait(self.interval)
+
+
+__all__ = [
+    "PreviewWarmer",
+    "RateLimiter",
+    "WarmJob",
+    "PREWARM_ENABLED",
+]
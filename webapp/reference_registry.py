@@ -0,0 +1,196 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+# Registry of reference audio for Chatterbox voice cloning.
+#
+# Every cloned-voice chunk needs its reference WAV on the Chatterbox server.
+# Instead of fetching /get_reference_files (and maybe re-uploading) per chunk,
+# the registry remembers which local content it has put on the server and
+# only talks to the server again when:
+#   - the local file's content changes (sha256, cached by mtime/size),
+#   - the server restarts (new "generation" from its health endpoint), or
+#   - the cached manifest is older than the TTL and no generation is exposed.
+# Within one server generation each file is uploaded at most once.
+#
+# Server calls happen outside the registry-wide lock, which only guards the
+# bookkeeping: revalidation and manifest fetches are done by one thread at a
+# time, and uploads are serialized per filename, so segments using different
+# voices never wait on each other's uploads.
+
+MANIFEST_TTL = float(os.environ.get("CHATTERBOX_MANIFEST_TTL", "300"))
+
+# Health-response fields that change when the server process restarts
+GENERATION_FIELDS = ("boot_id", "instance_id", "started_at", "start_time", "server_start_time", "pid", "version")
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file, read in 1 MB pieces."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def generation_from_health(payload: Any) -> Optional[Tuple]:
+    """Restart-sensitive fingerprint from a health JSON body, or None if it has none."""
+    if not isinstance(payload, dict):
+        return None
+    values = tuple((k, payload[k]) for k in GENERATION_FIELDS if payload.get(k) is not None)
+    return values or None
+
+
+class ReferenceRegistry:
+    """
+    Tracks which reference files are on the server.
+
+    list_files() returns the server's filenames (raising on failure).
+    upload(local_path, filename) uploads and returns the server filename.
+    probe_generation() returns a fingerprint that changes on restart, or
+    None if the server doesn't expose one.
+    """
+
+    def __init__(
+        self,
+        list_files: Callable[[], Iterable[str]],
+        upload: Callable[[str, str], Optional[str]],
+        probe_generation: Optional[Callable[[], Optional[Tuple]]] = None,
+        ttl: float = MANIFEST_TTL,
+    ):
+        self._list_files = list_files
+        self._upload = upload
+        self._probe_generation = probe_generation
+        self.ttl = ttl
+        self._lock = threading.Lock()  # bookkeeping only; never held across server calls
+        self._refresh_lock = threading.Lock()  # one revalidation / manifest fetch at a time
+        self._file_locks: Dict[str, threading.Lock] = {}
+        self._digests: Dict[str, Tuple[int, int, str]] = {}  # path -> (mtime_ns, size, sha256)
+        # server filename -> sha256 of the local content the server copy matches
+        # (for files found already on the server: the local content at that time)
+        self._uploaded: Dict[str, str] = {}
+        self._manifest: Optional[Set[str]] = None
+        self._generation: Optional[Tuple] = None
+        self._epoch = 0  # bumped whenever server state is forgotten
+        self._checked_at = 0.0
+        self.stats = {"manifest_fetches": 0, "uploads": 0, "generation_probes": 0}
+
+    def digest(self, path: str) -> str:
+        st = os.stat(path)
+        cached = self._digests.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        value = file_digest(path)
+        self._digests[path] = (st.st_mtime_ns, st.st_size, value)
+        return value
+
+    def _forget_server_state(self) -> None:
+        """Called with the lock held."""
+        self._uploaded.clear()
+        self._manifest = None
+        self._epoch += 1
+
+    def _file_lock(self, filename: str) -> threading.Lock:
+        with self._lock:
+            lock = self._file_locks.get(filename)
+            if lock is None:
+                lock = self._file_locks[filename] = threading.Lock()
+            return lock
+
+    def _fetch_manifest(self) -> Set[str]:
+        """Called with the refresh lock held."""
+        self.stats["manifest_fetches"] += 1
+        manifest = set(self._list_files())
+        with self._lock:
+            self._manifest = manifest
+        return manifest
+
+    def _current_manifest(self) -> Set[str]:
+        manifest = self._manifest
+        if manifest is not None:
+            return manifest
+        with self._refresh_lock:
+            manifest = self._manifest
+            return manifest if manifest is not None else self._fetch_manifest()
+
+    def _refresh_if_stale(self) -> None:
+        if time.monotonic() - self._checked_at < self.ttl:
+            return
+        with self._refresh_lock:
+            # Another thread may have revalidated while this one waited
+            if self.ttl and time.monotonic() - self._checked_at < self.ttl:
+                return
+            self._revalidate()
+
+    def _revalidate(self) -> None:
+        """Called with the refresh lock held once the TTL has lapsed."""
+        generation = None
+        if self._probe_generation is not None:
+            self.stats["generation_probes"] += 1
+            try:
+                generation = self._probe_generation()
+            except Exception:
+                generation = None
+        if generation is not None:
+            with self._lock:
+                if generation != self._generation:
+                    # Server restarted (or first probe): nothing we uploaded can be assumed
+                    self._forget_server_state()
+                    self._generation = generation
+        else:
+            # No generation available: confirm against a fresh manifest instead
+            manifest = self._fetch_manifest()
+            with self._lock:
+                for name in [n for n in self._uploaded if n not in manifest]:
+                    del self._uploaded[name]
+        self._checked_at = time.monotonic()
+
+    def ensure(self, local_path: str, filename: str) -> str:
+        """
+        Make local_path available on the server as filename; returns the server
+        filename. Raises FileNotFoundError or whatever upload() raises.
+        """
+        content = self.digest(local_path)
+        self._refresh_if_stale()
+
+        with self._file_lock(filename):
+            with self._lock:
+                known = self._uploaded.get(filename)
+                epoch = self._epoch
+            if known == content:
+                return filename
+            if known is None and filename in self._current_manifest():
+                # Already on the server (uploaded by another worker or a previous
+                # run); taken to match the local file until that changes
+                with self._lock:
+                    if self._epoch == epoch:
+                        self._uploaded[filename] = content
+                return filename
+
+            server_name = self._upload(local_path, filename) or filename
+            with self._lock:
+                self.stats["uploads"] += 1
+                if self._epoch == epoch:
+                    self._uploaded[filename] = content
+                    self._uploaded[server_name] = content
+                    if self._manifest is not None:
+                        self._manifest.update({filename, server_name})
+            return server_name
+
+    def invalidate(self, filename: Optional[str] = None) -> None:
+        """Forget server state for one file (e.g. the server rejected it) or for all files."""
+        with self._lock:
+            if filename is None:
+                self._forget_server_state()
+                self._checked_at = 0.0
+            else:
+                self._uploaded.pop(filename, None)
+                if self._manifest is not None:
+                    self._manifest.discard(filename)
+
+
+__all__ = ["ReferenceRegistry", "file_digest", "generation_from_health", "MANIFEST_TTL"]
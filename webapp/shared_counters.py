@@ -0,0 +1,300 @@
+import atexit
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+from tts_logging import get_logger
+
+# Counters shared by every gunicorn worker (and every host, with Redis).
+#
+# Rate limits and throttle windows used to live on the `user` row or in
+# per-process memory, so each of the 4 workers counted separately and every
+# request wrote the row. A CounterStore keeps sliding-window counters
+# outside the database:
+#
+#   redis://...        shared across hosts (needs the `redis` package)
+#   sqlite:///path     shared by workers on one host; also the test stand-in
+#   memory://          this process only
+#
+# Windows use the sliding-window-counter algorithm: the current fixed bucket
+# plus the previous bucket weighted by how much of it still overlaps the
+# window. Checks and increments are atomic (Lua script / IMMEDIATE
+# transaction / lock). UsageFlusher batches values that still need to reach
+# the database and writes them from a background thread.
+
+USAGE_FLUSH_INTERVAL = float(os.environ.get("USAGE_FLUSH_INTERVAL", "10"))
+_SQLITE_TIMEOUT = 5.0
+_SWEEP_EVERY = 500  # SQLite: delete expired buckets every N writes
+
+log = get_logger("usage")
+
+
+@dataclass
+class WindowResult:
+    allowed: bool
+    count: float  # usage in the window, including this hit if allowed
+    limit: Optional[float]
+
+    @property
+    def remaining(self) -> float:
+        if self.limit is None:
+            return math.inf
+        return max(0.0, self.limit - self.count)
+
+
+def _buckets(key: str, window: float, now: float) -> Tuple[str, str, float, int]:
+    """(current bucket key, previous bucket key, previous weight, bucket ttl)."""
+    index = int(now // window)
+    elapsed = (now - index * window) / window
+    ttl = int(math.ceil(window * 2)) + 1
+    return f"{key}:{index}", f"{key}:{index - 1}", 1.0 - elapsed, ttl
+
+
+class CounterStore:
+    """Atomic sliding-window counters."""
+
+    def hit(self, key: str, limit: Optional[float], window: float, cost: float = 1) -> WindowResult:
+        """
+        Count `cost` against key's window unless that would exceed limit
+        (rejected hits are not counted). limit=None always counts.
+        """
+        raise NotImplementedError
+
+    def add(self, key: str, amount: float, window: float) -> float:
+        """Unconditionally add amount; returns the window total."""
+        return self.hit(key, None, window, amount).count
+
+    def total(self, key: str, window: float) -> float:
+        return self.hit(key, None, window, 0).count
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStore(CounterStore):
+    def __init__(self) -> None:
+        self._values: Dict[str, Tuple[float, float]] = {}  # bucket -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: Optional[float], window: float, cost: float = 1) -> WindowResult:
+        now = time.time()
+        curr_key, prev_key, weight, ttl = _buckets(key, window, now)
+        with self._lock:
+            curr, curr_exp = self._values.get(curr_key, (0.0, 0.0))
+            prev, prev_exp = self._values.get(prev_key, (0.0, 0.0))
+            curr = curr if curr_exp > now else 0.0
+            prev = prev if prev_exp > now else 0.0
+            count = prev * weight + curr
+            if limit is not None and count + cost > limit:
+                return WindowResult(False, count, limit)
+            if cost:
+                self._values[curr_key] = (curr + cost, now + ttl)
+                self._values.pop(f"{key}:{int(now // window) - 2}", None)
+            return WindowResult(True, count + cost, limit)
+
+
+class SQLiteStore(CounterStore):
+    """File-backed store; safe across processes on one host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS window_counters ("
+                "key TEXT PRIMARY KEY, value REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=_SQLITE_TIMEOUT, isolation_level=None,
+                                   check_same_thread=False)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """This thread's connection inside an IMMEDIATE transaction, committed unless it raises."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def hit(self, key: str, limit: Optional[float], window: float, cost: float = 1) -> WindowResult:
+        now = time.time()
+        curr_key, prev_key, weight, ttl = _buckets(key, window, now)
+        with self.transaction() as conn:
+            rows = dict(conn.execute(
+                "SELECT key, value FROM window_counters WHERE key IN (?, ?) AND expires_at > ?",
+                (curr_key, prev_key, now),
+            ).fetchall())
+            count = rows.get(prev_key, 0.0) * weight + rows.get(curr_key, 0.0)
+            if limit is not None and count + cost > limit:
+                return WindowResult(False, count, limit)
+            if cost:
+                conn.execute(
+                    "INSERT INTO window_counters (key, value, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = CASE WHEN expires_at > ? "
+                    "THEN value + excluded.value ELSE excluded.value END, expires_at = excluded.expires_at",
+                    (curr_key, cost, now + ttl, now),
+                )
+                self._writes += 1
+                if self._writes % _SWEEP_EVERY == 0:
+                    conn.execute("DELETE FROM window_counters WHERE expires_at <= ?", (now,))
+        return WindowResult(True, count + cost, limit)
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_REDIS_HIT = """
+local curr = tonumber(redis.call('GET', KEYS[1]) or '0')
+local prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+local limit = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local count = prev * tonumber(ARGV[3]) + curr
+if limit >= 0 and count + cost > limit then
+  return {0, tostring(count)}
+end
+if cost ~= 0 then
+  redis.call('INCRBYFLOAT', KEYS[1], cost)
+  redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+end
+return {1, tostring(count + cost)}
+"""
+
+
+class RedisStore(CounterStore):
+    """Redis (or any server speaking its protocol and Lua, e.g. Valkey, KeyDB)."""
+
+    def __init__(self, url: str, prefix: str = "tts:"):
+        try:
+            import redis
+        except ImportError as e:  # pragma: no cover - depends on deployment
+            raise RuntimeError("COUNTER_STORE_URI is a redis:// URL but the redis package is not installed") from e
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_HIT)
+
+    def hit(self, key: str, limit: Optional[float], window: float, cost: float = 1) -> WindowResult:
+        curr_key, prev_key, weight, ttl = _buckets(self.prefix + key, window, time.time())
+        allowed, count = self._script(
+            keys=[curr_key, prev_key],
+            args=[-1 if limit is None else limit, cost, weight, ttl],
+        )
+        return WindowResult(bool(int(allowed)), float(count), limit)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def sqlite_path(uri: str) -> str:
+    """File path of a sqlite:///path URI (":memory:" if it has none)."""
+    path = uri[len("sqlite:///"):] if uri.startswith("sqlite:///") else uri[len("sqlite://"):]
+    return path or ":memory:"
+
+
+def open_store(uri: str) -> CounterStore:
+    """CounterStore for a redis://, rediss://, unix://, sqlite:/// or memory:// URI."""
+    scheme = urlparse(uri).scheme
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisStore(uri)
+    if scheme == "sqlite":
+        return SQLiteStore(sqlite_path(uri))
+    if scheme == "memory":
+        return MemoryStore()
+    raise ValueError(f"Unsupported counter store URI: {uri}")
+
+
+class UsageFlusher:
+    """
+    Buffers values bound for the database and writes them in batches.
+
+    record(key, values) keeps the latest values per key; a daemon thread
+    passes everything pending to flush(batch) every `interval` seconds (and
+    once more at exit). A failed flush is retried on the next round unless
+    newer values arrived meanwhile.
+    """
+
+    def __init__(self, flush: Callable[[Dict[Hashable, Dict[str, Any]]], None],
+                 interval: float = USAGE_FLUSH_INTERVAL):
+        self._flush = flush
+        self.interval = interval
+        self._pending: Dict[Hashable, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pid: Optional[int] = None
+        self.flushed = 0
+
+    def record(self, key: Hashable, values: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.setdefault(key, {}).update(values)
+        self.ensure_started()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            self._flush(batch)
+        except Exception as e:
+            log.warning('usage.flush_failed', rows=len(batch), error=str(e))
+            with self._lock:
+                for key, values in batch.items():
+                    self._pending[key] = {**values, **self._pending.get(key, {})}
+            return 0
+        self.flushed += len(batch)
+        return len(batch)
+
+    def ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            threading.Thread(target=self._run, name="usage-flush", daemon=True).start()
+            atexit.register(self.flush)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+
+__all__ = [
+    "CounterStore",
+    "MemoryStore",
+    "RedisStore",
+    "SQLiteStore",
+    "UsageFlusher",
+    "WindowResult",
+    "open_store",
+    "sqlite_path",
+]
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+try:
+    import fcntl  # POSIX only; Windows dev boxes fall back to in-process locking
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# Single-flight coalescing for synthesis keyed by cache key.
+#
+# When many identical requests arrive before the cached file exists, only the
+# first one renders; the rest wait for it and then reuse the file. Threads in
+# one worker wait on an exact per-key lock. Gunicorn workers coordinate through
+# a small, fixed table of flock()ed stripe files, so lock files never pile up
+# and two unrelated keys only serialize if they hash to the same stripe.
+
+LOCK_STRIPES = 256
+DEFAULT_TIMEOUT = float(os.environ.get("SINGLE_FLIGHT_TIMEOUT", "300"))
+_POLL_INTERVAL = 0.05
+
+PathLike = Union[str, Path]
+
+
+class _KeyedLocks:
+    """Per-key threading locks that are dropped once nobody holds or waits on them."""
+
+    def __init__(self) -> None:
+        self._mutex = threading.Lock()
+        self._locks: Dict[str, List] = {}  # key -> [lock, refcount]
+
+    @contextmanager
+    def hold(self, key: str, timeout: float) -> Iterator[None]:
+        with self._mutex:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            if not entry[0].acquire(timeout=timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight render of {key}")
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            with self._mutex:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._locks.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+class SingleFlight:
+    """Coalesce concurrent renders of the same output file across threads and workers."""
+
+    def __init__(self, lock_dir: PathLike, stripes: int = LOCK_STRIPES, timeout: float = DEFAULT_TIMEOUT):
+        self.lock_dir = Path(lock_dir)
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self.stripes = stripes
+        self.timeout = timeout
+        self._local = _KeyedLocks()
+        self.renders = 0
+        self.coalesced = 0
+
+    def _stripe_path(self, key: str) -> Path:
+        digest = hashlib.md5(key.encode()).digest()
+        stripe = int.from_bytes(digest[:4], "big") % self.stripes
+        return self.lock_dir / f"{stripe:03d}.lock"
+
+    @contextmanager
+    def _file_lock(self, key: str, deadline: float) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(self._stripe_path(key), "a+b") as fh:
+            while True:
+                try:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"Timed out waiting for in-flight render of {key}")
+                    time.sleep(_POLL_INTERVAL)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def hold(self, key: str, timeout: Optional[float] = None) -> Iterator[None]:
+        """Exclusive section for key across threads in this process and other workers."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._local.hold(key, timeout):
+            with self._file_lock(key, deadline):
+                yield
+
+    @contextmanager
+    def try_hold(self, key: str) -> Iterator[bool]:
+        """Like hold(), but yields False at once instead of waiting if key is held."""
+        with ExitStack() as stack:
+            try:
+                stack.enter_context(self.hold(key, timeout=0))
+            except TimeoutError:
+                yield False
+                return
+            yield True
+
+    def render(self, key: str, output_path: PathLike, produce: Callable[[Path], None],
+               timeout: Optional[float] = None) -> Path:
+        """
+        Return output_path, calling produce(partial_path) only if no one else has.
+
+        produce() writes to a temporary sibling path that is atomically renamed
+        into place, so a file that exists is always complete.
+        """
+        output_path = Path(output_path)
+        if output_path.exists():
+            return output_path
+        with self.hold(key, timeout):
+            if output_path.exists():
+                # Another request rendered it while we waited
+                self.coalesced += 1
+                return output_path
+            partial = partial_path(output_path)
+            try:
+                produce(partial)
+                os.replace(partial, output_path)
+            finally:
+                if partial.exists():
+                    partial.unlink()
+            self.renders += 1
+        return output_path
+
+
+def partial_path(output_path: PathLike) -> Path:
+    """In-progress path for output_path; keeps the extension so encoders infer format."""
+    output_path = Path(output_path)
+    return output_path.with_name(f".{output_path.stem}.{os.getpid()}.{threading.get_ident()}.part{output_path.suffix}")
+
+
+__all__ = ["SingleFlight", "partial_path", "LOCK_STRIPES"]
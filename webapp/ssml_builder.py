@@ -1,9 +1,24 @@
+import heapq
 import html
 import re
 from typing import Any, Dict, List, Optional, Tuple
 
+# Patterns are compiled once at import. Keywords are scored in one
+# tokenization pass per chunk and emphasized in one more pass over the
+# escaped text (no per-keyword regex). build_ssml_batch renders a list of
+# chunks that are synthesized one by one (each as its own single-voice
+# request) in a single call, instead of one build_ssml call per chunk.
+
 Chunk = Dict[str, Any]
 
+_WORD_RE = re.compile(r"\b[\w']+\b")
+_EMPHASIS = '<emphasis level="moderate">{}</emphasis>'
+_SPEAK_OPEN = (
+    "<speak version=\"1.0\" xmlns=\"http://www.w3.org/2001/10/synthesis\" "
+    "xmlns:mstts=\"https://www.w3.org/2001/mstts\" xml:lang=\"en-US\">"
+)
+MAX_SSML_CHARS = 50000
+
 STYLEDEGREE_MAP = {
     1: 0.7,
     2: 1.0,
@@ -72,24 +87,36 @@ def _styledegree(intensity: Optional[int]) -> float:
 
 
 def _find_keywords(text: str, max_keywords: int = 3) -> List[str]:
-    words = re.findall(r"\b[\w']+\b", text)
     scored = []
-    for w in words:
-        lw = w.lower()
-        if lw in STOPWORDS or len(w) < 5:
+    for match in _WORD_RE.finditer(text):
+        w = match.group(0)
+        if len(w) < 5 or w.lower() in STOPWORDS:
             continue
         scored.append((len(w), w))
-    scored.sort(reverse=True)
-    return [w for _, w in scored[:max_keywords]]
+    return [w for _, w in heapq.nlargest(max_keywords, scored)]
 
 
 def _apply_emphasis(text: str, keywords: List[str]) -> str:
-    result = text
-    for kw in keywords:
-        pattern = re.compile(rf"\b{re.escape(kw)}\b", re.IGNORECASE)
-        if pattern.search(result):
-            result = pattern.sub(lambda m: f"<emphasis level=\"moderate\">{m.group(0)}</emphasis>", result, count=1)
-    return result
+    """Wrap the first whole-word, case-insensitive occurrence of each keyword."""
+    pending = {kw.lower() for kw in keywords}
+    if not pending:
+        return text
+    parts = []
+    cursor = 0
+    for match in _WORD_RE.finditer(text):
+        word = match.group(0)
+        if word.lower() not in pending:
+            continue
+        pending.discard(word.lower())
+        parts.append(text[cursor:match.start()])
+        parts.append(_EMPHASIS.format(word))
+        cursor = match.end()
+        if not pending:
+            break
+    if not parts:
+        return text
+    parts.append(text[cursor:])
+    return "".join(parts)
 
 
 def _pause_for_chunk(chunk_text: str) -> Optional[str]:
@@ -110,6 +137,97 @@ def _escape_text(text: str) -> str:
     return html.escape(text, quote=True)
 
 
+def _render_chunk(
+    idx: int,
+    raw_chunk: Chunk,
+    voice: str,
+    is_multi_voice: bool,
+    warnings: List[str],
+    *,
+    auto_pauses: bool,
+    auto_emphasis: bool,
+    global_rate: Optional[int],
+    global_pitch: Optional[int],
+    global_volume: Optional[float],
+) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(chunk SSML, resolved chunk) for one chunk, or None if it is empty."""
+    text = str(raw_chunk.get("content", "")).strip()
+    if not text:
+        return None
+
+    chunk_voice = raw_chunk.get("voice") or voice
+    emotion = raw_chunk.get("emotion")
+    intensity = raw_chunk.get("intensity")
+
+    # Resolve prosody with global fallbacks (handle None values explicitly)
+    rate_val = raw_chunk.get("speed") or raw_chunk.get("rate")
+    if rate_val is None:
+        rate_val = global_rate if global_rate is not None else 0
+    pitch_val = raw_chunk.get("pitch")
+    if pitch_val is None:
+        pitch_val = global_pitch if global_pitch is not None else 0
+    volume_val = raw_chunk.get("volume")
+    if volume_val is None:
+        volume_val = global_volume if global_volume is not None else 0.0
+
+    # Clamp values
+    rate_val, warn = _clamp(float(rate_val), MIN_RATE, MAX_RATE)
+    if warn:
+        warnings.append(f"chunk {idx}: rate {warn}")
+    pitch_val, warn = _clamp(float(pitch_val), MIN_PITCH, MAX_PITCH)
+    if warn:
+        warnings.append(f"chunk {idx}: pitch {warn}")
+    volume_val, warn = _clamp(float(volume_val), MIN_VOLUME_DB, MAX_VOLUME_DB)
+    if warn:
+        warnings.append(f"chunk {idx}: volume {warn}")
+
+    # Escape and optionally emphasize
+    escaped_text = _escape_text(text)
+    if auto_emphasis and not is_multi_voice:  # Skip emphasis in multi-voice to avoid issues
+        escaped_text = _apply_emphasis(escaped_text, _find_keywords(text))
+
+    if is_multi_voice:
+        # Multi-voice: prosody tags break voice switching
+        inner = escaped_text
+    else:
+        inner = (
+            f"<prosody rate=\"{_format_percent(rate_val)}\" pitch=\"{_format_percent(pitch_val)}\" "
+            f"volume=\"{_format_volume_db(volume_val)}\">{escaped_text}</prosody>"
+        )
+
+    # Wrap with express-as if emotion present
+    if emotion:
+        degree = _styledegree(intensity)
+        chunk_ssml = (
+            f'<mstts:express-as style="{html.escape(str(emotion))}" styledegree="{degree:.2f}">'
+            f"{inner}</mstts:express-as>"
+        )
+    else:
+        chunk_ssml = inner
+
+    # Auto pauses
+    if auto_pauses:
+        pause = _pause_for_chunk(text)
+        if pause:
+            chunk_ssml += f"<break time=\"{pause}\"/>"
+
+    return chunk_ssml, {
+        "content": text,
+        "voice": chunk_voice,
+        "emotion": emotion,
+        "intensity": intensity,
+        "rate": rate_val,
+        "pitch": pitch_val,
+        "volume": volume_val,
+    }
+
+
+def _length_warning(ssml: str) -> Optional[str]:
+    if len(ssml) > MAX_SSML_CHARS:
+        return f"SSML length {len(ssml)} exceeded 50k; consider chunking input further."
+    return None
+
+
 def build_ssml(
     voice: str,
     chunks: List[Chunk],
@@ -129,143 +247,110 @@ def build_ssml(
     resolved_chunks: List[Dict[str, Any]] = []
     ssml_parts: List[str] = []
     current_voice = None  # Track voice changes, start with None
-    
+
     # Check if we have multi-voice scenario (prosody causes issues with voice switching)
-    voices_used = set()
-    for chunk in chunks:
-        chunk_voice = chunk.get("voice") or voice
-        voices_used.add(chunk_voice)
+    voices_used = {chunk.get("voice") or voice for chunk in chunks}
     is_multi_voice = len(voices_used) > 1
-    
+
     if is_multi_voice:
         warnings.append("Multi-voice detected: prosody tags disabled for compatibility")
 
     for idx, raw_chunk in enumerate(chunks):
-        text = str(raw_chunk.get("content", "")).strip()
-        if not text:
+        rendered = _render_chunk(
+            idx, raw_chunk, voice, is_multi_voice, warnings,
+            auto_pauses=auto_pauses,
+            auto_emphasis=auto_emphasis,
+            global_rate=global_rate,
+            global_pitch=global_pitch,
+            global_volume=global_volume,
+        )
+        if rendered is None:
             continue
+        chunk_ssml, resolved = rendered
 
-        chunk_voice = raw_chunk.get("voice") or voice
-        emotion = raw_chunk.get("emotion")
-        intensity = raw_chunk.get("intensity")
-
-        # Resolve prosody with global fallbacks (handle None values explicitly)
-        rate_val = raw_chunk.get("speed") or raw_chunk.get("rate")
-        if rate_val is None:
-            rate_val = global_rate if global_rate is not None else 0
-        pitch_val = raw_chunk.get("pitch")
-        if pitch_val is None:
-            pitch_val = global_pitch if global_pitch is not None else 0
-        volume_val = raw_chunk.get("volume")
-        if volume_val is None:
-            volume_val = global_volume if global_volume is not None else 0.0
-
-        # Clamp values
-        rate_val, warn = _clamp(float(rate_val), MIN_RATE, MAX_RATE)
-        if warn:
-            warnings.append(f"chunk {idx}: rate {warn}")
-        pitch_val, warn = _clamp(float(pitch_val), MIN_PITCH, MAX_PITCH)
-        if warn:
-            warnings.append(f"chunk {idx}: pitch {warn}")
-        volume_val, warn = _clamp(float(volume_val), MIN_VOLUME_DB, MAX_VOLUME_DB)
-        if warn:
-            warnings.append(f"chunk {idx}: volume {warn}")
-
-        rate_str = _format_percent(rate_val)
-        pitch_str = _format_percent(pitch_val)
-        volume_str = _format_volume_db(volume_val)
-
-        # Escape and optionally emphasize
-        escaped_text = _escape_text(text)
-        if auto_emphasis and not is_multi_voice:  # Skip emphasis in multi-voice to avoid issues
-            keywords = _find_keywords(text)
-            escaped_text = _apply_emphasis(escaped_text, keywords)
-
-        # Wrap with express-as if emotion present
-        if emotion:
-            degree = _styledegree(intensity)
-            if is_multi_voice:
-                # Multi-voice: skip prosody tags for compatibility
-                chunk_ssml = (
-                    f'<mstts:express-as style="{html.escape(str(emotion))}" styledegree="{degree:.2f}">'
-                    f"{escaped_text}"
-                    f"</mstts:express-as>"
-                )
-            else:
-                # Single voice: include prosody
-                chunk_ssml = (
-                    f'<mstts:express-as style="{html.escape(str(emotion))}" styledegree="{degree:.2f}">'
-                    f"<prosody rate=\"{rate_str}\" pitch=\"{pitch_str}\" volume=\"{volume_str}\">{escaped_text}</prosody>"
-                    f"</mstts:express-as>"
-                )
-        else:
-            if is_multi_voice:
-                # Multi-voice: no prosody
-                chunk_ssml = escaped_text
-            else:
-                # Single voice: include prosody
-                chunk_ssml = f"<prosody rate=\"{rate_str}\" pitch=\"{pitch_str}\" volume=\"{volume_str}\">{escaped_text}</prosody>"
-
-        # Auto pauses
-        if auto_pauses:
-            pause = _pause_for_chunk(text)
-            if pause:
-                chunk_ssml += f"<break time=\"{pause}\"/>"
-
-        # Handle voice changes - open voice tag if needed, close previous if changing
-        if chunk_voice != current_voice:
+        # Voice tags are only emitted for multi-voice documents; a single
+        # voice is left to edge-tts to wrap
+        if is_multi_voice and resolved["voice"] != current_voice:
             if current_voice is not None:
-                # Close previous voice
                 ssml_parts.append("</voice>")
-            # Open new voice
-            ssml_parts.append(f"<voice name=\"{html.escape(chunk_voice)}\">")
-            current_voice = chunk_voice
+            ssml_parts.append(f"<voice name=\"{html.escape(resolved['voice'])}\">")
+            current_voice = resolved["voice"]
 
         ssml_parts.append(chunk_ssml)
-        resolved_chunks.append(
-            {
-                "content": text,
-                "voice": chunk_voice,
-                "emotion": emotion,
-                "intensity": intensity,
-                "rate": rate_val,
-                "pitch": pitch_val,
-                "volume": volume_val,
-            }
-        )
+        resolved_chunks.append(resolved)
 
-    # For single-voice: don't add voice tags - let edge-tts handle it
-    # For multi-voice: we need the full SSML with voice tags
     if is_multi_voice:
         # Close final voice tag if we opened one
         if current_voice is not None:
             ssml_parts.append("</voice>")
-        
-        body = "".join(ssml_parts)
-        speak = (
-            "<speak version=\"1.0\" xmlns=\"http://www.w3.org/2001/10/synthesis\" "
-            "xmlns:mstts=\"https://www.w3.org/2001/mstts\" xml:lang=\"en-US\">"
-            f"{body}"
-            "</speak>"
-        )
-        is_full_ssml = True
+        speak = f"{_SPEAK_OPEN}{''.join(ssml_parts)}</speak>"
     else:
-        # Single voice: just return the inner content, edge-tts will wrap it
-        # Remove any voice tags we might have added
-        body = "".join(ssml_parts).replace(f'<voice name="{html.escape(voice)}">', '').replace('</voice>', '')
-        speak = body
-        is_full_ssml = False
-    
-    # Length guard
-    if len(speak) > 50000:
-        warnings.append(f"SSML length {len(speak)} exceeded 50k; consider chunking input further.")
+        speak = "".join(ssml_parts)
+
+    warning = _length_warning(speak)
+    if warning:
+        warnings.append(warning)
 
     return {
         "ssml": speak,
         "chunk_map": resolved_chunks,
         "warnings": warnings,
-        "is_full_ssml": is_full_ssml,  # New flag to indicate if full SSML wrapper is included
+        "is_full_ssml": is_multi_voice,  # New flag to indicate if full SSML wrapper is included
+    }
+
+
+def build_ssml_batch(
+    voice: str,
+    chunks: List[Chunk],
+    *,
+    auto_pauses: bool = True,
+    auto_emphasis: bool = True,
+    auto_breaths: bool = False,  # reserved for future use
+    global_rate: Optional[int] = None,
+    global_pitch: Optional[int] = None,
+    global_volume: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    SSML for chunks that are synthesized one request each, in one pass.
+
+    Each entry of "parts" is what build_ssml(voice=<chunk voice>, chunks=[chunk])
+    would return for that chunk ({ssml, voice, chunk_map, warnings,
+    is_full_ssml}); empty chunks are skipped. Also returns the joined "ssml"
+    document and the combined "chunk_map" and "warnings".
+    """
+    parts: List[Dict[str, Any]] = []
+    all_warnings: List[str] = []
+    for idx, raw_chunk in enumerate(chunks):
+        warnings: List[str] = []
+        rendered = _render_chunk(
+            idx, raw_chunk, voice, False, warnings,
+            auto_pauses=auto_pauses,
+            auto_emphasis=auto_emphasis,
+            global_rate=global_rate,
+            global_pitch=global_pitch,
+            global_volume=global_volume,
+        )
+        if rendered is None:
+            continue
+        chunk_ssml, resolved = rendered
+        warning = _length_warning(chunk_ssml)
+        if warning:
+            warnings.append(f"chunk {idx}: {warning}")
+        parts.append({
+            "ssml": chunk_ssml,
+            "voice": resolved["voice"],
+            "chunk_map": [resolved],
+            "warnings": warnings,
+            "is_full_ssml": False,
+        })
+        all_warnings.extend(warnings)
+
+    return {
+        "parts": parts,
+        "ssml": "".join(part["ssml"] for part in parts),
+        "chunk_map": [part["chunk_map"][0] for part in parts],
+        "warnings": all_warnings,
     }
 
 
-__all__ = ["build_ssml"]
+__all__ = ["build_ssml", "build_ssml_batch"]
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for hashed API key verification caching.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api_key_cache import APIKeyCache, VerifiedKey, display_prefix, hash_api_key
+
+
+def _key(key_id, user_id=1):
+    return VerifiedKey(key_id=key_id, user_id=user_id, api_tier="starter", has_api_access=True, char_limit=100000)
+
+
+def test_hash_is_stable_and_hides_key():
+    raw = "ctts_" + "x" * 43
+    assert hash_api_key(raw) == hash_api_key(raw)
+    assert len(hash_api_key(raw)) == 64 and raw not in hash_api_key(raw)
+    assert display_prefix(raw) == "ctts_xxxxxxx"
+
+
+def test_entries_expire():
+    cache = APIKeyCache(ttl=0.05)
+    cache.put("h1", _key(1))
+    assert cache.get("h1") == _key(1)
+    time.sleep(0.06)
+    assert cache.get("h1") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidate_by_key_and_user():
+    cache = APIKeyCache(ttl=60)
+    cache.put("h1", _key(1, user_id=7))
+    cache.put("h2", _key(2, user_id=7))
+    cache.put("h3", _key(3, user_id=8))
+    cache.invalidate(key_id=1)
+    assert cache.get("h1") is None and cache.get("h2") is not None
+    cache.invalidate(user_id=7)
+    assert cache.get("h2") is None and cache.get("h3") is not None
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_size_is_bounded_lru():
+    cache = APIKeyCache(ttl=60, max_size=2)
+    cache.put("h1", _key(1))
+    cache.put("h2", _key(2))
+    cache.get("h1")  # h2 is now least recently used
+    cache.put("h3", _key(3))
+    assert cache.get("h2") is None
+    assert cache.get("h1") is not None and cache.get("h3") is not None
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for conditional and byte-range audio responses.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from werkzeug.test import Client, EnvironBuilder
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import audio_serving
+from audio_serving import serve_audio
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+
+
+def _app(path):
+    def app(environ, start_response):
+        return serve_audio(path, environ)(environ, start_response)
+    return Client(app)
+
+
+def _file(tmp):
+    path = Path(tmp) / "speech_abc123.mp3"
+    path.write_bytes(DATA)
+    return path
+
+
+def test_full_response_is_immutable_with_strong_etag():
+    with tempfile.TemporaryDirectory() as tmp:
+        resp = _app(_file(tmp)).get("/")
+        assert resp.status_code == 200 and resp.data == DATA
+        assert resp.headers["ETag"].startswith('"speech_abc123-')
+        assert "immutable" in resp.headers["Cache-Control"]
+        assert resp.headers["Content-Type"] == "audio/mpeg"
+        assert resp.headers["Content-Length"] == str(len(DATA))
+
+
+def test_if_none_match_returns_304():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _app(_file(tmp))
+        etag = client.get("/").headers["ETag"]
+        resp = client.get("/", headers={"If-None-Match": etag})
+        assert resp.status_code == 304 and resp.data == b""
+
+
+def test_byte_ranges():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _app(_file(tmp))
+        resp = client.get("/", headers={"Range": "bytes=100-199"})
+        assert resp.status_code == 206 and resp.data == DATA[100:200]
+        assert resp.headers["Content-Range"] == f"bytes 100-199/{len(DATA)}"
+
+        resp = client.get("/", headers={"Range": "bytes=-10"})
+        assert resp.data == DATA[-10:]
+
+        resp = client.get("/", headers={"Range": "bytes=99999-"})
+        assert resp.status_code == 416 and resp.headers["Content-Range"] == f"bytes */{len(DATA)}"
+
+        # Multi-range and non-byte units are ignored rather than refused
+        for header in ("bytes=0-1,5-6", "items=0-5"):
+            resp = client.get("/", headers={"Range": header})
+            assert resp.status_code == 200 and resp.data == DATA and "Content-Range" not in resp.headers
+
+        # A stale If-Range gets the whole file
+        resp = client.get("/", headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+        assert resp.status_code == 200 and len(resp.data) == len(DATA)
+
+
+def test_missing_file_and_offload():
+    with tempfile.TemporaryDirectory() as tmp:
+        env = EnvironBuilder().get_environ()
+        assert serve_audio(Path(tmp) / "nope.mp3", env) is None
+        assert serve_audio(Path(tmp), env) is None
+
+        path = _file(tmp)
+        audio_serving.AUDIO_OFFLOAD = "nginx"
+        try:
+            resp = _app(path).get("/")
+        finally:
+            audio_serving.AUDIO_OFFLOAD = ""
+        assert resp.headers["X-Accel-Redirect"] == "/protected-audio/speech_abc123.mp3"
+        assert resp.data == b""
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
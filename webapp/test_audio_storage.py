@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Tests for the audio storage contract, run against LocalStorage and against
+S3Storage with an in-memory S3 client.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from audio_storage import LocalStorage, S3Storage, open_storage
+
+DATA = os.urandom(200_000)
+
+
+class _ClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class _Body:
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+        self.closed = False
+
+    def iter_chunks(self, size):
+        while True:
+            chunk = self.stream.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class FakeS3Client:
+    """The subset of the boto3 S3 client S3Storage uses, kept in memory."""
+
+    class exceptions:
+        ClientError = _ClientError
+
+    def __init__(self):
+        self.objects = {}  # (bucket, key) -> (data, extra args, last modified)
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.objects[(Bucket, Key)] = (Fileobj.read(), ExtraArgs or {}, datetime.now(timezone.utc))
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None, Config=None):
+        with open(Filename, "rb") as fh:
+            self.upload_fileobj(fh, Bucket, Key, ExtraArgs, Config)
+
+    def _object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise _ClientError("404")
+        return self.objects[(Bucket, Key)]
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self._object(Bucket, Key)[0]
+        if Range:
+            start, _, end = Range[len("bytes="):].partition("-")
+            data = data[int(start):int(end) + 1 if end else None]
+        return {"Body": _Body(data)}
+
+    def head_object(self, Bucket, Key):
+        data, extra, _ = self._object(Bucket, Key)
+        return {"ContentLength": len(data), **extra}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?op={operation}&expires={ExpiresIn}"
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def delete_objects(self, Bucket, Delete):
+        assert len(Delete["Objects"]) <= 1000
+        for obj in Delete["Objects"]:
+            self.delete_object(Bucket, obj["Key"])
+
+    def get_paginator(self, name):
+        assert name == "list_objects_v2"
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = sorted(k for b, k in client.objects if b == Bucket and k.startswith(Prefix))
+                for i in range(0, len(keys), 1000):
+                    yield {"Contents": [{"Key": k, "LastModified": client.objects[(Bucket, k)][2]}
+                                        for k in keys[i:i + 1000]]}
+
+        return Paginator()
+
+    def age(self, Bucket, Key, seconds):
+        data, extra, modified = self.objects[(Bucket, Key)]
+        self.objects[(Bucket, Key)] = (data, extra, datetime.fromtimestamp(modified.timestamp() - seconds, timezone.utc))
+
+
+def _backends(tmp):
+    """(storage, make_old(key)) for each implementation of the contract."""
+    local = LocalStorage(Path(tmp) / "store")
+
+    def age_local(key):
+        past = time.time() - 3600
+        os.utime(local.root / key, (past, past))
+
+    client = FakeS3Client()
+    s3 = S3Storage("audio", prefix="/renders/", client=client)
+    return [(local, age_local), (s3, lambda key: client.age("audio", "renders/" + key, 3600))]
+
+
+def test_put_get_stream_delete():
+    with tempfile.TemporaryDirectory() as tmp:
+        for storage, _ in _backends(tmp):
+            storage.put("speech_a.mp3", io.BytesIO(DATA))
+            assert storage.exists("speech_a.mp3")
+            assert storage.get("speech_a.mp3") == DATA
+            assert b"".join(storage.stream("speech_a.mp3", 1000, 70_000)) == DATA[1000:70_000]
+            assert b"".join(storage.stream("speech_a.mp3", 150_000)) == DATA[150_000:]
+            storage.delete("speech_a.mp3")
+            storage.delete("speech_a.mp3")
+            assert not storage.exists("speech_a.mp3")
+
+
+def test_put_from_path_and_in_place():
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "rendered.mp3"
+        src.write_bytes(DATA)
+        for storage, _ in _backends(tmp):
+            storage.put("speech_b.mp3", src)
+            assert storage.get("speech_b.mp3") == DATA
+
+        in_place = LocalStorage(tmp)
+        in_place.put("rendered.mp3", src)  # already there; no copy
+        assert sorted(p.name for p in Path(tmp).iterdir()) == ["rendered.mp3", "store"]
+
+
+def test_keys_cannot_escape_root():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = LocalStorage(tmp)
+        for key in ("../x.mp3", "a/b.mp3", ".."):
+            try:
+                storage.put(key, io.BytesIO(b"x"))
+            except ValueError:
+                continue
+            raise AssertionError(f"accepted {key!r}")
+
+
+def test_presign():
+    with tempfile.TemporaryDirectory() as tmp:
+        (local, _), (s3, _) = _backends(tmp)
+        assert local.presign("speech_a.mp3") is None  # served by the app
+        assert s3.remote and not local.remote
+        assert s3.presign("speech_a.mp3", expires=60) == \
+            "https://s3.test/audio/renders/speech_a.mp3?op=get_object&expires=60"
+        public = S3Storage("audio", prefix="renders", public_url="https://cdn.test/", client=FakeS3Client())
+        assert public.presign("speech_a.mp3") == "https://cdn.test/renders/speech_a.mp3"
+
+
+def test_s3_objects_carry_type_and_cache_headers():
+    client = FakeS3Client()
+    storage = S3Storage("audio", client=client)
+    storage.put("job.m3u8", io.BytesIO(b"#EXTM3U\n"))
+    storage.put("job_00000.mp3", io.BytesIO(b"x"))
+    assert client.head_object("audio", "job.m3u8")["CacheControl"] == "no-cache"
+    head = client.head_object("audio", "job_00000.mp3")
+    assert head["ContentType"] == "audio/mpeg" and "immutable" in head["CacheControl"]
+
+
+def test_delete_older_than():
+    with tempfile.TemporaryDirectory() as tmp:
+        for storage, make_old in _backends(tmp):
+            for i in range(1001):  # more than one S3 delete batch
+                storage.put(f"old_{i}.mp3", io.BytesIO(b"x"))
+                make_old(f"old_{i}.mp3")
+            storage.put("new.mp3", io.BytesIO(b"y"))
+            assert storage.delete_older_than(60) == 1001
+            assert storage.exists("new.mp3") and not storage.exists("old_0.mp3")
+
+
+def test_delete_older_than_and_open_storage():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = open_storage(None, tmp)
+        assert isinstance(storage, LocalStorage) and not storage.remote
+        storage.put("old.mp3", io.BytesIO(b"x"))
+        storage.put("new.mp3", io.BytesIO(b"y"))
+        past = time.time() - 3600
+        os.utime(Path(tmp) / "old.mp3", (past, past))
+        assert storage.delete_older_than(60) == 1
+        assert storage.exists("new.mp3") and not storage.exists("old.mp3")
+        assert open_storage(f"file://{tmp}/other", tmp).root == Path(tmp) / "other"
+        try:
+            open_storage("ftp://host/x", tmp)
+        except ValueError:
+            return
+        raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
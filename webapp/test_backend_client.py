@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled model-server client.
+Uses a throwaway local HTTP server to check keep-alive reuse, streaming
+to disk and error mapping.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend_client import BackendClient, BackendError
+
+AUDIO = b"RIFF" + bytes(range(256)) * 4096  # ~1 MB
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = set()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        _Handler.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/fail":
+            body = b'{"detail": "voice not found"}'
+            self.send_response(404)
+            self.send_header("Content-Type", "application/json")
+        else:
+            body = AUDIO
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _serve():
+    _Handler.connections = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_reuses_connection_across_requests():
+    server, url = _serve()
+    try:
+        client = BackendClient("test", url)
+        for _ in range(5):
+            assert client.fetch("POST", "/generate", json={"text": "hi"}, timeout=5) == AUDIO
+        assert len(_Handler.connections) == 1
+    finally:
+        server.shutdown()
+
+
+def test_download_streams_to_file():
+    server, url = _serve()
+    try:
+        client = BackendClient("test", url)
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = Path(tmp) / "out.wav"
+            assert client.download("POST", "/generate", dest, json={}, timeout=5) == dest
+            assert dest.read_bytes() == AUDIO
+            assert [p.name for p in Path(tmp).iterdir()] == ["out.wav"]
+    finally:
+        server.shutdown()
+
+
+def test_error_response_raises_with_detail():
+    server, url = _serve()
+    try:
+        client = BackendClient("test", url)
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = Path(tmp) / "out.wav"
+            try:
+                client.download("POST", "/fail", dest, json={}, timeout=5)
+            except BackendError as e:
+                assert e.status_code == 404
+                assert e.detail == "voice not found"
+            else:
+                raise AssertionError("expected BackendError")
+            assert not list(Path(tmp).iterdir())
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Tests for circuit breakers and the background health monitor.
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend_client import BackendError
+from backend_health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, HealthMonitor, is_backend_failure
+from backend_pool import BackendPool, NoHealthyBackend
+
+
+def test_opens_on_error_rate_and_recovers_through_trial():
+    breaker = CircuitBreaker("t", window=60, min_calls=4, error_rate=0.5, open_seconds=0.1)
+    for ok in (True, False, True, False):
+        assert breaker.begin()
+        breaker.record(ok)
+    assert breaker.state == OPEN
+    assert not breaker.available() and not breaker.begin()
+
+    time.sleep(0.12)
+    assert breaker.begin()  # the one trial request
+    assert breaker.state == HALF_OPEN and not breaker.begin()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker("t", min_calls=1, error_rate=0.5, open_seconds=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.begin()
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.trips == 2
+
+
+def test_slow_probes_trip_breaker():
+    breaker = CircuitBreaker("t", min_calls=3, probe_p95=1.0)
+    for _ in range(3):
+        breaker.record_probe(True, 2.0)
+    assert breaker.state == OPEN
+
+
+def test_caller_errors_do_not_count():
+    assert is_backend_failure(requests.ReadTimeout())
+    assert is_backend_failure(BackendError("x", 503, "overloaded"))
+    assert not is_backend_failure(BackendError("x", 404, "voice not found"))
+    try:
+        try:
+            raise BackendError("x", 500, "CUDA OOM")
+        except BackendError as e:
+            raise Exception("IndexTTS2 error: CUDA OOM") from e
+    except Exception as wrapped:
+        assert is_backend_failure(wrapped)
+    assert not is_backend_failure(ValueError("bad input"))
+
+
+def _replica(status):
+    state = {"status": status, "hits": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, code, body):
+            self.send_response(code)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._reply(200, b'{"status": "healthy", "model_loaded": true}')
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            state["hits"] += 1
+            self._reply(state["status"], b"audio" if state["status"] == 200 else b'{"detail": "boom"}')
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", state
+
+
+def _synth(client):
+    return client.fetch("POST", "/tts", data=b"x", timeout=5)
+
+
+def test_pool_stops_sending_to_tripped_replica():
+    bad_server, bad_url, bad = _replica(500)
+    good_server, good_url, good = _replica(200)
+    try:
+        pool = BackendPool("test-breaker", [bad_url, good_url], health_path="/health")
+        for replica in pool.replicas:
+            replica.breaker.min_calls = 2
+        for _ in range(12):
+            try:
+                pool.call(_synth)
+            except BackendError:
+                pass
+        assert pool.replicas[0].breaker.state == OPEN
+        assert bad["hits"] <= 3
+        assert pool.available()
+    finally:
+        bad_server.shutdown()
+        good_server.shutdown()
+
+
+def test_all_tripped_fails_fast():
+    server, url, _ = _replica(500)
+    try:
+        pool = BackendPool("test-fast", [url])
+        pool.replicas[0].breaker.min_calls = 1
+        try:
+            pool.call(_synth)
+        except BackendError:
+            pass
+        assert not pool.available()
+        began = time.monotonic()
+        try:
+            pool.call(_synth)
+        except NoHealthyBackend:
+            pass
+        else:
+            raise AssertionError("expected NoHealthyBackend")
+        assert time.monotonic() - began < 0.1
+    finally:
+        server.shutdown()
+
+
+def test_monitor_records_health_and_metrics():
+    server, url, _ = _replica(200)
+    try:
+        pool = BackendPool("test-monitor", [url], health_path="/health")
+        monitor = HealthMonitor([pool], interval=60)
+        monitor.run_once()
+        status = pool.status()[0]
+        assert status["healthy"] and status["health"]["model_loaded"] is True
+        names = {name for name, _, _ in monitor.metrics()}
+        assert {"backend_up", "backend_circuit_state", "backend_probe_p95_seconds"} <= names
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
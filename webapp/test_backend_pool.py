@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for fanning segments out across model-server replicas.
+Spins up throwaway local HTTP servers as stand-in replicas.
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend_pool import BackendPool, SegmentFailed, parse_urls
+
+
+def _replica(delay=0.2):
+    served = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            served.append(body)
+            time.sleep(delay)
+            if body == b"bad":
+                self.send_response(500)
+                reply = b"boom"
+            else:
+                self.send_response(200)
+                reply = body.upper()
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", served
+
+
+def _dead_url():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()  # nothing listens here
+    return f"http://127.0.0.1:{port}"
+
+
+def _synth(client, text):
+    return client.fetch("POST", "/tts", data=text.encode(), timeout=5).decode()
+
+
+def test_fans_out_and_keeps_order():
+    replicas = [_replica() for _ in range(3)]
+    try:
+        pool = BackendPool("test-fanout", [url for _, url, _ in replicas])
+        items = [f"segment {i}" for i in range(6)]
+        began = time.monotonic()
+        results = pool.map_ordered(_synth, items)
+        elapsed = time.monotonic() - began
+        assert results == [t.upper() for t in items]
+        assert [len(served) for _, _, served in replicas] == [2, 2, 2]
+        assert elapsed < 0.2 * 6 * 0.6  # well under sequential time
+    finally:
+        for server, _, _ in replicas:
+            server.shutdown()
+
+
+def test_routes_around_unreachable_replica():
+    server, url, served = _replica(delay=0)
+    try:
+        pool = BackendPool("test-failover", [_dead_url(), url], health_interval=60)
+        assert pool.map_ordered(_synth, ["a", "b", "c"]) == ["A", "B", "C"]
+        assert len(served) == 3
+        assert [r["healthy"] for r in pool.status()] == [False, True]
+    finally:
+        server.shutdown()
+
+
+def test_failure_reports_segment_index():
+    server, url, _ = _replica(delay=0)
+    try:
+        pool = BackendPool("test-failure", [url])
+        try:
+            pool.map_ordered(_synth, ["ok", "bad", "ok"])
+        except SegmentFailed as e:
+            assert e.index == 1
+        else:
+            raise AssertionError("expected SegmentFailed")
+    finally:
+        server.shutdown()
+
+
+def test_parse_urls():
+    assert parse_urls("http://a:1/, http://b:2  http://a:1", "http://x") == ["http://a:1", "http://b:2"]
+    assert parse_urls("", "http://x/") == ["http://x"]
+    assert parse_urls(None) == []
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
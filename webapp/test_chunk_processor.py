@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for chunk_processor: splitting, markers, and output stability on a long corpus.
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chunk_processor import process_text
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "001-long-text.txt")
+
+
+def _texts(chunks):
+    return [chunk["content"] for chunk in chunks]
+
+
+def _digest(chunks):
+    return hashlib.sha256(json.dumps(chunks, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def test_split_on_punctuation_and_length():
+    chunks = process_text("Hello... world! Is it ok?? Yes, it is; fine — done", max_chars=20)
+    assert _texts(chunks) == ["Hello... world! Is", "it ok? ? Yes, it is;", "fine — done"]
+    assert process_text("") == []
+
+
+def test_markers_apply_to_following_text():
+    text = "[[voice=a;emotion=sad]]Short. [[pitch=3]]Another sentence here, with a comma. tail without end"
+    chunks = process_text(text, max_chars=20)
+    assert _texts(chunks) == ["Short.", "Another sentence", "here, with a comma.", "tail without end"]
+    assert chunks[0]["voice"] == "a" and chunks[0]["emotion"] == "sad"
+    assert chunks[1]["pitch"] == 3
+
+
+def test_short_fragments_are_merged():
+    chunks = process_text("a. b. c. d. This is long enough to stand alone.", max_chars=20)
+    assert _texts(chunks) == ["a. b. c. d.", "This is long enough", "to stand alone."]
+
+
+def test_long_corpus_output_is_stable():
+    with open(CORPUS, encoding="utf-8") as fh:
+        text = fh.read()
+    chunks = process_text(text, max_chars=240)
+    assert len(chunks) == 3689
+    assert _digest(chunks) == "6a708c70007cc8bce4d7427100ea7210620652e3d0b6e31cc2bde900646097f9"
+    chunks = process_text(text, max_chars=60)
+    assert len(chunks) == 5214
+    assert _digest(chunks) == "5bec61b9fcbaf5c6452cea9152db3b569e22fd1c5f98be8d62ae487f0bca124f"
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for segmented HLS output from MP3 parts.
+"""
+
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hls_writer import HLSWriter, playlist_complete, timestamp_tag
+from mp3_assembler import iter_frames
+
+# MPEG-2 Layer III, 48 kbit/s, 24 kHz, mono: 144-byte frames of 24 ms
+HEADER = bytes([0xFF, 0xF3, 0x64, 0xC4])
+FRAME_SECONDS = 576 / 24000
+
+
+def _part(count):
+    return io.BytesIO((HEADER + b"\x55" * 140) * count)
+
+
+def test_segments_cut_on_frames_across_parts():
+    with tempfile.TemporaryDirectory() as tmp:
+        written = []
+        writer = HLSWriter(tmp, "job", segment_seconds=1, on_write=lambda p: written.append(p.name))
+        writer.add_part(_part(30))  # 0.72 s: no segment yet
+        assert writer.segments == [] and not writer.playlist_path.exists()
+        writer.add_part(_part(60))  # crosses 1 s twice
+        assert len(writer.segments) == 2 and not playlist_complete(writer.playlist_path)
+        assert "#EXT-X-ENDLIST" not in writer.playlist_path.read_text()
+        writer.finish()
+        assert playlist_complete(writer.playlist_path)
+
+        durations = [d for _, d in writer.segments]
+        assert all(d <= 1 + FRAME_SECONDS for d in durations)
+        assert abs(sum(durations) - 90 * FRAME_SECONDS) < 1e-9
+        assert written[:2] == ["job_00000.mp3", "job.m3u8"] and written[-1] == "job.m3u8"
+
+        lines = writer.playlist_path.read_text().splitlines()
+        assert lines[0] == "#EXTM3U" and "#EXT-X-TARGETDURATION:1" in lines
+        assert [line for line in lines if not line.startswith("#")] == [name for name, _ in writer.segments]
+
+        frames = 0
+        for name, _ in writer.segments:
+            with open(Path(tmp) / name, "rb") as fh:
+                assert fh.read(3) == b"ID3"  # timestamp tag
+                fh.seek(0)
+                frames += len(list(iter_frames(fh)))
+        assert frames == 90
+
+
+def test_resume_continues_an_interrupted_playlist():
+    with tempfile.TemporaryDirectory() as full_dir, tempfile.TemporaryDirectory() as tmp:
+        full = HLSWriter(full_dir, "job", segment_seconds=1)
+        full.add_part(_part(90))
+        full.finish()
+
+        crashed = HLSWriter(tmp, "job", segment_seconds=1)
+        crashed.add_part(_part(60))  # one segment written, the rest lost
+        assert len(crashed.segments) == 1
+
+        written = []
+        writer = HLSWriter(tmp, "job", segment_seconds=1, on_write=lambda p: written.append(p.name))
+        assert writer.resume() == 1
+        writer.add_part(_part(90))
+        writer.finish()
+        assert "job_00000.mp3" not in written  # kept, not rewritten
+        assert [n for n, _ in writer.segments] == [n for n, _ in full.segments]
+        assert writer.playlist_path.read_text() == full.playlist_path.read_text()
+        for name, _ in full.segments:
+            assert (Path(tmp) / name).read_bytes() == (Path(full_dir) / name).read_bytes()
+
+        assert HLSWriter(tmp, "missing", segment_seconds=1).resume() == 0
+
+
+def test_timestamp_tag():
+    tag = timestamp_tag(2.0)
+    assert tag.startswith(b"ID3\x04") and b"com.apple.streaming.transportStreamTimestamp\x00" in tag
+    assert tag.endswith((180000).to_bytes(8, "big"))
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for the Flask-Limiter storage on the shared SQLite counter file.
+Limits must hold across worker processes, not per process.
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from flask_limiter import Limiter
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, MovingWindowRateLimiter
+
+from limiter_storage import SQLiteLimiterStorage, limiter_storage_uri
+from shared_counters import SQLiteStore
+
+
+def _app(uri):
+    app = Flask(__name__)
+    limiter = Limiter(app=app, key_func=lambda: "client", storage_uri=uri, strategy="moving-window")
+
+    @app.route("/")
+    @limiter.limit("10 per minute")
+    def index():
+        return "ok"
+
+    return app
+
+
+def _requests(uri, n, statuses):
+    client = _app(uri).test_client()
+    for _ in range(n):
+        statuses.put(client.get("/").status_code)
+
+
+def test_limit_is_shared_across_processes():
+    if sys.platform.startswith("win"):
+        return  # the workers are forked
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'counters.db')}"
+        storage_from_string(uri)  # create the tables before the workers race
+        ctx = multiprocessing.get_context("fork")
+        statuses = ctx.Queue()
+        workers = [ctx.Process(target=_requests, args=(uri, 6, statuses)) for _ in range(4)]
+        for w in workers:
+            w.start()
+        codes = [statuses.get(timeout=30) for _ in range(24)]
+        for w in workers:
+            w.join(10)
+            assert w.exitcode == 0
+        # 24 requests, 10 allowed in total (not 10 per process)
+        assert codes.count(200) == 10 and codes.count(429) == 14
+
+
+def test_moving_and_fixed_windows():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "counters.db")
+        storage = storage_from_string(f"sqlite:///{path}")
+        assert isinstance(storage, SQLiteLimiterStorage) and storage.check()
+        item = parse("3 per minute")
+        for strategy in (MovingWindowRateLimiter(storage), FixedWindowRateLimiter(storage)):
+            assert [strategy.hit(item, "ip") for _ in range(4)] == [True, True, True, False]
+            assert strategy.get_window_stats(item, "ip").remaining == 0
+            strategy.clear(item, "ip")
+            assert strategy.hit(item, "ip")
+
+        # reset() clears the limits but not the Studio counters in the same file
+        SQLiteStore(path).add("studio:1", 5, 60)
+        assert storage.reset() > 0
+        assert MovingWindowRateLimiter(storage).test(item, "ip")
+        assert SQLiteStore(path).total("studio:1", 60) == 5
+
+
+def test_counter_store_uris():
+    assert limiter_storage_uri("unix:///run/redis.sock") == "redis+unix:///run/redis.sock"
+    assert limiter_storage_uri("redis://cache:6379/0") == "redis://cache:6379/0"
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
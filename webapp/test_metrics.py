@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the /metrics registry.
+Output must be valid text exposition format, histograms cumulative, and
+worker snapshots in METRICS_DIR merged into one view.
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+from metrics import Registry
+
+
+def _lines(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+
+def test_counter_and_gauge_render():
+    registry = Registry()
+    chars = registry.counter("chars_total", "Characters.", ("engine",))
+    rtf = registry.gauge("rtf", "Realtime factor.", ("voice",))
+    chars.inc(120, engine="edge")
+    chars.inc(30, engine="edge")
+    rtf.set(0.25, voice='say "hi"')
+
+    text = registry.render()
+    assert "# HELP chars_total Characters." in text
+    assert "# TYPE chars_total counter" in text
+    assert 'chars_total{engine="edge"} 150' in text
+    assert 'rtf{voice="say \\"hi\\""} 0.25' in text
+    assert text.endswith("\n")
+    assert registry.counter("chars_total", "Characters.", ("engine",)) is chars
+    try:
+        chars.inc(engine="edge", voice="x")
+        assert False, "wrong label set accepted"
+    except ValueError:
+        pass
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    stage = registry.histogram("stage_seconds", "Stage time.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        stage.observe(value, stage="ttfb")
+
+    text = registry.render()
+    assert _lines(text, "stage_seconds_bucket") == [
+        'stage_seconds_bucket{stage="ttfb",le="0.1"} 1',
+        'stage_seconds_bucket{stage="ttfb",le="1"} 3',
+        'stage_seconds_bucket{stage="ttfb",le="+Inf"} 4',
+    ]
+    assert 'stage_seconds_count{stage="ttfb"} 4' in text
+    assert 'stage_seconds_sum{stage="ttfb"} 4.25' in text
+    assert stage.count(stage="ttfb") == 4
+
+
+def test_worker_snapshots_are_merged():
+    registry = Registry()
+    chars = registry.counter("chars_total", "Characters.", ("engine",))
+    rtf = registry.gauge("rtf", "Realtime factor.", ("voice",))
+    chars.inc(10, engine="edge")
+    rtf.set(0.5, voice="a")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original = metrics.METRICS_DIR
+        metrics.METRICS_DIR = tmp
+        try:
+            # An exited worker: its counter still counts, its gauge is stale
+            with open(os.path.join(tmp, "metrics-999999999.json"), "w") as fh:
+                json.dump({"pid": 999999999, "time": 1.0, "families": {
+                    "chars_total": {"kind": "counter", "help": "Characters.", "labels": ["engine"],
+                                    "buckets": [], "values": [[["edge"], 5.0], [["indextts"], 7.0]]},
+                    "rtf": {"kind": "gauge", "help": "Realtime factor.", "labels": ["voice"],
+                            "buckets": [], "values": [[["b"], 0.9]]},
+                }}, fh)
+            registry.write_snapshot()
+            assert os.path.exists(os.path.join(tmp, f"metrics-{os.getpid()}.json"))
+            text = registry.render()
+        finally:
+            metrics.METRICS_DIR = original
+
+    assert 'chars_total{engine="edge"} 15' in text
+    assert 'chars_total{engine="indextts"} 7' in text
+    assert 'rtf{voice="a"} 0.5' in text
+    assert 'rtf{voice="b"}' not in text
+
+
+def test_collectors_are_read_at_scrape_time():
+    registry = Registry()
+    state = {"healthy": 1}
+    registry.add_collector(lambda: [("backend_healthy", {"backend": "chatterbox"}, state["healthy"])])
+    registry.add_collector(lambda: 1 / 0)  # must not break the scrape
+
+    assert 'backend_healthy{backend="chatterbox"} 1' in registry.render()
+    state["healthy"] = 0
+    assert 'backend_healthy{backend="chatterbox"} 0' in registry.render()
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for versioned schema migrations.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from migrations import Migration, MigrationRunner
+
+
+def _runner(tmp, migrations):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp, 'app.db')}", connect_args={"timeout": 10})
+    return engine, MigrationRunner(lambda: engine, migrations, lock_path=os.path.join(tmp, "migrate.lock"))
+
+
+def test_migrations_apply_once_in_order():
+    calls = []
+    migrations = [
+        Migration(2, "add_column", lambda conn: (calls.append(2), conn.execute(text("ALTER TABLE t ADD COLUMN b INTEGER")))),
+        Migration(1, "create_table", lambda conn: (calls.append(1), conn.execute(text("CREATE TABLE t (a INTEGER)")))),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, runner = _runner(tmp, migrations)
+        assert runner.current_version() == 0 and len(runner.pending()) == 2
+        assert [m.version for m in runner.upgrade()] == [1, 2]
+        assert runner.upgrade() == [] and runner.ensure_current() == []
+        assert calls == [1, 2] and runner.current_version() == 2
+        engine.dispose()
+
+
+def test_failed_migration_is_not_recorded():
+    def broken(conn):
+        conn.execute(text("CREATE TABLE half (a INTEGER)"))
+        raise RuntimeError("boom")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, runner = _runner(tmp, [Migration(1, "ok", lambda conn: None), Migration(2, "broken", broken)])
+        try:
+            runner.upgrade()
+        except RuntimeError:
+            pass
+        assert runner.current_version() == 1
+        engine.dispose()
+
+
+def test_concurrent_upgrades_apply_each_migration_once():
+    calls = []
+    migrations = [Migration(1, "counted", lambda conn: calls.append(1))]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, runner = _runner(tmp, migrations)
+        threads = [threading.Thread(target=runner.ensure_current) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert calls == [1]
+        engine.dispose()
+
+
+def test_duplicate_versions_rejected():
+    try:
+        MigrationRunner(lambda: None, [Migration(1, "a", print), Migration(1, "b", print)])
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
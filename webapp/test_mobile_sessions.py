@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the mobile session token cache.
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mobile_sessions import CachedSession, SessionCache, hash_token, session_expiry
+
+
+def _session(user_id=1, expires_in=3600):
+    return CachedSession(user_id=user_id, expires_at=datetime.utcnow() + timedelta(seconds=expires_in))
+
+
+def test_token_is_hashed():
+    assert hash_token("abc") == hash_token("abc")
+    assert len(hash_token("abc")) == 64 and hash_token("abc") != hash_token("abd")
+    assert session_expiry() > datetime.utcnow() + timedelta(days=1)
+
+
+def test_entries_respect_cache_ttl_and_session_expiry():
+    cache = SessionCache(ttl=0.05)
+    cache.put("h1", _session())
+    assert cache.get("h1") is not None
+    time.sleep(0.06)
+    assert cache.get("h1") is None
+
+    cache = SessionCache(ttl=60)
+    cache.put("h2", _session(expires_in=-1))  # session expired before the cache entry
+    assert cache.get("h2") is None and len(cache) == 0
+
+
+def test_invalidate_and_lru_bound():
+    cache = SessionCache(ttl=60, max_size=2)
+    cache.put("h1", _session(user_id=7))
+    cache.put("h2", _session(user_id=7))
+    cache.get("h1")  # h2 is now least recently used
+    cache.put("h3", _session(user_id=8))
+    assert cache.get("h2") is None
+    cache.invalidate(user_id=7)
+    assert cache.get("h1") is None and cache.get("h3") is not None
+    cache.invalidate("h3")
+    assert len(cache) == 0
+
+
+def test_cleanup_due_once_per_interval():
+    cache = SessionCache()
+    assert cache.cleanup_due(interval=0) is True
+    assert cache.cleanup_due(interval=60) is False
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
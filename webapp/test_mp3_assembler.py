@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for frame-accurate MP3 concatenation with a Xing/Info header.
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mp3_assembler import assemble_mp3, iter_frames, parse_header, read_info
+
+# MPEG-2 Layer III, 48 kbit/s, 24 kHz, mono (Edge TTS output): 144-byte frames
+HEADER = bytes([0xFF, 0xF3, 0x64, 0xC4])
+
+
+def _frames(count, fill=0x55):
+    return (HEADER + bytes([fill]) * 140) * count
+
+
+def _id3(payload=b"x" * 20):
+    size = len(payload)
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x03\x00\x00" + syncsafe + payload
+
+
+def _with_info(count):
+    """A part as an encoder would write it: ID3v2, an Info frame, audio, ID3v1."""
+    info = bytearray(HEADER + bytes(140))
+    info[13:17] = b"Info"
+    return _id3() + bytes(info) + _frames(count) + b"TAG" + bytes(125)
+
+
+def test_parse_header():
+    header = parse_header(HEADER)
+    assert (header.bitrate, header.sample_rate, header.mono, header.length) == (48, 24000, True, 144)
+    assert header.samples == 576
+    assert parse_header(b"\xff\xff\xff\xff") is None and parse_header(b"ID3\x03") is None
+
+
+def test_iter_frames_skips_tags_and_junk_with_small_blocks():
+    data = _with_info(5) + b"\x00\xff\xe0junk" + _frames(3)
+    frames = list(iter_frames(io.BytesIO(data), block_size=7))
+    assert len(frames) == 1 + 5 + 3  # the Info frame is still a frame here
+    assert all(len(frame) == 144 for _, frame in frames)
+
+
+def test_assemble_strips_per_part_metadata_and_writes_info_header():
+    with tempfile.TemporaryDirectory() as tmp:
+        dest = os.path.join(tmp, "merged.mp3")
+        info = assemble_mp3([io.BytesIO(_with_info(100)), io.BytesIO(_with_info(50))], dest)
+        assert info.frames == 150 and not info.vbr
+        assert abs(info.duration - 150 * 576 / 24000) < 1e-9
+        with open(dest, "rb") as fh:
+            data = fh.read()
+        assert len(data) == info.bytes == 144 * 151
+        assert b"ID3" not in data and b"TAG" not in data
+        assert data[144:] == _frames(150)
+
+        frames, size, toc = read_info(dest)
+        assert (frames, size) == (150, len(data))
+        assert toc[0] <= 1 and list(toc) == sorted(toc) and toc[50] in range(126, 130)
+
+
+def test_reassembling_merged_output_drops_old_header():
+    with tempfile.TemporaryDirectory() as tmp:
+        first = os.path.join(tmp, "a.mp3")
+        assemble_mp3([io.BytesIO(_frames(10))], first)
+        info = assemble_mp3([first, first], os.path.join(tmp, "b.mp3"))
+        assert info.frames == 20
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for pre-warming fixed-text previews into the synthesis cache.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from preview_warmer import PreviewWarmer, RateLimiter, WarmJob
+from single_flight import SingleFlight
+
+
+def _jobs(out_dir, flight, names, calls):
+    def make(name):
+        path = Path(out_dir) / f"{name}.wav"
+
+        def render():
+            def produce(partial):
+                calls.append(name)
+                time.sleep(0.05)
+                partial.write_bytes(name.encode())
+            return flight.render(path.name, path, produce)
+
+        return WarmJob(name=name, output_path=path, render=render)
+
+    return [make(n) for n in names]
+
+
+def test_renders_missing_previews_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        flight = SingleFlight(Path(tmp) / ".locks")
+        calls = []
+        warmer = PreviewWarmer(
+            {"a": lambda: _jobs(tmp, flight, ["p1", "p2", "p3"], calls)},
+            lock_path=Path(tmp) / ".locks" / "prewarm.lock", concurrency=2, rate=0,
+        )
+        stats = warmer.run_once()
+        assert stats["rendered"] == 3 and stats["cached"] == 0
+        assert sorted(calls) == ["p1", "p2", "p3"]
+
+        again = warmer.run_once()
+        assert again["cached"] == 3 and again["rendered"] == 0
+        assert len(calls) == 3
+
+
+def test_request_after_warm_is_cache_hit():
+    with tempfile.TemporaryDirectory() as tmp:
+        flight = SingleFlight(Path(tmp) / ".locks")
+        calls = []
+        warmer = PreviewWarmer({"a": lambda: _jobs(tmp, flight, ["voice"], calls)},
+                               lock_path=Path(tmp) / "prewarm.lock", rate=0)
+        warmer.run_once()
+        # The endpoint runs the same render call; nothing new is synthesized
+        _jobs(tmp, flight, ["voice"], calls)[0].render()
+        assert calls == ["voice"]
+
+
+def test_failing_source_and_job_are_skipped():
+    with tempfile.TemporaryDirectory() as tmp:
+        flight = SingleFlight(Path(tmp) / ".locks")
+        calls = []
+
+        def broken_source():
+            raise RuntimeError("catalog unreachable")
+
+        def broken_render():
+            raise RuntimeError("HTTP 500")
+
+        warmer = PreviewWarmer(
+            {
+                "down": broken_source,
+                "up": lambda: _jobs(tmp, flight, ["ok"], calls)
+                + [WarmJob("bad", Path(tmp) / "bad.wav", broken_render)],
+            },
+            lock_path=Path(tmp) / "prewarm.lock", rate=0,
+        )
+        stats = warmer.run_once()
+        assert stats["rendered"] == 1 and stats["failed"] == 1 and calls == ["ok"]
+
+
+def test_only_one_leader_warms():
+    with tempfile.TemporaryDirectory() as tmp:
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_source():
+            started.set()
+            release.wait(2)
+            return []
+
+        lock_path = Path(tmp) / "prewarm.lock"
+        leader = PreviewWarmer({"slow": slow_source}, lock_path=lock_path, rate=0)
+        follower = PreviewWarmer({"slow": slow_source}, lock_path=lock_path, rate=0)
+        thread = threading.Thread(target=leader.run_if_leader)
+        thread.start()
+        started.wait(2)
+        assert follower.run_if_leader() is None
+        release.set()
+        thread.join()
+
+
+def test_rate_limiter_spaces_renders():
+    limiter = RateLimiter(rate=20)
+    began = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - began >= 4 / 20 * 0.9
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
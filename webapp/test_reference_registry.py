@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for the Chatterbox reference-audio registry.
+A cloned-voice job must not re-check or re-upload its reference per chunk.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from reference_registry import ReferenceRegistry, generation_from_health
+
+
+class FakeServer:
+    def __init__(self, files=()):
+        self.files = set(files)
+        self.generation = ("boot_id", 1)
+        self.manifest_calls = 0
+        self.uploads = []
+        self.probes = 0
+
+    def list_files(self):
+        self.manifest_calls += 1
+        return list(self.files)
+
+    def upload(self, local_path, filename):
+        self.uploads.append(filename)
+        self.files.add(filename)
+        return filename
+
+    def probe(self):
+        self.probes += 1
+        return self.generation
+
+    def restart(self):
+        self.files.clear()
+        self.generation = ("boot_id", self.generation[1] + 1)
+
+
+def _wav(tmp, name, content=b"RIFF voice"):
+    path = Path(tmp) / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_thirty_chunks_cost_one_upload():
+    with tempfile.TemporaryDirectory() as tmp:
+        server = FakeServer()
+        registry = ReferenceRegistry(server.list_files, server.upload, server.probe, ttl=60)
+        path = _wav(tmp, "Sample Audio.wav")
+        for _ in range(30):
+            assert registry.ensure(path, "Sample_Audio.wav") == "Sample_Audio.wav"
+        assert server.uploads == ["Sample_Audio.wav"]
+        assert server.manifest_calls == 1
+        assert server.probes == 1
+
+
+def test_existing_server_file_is_not_uploaded():
+    with tempfile.TemporaryDirectory() as tmp:
+        server = FakeServer(files={"Sample_Audio.wav"})
+        registry = ReferenceRegistry(server.list_files, server.upload, server.probe, ttl=60)
+        registry.ensure(_wav(tmp, "a.wav"), "Sample_Audio.wav")
+        assert server.uploads == []
+
+
+def test_changed_local_content_is_reuploaded():
+    with tempfile.TemporaryDirectory() as tmp:
+        server = FakeServer()
+        registry = ReferenceRegistry(server.list_files, server.upload, server.probe, ttl=60)
+        path = _wav(tmp, "a.wav")
+        registry.ensure(path, "a.wav")
+        time.sleep(0.01)
+        Path(path).write_bytes(b"RIFF a different take")
+        registry.ensure(path, "a.wav")
+        assert server.uploads == ["a.wav", "a.wav"]
+
+
+def test_edited_file_found_on_server_is_reuploaded():
+    with tempfile.TemporaryDirectory() as tmp:
+        server = FakeServer(files={"a.wav"})
+        registry = ReferenceRegistry(server.list_files, server.upload, server.probe, ttl=60)
+        path = _wav(tmp, "a.wav")
+        registry.ensure(path, "a.wav")
+        registry.ensure(path, "a.wav")
+        assert server.uploads == []
+        time.sleep(0.01)
+        Path(path).write_bytes(b"RIFF a different take")
+        registry.ensure(path, "a.wav")
+        registry.ensure(path, "a.wav")
+        assert server.uploads == ["a.wav"]
+
+
+def test_slow_upload_does_not_block_other_voices():
+    with tempfile.TemporaryDirectory() as tmp:
+        server = FakeServer()
+        release = threading.Event()
+        slow_upload = server.upload
+
+        def upload(local_path, filename):
+            if filename == "slow.wav":
+                assert release.wait(5)
+            return slow_upload(local_path, filename)
+
+        registry = ReferenceRegistry(server.list_files, upload, server.probe, ttl=60)
+        slow = threading.Thread(target=registry.ensure, args=(_wav(tmp, "slow.wav"), "slow.wav"))
+        slow.start()
+        try:
+            time.sleep(0.05)
+            assert registry.ensure(_wav(tmp, "fast.wav"), "fast.wav") == "fast.wav"
+            assert server.uploads == ["fast.wav"]
+        finally:
+            release.set()
+            slow.join()
+        assert sorted(server.uploads) == ["fast.wav", "slow.wav"]
+
+
+def test_server_restart_triggers_one_reupload():
+    with tempfile.TemporaryDirectory() as tmp:
+        server = FakeServer()
+        registry = ReferenceRegistry(server.list_files, server.upload, server.probe, ttl=0)
+        path = _wav(tmp, "a.wav")
+        registry.ensure(path, "a.wav")
+        registry.ensure(path, "a.wav")
+        assert server.uploads == ["a.wav"]
+        server.restart()
+        for _ in range(3):
+            registry.ensure(path, "a.wav")
+        assert server.uploads == ["a.wav", "a.wav"]
+
+
+def test_without_generation_manifest_is_rechecked_after_ttl():
+    with tempfile.TemporaryDirectory() as tmp:
+        server = FakeServer()
+        registry = ReferenceRegistry(server.list_files, server.upload, ttl=0)
+        path = _wav(tmp, "a.wav")
+        registry.ensure(path, "a.wav")
+        server.files.clear()  # wiped without a detectable restart
+        registry.ensure(path, "a.wav")
+        assert server.uploads == ["a.wav", "a.wav"]
+
+
+def test_generation_from_health():
+    assert generation_from_health({"status": "ok"}) is None
+    assert generation_from_health({"status": "ok", "started_at": 5}) == (("started_at", 5),)
+    assert generation_from_health("ok") is None
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
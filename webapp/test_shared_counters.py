@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for shared sliding-window counters and batched usage flushing.
+Uses the SQLite stand-in, which is what workers share without Redis.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Process
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from shared_counters import MemoryStore, SQLiteStore, UsageFlusher, open_store
+
+
+def _hammer(path, key, n):
+    store = SQLiteStore(path)
+    for _ in range(n):
+        store.hit(key, 50, 60)
+
+
+def test_limit_is_shared_across_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "counters.db")
+        SQLiteStore(path)  # create the table before the workers race
+        workers = [Process(target=_hammer, args=(path, "rpm:1", 30)) for _ in range(4)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        store = SQLiteStore(path)
+        # 120 attempts, 50 allowed in total (not 50 per process)
+        assert store.total("rpm:1", 60) == 50
+        assert not store.hit("rpm:1", 50, 60).allowed
+
+
+def test_threads_never_overshoot():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteStore(os.path.join(tmp, "counters.db"))
+        allowed = []
+
+        def worker():
+            for _ in range(20):
+                if store.hit("k", 25, 60).allowed:
+                    allowed.append(1)
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(allowed) == 25
+
+
+def test_sliding_window_weights_previous_bucket():
+    store = MemoryStore()
+    window = 0.2
+    # Start at the beginning of a bucket so both hits land in it
+    time.sleep(window - (time.time() % window) + 0.01)
+    assert store.hit("w", 2, window).allowed
+    assert store.hit("w", 2, window).allowed
+    assert not store.hit("w", 2, window).allowed
+    time.sleep(window)  # next bucket: most of the previous one still counts
+    assert store.total("w", window) > 0
+    time.sleep(window * 2)
+    assert store.total("w", window) == 0
+    assert store.hit("w", 2, window).allowed
+
+
+def test_add_and_total_weighted_amounts():
+    store = open_store("memory://")
+    store.add("seconds", 30.5, 3600)
+    assert store.add("seconds", 10, 3600) == 40.5
+    assert store.total("seconds", 3600) == 40.5
+    assert store.hit("seconds", 45, 3600, cost=4.5).allowed
+    assert not store.hit("seconds", 45, 3600, cost=1).allowed
+
+
+def test_flusher_batches_latest_values_and_retries():
+    batches = []
+    fail = {"once": True}
+
+    def flush(batch):
+        if fail["once"]:
+            fail["once"] = False
+            raise RuntimeError("database is locked")
+        batches.append(batch)
+
+    flusher = UsageFlusher(flush, interval=3600)
+    flusher.record(1, {"hourly": 10})
+    flusher.record(1, {"hourly": 20, "daily": 20})
+    flusher.record(2, {"hourly": 5})
+    assert flusher.flush() == 0  # failed, kept for the next round
+    flusher.record(1, {"hourly": 30})
+    assert flusher.flush() == 2
+    assert batches == [{1: {"hourly": 30, "daily": 20}, 2: {"hourly": 5}}]
+    assert flusher.pending() == 0
+    flusher.stop()
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for single-flight request coalescing.
+Many identical concurrent renders (threads and separate processes) must
+collapse to one call to the producer.
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from single_flight import SingleFlight
+
+
+def test_threads_collapse_to_one_render():
+    with tempfile.TemporaryDirectory() as tmp:
+        flight = SingleFlight(Path(tmp) / ".locks")
+        output = Path(tmp) / "speech_abc.mp3"
+        calls = []
+        start = threading.Barrier(20)
+
+        def produce(partial):
+            calls.append(partial)
+            time.sleep(0.1)  # simulated upstream synthesis
+            partial.write_bytes(b"ID3 audio")
+
+        def request(_):
+            start.wait()
+            return flight.render("speech_abc", output, produce)
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            results = list(pool.map(request, range(20)))
+
+        assert len(calls) == 1
+        assert all(r == output for r in results)
+        assert output.read_bytes() == b"ID3 audio"
+        assert not list(Path(tmp).glob("*.part*"))
+
+
+def test_failed_render_lets_next_request_retry():
+    with tempfile.TemporaryDirectory() as tmp:
+        flight = SingleFlight(Path(tmp) / ".locks")
+        output = Path(tmp) / "speech_fail.mp3"
+
+        def boom(partial):
+            partial.write_bytes(b"half")
+            raise RuntimeError("upstream 500")
+
+        try:
+            flight.render("speech_fail", output, boom)
+        except RuntimeError:
+            pass
+        assert not output.exists()
+        assert not list(Path(tmp).glob(".*.part*"))
+
+        flight.render("speech_fail", output, lambda p: p.write_bytes(b"ok"))
+        assert output.read_bytes() == b"ok"
+
+
+def test_different_keys_do_not_wait_on_each_other():
+    with tempfile.TemporaryDirectory() as tmp:
+        flight = SingleFlight(Path(tmp) / ".locks", stripes=4096)
+        release = threading.Event()
+
+        def slow(partial):
+            release.wait(5)
+            partial.write_bytes(b"a")
+
+        t = threading.Thread(target=flight.render, args=("key-a", Path(tmp) / "a.mp3", slow))
+        t.start()
+        time.sleep(0.05)
+        began = time.monotonic()
+        flight.render("key-b", Path(tmp) / "b.mp3", lambda p: p.write_bytes(b"b"))
+        assert time.monotonic() - began < 1
+        release.set()
+        t.join()
+
+
+def test_try_hold_does_not_wait():
+    with tempfile.TemporaryDirectory() as tmp:
+        flight = SingleFlight(Path(tmp) / ".locks")
+        other_worker = SingleFlight(Path(tmp) / ".locks")
+        with flight.try_hold("playlist") as owner:
+            assert owner
+            began = time.monotonic()
+            with other_worker.try_hold("playlist") as second:
+                assert not second
+            assert time.monotonic() - began < 1
+        with other_worker.try_hold("playlist") as owner:
+            assert owner
+
+
+def _worker_render(lock_dir, output, log_path, barrier):
+    flight = SingleFlight(lock_dir)
+    barrier.wait()
+
+    def produce(partial):
+        with open(log_path, "a") as log:
+            log.write(f"{os.getpid()}\n")
+        time.sleep(0.2)
+        Path(partial).write_bytes(b"rendered")
+
+    flight.render("shared", output, produce)
+
+
+def test_processes_collapse_to_one_render():
+    if sys.platform.startswith("win"):
+        return  # cross-process locking needs fcntl
+    with tempfile.TemporaryDirectory() as tmp:
+        lock_dir = Path(tmp) / ".locks"
+        output = Path(tmp) / "speech_shared.mp3"
+        log_path = Path(tmp) / "calls.log"
+        ctx = multiprocessing.get_context("fork")
+        barrier = ctx.Barrier(4)
+        procs = [ctx.Process(target=_worker_render, args=(lock_dir, output, log_path, barrier)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(10)
+            assert p.exitcode == 0
+        assert len(log_path.read_text().splitlines()) == 1
+        assert output.read_bytes() == b"rendered"
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the SSML builder: emphasis, multi-voice documents and batch mode.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ssml_builder import build_ssml, build_ssml_batch
+
+EMPHASIS = '<emphasis level="moderate">'
+
+
+def test_single_voice_prosody_emphasis_and_pause():
+    result = build_ssml("en-US-AriaNeural", [{"content": "The wonderful garden & the quiet river.", "pitch": 80}])
+    assert not result["is_full_ssml"]
+    assert result["warnings"] == ["chunk 0: pitch clamped 80.0 -> 50"]
+    assert result["ssml"] == (
+        '<prosody rate="+0%" pitch="+50%" volume="+0%">The <emphasis level="moderate">wonderful</emphasis> '
+        '<emphasis level="moderate">garden</emphasis> &amp; the quiet <emphasis level="moderate">river</emphasis>.'
+        '</prosody><break time="280ms"/>'
+    )
+
+
+def test_emphasis_wraps_each_keyword_once_and_never_inside_tags():
+    ssml = build_ssml("v", [{"content": "level first-level level planet planet"}])["ssml"]
+    assert ssml.count(EMPHASIS) == 2
+    assert "<emphasis <" not in ssml and EMPHASIS + EMPHASIS not in ssml
+    assert ssml.startswith('<prosody rate="+0%" pitch="+0%" volume="+0%"><emphasis level="moderate">level</emphasis> ')
+
+
+def test_multi_voice_document():
+    result = build_ssml("A", [
+        {"content": "Hello there.", "voice": "A", "emotion": "cheerful", "intensity": 3},
+        {"content": "Hi!", "voice": "B"},
+    ])
+    assert result["is_full_ssml"]
+    assert result["ssml"].startswith("<speak ") and result["ssml"].endswith("</voice></speak>")
+    assert ('<voice name="A"><mstts:express-as style="cheerful" styledegree="1.30">Hello there.'
+            '</mstts:express-as><break time="280ms"/></voice><voice name="B">Hi!') in result["ssml"]
+    assert EMPHASIS not in result["ssml"]
+
+
+def test_batch_matches_per_chunk_build():
+    chunks = [
+        {"content": "First paragraph about astronomy, stars and galaxies."},
+        {"content": "   "},
+        {"content": "Second speaker talks slowly", "voice": "B", "speed": -70},
+    ]
+    batch = build_ssml_batch("A", chunks, global_pitch=5)
+    expected = [
+        build_ssml(chunk.get("voice") or "A", [chunk], global_pitch=5)
+        for chunk in chunks if chunk["content"].strip()
+    ]
+    assert [part["ssml"] for part in batch["parts"]] == [r["ssml"] for r in expected]
+    assert [part["voice"] for part in batch["parts"]] == ["A", "B"]
+    assert batch["chunk_map"] == [r["chunk_map"][0] for r in expected]
+    assert batch["ssml"] == "".join(r["ssml"] for r in expected)
+    assert batch["warnings"] == ["chunk 2: rate clamped -70.0 -> -50"]
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-pass text normalizer used before model TTS.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from text_normalizer import Normalizer, Rule, RulePack, default_normalizer, number_words, ordinal_words, year_words
+
+
+def test_default_packs_match_legacy_preprocessing():
+    normalizer = default_normalizer("contractions,numbers")
+    text = "I'm here.  Don't go!\n\nIt's 2024 and 1 of 12 things 😀"
+    assert normalizer.normalize(text) == (
+        "I am here.   Do not go!   It is twenty twenty four and one of twelve things."
+    )
+    # Whole words only: no expansion inside longer words or numbers
+    assert normalizer.normalize("ache's 123 v1") == "ache's 123 v1."
+    assert normalizer.normalize("") == ""
+
+
+def test_number_words():
+    assert number_words(0) == "zero" and number_words(115) == "one hundred fifteen"
+    assert number_words(1_204_000) == "one million two hundred four thousand"
+    assert ordinal_words(3) == "third" and ordinal_words(40) == "fortieth" and ordinal_words(21) == "twenty first"
+    assert year_words(1999) == "nineteen ninety nine" and year_words(2005) == "two thousand five"
+
+
+def test_dates_and_currency_take_precedence_over_numbers():
+    normalizer = default_normalizer("dates,currency,numbers")
+    assert normalizer.normalize("Due 2024-03-15: $1,250.5, then €1 on May 2") == (
+        "Due March fifteenth, twenty twenty four: one thousand two hundred fifty dollars"
+        " and fifty cents, then one euro on May second."
+    )
+
+
+def test_custom_pack_and_memoization():
+    pack = RulePack("units", (Rule(r"(\d+)\s?km\b", lambda m: f"{number_words(int(m.group(1)))} kilometers"),))
+    normalizer = Normalizer([pack])
+    assert normalizer.normalize("Ran 42km today") == "Ran forty two kilometers today."
+    normalizer.normalize("Ran 42km today")
+    assert normalizer.cache_info().hits == 1
+    try:
+        default_normalizer("numbers,nope")
+        assert False, "unknown pack accepted"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for request tracing.
+Spans must nest, follow fan-out threads, reach the model servers in the
+`traceparent` header and land in the JSON-lines sink.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import tracing
+from backend_pool import BackendPool
+
+
+class _Sink:
+    """Point tracing at a temporary TRACE_FILE for the with-block."""
+
+    def __enter__(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "traces.jsonl")
+        self.original = tracing.TRACE_FILE
+        tracing.TRACE_FILE = self.path
+        return self
+
+    def spans(self):
+        tracing.flush()
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as fh:
+            return [json.loads(line) for line in fh]
+
+    def __exit__(self, *exc):
+        tracing.flush()
+        tracing.TRACE_FILE = self.original
+        self.dir.cleanup()
+
+
+def _replica():
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            seen.append(self.headers.get("traceparent"))
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", seen
+
+
+def test_traceparent_round_trip():
+    ctx = tracing.SpanContext("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+    assert ctx.header() == "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    assert tracing.parse_traceparent(ctx.header()) == ctx
+    assert tracing.parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00").sampled is False
+    for bad in (None, "", "garbage", "00-xyz-00f067aa0ba902b7-01",
+                "00-00000000000000000000000000000000-00f067aa0ba902b7-01"):
+        assert tracing.parse_traceparent(bad) is None
+
+
+def test_spans_nest_and_reach_the_sink():
+    with _Sink() as sink:
+        with tracing.start_trace("POST api_generate_premium") as root:
+            with tracing.span("segment", chars=42):
+                pass
+            with tracing.span("synthesis", engine="chatterbox"):
+                tracing.record("queue_wait", 0.0, 0.25, backend="chatterbox")
+            try:
+                with tracing.span("file_write"):
+                    raise OSError("disk full")
+            except OSError:
+                pass
+        assert tracing.current() is None
+        spans = {entry["name"]: entry for entry in sink.spans()}
+
+    trace = root.context.trace_id
+    assert set(spans) == {"POST api_generate_premium", "segment", "synthesis", "queue_wait", "file_write"}
+    assert all(entry["trace_id"] == trace for entry in spans.values())
+    assert spans["segment"]["parent_id"] == root.context.span_id
+    assert spans["queue_wait"]["parent_id"] == spans["synthesis"]["span_id"]
+    assert spans["queue_wait"]["duration_ms"] == 250.0
+    assert spans["segment"]["attrs"] == {"chars": 42}
+    assert spans["file_write"]["error"] == "OSError: disk full"
+
+    lines = tracing.waterfall(list(spans.values())).splitlines()
+    assert len(lines) == 5
+    assert ":POST api_generate_premium" in lines[0] and not lines[0].startswith(" ")
+    assert any(line.startswith("    ") and ":queue_wait" in line for line in lines)  # grandchild
+    assert any(":file_write" in line and line.endswith("!") for line in lines)
+
+
+def test_header_follows_fan_out_threads_to_the_server():
+    servers = [_replica() for _ in range(2)]
+    pool = BackendPool("chatterbox", [url for _, url, _ in servers])
+    try:
+        with _Sink() as sink:
+            with tracing.start_trace("POST api_generate_premium") as root:
+                out = pool.map_ordered(lambda client, text: client.fetch("POST", "/tts", data=text.encode(), timeout=5),
+                                       ["a", "b", "c", "d"])
+            spans = sink.spans()
+    finally:
+        for server, _, _ in servers:
+            server.shutdown()
+
+    assert out == [b"a", b"b", b"c", b"d"]
+    headers = [header for _, _, seen in servers for header in seen]
+    assert len(headers) == 4
+    calls = {entry["span_id"]: entry for entry in spans if entry["name"] == "backend_call"}
+    for header in headers:
+        ctx = tracing.parse_traceparent(header)
+        assert ctx.trace_id == root.context.trace_id and ctx.sampled
+        assert calls[ctx.span_id]["parent_id"] == root.context.span_id  # server spans hang off the call
+        assert calls[ctx.span_id]["attrs"]["status"] == 200
+    assert sum(entry["name"] == "queue_wait" for entry in spans) == 4
+
+
+def test_unsampled_trace_propagates_but_records_nothing():
+    incoming = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00"
+    with _Sink() as sink:
+        with tracing.start_trace("GET api_engines", incoming):
+            with tracing.span("synthesis"):
+                header = tracing.inject()[tracing.TRACE_HEADER]
+        assert sink.spans() == []
+    assert header.startswith("00-4bf92f3577b34da6a3ce929d0e0e4736-") and header.endswith("-00")
+    assert tracing.inject() == {}
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared synthesis pipeline.
+Uses an in-process fake engine; no model servers needed.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend_pool import SegmentFailed
+from single_flight import SingleFlight
+from tts_engines import Capabilities, Engine, Segment, SynthesisPipeline
+
+
+class FakeEngine(Engine):
+    name = "fake"
+
+    def __init__(self, batch=False, max_batch=None, fail_batch=False, fail_text=None):
+        super().__init__()
+        self.capabilities = Capabilities(batch=batch, max_batch_segments=max_batch)
+        self.fail_batch = fail_batch
+        self.fail_text = fail_text
+        self.calls = []
+
+    def synthesize(self, segment, backend=None):
+        self.calls.append(("one", segment.text))
+        if segment.text == self.fail_text:
+            raise RuntimeError("server error")
+        return segment.text.encode()
+
+    def stream(self, segment, output_path, backend=None):
+        self.calls.append(("stream", segment.text))
+        Path(output_path).write_bytes(segment.text.encode())
+        return Path(output_path)
+
+    def synthesize_batch(self, segments, silence_ms, output_path, backend=None):
+        self.calls.append(("batch", silence_ms))
+        if self.fail_batch:
+            raise RuntimeError("batch timeout")
+        Path(output_path).write_bytes(b"|".join(s.text.encode() for s in segments))
+        return Path(output_path)
+
+
+def join(chunks, crossfade_ms, silence_ms):
+    return b"+".join(chunks)
+
+
+def _segments(*texts):
+    return [Segment(text=t, voice="Emily", stats={"chars": len(t)}) for t in texts]
+
+
+def test_per_segment_assembles_in_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = FakeEngine()
+        result = SynthesisPipeline(engine, join).run(_segments("a", "bb", "c"), Path(tmp) / "out.wav")
+        assert result.output_file.read_bytes() == b"a+bb+c"
+        assert result.audio_size == 6
+        assert [s["audio_size"] for s in result.segment_stats] == [1, 2, 1]
+        assert not result.batched
+
+
+def test_single_segment_is_streamed():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = FakeEngine(batch=True)
+        result = SynthesisPipeline(engine, join).run(_segments("hello"), Path(tmp) / "out.wav")
+        assert engine.calls == [("stream", "hello")]
+        assert result.output_file.read_bytes() == b"hello"
+
+
+def test_batch_used_within_limit_and_falls_back():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = FakeEngine(batch=True, max_batch=2)
+        result = SynthesisPipeline(engine, join).run(_segments("a", "b"), Path(tmp) / "1.wav", batch_silence_ms=150)
+        assert result.batched and engine.calls == [("batch", 150)]
+        assert result.output_file.read_bytes() == b"a|b"
+
+        engine = FakeEngine(batch=True, max_batch=2)
+        SynthesisPipeline(engine, join).run(_segments("a", "b", "c"), Path(tmp) / "2.wav")
+        assert ("batch", 100) not in engine.calls
+
+        engine = FakeEngine(batch=True, fail_batch=True)
+        result = SynthesisPipeline(engine, join).run(_segments("a", "b"), Path(tmp) / "3.wav")
+        assert result.output_file.read_bytes() == b"a+b"
+
+
+def test_failure_reports_index_and_leaves_no_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = FakeEngine(fail_text="bad")
+        try:
+            SynthesisPipeline(engine, join).run(_segments("a", "bad", "c"), Path(tmp) / "out.wav")
+        except SegmentFailed as e:
+            assert e.index == 1
+        else:
+            raise AssertionError("expected SegmentFailed")
+        assert list(Path(tmp).iterdir()) == []
+
+
+def test_cache_key_coalesces_identical_runs():
+    with tempfile.TemporaryDirectory() as tmp:
+        renders = []
+
+        class SlowEngine(FakeEngine):
+            def stream(self, segment, output_path, backend=None):
+                renders.append(threading.get_ident())
+                time.sleep(0.1)
+                return super().stream(segment, output_path, backend)
+
+        pipeline = SynthesisPipeline(SlowEngine(), join, SingleFlight(Path(tmp) / ".locks"))
+        output = Path(tmp) / "cached.wav"
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: pipeline.run(_segments("hi"), output, cache_key="k"), range(8)))
+        assert len(renders) == 1
+        assert all(r.output_file == output for r in results)
+
+
+class FileEngine(Engine):
+    """Local engine rendering each segment to its own cached file."""
+
+    name = "files"
+
+    def __init__(self, directory, fail_text=None):
+        super().__init__(concurrency=4)
+        self.directory = Path(directory)
+        self.fail_text = fail_text
+        self.threads = set()
+
+    def synthesize_file(self, segment, backend=None):
+        self.threads.add(threading.get_ident())
+        time.sleep(0.05)
+        if segment.text == self.fail_text:
+            raise RuntimeError("no audio received")
+        path = self.directory / f"part_{segment.text}.mp3"
+        path.write_bytes(segment.text.encode())
+        return path
+
+
+def _join_files(paths, dest):
+    Path(dest).write_bytes(b"+".join(Path(p).read_bytes() for p in paths))
+
+
+def test_file_parts_render_in_parallel_and_join_in_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = FileEngine(tmp)
+        pipeline = SynthesisPipeline(engine, assemble_files=_join_files)
+        result = pipeline.run(_segments("a", "b", "c", "d"), Path(tmp) / "out.mp3")
+        assert result.output_file.read_bytes() == b"a+b+c+d"
+        assert [s["audio_size"] for s in result.segment_stats] == [1, 1, 1, 1]
+        assert len(engine.threads) > 1
+
+
+class FakeLedger:
+    def __init__(self):
+        self.events = []
+
+    def commit(self, reservation, actual=None, user=None):
+        self.events.append(("commit", reservation))
+
+    def refund(self, reservation, user=None):
+        self.events.append(("refund", reservation))
+
+
+def test_reservation_committed_on_success_and_refunded_on_failure():
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = FakeLedger()
+        pipeline = SynthesisPipeline(FileEngine(tmp, fail_text="bad"), assemble_files=_join_files, ledger=ledger)
+        pipeline.run(_segments("a", "b"), Path(tmp) / "ok.mp3", reservation="r1")
+        try:
+            pipeline.run(_segments("a", "bad", "c"), Path(tmp) / "failed.mp3", reservation="r2")
+        except SegmentFailed as e:
+            assert e.index == 1
+        else:
+            raise AssertionError("expected SegmentFailed")
+        assert ledger.events == [("commit", "r1"), ("refund", "r2")]
+        assert not (Path(tmp) / "failed.mp3").exists()
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the structured request-path logger.
+Fields must be truncated and rendered as text or JSON, sampling must never
+drop warnings, and a full queue must drop records instead of blocking.
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import tracing
+import tts_logging
+from tts_logging import EventLogger, StructuredFormatter, get_logger, truncate
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _logger(name):
+    logger = logging.getLogger(f"test_tts_logging.{name}")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    capture = _Capture()
+    logger.handlers = [capture]
+    return logger, capture
+
+
+def test_truncate():
+    assert truncate("short", 10) == "short"
+    assert truncate("x" * 25, 10) == "xxxxxxxxxx...(+15 chars)"
+    assert truncate({"text": "y" * 50}, 12) == "{'text': 'yy...(+50 chars)"
+    assert truncate(42, 1) == 42 and truncate(None, 1) is None
+
+
+def test_sampling_keeps_warnings():
+    logger, capture = _logger("sampled")
+    log = EventLogger(logger, sample_rate=0.0)
+    for _ in range(100):
+        log.info("batch.render", batch=1)
+    log.warning("replica.down", url="http://a")
+    log.error("segment.failed", segment=3)
+    assert [r.getMessage() for r in capture.records] == ["replica.down", "segment.failed"]
+
+    logger.setLevel(logging.INFO)
+    full = EventLogger(logger)
+    full.debug("hidden")
+    full.info("shown", n=1)
+    assert capture.records[-1].getMessage() == "shown" and capture.records[-1].fields == {"n": 1}
+
+
+def test_formatter_text_and_json():
+    logger, capture = _logger("format")
+    log = EventLogger(logger)
+    with tracing.start_trace("POST widget_generate") as root:
+        log.info("widget.request", remote="1.2.3.4", payload={"chunks": ["a" * 500]}, note="two words")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        log.exception("widget.failed", error="ValueError: boom")
+    request, failure = capture.records
+
+    line = StructuredFormatter("text", max_chars=40).format(request)
+    assert " INFO    test_tts_logging.format widget.request remote=1.2.3.4 " in line
+    assert 'note="two words"' in line
+    assert "...(+" in line and len(line) < 300
+    assert f"trace_id={root.context.trace_id}" in line
+
+    entry = json.loads(StructuredFormatter("json", max_chars=40).format(failure))
+    assert entry["level"] == "ERROR" and entry["event"] == "widget.failed"
+    assert entry["error"] == "ValueError: boom"
+    assert "ValueError: boom" in entry["exc"] and "trace_id" not in entry
+
+
+def test_full_queue_drops_instead_of_blocking():
+    stream = io.StringIO()
+    original = tts_logging.LOG_QUEUE_SIZE
+    tts_logging.LOG_QUEUE_SIZE = 5
+    try:
+        tts_logging.configure(level="INFO", fmt="json", stream=stream)
+        listener = tts_logging._listener
+        listener.stop()  # nothing drains the queue now
+        tts_logging._listener = None
+        dropped = tts_logging.DROPPED.value()
+        log = get_logger("test")
+        for i in range(20):
+            log.info("queued", i=i)
+        assert tts_logging.DROPPED.value() - dropped == 15
+
+        tts_logging.configure(level="INFO", fmt="json", stream=stream)
+        log.info("after", ok=True)
+        tts_logging.shutdown()
+    finally:
+        tts_logging.LOG_QUEUE_SIZE = original
+        tts_logging.configure()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines[-1]["event"] == "after" and lines[-1]["logger"] == "tts.test"
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
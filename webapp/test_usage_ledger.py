@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for atomic usage reservations on the user row.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Integer, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from usage_ledger import Meter, UsageLedger
+
+Base = declarative_base()
+
+
+class User(Base):
+    __tablename__ = "user"
+    id = Column(Integer, primary_key=True)
+    chars_used = Column(Integer, default=0)
+    chars_reset_at = Column(DateTime)
+    overage_cents = Column(Integer, default=0)
+
+
+METER = Meter("chars", "chars_used", "chars_reset_at", overage_column="overage_cents")
+
+
+def _setup(tmp, **values):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp, 'users.db')}", connect_args={"timeout": 10})
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    user = User(id=1, chars_reset_at=datetime.utcnow() + timedelta(days=10), **values)
+    session.add(user)
+    session.commit()
+    return engine, session, user
+
+
+def test_concurrent_reservations_never_overspend():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, session, user = _setup(tmp, chars_used=0)
+        ledger = UsageLedger(lambda: engine)
+        granted = []
+
+        def worker():
+            if ledger.reserve(METER, user, 10, 100) is not None:
+                granted.append(1)
+
+        threads = [threading.Thread(target=worker) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        session.expire_all()
+        assert len(granted) == 10
+        assert session.get(User, 1).chars_used == 100
+
+
+def test_rejected_reservation_changes_nothing():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, session, user = _setup(tmp, chars_used=95)
+        ledger = UsageLedger(lambda: engine)
+        assert ledger.reserve(METER, user, 10, 100) is None
+        reservation = ledger.reserve(METER, user, 5, 100)
+        assert reservation.used == 100
+        assert user.chars_used == 100  # mirrored onto the ORM object
+        assert user not in session.dirty
+
+
+def test_refund_and_commit_trim():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, session, user = _setup(tmp, chars_used=0)
+        ledger = UsageLedger(lambda: engine)
+        reservation = ledger.reserve(METER, user, 40, 100)
+        ledger.add_overage(reservation, 7, user)
+        ledger.refund(reservation, user)
+        ledger.refund(reservation, user)  # settled; no double refund
+        assert (user.chars_used, user.overage_cents) == (0, 0)
+
+        reservation = ledger.reserve(METER, user, 40, 100)
+        ledger.commit(reservation, actual=25, user=user)
+        session.expire_all()
+        assert session.get(User, 1).chars_used == 25
+
+
+def test_expired_period_resets_in_same_statement():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, session, user = _setup(tmp, chars_used=100, overage_cents=12)
+        session.query(User).update({"chars_reset_at": datetime.utcnow() - timedelta(days=1)})
+        session.commit()
+        ledger = UsageLedger(lambda: engine)
+        reservation = ledger.reserve(METER, user, 30, 100)
+        assert reservation is not None and reservation.used == 30
+        assert user.overage_cents == 0
+        assert user.chars_reset_at > datetime.utcnow() + timedelta(days=29)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✅ PASS: {name}")
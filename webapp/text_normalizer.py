@@ -0,0 +1,264 @@
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+# Text normalization for the model TTS engines.
+#
+# Rules are grouped into packs (contractions, numbers, dates, currency, ...).
+# A Normalizer compiles every rule of its packs into ONE alternation at
+# construction, each rule in its own named group, and rewrites the text in
+# a single re.sub pass that dispatches on match.lastgroup. Literal tables
+# (contractions, fixed number words) become one branch of escaped words,
+# longest first, plus a dict lookup. At a given position the first matching
+# rule in pack order wins, so put more specific packs (dates, currency)
+# before generic ones (numbers).
+#
+# Whitespace cleanup, pause spacing after . ! ? and emoji removal are part
+# of the same pass. Results for short segments are memoized, since the same
+# lines (speaker turns, repeated headings, retries) are normalized often.
+
+NORMALIZER_PACKS = os.environ.get("NORMALIZER_PACKS", "contractions,numbers")
+NORMALIZER_CACHE_SIZE = int(os.environ.get("NORMALIZER_CACHE_SIZE", "2048"))
+NORMALIZER_CACHE_MAX_CHARS = int(os.environ.get("NORMALIZER_CACHE_MAX_CHARS", "4096"))
+
+Replacement = Union[str, Callable[["re.Match"], str]]
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A regex and its replacement (a string, or a function of the match).
+
+    A function receives a match of the rule's own pattern against the
+    matched text, so its group numbers are the ones written in `pattern`.
+    """
+
+    pattern: str
+    replace: Replacement
+    flags: int = 0
+
+
+@dataclass(frozen=True)
+class RulePack:
+    name: str
+    rules: Sequence[Rule] = field(default_factory=tuple)
+
+
+def _match_case(source: str, replacement: str) -> str:
+    if source[:1].isupper() and replacement[:1].islower():
+        return replacement[:1].upper() + replacement[1:]
+    return replacement
+
+
+def literal_rule(table: Mapping[str, str], ignore_case: bool = False) -> Rule:
+    """One Rule replacing whole-word occurrences of any key in table."""
+    lookup = {(key.lower() if ignore_case else key): value for key, value in table.items()}
+    words = sorted(table, key=len, reverse=True)
+    pattern = r"(?<!\w)(?:" + "|".join(re.escape(word) for word in words) + r")(?!\w)"
+
+    def replace(match: "re.Match") -> str:
+        text = match.group(0)
+        value = lookup[text.lower() if ignore_case else text]
+        return _match_case(text, value) if ignore_case else value
+
+    return Rule(pattern, replace, re.IGNORECASE if ignore_case else 0)
+
+
+# -------- number words --------
+
+_ONES = ("zero one two three four five six seven eight nine ten eleven twelve thirteen "
+         "fourteen fifteen sixteen seventeen eighteen nineteen").split()
+_TENS = "_ _ twenty thirty forty fifty sixty seventy eighty ninety".split()
+_SCALES = ((10 ** 9, "billion"), (10 ** 6, "million"), (1000, "thousand"))
+_ORDINAL_SUFFIXES = {
+    "one": "first", "two": "second", "three": "third", "five": "fifth",
+    "eight": "eighth", "nine": "ninth", "twelve": "twelfth",
+}
+
+
+def _below_thousand(n: int) -> str:
+    words = []
+    if n >= 100:
+        words += [_ONES[n // 100], "hundred"]
+        n %= 100
+        if not n:
+            return " ".join(words)
+    if n < 20:
+        words.append(_ONES[n])
+    else:
+        words.append(_TENS[n // 10] + ("" if n % 10 == 0 else " " + _ONES[n % 10]))
+    return " ".join(words)
+
+
+def number_words(n: int) -> str:
+    """Cardinal words for 0 <= n < 10**12 (e.g. 1204 -> 'one thousand two hundred four')."""
+    if n < 1000:
+        return _below_thousand(n)
+    words = []
+    for size, name in _SCALES:
+        if n >= size:
+            words += [number_words(n // size), name]
+            n %= size
+    if n:
+        words.append(_below_thousand(n))
+    return " ".join(words)
+
+
+def ordinal_words(n: int) -> str:
+    words = number_words(n)
+    head, _, last = words.rpartition(" ")
+    if last in _ORDINAL_SUFFIXES:
+        last = _ORDINAL_SUFFIXES[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return f"{head} {last}" if head else last
+
+
+def year_words(n: int) -> str:
+    """Years read in pairs: 1999 -> 'nineteen ninety nine', 2024 -> 'twenty twenty four'."""
+    if n < 1000 or n >= 10000 or n % 1000 < 10 or n % 100 == 0:
+        return number_words(n)
+    return f"{_below_thousand(n // 100)} {_below_thousand(n % 100)}"
+
+
+# -------- rule packs --------
+
+CONTRACTIONS = {
+    "don't": "do not", "doesn't": "does not", "didn't": "did not",
+    "won't": "will not", "wouldn't": "would not", "couldn't": "could not",
+    "shouldn't": "should not", "can't": "cannot", "isn't": "is not",
+    "aren't": "are not", "wasn't": "was not", "weren't": "were not",
+    "haven't": "have not", "hasn't": "has not", "hadn't": "had not",
+    "I'm": "I am", "you're": "you are", "we're": "we are", "they're": "they are",
+    "he's": "he is", "she's": "she is", "it's": "it is", "that's": "that is",
+    "what's": "what is", "who's": "who is", "there's": "there is",
+    "I've": "I have", "you've": "you have", "we've": "we have", "they've": "they have",
+    "I'll": "I will", "you'll": "you will", "we'll": "we will", "they'll": "they will",
+    "he'll": "he will", "she'll": "she will", "it'll": "it will",
+    "I'd": "I would", "you'd": "you would", "we'd": "we would", "they'd": "they would",
+    "he'd": "he would", "she'd": "she would", "it'd": "it would",
+    "let's": "let us", "that'll": "that will", "who'll": "who will",
+}
+
+NUMBER_WORDS = {
+    '0': 'zero', '1': 'one', '2': 'two', '3': 'three', '4': 'four',
+    '5': 'five', '6': 'six', '7': 'seven', '8': 'eight', '9': 'nine',
+    '10': 'ten', '11': 'eleven', '12': 'twelve', '100': 'one hundred',
+    '1000': 'one thousand', '2024': 'twenty twenty four', '2025': 'twenty twenty five',
+}
+
+_MONTHS = ("January February March April May June July August September "
+           "October November December").split()
+
+
+def _iso_date(match: "re.Match") -> str:
+    year, month, day = int(match.group(1)), int(match.group(2)), int(match.group(3))
+    return f"{_MONTHS[month - 1]} {ordinal_words(day)}, {year_words(year)}"
+
+
+def _month_day(match: "re.Match") -> str:
+    month, day, year = match.group(1), int(match.group(2)), match.group(3)
+    spoken = f"{month} {ordinal_words(day)}"
+    return f"{spoken}, {year_words(int(year))}" if year else spoken
+
+
+_CURRENCIES = {"$": ("dollar", "dollars"), "€": ("euro", "euros"), "£": ("pound", "pounds")}
+
+
+def _amount(match: "re.Match") -> str:
+    singular, plural = _CURRENCIES[match.group(1)]
+    whole = int(match.group(2).replace(",", ""))
+    cents = int((match.group(3) or "0").ljust(2, "0"))
+    spoken = f"{number_words(whole)} {singular if whole == 1 else plural}"
+    if cents:
+        spoken += f" and {number_words(cents)} {'cent' if cents == 1 else 'cents'}"
+    return spoken
+
+
+PACKS: Dict[str, RulePack] = {
+    "contractions": RulePack("contractions", (literal_rule(CONTRACTIONS, ignore_case=True),)),
+    # The fixed table the model engines have always used; other numbers are
+    # left to the model
+    "numbers": RulePack("numbers", (Rule(r"\b(?:" + "|".join(
+        sorted(NUMBER_WORDS, key=len, reverse=True)) + r")\b", lambda m: NUMBER_WORDS[m.group(0)]),)),
+    "dates": RulePack("dates", (
+        Rule(r"\b(\d{4})-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])\b", _iso_date),
+        Rule(r"\b(" + "|".join(_MONTHS) + r")\s+([1-9]|[12]\d|3[01])(?:st|nd|rd|th)?\b(?:,?\s+(\d{4})\b)?", _month_day),
+    )),
+    "currency": RulePack("currency", (
+        Rule(r"([$€£])(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d{1,2}))?\b", _amount),
+    )),
+}
+
+# Always applied, in the same pass: collapse whitespace (wider after . ! ?
+# so the model pauses) and drop emoji
+_CLEANUP = (
+    Rule(r"(?<=[.!?])\s+", "   "),
+    Rule(r"\s+", " "),
+    Rule(r"[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]", ""),
+)
+
+
+class Normalizer:
+    def __init__(self, packs: Iterable[Union[str, RulePack]], cache_size: int = NORMALIZER_CACHE_SIZE):
+        self.packs: List[RulePack] = [PACKS[p] if isinstance(p, str) else p for p in packs]
+        rules = [rule for pack in self.packs for rule in pack.rules] + list(_CLEANUP)
+        self._rules: Dict[str, Rule] = {}
+        self._compiled: Dict[str, "re.Pattern"] = {}
+        branches = []
+        for index, rule in enumerate(rules):
+            name = f"r{index}"
+            self._rules[name] = rule
+            self._compiled[name] = re.compile(rule.pattern, rule.flags)
+            inline = "(?i:" if rule.flags & re.IGNORECASE else "(?:"
+            branches.append(f"(?P<{name}>{inline}{rule.pattern}))")
+        self.pattern = re.compile("|".join(branches))
+        self._cached = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def _dispatch(self, match: "re.Match") -> str:
+        name = match.lastgroup
+        rule = self._rules[name]
+        if isinstance(rule.replace, str):
+            return rule.replace
+        return rule.replace(self._compiled[name].match(match.group(name)))
+
+    def _normalize(self, text: str) -> str:
+        text = self.pattern.sub(self._dispatch, text).strip()
+        # End on punctuation so the last sentence gets a natural falling close
+        if text and text[-1] not in ".!?":
+            text += "."
+        return text
+
+    def normalize(self, text: str) -> str:
+        if len(text) > NORMALIZER_CACHE_MAX_CHARS:
+            return self._normalize(text)
+        return self._cached(text)
+
+    def cache_info(self):
+        return self._cached.cache_info()
+
+
+def default_normalizer(packs: Optional[str] = None) -> Normalizer:
+    """Normalizer for a comma-separated pack list (NORMALIZER_PACKS by default)."""
+    names = [name.strip() for name in (packs or NORMALIZER_PACKS).split(",") if name.strip()]
+    unknown = [name for name in names if name not in PACKS]
+    if unknown:
+        raise ValueError(f"Unknown normalizer packs: {', '.join(unknown)} (available: {', '.join(PACKS)})")
+    return Normalizer(names)
+
+
+__all__ = [
+    "NORMALIZER_PACKS",
+    "Normalizer",
+    "PACKS",
+    "Rule",
+    "RulePack",
+    "default_normalizer",
+    "literal_rule",
+    "number_words",
+    "ordinal_words",
+    "year_words",
+]
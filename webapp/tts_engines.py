@@ -0,0 +1,332 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+import tracing
+
+from backend_client import BackendClient
+from backend_pool import BackendPool, SegmentFailed
+from metrics import CACHE_LOOKUPS, CHARACTERS, ENGINE_ERRORS, STAGE_SECONDS
+from single_flight import SingleFlight, partial_path
+from tts_logging import get_logger
+from usage_ledger import Reservation, UsageLedger
+
+# Common interface for the TTS engines behind the webapp (Edge, Chatterbox,
+# IndexTTS2, VibeVoice) plus the pipeline every long-form request runs through:
+#
+#   segment -> schedule -> synthesize -> assemble -> cache -> persist
+#
+# Endpoints turn a request into Segments and hand them to a SynthesisPipeline.
+# Scheduling (fan-out across replicas), batch-vs-per-segment choice,
+# streaming single results to disk, assembly and atomic persistence live here
+# once instead of in every endpoint. Each stage is timed into
+# tts_stage_seconds, labelled with the engine name, and is a span in the
+# request's trace under one "pipeline" span. A usage reservation handed to
+# run() is committed when the file is saved and refunded on any failure.
+#
+# Engines whose parts are files (Edge MP3s, cached per chunk) use a file
+# assembler (e.g. mp3_assembler.assemble_mp3) instead of joining bytes; local
+# engines without a replica pool render up to `concurrency` segments at once.
+
+PathLike = Union[str, Path]
+
+log = get_logger("pipeline")
+
+
+@dataclass(frozen=True)
+class Capabilities:
+    """What an engine supports; used by the pipeline and exposed to clients."""
+
+    batch: bool = False  # server-side multi-segment endpoint
+    max_batch_segments: Optional[int] = None  # larger requests go per-segment
+    streaming: bool = True  # single results can be streamed to disk
+    cloning: bool = False
+    emotion: bool = False
+    ssml: bool = False
+    output_format: str = "wav"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class Segment:
+    """One unit of synthesis: text, voice and engine-specific options."""
+
+    text: str
+    voice: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    label: str = "segment"
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class PipelineResult:
+    output_file: Path
+    audio_size: int
+    segment_stats: List[Dict[str, Any]]
+    batched: bool = False
+
+
+class Engine:
+    """
+    Base class for a TTS engine.
+
+    HTTP engines are backed by a BackendPool; synthesize()/stream() receive
+    the replica client chosen by the scheduler. Local engines (Edge) have no
+    pool, are called with backend=None and run up to `concurrency` segments
+    in parallel.
+    """
+
+    name = "engine"
+    capabilities = Capabilities()
+
+    def __init__(self, pool: Optional[BackendPool] = None, health_path: str = "/health", concurrency: int = 1):
+        self.pool = pool
+        self.health_path = health_path
+        self.concurrency = concurrency
+
+    @property
+    def configured(self) -> bool:
+        return self.pool is None or self.pool.configured
+
+    def available(self) -> bool:
+        """False while every replica is down or has its circuit open."""
+        return self.pool is None or self.pool.available()
+
+    def synthesize(self, segment: Segment, backend: Optional[BackendClient] = None) -> bytes:
+        """Render one segment and return its audio bytes."""
+        raise NotImplementedError
+
+    def stream(self, segment: Segment, output_path: PathLike, backend: Optional[BackendClient] = None) -> Path:
+        """Render one segment straight into output_path."""
+        output_path = Path(output_path)
+        output_path.write_bytes(self.synthesize(segment, backend))
+        return output_path
+
+    def synthesize_file(self, segment: Segment, backend: Optional[BackendClient] = None) -> Path:
+        """Render one segment to a file the engine owns (e.g. its cache) and return the path."""
+        raise NotImplementedError(f"{self.name} renders segments to bytes")
+
+    def synthesize_batch(self, segments: Sequence[Segment], silence_ms: int, output_path: PathLike,
+                         backend: Optional[BackendClient] = None) -> Path:
+        """Render several segments in one server call into output_path."""
+        raise NotImplementedError(f"{self.name} has no batch endpoint")
+
+    def health(self) -> Dict[str, Any]:
+        """Health of the primary replica as reported by the server."""
+        if self.pool is None:
+            return {"status": "healthy"}
+        if not self.pool.configured:
+            return {"status": "not_configured"}
+        response = self.pool.replicas[0].client.get(self.health_path, timeout=10)
+        if response.status_code != 200:
+            return {"status": "unhealthy", "http_status": response.status_code}
+        try:
+            return response.json()
+        except ValueError:
+            return {"status": "healthy"}
+
+    # Scheduling -------------------------------------------------------
+
+    def call(self, fn: Callable[[Optional[BackendClient]], Any]) -> Any:
+        return fn(None) if self.pool is None else self.pool.call(fn)
+
+    def map_ordered(self, fn: Callable[[Optional[BackendClient], Segment], Any], segments: Sequence[Segment]) -> List[Any]:
+        if self.pool is not None:
+            return self.pool.map_ordered(fn, segments)
+        if self.concurrency <= 1 or len(segments) <= 1:
+            results = []
+            for idx, segment in enumerate(segments):
+                try:
+                    results.append(fn(None, segment))
+                except Exception as e:
+                    raise SegmentFailed(idx, e) from e
+            return results
+        workers = min(self.concurrency, len(segments))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{self.name}-render") as executor:
+            futures = [executor.submit(tracing.bind(fn), None, segment) for segment in segments]
+            results = []
+            for idx, future in enumerate(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    for pending in futures[idx + 1:]:
+                        pending.cancel()
+                    raise SegmentFailed(idx, e) from e
+            return results
+
+
+_engines: Dict[str, Engine] = {}
+
+
+def register_engine(engine: Engine) -> Engine:
+    _engines[engine.name] = engine
+    return engine
+
+
+def get_engine(name: str) -> Engine:
+    return _engines[name]
+
+
+def registered_engines() -> Dict[str, Engine]:
+    return dict(_engines)
+
+
+class SynthesisPipeline:
+    """
+    Runs segments through one engine and persists the result.
+
+    assemble(chunks, crossfade_ms, silence_ms) joins per-segment audio bytes;
+    assemble_files(paths, dest) instead joins the files returned by the
+    engine's synthesize_file(). If a SingleFlight is given and run() gets a
+    cache_key, identical concurrent runs render once and later runs reuse the
+    file. With a ledger, run() settles the reservation it is given.
+    """
+
+    def __init__(self, engine: Engine, assemble: Optional[Callable[[List[bytes], int, int], bytes]] = None,
+                 flight: Optional[SingleFlight] = None,
+                 assemble_files: Optional[Callable[[List[Path], Path], Any]] = None,
+                 ledger: Optional[UsageLedger] = None):
+        if (assemble is None) == (assemble_files is None):
+            raise ValueError("Give exactly one of assemble and assemble_files")
+        self.engine = engine
+        self.assemble = assemble
+        self.assemble_files = assemble_files
+        self.flight = flight
+        self.ledger = ledger
+
+    def run(self, segments: Sequence[Segment], output_path: PathLike, crossfade_ms: int = 40,
+            silence_ms: int = 100, batch_silence_ms: Optional[int] = None,
+            cache_key: Optional[str] = None, reservation: Optional[Reservation] = None,
+            user: Any = None) -> PipelineResult:
+        """
+        Synthesize segments into output_path. Raises SegmentFailed (with the
+        segment index) if a segment can't be rendered. reservation (usage
+        reserved for this run; user is kept in sync) is committed on success
+        and refunded if anything fails.
+        """
+        try:
+            result = self._run(list(segments), Path(output_path), crossfade_ms, silence_ms, batch_silence_ms,
+                               cache_key)
+        except BaseException:
+            if self.ledger is not None:
+                self.ledger.refund(reservation, user)
+            raise
+        if self.ledger is not None:
+            self.ledger.commit(reservation, user=user)
+        return result
+
+    def _run(self, segments: List[Segment], output_path: Path, crossfade_ms: int, silence_ms: int,
+             batch_silence_ms: Optional[int], cache_key: Optional[str]) -> PipelineResult:
+        if not segments:
+            raise ValueError("No segments to synthesize")
+        outcome: Dict[str, Any] = {}
+
+        def produce(partial: Path) -> None:
+            outcome["rendered"] = True
+            CHARACTERS.inc(sum(len(s.text) for s in segments), engine=self.engine.name)
+            outcome.update(self._produce(segments, partial, crossfade_ms, silence_ms, batch_silence_ms))
+
+        try:
+            with tracing.span("pipeline", engine=self.engine.name, segments=len(segments)) as run_span:
+                if cache_key and self.flight is not None:
+                    self.flight.render(cache_key, output_path, produce)
+                    CACHE_LOOKUPS.inc(engine=self.engine.name, result="miss" if outcome else "hit")
+                    run_span.attrs["cached"] = not outcome
+                else:
+                    partial = partial_path(output_path)
+                    try:
+                        produce(partial)
+                        os.replace(partial, output_path)
+                    finally:
+                        if partial.exists():
+                            partial.unlink()
+        except Exception as e:
+            error = e.error if isinstance(e, SegmentFailed) else e
+            ENGINE_ERRORS.inc(engine=self.engine.name, error=type(error).__name__)
+            raise
+
+        size = output_path.stat().st_size
+        log.info("pipeline.saved", engine=self.engine.name, file=output_path.name, size=size)
+        return PipelineResult(
+            output_file=output_path,
+            audio_size=size,
+            segment_stats=outcome.get("stats") or [{"voice": s.voice, **s.stats} for s in segments],
+            batched=outcome.get("batched", False),
+        )
+
+    @contextmanager
+    def _timed(self, stage: str) -> Iterator[None]:
+        with tracing.span(stage, engine=self.engine.name), STAGE_SECONDS.time(stage=stage, engine=self.engine.name):
+            yield
+
+    def _produce(self, segments: List[Segment], partial: Path, crossfade_ms: int, silence_ms: int,
+                 batch_silence_ms: Optional[int]) -> Dict[str, Any]:
+        engine = self.engine
+        caps = engine.capabilities
+
+        # File parts (cached per segment by the engine), joined on disk
+        if self.assemble_files is not None:
+            with self._timed("synthesis"):
+                paths = engine.map_ordered(lambda backend, seg: engine.synthesize_file(seg, backend), segments)
+            with self._timed("assembly"):
+                self.assemble_files(paths, partial)
+            return {"stats": [{"voice": s.voice, **s.stats, "audio_size": p.stat().st_size}
+                              for s, p in zip(segments, paths)]}
+
+        # Server-side batch: one call, result streamed to disk
+        if caps.batch and len(segments) > 1:
+            if caps.max_batch_segments and len(segments) > caps.max_batch_segments:
+                log.debug("pipeline.sequential", engine=engine.name, segments=len(segments),
+                          reason="too many segments for batch")
+            else:
+                log.debug("pipeline.batch", engine=engine.name, segments=len(segments))
+                try:
+                    gap = silence_ms if batch_silence_ms is None else batch_silence_ms
+                    with self._timed("synthesis"):
+                        engine.call(lambda backend: engine.synthesize_batch(segments, gap, partial, backend))
+                    return {"batched": True, "stats": [{"voice": s.voice, **s.stats} for s in segments]}
+                except Exception as e:
+                    log.warning("pipeline.batch_failed", engine=engine.name, error=str(e), fallback="sequential")
+
+        # Single segment: stream straight into the output file
+        if len(segments) == 1 and caps.streaming:
+            segment = segments[0]
+            try:
+                with self._timed("synthesis"):
+                    engine.call(lambda backend: engine.stream(segment, partial, backend))
+            except Exception as e:
+                raise SegmentFailed(0, e) from e
+            return {"stats": [{"voice": segment.voice, **segment.stats, "audio_size": partial.stat().st_size}]}
+
+        # Per-segment across replicas, reassembled in order
+        with self._timed("synthesis"):
+            chunks = engine.map_ordered(lambda backend, seg: engine.synthesize(seg, backend), segments)
+        stats = [{"voice": s.voice, **s.stats, "audio_size": len(a)} for s, a in zip(segments, chunks)]
+        if len(chunks) > 1:
+            log.debug("pipeline.assemble", engine=engine.name, chunks=len(chunks))
+            with self._timed("assembly"):
+                audio = self.assemble(chunks, crossfade_ms, silence_ms)
+        else:
+            audio = chunks[0]
+        if not audio:
+            raise SegmentFailed(0, ValueError("No audio data generated"))
+        with self._timed("file_write"):
+            partial.write_bytes(audio)
+        return {"stats": stats}
+
+
+__all__ = [
+    "Capabilities",
+    "Engine",
+    "PipelineResult",
+    "Segment",
+    "SynthesisPipeline",
+    "get_engine",
+    "register_engine",
+    "registered_engines",
+]
@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm.attributes import set_committed_value
+
+# Atomic character accounting on the user row.
+#
+# Each metered product (web chars, API chars, Ultra, IndexTTS2, Studio) is a
+# Meter: a usage column, the column holding when the period resets, and
+# optionally an overage column. Reserving usage is one conditional UPDATE:
+#
+#   UPDATE "user" SET used = used + :n
+#   WHERE id = :id AND used + :n <= :limit RETURNING used
+#
+# with the monthly reset folded into the same statement, so two concurrent
+# requests can never both spend the last characters and no read-modify-write
+# transaction is needed. Statements run on their own autocommitted
+# connection, independent of the request's ORM session. A reservation can be
+# committed (optionally trimmed to actual usage) or refunded if generation
+# fails.
+
+USAGE_PERIOD = timedelta(days=30)
+
+
+@dataclass(frozen=True)
+class Meter:
+    name: str
+    used_column: str
+    reset_column: str
+    overage_column: Optional[str] = None  # cleared when the period resets
+    period: timedelta = USAGE_PERIOD
+
+
+@dataclass
+class Reservation:
+    meter: Meter
+    user_id: int
+    amount: int
+    used: int  # meter value right after reserving
+    overage_cents: int = 0
+    settled: bool = False
+
+    @property
+    def is_overage(self) -> bool:
+        return self.overage_cents > 0
+
+
+class UsageLedger:
+    """Reserve / commit / refund usage with single-statement atomic updates."""
+
+    def __init__(self, engine: Callable[[], Engine], table: str = "user"):
+        self._engine = engine  # callable so Flask-SQLAlchemy can resolve it per app
+        self.table = table
+
+    def _update(self, sql: str, params: dict) -> Optional[tuple]:
+        engine = self._engine()
+        with engine.begin() as conn:
+            if engine.dialect.update_returning:
+                return conn.execute(_statement(sql, params), params).first()
+            # Old SQLite without RETURNING: same UPDATE, then read back in
+            # the same transaction
+            head, _, returning = sql.rpartition(" RETURNING ")
+            if conn.execute(_statement(head, params), params).rowcount == 0:
+                return None
+            return conn.execute(
+                text(f'SELECT {returning} FROM "{self.table}" WHERE id = :id'), params
+            ).first()
+
+    def _sync(self, user: Any, meter: Meter, row: tuple) -> None:
+        """Mirror the new values onto the loaded ORM object without dirtying it."""
+        if user is None or isinstance(user, int):
+            return
+        set_committed_value(user, meter.used_column, row[0])
+        set_committed_value(user, meter.reset_column, _as_datetime(row[1]))
+        if meter.overage_column and len(row) > 2:
+            set_committed_value(user, meter.overage_column, row[2])
+
+    def reserve(self, meter: Meter, user: Any, amount: int, limit: Optional[int]) -> Optional[Reservation]:
+        """
+        Add amount to the meter if it stays within limit (limit=None: always).
+        Returns None, changing nothing, if it would not fit. `user` is the
+        ORM object (kept in sync) or just a user id.
+        """
+        user_id = user if isinstance(user, int) else user.id
+        used, reset, overage = meter.used_column, meter.reset_column, meter.overage_column
+        expired = f"({reset} IS NULL OR {reset} <= :now)"
+        current = f"(CASE WHEN {expired} THEN 0 ELSE COALESCE({used}, 0) END)"
+        sets = [
+            f"{used} = {current} + :n",
+            f"{reset} = CASE WHEN {expired} THEN :next_reset ELSE {reset} END",
+        ]
+        returning = [used, reset]
+        if overage:
+            sets.append(f"{overage} = CASE WHEN {expired} THEN 0 ELSE COALESCE({overage}, 0) END")
+            returning.append(overage)
+        where = "id = :id" + (f" AND {current} + :n <= :limit" if limit is not None else "")
+        now = datetime.utcnow()
+        row = self._update(
+            f'UPDATE "{self.table}" SET {", ".join(sets)} WHERE {where} RETURNING {", ".join(returning)}',
+            {"id": user_id, "n": amount, "limit": limit, "now": now, "next_reset": now + meter.period},
+        )
+        if row is None:
+            return None
+        self._sync(user, meter, row)
+        return Reservation(meter, user_id, amount, row[0])
+
+    def add_overage(self, reservation: Reservation, cents: int, user: Any = None) -> None:
+        """Record overage charged for a reservation (refunded with it)."""
+        column = reservation.meter.overage_column
+        if not column or cents <= 0:
+            return
+        row = self._update(
+            f'UPDATE "{self.table}" SET {column} = COALESCE({column}, 0) + :cents WHERE id = :id RETURNING {column}',
+            {"id": reservation.user_id, "cents": cents},
+        )
+        reservation.overage_cents += cents
+        if user is not None and row is not None:
+            set_committed_value(user, column, row[0])
+
+    def commit(self, reservation: Optional[Reservation], actual: Optional[int] = None, user: Any = None) -> None:
+        """Keep the reservation; if fewer characters were used, give back the rest."""
+        if reservation is None or reservation.settled:
+            return
+        if actual is not None and actual < reservation.amount:
+            self._give_back(reservation, reservation.amount - actual, 0, user)
+        reservation.settled = True
+
+    def refund(self, reservation: Optional[Reservation], user: Any = None) -> None:
+        """Undo a reservation (and any overage recorded with it)."""
+        if reservation is None or reservation.settled:
+            return
+        self._give_back(reservation, reservation.amount, reservation.overage_cents, user)
+        reservation.settled = True
+
+    def _give_back(self, reservation: Reservation, amount: int, cents: int, user: Any) -> None:
+        if amount <= 0 and cents <= 0:
+            return
+        meter = reservation.meter
+        used, overage = meter.used_column, meter.overage_column
+        sets = [f"{used} = CASE WHEN COALESCE({used}, 0) >= :n THEN {used} - :n ELSE 0 END"]
+        returning = [used]
+        if overage and cents:
+            sets.append(f"{overage} = CASE WHEN COALESCE({overage}, 0) >= :cents THEN {overage} - :cents ELSE 0 END")
+            returning.append(overage)
+        row = self._update(
+            f'UPDATE "{self.table}" SET {", ".join(sets)} WHERE id = :id RETURNING {", ".join(returning)}',
+            {"id": reservation.user_id, "n": amount, "cents": cents},
+        )
+        if user is not None and row is not None:
+            set_committed_value(user, used, row[0])
+            if len(row) > 1:
+                set_committed_value(user, overage, row[1])
+
+
+def _statement(sql: str, params: dict):
+    # Bind timestamps through the dialect's DateTime type so they compare
+    # correctly with what the ORM stored
+    stmt = text(sql)
+    for key in ("now", "next_reset"):
+        if key in params:
+            stmt = stmt.bindparams(bindparam(key, type_=DateTime()))
+    return stmt
+
+
+def _as_datetime(value: Any) -> Any:
+    # SQLite hands back DATETIME columns from raw SQL as strings
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+__all__ = ["Meter", "Reservation", "UsageLedger", "USAGE_PERIOD"]